@@ -1,6 +1,10 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+from services.llm_gateway import get_llm_gateway, LLMUnavailableError
 
 app = Flask(__name__)
 CORS(app)
@@ -19,18 +23,15 @@ def health():
 @app.route('/api/chatbot', methods=['POST'])
 def chatbot():
     try:
-        from groq import Groq
-        
         data = request.json
         message = data.get('message', '')
         
-        groq_api_key = os.getenv('GROQ_API_KEY')
-        if not groq_api_key:
+        # Reused across warm invocations instead of a new client per request
+        llm = get_llm_gateway()
+        if not llm.is_configured():
             return jsonify({"error": "AI service not configured"}), 503
         
-        client = Groq(api_key=groq_api_key)
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
+        reply = llm.chat(
             messages=[
                 {"role": "system", "content": "You are a helpful medical assistant."},
                 {"role": "user", "content": message}
@@ -40,9 +41,11 @@ def chatbot():
         )
         
         return jsonify({
-            "response": response.choices[0].message.content,
+            "response": reply,
             "success": True
         })
+    except LLMUnavailableError as e:
+        return jsonify({"error": f"AI service unavailable: {e}", "success": False}), 503
     except Exception as e:
         return jsonify({"error": str(e), "success": False}), 500
 
@@ -2,7 +2,8 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
 import os
-from groq import Groq
+
+from services.llm_gateway import get_llm_gateway, LLMUnavailableError
 
 # Load environment variables
 load_dotenv()
@@ -18,17 +19,8 @@ CORS(app, resources={
     }
 })
 
-# Initialize Groq client
-groq_client = None
-try:
-    groq_api_key = os.getenv('GROQ_API_KEY')
-    if groq_api_key:
-        groq_client = Groq(api_key=groq_api_key)
-        print("✅ Groq AI client initialized")
-    else:
-        print("⚠️  GROQ_API_KEY not set")
-except Exception as e:
-    print(f"⚠️ Groq init failed: {e}")
+# Shared LLM gateway (pooled client, deadlines, retries, circuit breaker)
+llm = get_llm_gateway()
 
 @app.route('/')
 def index():
@@ -45,7 +37,8 @@ def health():
 @app.route('/ai-capabilities')
 def ai_capabilities():
     return jsonify({
-        "groq_available": groq_client is not None,
+        "groq_available": llm.is_configured(),
+        "llm_circuit": llm.breaker.get_stats()["state"],
         "features": ["chatbot"]
     })
 
@@ -55,11 +48,10 @@ def chatbot():
         data = request.json
         message = data.get('message', '')
         
-        if not groq_client:
+        if not llm.is_configured():
             return jsonify({"error": "AI service not configured"}), 503
         
-        response = groq_client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
+        reply = llm.chat(
             messages=[
                 {"role": "system", "content": "You are a helpful medical assistant for DoseSafe AI. Provide helpful information about medications and health."},
                 {"role": "user", "content": message}
@@ -69,9 +61,11 @@ def chatbot():
         )
         
         return jsonify({
-            "response": response.choices[0].message.content,
+            "response": reply,
             "success": True
         })
+    except LLMUnavailableError as e:
+        return jsonify({"error": f"AI service unavailable: {e}", "success": False}), 503
     except Exception as e:
         return jsonify({"error": str(e), "success": False}), 500
 
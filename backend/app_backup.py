@@ -13,7 +13,7 @@ ML_MODELS_AVAILABLE = False
 # try:
 #     import sys
 #     sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'ml_models'))
-#     from ml_integration import extract_medicines, check_interactions, check_age_warnings, get_ml_status
+#     from ml_integration import extract_medicines, check_interactions, check_interactions_batch, check_age_warnings, get_ml_status
 #     ML_MODELS_AVAILABLE = True
 #     print("✅ ML models loaded in main app")
 #     print(f"   Status: {get_ml_status()}")
@@ -40,6 +40,16 @@ except:
 # Import drug database service
 # from services.drug_database_service import drug_db_service
 
+# Shared Tesseract workers, located once at startup; a full queue answers 429
+from services.ocr_engine import get_ocr_engine, OCRBusyError
+ocr_engine = get_ocr_engine()
+
+# Uploads are decoded from memory, never written to temp files
+from services.image_ingest import enable_in_memory_uploads, load_image
+from services.lazy_resource import lazy_import
+image_preprocess = lazy_import('services.image_preprocess')  # numpy, loaded with the first image
+from services.pdf_ingest import is_pdf, extract_pdf_text
+
 # Initialize global Groq client
 groq_client = None
 try:
@@ -56,6 +66,7 @@ except Exception as e:
 # from routes.ai_only_ocr import ai_only_ocr_bp
 
 app = Flask(__name__)
+enable_in_memory_uploads(app)
 
 # Production CORS configuration
 CORS(app, resources={
@@ -174,25 +185,26 @@ def system_metrics():
 def validate_database_connection():
     """Validate database connectivity and data integrity"""
     try:
-        import pandas as pd
+        from services.drug_knowledge_base import get_knowledge_base
+        from services.drug_database_service import get_drug_db_service
         
-        # Verify CSV database accessibility
-        database_path = 'data/drug_interactions.csv'
-        interaction_data = pd.read_csv(database_path)
+        # Verify the shared drug knowledge base loaded and validated the CSVs
+        knowledge_base = get_knowledge_base()
+        stats = knowledge_base.get_stats()
         
-        print(f"Database validation: {len(interaction_data)} interactions loaded successfully")
+        print(f"Database validation: {stats['interactions']} interactions loaded successfully")
         
         # Test specific interaction lookup for validation
-        test_interaction = interaction_data[
-            ((interaction_data['Drug A'] == 'Aspirin') & (interaction_data['Drug B'] == 'Warfarin')) |
-            ((interaction_data['Drug A'] == 'Warfarin') & (interaction_data['Drug B'] == 'Aspirin'))
-        ]
+        test_interaction = knowledge_base.interactions_for_pair('Aspirin', 'Warfarin')
         
         return jsonify({
             "database_status": "operational",
-            "total_interactions": len(interaction_data),
+            "total_interactions": stats['interactions'],
+            "total_warnings": stats['warnings'],
+            "unique_drugs": stats['unique_drugs'],
             "test_interaction_found": len(test_interaction) > 0,
-            "sample_data": interaction_data.head(3).to_dict('records'),
+            "sample_data": knowledge_base.interaction_rows()[:3],
+            "name_match_cache": get_drug_db_service().get_cache_stats(),
             "validation_successful": True
         })
         
@@ -232,22 +244,21 @@ def analyze_interactions():
     if ML_MODELS_AVAILABLE:
         print("🤖 Using ML models for drug interaction analysis...")
         
-        # Check all pairwise interactions using ML
-        for i, drug1 in enumerate(medicine_names):
-            for j, drug2 in enumerate(medicine_names[i+1:], i+1):
-                ml_result = check_interactions(drug1, drug2)
-                
-                if ml_result['has_interaction'] and ml_result['confidence'] > 0.7:
-                    drug_interactions.append({
-                        "drug1": drug1,
-                        "drug2": drug2,
-                        "severity": ml_result.get('severity', 'Medium'),
-                        "clinical_effect": f"Potential interaction detected (ML confidence: {ml_result['confidence']:.2f})",
-                        "mechanism": "Machine learning model prediction based on drug interaction patterns",
-                        "management": "Consult healthcare provider for clinical assessment",
-                        "ml_confidence": ml_result['confidence']
-                    })
-                    print(f"🚨 ML detected interaction: {drug1} + {drug2} (confidence: {ml_result['confidence']:.2f})")
+        # Check all pairwise interactions using ML, scored in one batch
+        for ml_result in check_interactions_batch(medicine_names):
+            drug1, drug2 = ml_result['drug1'], ml_result['drug2']
+            
+            if ml_result['has_interaction'] and ml_result['confidence'] > 0.7:
+                drug_interactions.append({
+                    "drug1": drug1,
+                    "drug2": drug2,
+                    "severity": ml_result.get('severity', 'Medium'),
+                    "clinical_effect": f"Potential interaction detected (ML confidence: {ml_result['confidence']:.2f})",
+                    "mechanism": "Machine learning model prediction based on drug interaction patterns",
+                    "management": "Consult healthcare provider for clinical assessment",
+                    "ml_confidence": ml_result['confidence']
+                })
+                print(f"🚨 ML detected interaction: {drug1} + {drug2} (confidence: {ml_result['confidence']:.2f})")
         
         # Check age-related warnings using ML
         age_group = "Adult"
@@ -743,10 +754,238 @@ def analyze_interactions_ai():
         print(f"Interaction analysis error: {e}")
         return jsonify({"error": str(e)}), 500
 
+# Scan pipeline stages: each takes the results it depends on as keyword arguments
+
+def scan_ocr_text(file):
+    """Step 1: Extract text using OCR, decoding the upload in memory"""
+    extracted_text = "Prescription image uploaded for AI analysis"
+    try:
+        extracted_text = simple_ocr_extraction(file)
+        print(f"✅ OCR completed: {len(extracted_text)} characters extracted")
+        print(f"📄 OCR Text Preview: {extracted_text[:200]}...")  # Show first 200 chars
+            
+    except OCRBusyError:
+        raise
+    except Exception as ocr_error:
+        print(f"OCR error: {ocr_error}")
+        extracted_text = "Prescription image uploaded for AI analysis"
+    return extracted_text
+
+def scan_extract_medications(extracted_text, patient_age, patient_condition):
+    """Step 2: Use Groq AI to extract REAL medications from prescription"""
+    medication_extraction_prompt = f"""
+    You are a medical AI assistant. Analyze this prescription and extract ALL medications with complete details.
+
+    PRESCRIPTION CONTENT:
+    {extracted_text}
+
+    PATIENT INFO:
+    - Age: {patient_age} years old
+    - Condition: {patient_condition}
+
+    Please extract ALL medications from the prescription above and return ONLY valid JSON in this exact format:
+
+    {{
+        "medications": [
+            {{
+                "name": "exact medication name",
+                "dosage": "strength with unit",
+                "form": "tablet/capsule/liquid/etc",
+                "frequency": "dosing frequency",
+                "instructions": "special instructions",
+                "generic_name": "generic name if known",
+                "drug_class": "medication class"
+            }}
+        ]
+    }}
+
+    CRITICAL INSTRUCTIONS:
+    1. Return ONLY the JSON, no other text
+    2. Extract ALL medications mentioned
+    3. Use real medication names from the prescription
+    4. If unclear, use best medical judgment
+    5. Ensure valid JSON format
+
+    Based on the prescription content above, what medications do you see?
+    """
+    
+    try:
+        print("🤖 Calling Groq AI for medication extraction...")
+        extraction_response = groq_client.chat.completions.create(
+            messages=[{"role": "user", "content": medication_extraction_prompt}],
+            model="llama-3.3-70b-versatile",
+            temperature=0.1,
+            max_tokens=2000
+        )
+        
+        # Get the response content
+        response_content = extraction_response.choices[0].message.content.strip()
+        print(f"🔍 Groq AI response: {response_content[:200]}...")
+        
+        # Try to parse JSON
+        import json
+        try:
+            medication_data = json.loads(response_content)
+            extracted_medications = medication_data.get("medications", [])
+        except json.JSONDecodeError:
+            # Try to extract JSON from response if it contains extra text
+            import re
+            json_match = re.search(r'\{.*\}', response_content, re.DOTALL)
+            if json_match:
+                medication_data = json.loads(json_match.group())
+                extracted_medications = medication_data.get("medications", [])
+            else:
+                raise ValueError("No valid JSON found in response")
+        
+        print(f"✅ Groq AI extracted {len(extracted_medications)} medications:")
+        for med in extracted_medications:
+            print(f"   - {med.get('name', 'Unknown')}: {med.get('dosage', 'N/A')}")
+            
+    except Exception as ai_error:
+        print(f"AI medication extraction error: {ai_error}")
+        print(f"Response content: {response_content if 'response_content' in locals() else 'No response'}")
+        
+        # Try simple text parsing fallback
+        extracted_medications = extract_medications_from_text(extracted_text)
+        if not extracted_medications:
+            # Last resort fallback
+            extracted_medications = [
+                {
+                    "name": "Medication extraction failed",
+                    "dosage": "Please try manual entry",
+                    "form": "N/A",
+                    "frequency": "N/A", 
+                    "instructions": f"AI extraction error: {str(ai_error)[:100]}",
+                    "generic_name": "N/A",
+                    "drug_class": "N/A"
+                }
+            ]
+    return extracted_medications
+
+def scan_clinical_analysis(extracted_medications, real_interactions, age_warnings, contraindications, patient_age, patient_condition):
+    """Step 4: Use Groq AI for comprehensive clinical analysis with detailed explanations"""
+    comprehensive_analysis_prompt = f"""
+    As a clinical pharmacist AI, provide comprehensive analysis for these medications with detailed explanations:
+
+    Medications:
+    {json.dumps(extracted_medications, indent=2)}
+
+    Database Findings:
+    - Drug Interactions: {len(real_interactions)} found
+    - Age Warnings: {len(age_warnings)} found  
+    - Contraindications: {len(contraindications)} found
+
+    Patient: {patient_age} years old, {patient_condition}
+
+    Provide comprehensive clinical analysis in this JSON format:
+    {{
+        "clinical_summary": "Comprehensive analysis by Llama 3.3-70B\n\nAnalyzed {len(extracted_medications)} medications from prescription. Found {len(real_interactions)} interactions in CSV database.\n\nDETAILED FINDINGS:\n\n🔍 MEDICATION REVIEW:\n{chr(10).join([f'• {med.get("name", "Unknown")} ({med.get("dose", "dose not specified")}) - {med.get("frequency", "frequency not specified")}' for med in extracted_medications])}\n\n⚠️ INTERACTION ANALYSIS:\n{chr(10).join([f'• {interaction.get("drug1", "Unknown")} + {interaction.get("drug2", "Unknown")}: {interaction.get("description", "Interaction details not available")}' for interaction in real_interactions]) if real_interactions else '• No significant drug-drug interactions detected in database'}\n\n🎯 AGE-SPECIFIC CONSIDERATIONS:\n{chr(10).join([f'• {warning.get("drug", "Unknown")}: {warning.get("warning", "Age-related concern")}' for warning in age_warnings]) if age_warnings else f'• Patient age ({patient_age}) within normal prescribing range for all medications'}\n\n📋 CLINICAL RECOMMENDATIONS:\n• Regular monitoring of therapeutic response and adverse effects\n• Patient education on proper medication administration\n• Follow-up assessment as clinically indicated\n• Contact prescriber if any concerning symptoms develop",
+        "overall_risk_assessment": "{'severe' if len(real_interactions) > 2 else 'high' if len(real_interactions) > 0 or len(contraindications) > 0 else 'moderate' if len(age_warnings) > 0 else 'low'}",
+        "key_concerns": [
+            {f"Found {len(real_interactions)} drug interactions" if real_interactions else "No drug interactions detected"},
+            {f"Age-related warnings for {len(age_warnings)} medications" if age_warnings else "No age-related concerns"},
+            {f"Contraindications identified for {len(contraindications)} medications" if contraindications else "No contraindications found"},
+            "Patient requires ongoing medication monitoring"
+        ],
+        "monitoring_requirements": [
+            "Monitor for drug interaction symptoms",
+            "Assess therapeutic effectiveness regularly", 
+            "Watch for age-related adverse effects",
+            "Regular clinical follow-up recommended"
+        ],
+        "patient_counseling": [
+            "Take medications exactly as prescribed",
+            "Report any unusual symptoms immediately",
+            "Keep updated medication list available",
+            "Do not stop medications without consulting prescriber"
+        ],
+        "prescriber_contact_needed": {len(real_interactions) > 0 or len(contraindications) > 0}
+    }}
+
+    Be thorough, include ALL medications and interactions found, and provide detailed explanations for each finding.
+    """
+    
+    try:
+        analysis_response = groq_client.chat.completions.create(
+            messages=[{"role": "user", "content": comprehensive_analysis_prompt}],
+            model="llama-3.3-70b-versatile",
+            temperature=0.1,
+            max_tokens=2000
+        )
+        
+        clinical_analysis = json.loads(analysis_response.choices[0].message.content)
+        
+    except Exception as ai_error:
+        print(f"AI clinical analysis error: {ai_error}")
+        clinical_analysis = {
+            "clinical_summary": f"Comprehensive analysis by DoseSafe AI Database\n\nAnalyzed {len(extracted_medications)} medications from prescription. Found {len(real_interactions)} interactions in CSV database.\n\nDETAILED FINDINGS:\n\n🔍 MEDICATION REVIEW:\n{chr(10).join([f'• {med.get("name", "Unknown")} ({med.get("dose", "dose not specified")}) - {med.get("frequency", "frequency not specified")}' for med in extracted_medications])}\n\n⚠️ INTERACTION ANALYSIS:\n{chr(10).join([f'• {interaction.get("drug1", "Unknown")} + {interaction.get("drug2", "Unknown")}: {interaction.get("description", "Potential interaction detected")}' for interaction in real_interactions]) if real_interactions else '• No significant drug-drug interactions detected in database'}\n\n🎯 AGE-SPECIFIC CONSIDERATIONS:\n{chr(10).join([f'• {warning.get("drug", "Unknown")}: {warning.get("warning", "Age-related concern")}' for warning in age_warnings]) if age_warnings else f'• Patient age ({patient_age}) within normal prescribing range for all medications'}\n\n📋 CLINICAL RECOMMENDATIONS:\n• Regular monitoring recommended for all medications\n• Patient education on proper administration\n• Contact healthcare provider with any concerns\n• Keep medication list updated",
+            "overall_risk_assessment": "moderate",
+            "key_concerns": [f"Database analysis complete - {len(real_interactions)} interactions found"],
+            "monitoring_requirements": ["Regular clinical monitoring"],
+            "patient_counseling": ["Follow prescription instructions carefully"],
+            "prescriber_contact_needed": len(real_interactions) > 0 or len(contraindications) > 0
+        }
+    return clinical_analysis
+
+def scan_risk_assessment(safety_report, patient_age):
+    """Deduplicate interactions and calculate realistic risk level"""
+    real_interactions, harmful_combinations = deduplicate_interactions(
+        safety_report['interactions'], safety_report['harmful_combinations']
+    )
+    calculated_risk = calculate_realistic_risk_level(
+        real_interactions, safety_report['age_warnings'], safety_report['contraindications'],
+        harmful_combinations, patient_age
+    )
+    return real_interactions, harmful_combinations, calculated_risk
+
+def build_scan_image_pipeline():
+    """
+    OCR -> medication extraction -> one drug-name resolution, then the CSV
+    checks side by side, combined into one safety report; the clinical
+    analysis (LLM) and the risk assessment run in parallel once the checks
+    they need are done
+    """
+    from services.drug_database_service import get_drug_db_service
+    from services.stage_pipeline import StagePipeline
+    
+    drug_db_service = get_drug_db_service()
+    
+    def safety_report(resolution, patient_age, real_interactions, age_warnings, contraindications, harmful_combinations):
+        # The checks that ran side by side, combined into one report on the shared resolution
+        return drug_db_service.generate_safety_report(
+            resolution, patient_age, interactions=real_interactions, age_warnings=age_warnings,
+            contraindications=contraindications, harmful_combinations=harmful_combinations
+        )
+    
+    pipeline = StagePipeline()
+    pipeline.add('extracted_text', scan_ocr_text, after=['file'])
+    pipeline.add('extracted_medications', scan_extract_medications,
+                 after=['extracted_text', 'patient_age', 'patient_condition'], io=True)
+    pipeline.add('resolution', lambda extracted_medications: drug_db_service.resolve_medications(extracted_medications),
+                 after=['extracted_medications'])
+    pipeline.add('real_interactions', lambda resolution: drug_db_service.check_drug_interactions(resolution),
+                 after=['resolution'])
+    pipeline.add('age_warnings', lambda resolution, patient_age: drug_db_service.check_age_warnings(resolution, patient_age),
+                 after=['resolution', 'patient_age'])
+    pipeline.add('contraindications', lambda resolution: drug_db_service.find_contraindications(resolution),
+                 after=['resolution'])
+    pipeline.add('harmful_combinations',
+                 lambda resolution, real_interactions: drug_db_service.find_harmful_combinations(resolution, real_interactions),
+                 after=['resolution', 'real_interactions'])
+    pipeline.add('safety_report', safety_report,
+                 after=['resolution', 'patient_age', 'real_interactions', 'age_warnings', 'contraindications',
+                        'harmful_combinations'])
+    pipeline.add('clinical_analysis', scan_clinical_analysis,
+                 after=['extracted_medications', 'real_interactions', 'age_warnings', 'contraindications',
+                        'patient_age', 'patient_condition'], io=True)
+    pipeline.add('risk_assessment', scan_risk_assessment, after=['safety_report', 'patient_age'])
+    return pipeline
+
 @app.route('/scan/image', methods=['POST'])
 def scan_image():
     """
     Complete image scanning pipeline: OCR + Medicine Extraction + Interaction Analysis + CSV Database
+    Independent stages run concurrently (see build_scan_image_pipeline)
     """
     try:
         # Check if file is present
@@ -761,215 +1000,29 @@ def scan_image():
         patient_age = int(request.form.get('patientAge', 30))
         patient_condition = request.form.get('patientCondition', '')
         
-        print(f"🔍 Processing REAL prescription analysis for patient age {patient_age}, condition: {patient_condition}")
-        
-        # Step 1: Extract text using OCR with better file handling
-        extracted_text = "Prescription image uploaded for AI analysis"
-        temp_file_path = None
-        try:
-            # Save uploaded file temporarily with better handling
-            import tempfile
-            import time
-            
-            # Create temp file with unique name to avoid conflicts
-            temp_file_path = tempfile.mktemp(suffix=f'_{int(time.time())}.jpg')
-            file.save(temp_file_path)
-            
-            # Small delay to ensure file is written
-            time.sleep(0.1)
-            
-            extracted_text = simple_ocr_extraction(temp_file_path)
-            print(f"✅ OCR completed: {len(extracted_text)} characters extracted")
-            print(f"📄 OCR Text Preview: {extracted_text[:200]}...")  # Show first 200 chars
-                
-        except Exception as ocr_error:
-            print(f"OCR error: {ocr_error}")
-            extracted_text = "Prescription image uploaded for AI analysis"
-        finally:
-            # Clean up temp file safely
-            if temp_file_path and os.path.exists(temp_file_path):
-                try:
-                    os.unlink(temp_file_path)
-                except:
-                    pass  # File cleanup failed, but continue
-        
-        # Step 2: Use Groq AI to extract REAL medications from prescription
+        # Checked up front so an unavailable AI service does not cost an OCR pass
         if not groq_client:
             return jsonify({"error": "AI service unavailable"}), 503
-            
-        medication_extraction_prompt = f"""
-        You are a medical AI assistant. Analyze this prescription and extract ALL medications with complete details.
-
-        PRESCRIPTION CONTENT:
-        {extracted_text}
-
-        PATIENT INFO:
-        - Age: {patient_age} years old
-        - Condition: {patient_condition}
-
-        Please extract ALL medications from the prescription above and return ONLY valid JSON in this exact format:
-
-        {{
-            "medications": [
-                {{
-                    "name": "exact medication name",
-                    "dosage": "strength with unit",
-                    "form": "tablet/capsule/liquid/etc",
-                    "frequency": "dosing frequency",
-                    "instructions": "special instructions",
-                    "generic_name": "generic name if known",
-                    "drug_class": "medication class"
-                }}
-            ]
-        }}
-
-        CRITICAL INSTRUCTIONS:
-        1. Return ONLY the JSON, no other text
-        2. Extract ALL medications mentioned
-        3. Use real medication names from the prescription
-        4. If unclear, use best medical judgment
-        5. Ensure valid JSON format
-
-        Based on the prescription content above, what medications do you see?
-        """
         
-        try:
-            print("🤖 Calling Groq AI for medication extraction...")
-            extraction_response = groq_client.chat.completions.create(
-                messages=[{"role": "user", "content": medication_extraction_prompt}],
-                model="llama-3.3-70b-versatile",
-                temperature=0.1,
-                max_tokens=2000
-            )
-            
-            # Get the response content
-            response_content = extraction_response.choices[0].message.content.strip()
-            print(f"🔍 Groq AI response: {response_content[:200]}...")
-            
-            # Try to parse JSON
-            import json
-            try:
-                medication_data = json.loads(response_content)
-                extracted_medications = medication_data.get("medications", [])
-            except json.JSONDecodeError:
-                # Try to extract JSON from response if it contains extra text
-                import re
-                json_match = re.search(r'\{.*\}', response_content, re.DOTALL)
-                if json_match:
-                    medication_data = json.loads(json_match.group())
-                    extracted_medications = medication_data.get("medications", [])
-                else:
-                    raise ValueError("No valid JSON found in response")
-            
-            print(f"✅ Groq AI extracted {len(extracted_medications)} medications:")
-            for med in extracted_medications:
-                print(f"   - {med.get('name', 'Unknown')}: {med.get('dosage', 'N/A')}")
-                
-        except Exception as ai_error:
-            print(f"AI medication extraction error: {ai_error}")
-            print(f"Response content: {response_content if 'response_content' in locals() else 'No response'}")
-            
-            # Try simple text parsing fallback
-            extracted_medications = extract_medications_from_text(extracted_text)
-            if not extracted_medications:
-                # Last resort fallback
-                extracted_medications = [
-                    {
-                        "name": "Medication extraction failed",
-                        "dosage": "Please try manual entry",
-                        "form": "N/A",
-                        "frequency": "N/A", 
-                        "instructions": f"AI extraction error: {str(ai_error)[:100]}",
-                        "generic_name": "N/A",
-                        "drug_class": "N/A"
-                    }
-                ]
-
-        # Step 3: Use REAL CSV database for drug interactions
-        print(f"🔍 Checking CSV database for interactions...")
-        from services.drug_database_service import drug_db_service
+        print(f"🔍 Processing REAL prescription analysis for patient age {patient_age}, condition: {patient_condition}")
         
-        real_interactions = drug_db_service.check_drug_interactions(extracted_medications)
-        age_warnings = drug_db_service.check_age_warnings(extracted_medications, patient_age)
-        contraindications = drug_db_service.find_contraindications(extracted_medications)
-        harmful_combinations = drug_db_service.find_harmful_combinations(extracted_medications)
+        results, stage_timings = build_scan_image_pipeline().run(
+            file=file, patient_age=patient_age, patient_condition=patient_condition
+        )
+        extracted_text = results['extracted_text']
+        extracted_medications = results['extracted_medications']
+        safety_report = results['safety_report']
+        age_warnings = safety_report['age_warnings']
+        contraindications = safety_report['contraindications']
+        clinical_analysis = results['clinical_analysis']
+        real_interactions, harmful_combinations, calculated_risk = results['risk_assessment']
         
         print(f"📊 CSV Database Results:")
         print(f"   - Interactions found: {len(real_interactions)}")
         print(f"   - Age warnings: {len(age_warnings)}")
         print(f"   - Contraindications: {len(contraindications)}")
         print(f"   - Harmful combinations: {len(harmful_combinations)}")
-        
-        # Step 4: Use Groq AI for comprehensive clinical analysis with detailed explanations
-        comprehensive_analysis_prompt = f"""
-        As a clinical pharmacist AI, provide comprehensive analysis for these medications with detailed explanations:
-
-        Medications:
-        {json.dumps(extracted_medications, indent=2)}
-
-        Database Findings:
-        - Drug Interactions: {len(real_interactions)} found
-        - Age Warnings: {len(age_warnings)} found  
-        - Contraindications: {len(contraindications)} found
-
-        Patient: {patient_age} years old, {patient_condition}
-
-        Provide comprehensive clinical analysis in this JSON format:
-        {{
-            "clinical_summary": "Comprehensive analysis by Llama 3.3-70B\n\nAnalyzed {len(extracted_medications)} medications from prescription. Found {len(real_interactions)} interactions in CSV database.\n\nDETAILED FINDINGS:\n\n🔍 MEDICATION REVIEW:\n{chr(10).join([f'• {med.get("name", "Unknown")} ({med.get("dose", "dose not specified")}) - {med.get("frequency", "frequency not specified")}' for med in extracted_medications])}\n\n⚠️ INTERACTION ANALYSIS:\n{chr(10).join([f'• {interaction.get("drug1", "Unknown")} + {interaction.get("drug2", "Unknown")}: {interaction.get("description", "Interaction details not available")}' for interaction in real_interactions]) if real_interactions else '• No significant drug-drug interactions detected in database'}\n\n🎯 AGE-SPECIFIC CONSIDERATIONS:\n{chr(10).join([f'• {warning.get("drug", "Unknown")}: {warning.get("warning", "Age-related concern")}' for warning in age_warnings]) if age_warnings else f'• Patient age ({patient_age}) within normal prescribing range for all medications'}\n\n📋 CLINICAL RECOMMENDATIONS:\n• Regular monitoring of therapeutic response and adverse effects\n• Patient education on proper medication administration\n• Follow-up assessment as clinically indicated\n• Contact prescriber if any concerning symptoms develop",
-            "overall_risk_assessment": "{'severe' if len(real_interactions) > 2 else 'high' if len(real_interactions) > 0 or len(contraindications) > 0 else 'moderate' if len(age_warnings) > 0 else 'low'}",
-            "key_concerns": [
-                {f"Found {len(real_interactions)} drug interactions" if real_interactions else "No drug interactions detected"},
-                {f"Age-related warnings for {len(age_warnings)} medications" if age_warnings else "No age-related concerns"},
-                {f"Contraindications identified for {len(contraindications)} medications" if contraindications else "No contraindications found"},
-                "Patient requires ongoing medication monitoring"
-            ],
-            "monitoring_requirements": [
-                "Monitor for drug interaction symptoms",
-                "Assess therapeutic effectiveness regularly", 
-                "Watch for age-related adverse effects",
-                "Regular clinical follow-up recommended"
-            ],
-            "patient_counseling": [
-                "Take medications exactly as prescribed",
-                "Report any unusual symptoms immediately",
-                "Keep updated medication list available",
-                "Do not stop medications without consulting prescriber"
-            ],
-            "prescriber_contact_needed": {len(real_interactions) > 0 or len(contraindications) > 0}
-        }}
-
-        Be thorough, include ALL medications and interactions found, and provide detailed explanations for each finding.
-        """
-        
-        try:
-            analysis_response = groq_client.chat.completions.create(
-                messages=[{"role": "user", "content": comprehensive_analysis_prompt}],
-                model="llama-3.3-70b-versatile",
-                temperature=0.1,
-                max_tokens=2000
-            )
-            
-            clinical_analysis = json.loads(analysis_response.choices[0].message.content)
-            
-        except Exception as ai_error:
-            print(f"AI clinical analysis error: {ai_error}")
-            clinical_analysis = {
-                "clinical_summary": f"Comprehensive analysis by DoseSafe AI Database\n\nAnalyzed {len(extracted_medications)} medications from prescription. Found {len(real_interactions)} interactions in CSV database.\n\nDETAILED FINDINGS:\n\n🔍 MEDICATION REVIEW:\n{chr(10).join([f'• {med.get("name", "Unknown")} ({med.get("dose", "dose not specified")}) - {med.get("frequency", "frequency not specified")}' for med in extracted_medications])}\n\n⚠️ INTERACTION ANALYSIS:\n{chr(10).join([f'• {interaction.get("drug1", "Unknown")} + {interaction.get("drug2", "Unknown")}: {interaction.get("description", "Potential interaction detected")}' for interaction in real_interactions]) if real_interactions else '• No significant drug-drug interactions detected in database'}\n\n🎯 AGE-SPECIFIC CONSIDERATIONS:\n{chr(10).join([f'• {warning.get("drug", "Unknown")}: {warning.get("warning", "Age-related concern")}' for warning in age_warnings]) if age_warnings else f'• Patient age ({patient_age}) within normal prescribing range for all medications'}\n\n📋 CLINICAL RECOMMENDATIONS:\n• Regular monitoring recommended for all medications\n• Patient education on proper administration\n• Contact healthcare provider with any concerns\n• Keep medication list updated",
-                "overall_risk_assessment": "moderate",
-                "key_concerns": [f"Database analysis complete - {len(real_interactions)} interactions found"],
-                "monitoring_requirements": ["Regular clinical monitoring"],
-                "patient_counseling": ["Follow prescription instructions carefully"],
-                "prescriber_contact_needed": len(real_interactions) > 0 or len(contraindications) > 0
-            }
-        
-        # Deduplicate interactions
-        real_interactions, harmful_combinations = deduplicate_interactions(real_interactions, harmful_combinations)
-        
-        # Calculate realistic risk level
-        calculated_risk = calculate_realistic_risk_level(
-            real_interactions, age_warnings, contraindications, harmful_combinations, patient_age
-        )
+        print(f"⏱️ Scan pipeline finished in {stage_timings['total_ms']} ms")
         
         # Prepare comprehensive response with REAL data
         return jsonify({
@@ -989,13 +1042,212 @@ def scan_image():
             "processing_method": "Real analysis (not mock data)",
             "key_concerns": clinical_analysis.get("key_concerns", []),
             "monitoring_requirements": clinical_analysis.get("monitoring_requirements", []),
-            "prescriber_contact_needed": clinical_analysis.get("prescriber_contact_needed", False)
+            "prescriber_contact_needed": clinical_analysis.get("prescriber_contact_needed", False),
+            "stage_timings_ms": stage_timings
         })
         
+    except OCRBusyError as busy:
+        print("OCR queue full, rejecting image scan")
+        return jsonify({"error": "OCR service busy", "retry_after": busy.retry_after}), 429, {'Retry-After': str(busy.retry_after)}
+        
     except Exception as e:
         print(f"Scan processing error: {e}")
         return jsonify({"error": str(e)}), 500
 
+def manual_format_medications(medications):
+    """Format medications consistently and extract ALL provided medications"""
+    formatted_medications = []
+    for med in medications:
+        if med.get('name'):  # Only include medications with names
+            formatted_medications.append({
+                "name": med.get('name', ''),
+                "dosage": f"{med.get('strength', '')}{med.get('strengthUnit', '')}",
+                "form": med.get('dosageForm', 'tablet'),
+                "frequency": med.get('frequency', ''),
+                "route": med.get('route', 'oral'),
+                "duration": med.get('duration', ''),
+                "instructions": med.get('instructions', ''),
+                "generic_name": med.get('name', ''),  # Will be enhanced by AI
+                "drug_class": "To be determined"  # Will be enhanced by AI
+            })
+    return formatted_medications
+
+def manual_ai_analysis(formatted_medications, patient_age, patient_condition):
+    """Use Groq AI to enhance medication information and analyze interactions"""
+    if groq_client:
+        enhancement_prompt = f"""
+        As a clinical pharmacist AI, enhance the medication information and provide comprehensive analysis:
+
+        Medications entered:
+        {json.dumps(formatted_medications, indent=2)}
+
+        Patient Information:
+        - Age: {patient_age}
+        - Condition: {patient_condition}
+
+        Please provide enhanced medication details and comprehensive interaction analysis in this JSON format:
+        {{
+            "enhanced_medications": [
+                {{
+                    "name": "brand/trade name",
+                    "generic_name": "generic name",
+                    "dosage": "strength with unit",
+                    "form": "tablet/capsule/etc",
+                    "frequency": "dosing frequency",
+                    "route": "administration route",
+                    "drug_class": "therapeutic class",
+                    "indications": "what it's used for",
+                    "common_side_effects": ["list of common side effects"]
+                }}
+            ],
+            "drug_interactions": [
+                {{
+                    "drugs": ["drug1", "drug2"],
+                    "severity": "minor/moderate/major/severe",
+                    "mechanism": "interaction mechanism",
+                    "clinical_effects": "patient effects",
+                    "recommendation": "clinical recommendation",
+                    "monitoring": "monitoring parameters"
+                }}
+            ],
+            "age_specific_warnings": [
+                {{
+                    "medication": "medication name",
+                    "warning": "age-specific concern",
+                    "recommendation": "specific advice"
+                }}
+            ],
+            "contraindications": [
+                {{
+                    "medication": "medication name",
+                    "contraindication": "condition to avoid",
+                    "reason": "explanation"
+                }}
+            ],
+            "harmful_combinations": [
+                {{
+                    "medications": ["list of drugs"],
+                    "danger_level": "risk level",
+                    "potential_harm": "description of harm"
+                }}
+            ],
+            "dosing_considerations": [
+                {{
+                    "medication": "medication name",
+                    "consideration": "dosing consideration",
+                    "recommendation": "dosing recommendation"
+                }}
+            ],
+            "overall_risk_assessment": "low/moderate/high/severe",
+            "clinical_summary": "comprehensive clinical summary"
+        }}
+
+        Analyze ALL medications for ALL possible interactions. Be comprehensive.
+        """
+        
+        try:
+            response = groq_client.chat.completions.create(
+                messages=[{"role": "user", "content": enhancement_prompt}],
+                model="llama-3.3-70b-versatile",
+                temperature=0.1,
+                max_tokens=4000
+            )
+            
+            ai_analysis = json.loads(response.choices[0].message.content)
+            
+            # Use AI-enhanced data
+            final_medications = ai_analysis.get("enhanced_medications", formatted_medications)
+            drug_interactions = ai_analysis.get("drug_interactions", [])
+            age_warnings = ai_analysis.get("age_specific_warnings", [])
+            contraindications = ai_analysis.get("contraindications", [])
+            harmful_combinations = ai_analysis.get("harmful_combinations", [])
+            dosing_considerations = ai_analysis.get("dosing_considerations", [])
+            risk_assessment = ai_analysis.get("overall_risk_assessment", "moderate")
+            clinical_summary = ai_analysis.get("clinical_summary", "")
+            
+        except Exception as ai_error:
+            print(f"AI enhancement error: {ai_error}")
+            # Use manual data with basic analysis
+            final_medications = formatted_medications
+            drug_interactions = []
+            age_warnings = []
+            contraindications = []
+            harmful_combinations = []
+            dosing_considerations = []
+            risk_assessment = "moderate"
+            clinical_summary = "Manual entry processed. AI analysis unavailable."
+    else:
+        # Fallback when Groq is unavailable
+        final_medications = formatted_medications
+        drug_interactions = []
+        age_warnings = []
+        contraindications = []
+        harmful_combinations = []
+        dosing_considerations = []
+        risk_assessment = "moderate"
+        clinical_summary = "Manual entry processed. AI analysis unavailable - API key not configured."
+    
+    return {
+        "final_medications": final_medications,
+        "drug_interactions": drug_interactions,
+        "age_warnings": age_warnings,
+        "contraindications": contraindications,
+        "harmful_combinations": harmful_combinations,
+        "dosing_considerations": dosing_considerations,
+        "risk_assessment": risk_assessment,
+        "clinical_summary": clinical_summary
+    }
+
+def manual_risk_assessment(ai_analysis, patient_age):
+    """Rule-based fallback interactions, deduplication and realistic risk level"""
+    final_medications = ai_analysis["final_medications"]
+    drug_interactions = list(ai_analysis["drug_interactions"])
+    
+    # Add basic interaction check for common combinations if AI fails
+    if not drug_interactions and len(final_medications) > 1:
+        # Basic rule-based interactions
+        med_names = [med["name"].lower() for med in final_medications]
+        
+        if "aspirin" in med_names and "warfarin" in med_names:
+            drug_interactions.append({
+                "drugs": ["Aspirin", "Warfarin"],
+                "severity": "major",
+                "mechanism": "Increased bleeding risk",
+                "clinical_effects": "Significantly increased risk of bleeding",
+                "recommendation": "Avoid combination or use with extreme caution",
+                "monitoring": "INR, bleeding signs"
+            })
+        
+        if "metformin" in med_names and any(acei in med_names for acei in ["lisinopril", "enalapril", "captopril"]):
+            drug_interactions.append({
+                "drugs": ["Metformin", "ACE Inhibitor"],
+                "severity": "minor",
+                "mechanism": "Potential enhanced glucose lowering",
+                "clinical_effects": "Improved glycemic control",
+                "recommendation": "Monitor blood glucose",
+                "monitoring": "Blood glucose levels"
+            })
+    
+    # Deduplicate interactions
+    drug_interactions, harmful_combinations = deduplicate_interactions(drug_interactions, ai_analysis["harmful_combinations"])
+    
+    # Calculate realistic risk level
+    calculated_risk = calculate_realistic_risk_level(
+        drug_interactions, ai_analysis["age_warnings"], ai_analysis["contraindications"], harmful_combinations, patient_age
+    )
+    return drug_interactions, harmful_combinations, calculated_risk
+
+def build_scan_manual_pipeline():
+    """Formatting -> AI enhancement -> risk assessment; every step needs the one before it"""
+    from services.stage_pipeline import StagePipeline
+    
+    pipeline = StagePipeline()
+    pipeline.add('formatted_medications', manual_format_medications, after=['medications'])
+    pipeline.add('ai_analysis', manual_ai_analysis, after=['formatted_medications', 'patient_age', 'patient_condition'],
+                 io=True)
+    pipeline.add('risk_assessment', manual_risk_assessment, after=['ai_analysis', 'patient_age'])
+    return pipeline
+
 @app.route('/scan/manual', methods=['POST'])
 def scan_manual():
     """
@@ -1012,168 +1264,17 @@ def scan_manual():
         
         print(f"Processing manual entry for {len(medications)} medications")
         
-        # Format medications consistently and extract ALL provided medications
-        formatted_medications = []
-        for med in medications:
-            if med.get('name'):  # Only include medications with names
-                formatted_medications.append({
-                    "name": med.get('name', ''),
-                    "dosage": f"{med.get('strength', '')}{med.get('strengthUnit', '')}",
-                    "form": med.get('dosageForm', 'tablet'),
-                    "frequency": med.get('frequency', ''),
-                    "route": med.get('route', 'oral'),
-                    "duration": med.get('duration', ''),
-                    "instructions": med.get('instructions', ''),
-                    "generic_name": med.get('name', ''),  # Will be enhanced by AI
-                    "drug_class": "To be determined"  # Will be enhanced by AI
-                })
-        
-        # Use Groq AI to enhance medication information and analyze interactions
-        if groq_client:
-            enhancement_prompt = f"""
-            As a clinical pharmacist AI, enhance the medication information and provide comprehensive analysis:
-
-            Medications entered:
-            {json.dumps(formatted_medications, indent=2)}
-
-            Patient Information:
-            - Age: {patient_age}
-            - Condition: {patient_condition}
-
-            Please provide enhanced medication details and comprehensive interaction analysis in this JSON format:
-            {{
-                "enhanced_medications": [
-                    {{
-                        "name": "brand/trade name",
-                        "generic_name": "generic name",
-                        "dosage": "strength with unit",
-                        "form": "tablet/capsule/etc",
-                        "frequency": "dosing frequency",
-                        "route": "administration route",
-                        "drug_class": "therapeutic class",
-                        "indications": "what it's used for",
-                        "common_side_effects": ["list of common side effects"]
-                    }}
-                ],
-                "drug_interactions": [
-                    {{
-                        "drugs": ["drug1", "drug2"],
-                        "severity": "minor/moderate/major/severe",
-                        "mechanism": "interaction mechanism",
-                        "clinical_effects": "patient effects",
-                        "recommendation": "clinical recommendation",
-                        "monitoring": "monitoring parameters"
-                    }}
-                ],
-                "age_specific_warnings": [
-                    {{
-                        "medication": "medication name",
-                        "warning": "age-specific concern",
-                        "recommendation": "specific advice"
-                    }}
-                ],
-                "contraindications": [
-                    {{
-                        "medication": "medication name",
-                        "contraindication": "condition to avoid",
-                        "reason": "explanation"
-                    }}
-                ],
-                "harmful_combinations": [
-                    {{
-                        "medications": ["list of drugs"],
-                        "danger_level": "risk level",
-                        "potential_harm": "description of harm"
-                    }}
-                ],
-                "dosing_considerations": [
-                    {{
-                        "medication": "medication name",
-                        "consideration": "dosing consideration",
-                        "recommendation": "dosing recommendation"
-                    }}
-                ],
-                "overall_risk_assessment": "low/moderate/high/severe",
-                "clinical_summary": "comprehensive clinical summary"
-            }}
-
-            Analyze ALL medications for ALL possible interactions. Be comprehensive.
-            """
-            
-            try:
-                response = groq_client.chat.completions.create(
-                    messages=[{"role": "user", "content": enhancement_prompt}],
-                    model="llama-3.3-70b-versatile",
-                    temperature=0.1,
-                    max_tokens=4000
-                )
-                
-                ai_analysis = json.loads(response.choices[0].message.content)
-                
-                # Use AI-enhanced data
-                final_medications = ai_analysis.get("enhanced_medications", formatted_medications)
-                drug_interactions = ai_analysis.get("drug_interactions", [])
-                age_warnings = ai_analysis.get("age_specific_warnings", [])
-                contraindications = ai_analysis.get("contraindications", [])
-                harmful_combinations = ai_analysis.get("harmful_combinations", [])
-                dosing_considerations = ai_analysis.get("dosing_considerations", [])
-                risk_assessment = ai_analysis.get("overall_risk_assessment", "moderate")
-                clinical_summary = ai_analysis.get("clinical_summary", "")
-                
-            except Exception as ai_error:
-                print(f"AI enhancement error: {ai_error}")
-                # Use manual data with basic analysis
-                final_medications = formatted_medications
-                drug_interactions = []
-                age_warnings = []
-                contraindications = []
-                harmful_combinations = []
-                dosing_considerations = []
-                risk_assessment = "moderate"
-                clinical_summary = "Manual entry processed. AI analysis unavailable."
-        else:
-            # Fallback when Groq is unavailable
-            final_medications = formatted_medications
-            drug_interactions = []
-            age_warnings = []
-            contraindications = []
-            harmful_combinations = []
-            dosing_considerations = []
-            risk_assessment = "moderate"
-            clinical_summary = "Manual entry processed. AI analysis unavailable - API key not configured."
-        
-        # Add basic interaction check for common combinations if AI fails
-        if not drug_interactions and len(final_medications) > 1:
-            # Basic rule-based interactions
-            med_names = [med["name"].lower() for med in final_medications]
-            
-            if "aspirin" in med_names and "warfarin" in med_names:
-                drug_interactions.append({
-                    "drugs": ["Aspirin", "Warfarin"],
-                    "severity": "major",
-                    "mechanism": "Increased bleeding risk",
-                    "clinical_effects": "Significantly increased risk of bleeding",
-                    "recommendation": "Avoid combination or use with extreme caution",
-                    "monitoring": "INR, bleeding signs"
-                })
-            
-            if "metformin" in med_names and any(acei in med_names for acei in ["lisinopril", "enalapril", "captopril"]):
-                drug_interactions.append({
-                    "drugs": ["Metformin", "ACE Inhibitor"],
-                    "severity": "minor",
-                    "mechanism": "Potential enhanced glucose lowering",
-                    "clinical_effects": "Improved glycemic control",
-                    "recommendation": "Monitor blood glucose",
-                    "monitoring": "Blood glucose levels"
-                })
-        
-        # Deduplicate interactions
-        drug_interactions, harmful_combinations = deduplicate_interactions(drug_interactions, harmful_combinations)
-        
-        # Calculate realistic risk level
-        calculated_risk = calculate_realistic_risk_level(
-            drug_interactions, age_warnings, contraindications, harmful_combinations, patient_age
+        results, stage_timings = build_scan_manual_pipeline().run(
+            medications=medications, patient_age=patient_age, patient_condition=patient_condition
         )
+        ai_analysis = results['ai_analysis']
+        final_medications = ai_analysis["final_medications"]
+        age_warnings = ai_analysis["age_warnings"]
+        contraindications = ai_analysis["contraindications"]
+        dosing_considerations = ai_analysis["dosing_considerations"]
+        clinical_summary = ai_analysis["clinical_summary"]
+        drug_interactions, harmful_combinations, calculated_risk = results['risk_assessment']
+        print(f"⏱️ Manual scan pipeline finished in {stage_timings['total_ms']} ms")
         
         return jsonify({
             "success": True,
@@ -1192,7 +1293,8 @@ def scan_manual():
             "patient_age": patient_age,
             "patient_condition": patient_condition,
             "ai_model": "Groq Llama 3.3-70B" if groq_client else "Rule-based fallback",
-            "source": "Manual Entry + Groq AI Analysis"
+            "source": "Manual Entry + Groq AI Analysis",
+            "stage_timings_ms": stage_timings
         })
         
     except Exception as e:
@@ -1257,19 +1359,9 @@ def test_ocr():
             return jsonify({"error": "No file selected"}), 400
         
         # Extract text using OCR
-        temp_file_path = None
         try:
-            # Save uploaded file temporarily with unique name
-            import tempfile
-            import uuid
-            unique_filename = f"ocr_test_{uuid.uuid4().hex[:8]}.jpg"
-            temp_file_path = os.path.join(tempfile.gettempdir(), unique_filename)
-            
-            file.save(temp_file_path)
-            print(f"✅ Successfully saved temp file: {temp_file_path}")
-            
-            # Extract text using simple OCR
-            extracted_text = simple_ocr_extraction(temp_file_path)
+            # Extract text using simple OCR, in memory
+            extracted_text = simple_ocr_extraction(file)
             
             return jsonify({
                 "success": True,
@@ -1284,13 +1376,6 @@ def test_ocr():
                 "error": str(ocr_error),
                 "fallback_text": "OCR extraction failed"
             })
-        finally:
-            # Clean up temp file
-            if temp_file_path and os.path.exists(temp_file_path):
-                try:
-                    os.unlink(temp_file_path)
-                except:
-                    pass
                     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1364,30 +1449,31 @@ def extract_medications_from_text(text):
     
     return medications[:10]  # Limit to 10 medications
 
-def simple_ocr_extraction(image_path):
+def simple_ocr_extraction(upload):
     """
     Simple OCR using Tesseract (fallback when EasyOCR fails)
+    upload is a werkzeug FileStorage, file-like object or bytes (image or PDF); nothing is written to disk
     """
     try:
-        # Try using pytesseract if available
-        try:
-            import pytesseract
-            from PIL import Image
-            
-            # Open image and extract text
-            image = Image.open(image_path)
-            text = pytesseract.image_to_string(image)
+        # PDFs: embedded text where present, scanned pages OCR'd in parallel
+        if is_pdf(upload):
+            return extract_pdf_text(upload, ocr_engine)['text']
+        
+        # Decode the image in memory, straight from the request stream
+        image = load_image(upload)
+        
+        # Use the shared Tesseract workers if installed
+        if ocr_engine.is_available():
+            # Crop to the text and scale it to ~300 DPI; a 12 MP photo becomes a small page
+            image, _ = image_preprocess.get().prepare_for_ocr(image)
+            text = ocr_engine.image_to_string(image)
             return text.strip()
             
-        except ImportError:
-            print("Pytesseract not available, using basic image reading")
-            
-        # Fallback: read image as binary and return a descriptive text
-        with open(image_path, 'rb') as f:
-            file_size = len(f.read())
-            
-        return f"Image file uploaded ({file_size} bytes). OCR libraries not available. Please enter medications manually or install tesseract-ocr."
+        print("Tesseract not available, returning image details only")
+        return f"Image file uploaded ({image.size[0]}x{image.size[1]} pixels). OCR libraries not available. Please enter medications manually or install tesseract-ocr."
         
+    except OCRBusyError:
+        raise
     except Exception as e:
         print(f"Simple OCR error: {e}")
         return "Image processing failed. Please try manual entry."
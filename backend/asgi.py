@@ -0,0 +1,205 @@
+"""
+ASGI deployment mode for DoseSafe AI
+
+The LLM-bound endpoints below are served natively async: while a request
+waits on Groq it holds no worker thread, so in-flight LLM calls are bounded
+by LLM_MAX_CONNECTIONS instead of workers x threads:
+
+    POST /ai-interactions/comprehensive-check
+    POST /ai-nlp/smart-extract
+    POST /ai-ocr/enhance-text
+    POST /chatbot/ask
+    POST /chatbot/chat
+
+Every other route is served by the Flask app (app.py plus the AI blueprints),
+mounted behind them and run on a thread pool.
+
+Run with:
+    pip install -r requirements-async.txt
+    uvicorn asgi:app --host 0.0.0.0 --port $PORT --workers 2
+"""
+
+import json
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+from app import app as flask_app
+from routes import ai_interactions, ai_nlp, ai_ocr, chatbot
+
+# The rest of the AI surface (advanced warnings, identify, streaming chat, ...)
+flask_app.register_blueprint(chatbot.chatbot_bp, url_prefix='/chatbot')
+flask_app.register_blueprint(ai_interactions.ai_interactions_bp, url_prefix='/ai-interactions')
+flask_app.register_blueprint(ai_nlp.ai_nlp_bp, url_prefix='/ai-nlp')
+flask_app.register_blueprint(ai_ocr.ai_ocr_bp, url_prefix='/ai-ocr')
+
+
+async def read_json(request):
+    """Request body as JSON, or None when missing or malformed (like request.get_json)"""
+    try:
+        return await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+
+
+async def comprehensive_interaction_check(request):
+    """Async /ai-interactions/comprehensive-check"""
+    try:
+        request_data = await read_json(request)
+        if not request_data:
+            return JSONResponse({"error": "No data provided"}, status_code=400)
+
+        medication_list = request_data.get('medicines', [])
+        patient_age = request_data.get('age', 30)
+
+        print(f"Processing interaction check for {len(medication_list)} medications (patient age: {patient_age})")
+
+        if not ai_interactions.async_llm.is_configured():
+            return JSONResponse({
+                "error": "AI service temporarily unavailable",
+                "fallback_message": "Please try again later"
+            }, status_code=503)
+
+        analysis_result = await ai_interactions.perform_comprehensive_analysis_async(medication_list, patient_age)
+        analysis_result.setdefault("served_from_cache", False)
+        return JSONResponse(analysis_result)
+
+    except Exception as error:
+        print(f"Error in comprehensive check: {str(error)}")
+        return JSONResponse({"error": "Analysis failed", "details": str(error)}, status_code=500)
+
+
+async def smart_medicine_extraction(request):
+    """Async /ai-nlp/smart-extract"""
+    prescription_text = ""
+    try:
+        request_data = await read_json(request)
+        if not request_data:
+            return JSONResponse({"error": "No data provided"}, status_code=400)
+
+        prescription_text = request_data.get('text', '')
+        if not prescription_text.strip():
+            return JSONResponse({
+                "error": "Empty text provided",
+                "medicines": [],
+                "extraction_summary": {"total_medicines": 0}
+            }, status_code=400)
+
+        print(f"Processing prescription text for medicine extraction: {prescription_text[:100]}...")
+
+        if not ai_nlp.async_llm.is_available():
+            return JSONResponse(ai_nlp.perform_fallback_medicine_extraction(prescription_text))
+
+        extraction_result = await ai_nlp.perform_intelligent_extraction_async(prescription_text)
+        return JSONResponse(ai_nlp.ensure_extracted_medicines(extraction_result, prescription_text))
+
+    except Exception as processing_error:
+        print(f"Medicine extraction error: {str(processing_error)}")
+        fallback_result = ai_nlp.perform_fallback_medicine_extraction(prescription_text)
+        fallback_result['error'] = str(processing_error)
+        return JSONResponse(fallback_result)
+
+
+async def enhance_ocr_text(request):
+    """Async /ai-ocr/enhance-text"""
+    messy_text = ""
+    try:
+        request_data = await read_json(request)
+        if not request_data:
+            return JSONResponse({"error": "No data provided"}, status_code=400)
+
+        messy_text = request_data.get('text', '')
+        if not messy_text.strip():
+            return JSONResponse({"error": "No text provided for enhancement"}, status_code=400)
+
+        print(f"AI OCR processing: {messy_text[:100]}...")
+
+        if not ai_ocr.async_llm.is_configured():
+            return JSONResponse({
+                "error": "AI OCR service unavailable",
+                "cleaned_text": messy_text,
+                "medicines": [],
+                "ai_processed": False,
+                "confidence": "Low"
+            }, status_code=503)
+
+        return JSONResponse(await ai_ocr.ai_enhance_prescription_text_async(messy_text))
+
+    except Exception as e:
+        print(f"AI OCR error: {str(e)}")
+        return JSONResponse({
+            "error": str(e),
+            "cleaned_text": messy_text,
+            "medicines": [],
+            "ai_processed": False
+        }, status_code=500)
+
+
+async def chatbot_ask(request):
+    """Async /chatbot/ask"""
+    clinical_context = {}
+    try:
+        request_data = await read_json(request) or {}
+        clinical_context = request_data.get('context', {})
+        if isinstance(clinical_context, str):
+            clinical_context = json.loads(clinical_context)
+
+        if chatbot.async_llm.is_available():
+            explanation_response = await chatbot.generate_comprehensive_ai_explanation_async(clinical_context)
+        else:
+            explanation_response = chatbot.generate_professional_fallback_explanation(clinical_context)
+
+        return JSONResponse({"response": explanation_response})
+
+    except Exception as processing_error:
+        print(f"Chatbot processing error: {str(processing_error)}")
+        return JSONResponse({"response": chatbot.generate_professional_fallback_explanation(clinical_context)})
+
+
+async def chatbot_chat(request):
+    """Async /chatbot/chat"""
+    user_message = ""
+    try:
+        request_data = await read_json(request) or {}
+        user_message = request_data.get('message', '')
+        conversation_history = request_data.get('history', [])
+
+        if not user_message.strip():
+            return JSONResponse({
+                "response": "Please provide a question about medications or health.",
+                "type": "error"
+            }, status_code=400)
+
+        if chatbot.async_llm.is_available():
+            response_text = await chatbot.generate_medical_chat_response_async(user_message, conversation_history)
+            response_type = "info"
+        else:
+            response_text = chatbot.generate_fallback_chat_response(user_message)
+            response_type = "fallback"
+
+        return JSONResponse({"response": response_text, "type": response_type})
+
+    except Exception as error:
+        print(f"Chat endpoint error: {str(error)}")
+        return JSONResponse({"response": chatbot.generate_fallback_chat_response(user_message), "type": "error"})
+
+
+app = Starlette(
+    routes=[
+        Route('/ai-interactions/comprehensive-check', comprehensive_interaction_check, methods=['POST']),
+        Route('/ai-nlp/smart-extract', smart_medicine_extraction, methods=['POST']),
+        Route('/ai-ocr/enhance-text', enhance_ocr_text, methods=['POST']),
+        Route('/chatbot/ask', chatbot_ask, methods=['POST']),
+        Route('/chatbot/chat', chatbot_chat, methods=['POST']),
+        Mount('/', app=WSGIMiddleware(flask_app)),
+    ],
+    middleware=[
+        # Same policy as flask-cors in app.py
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['GET', 'POST', 'OPTIONS'],
+                   allow_headers=['Content-Type', 'Authorization'])
+    ]
+)
@@ -0,0 +1,62 @@
+"""
+gunicorn settings, read automatically when gunicorn starts from backend/
+
+Heavy dependencies (ML models, OpenCV, PDF rendering, drug indexes) load on
+first use, so workers boot fast and only pay for what they serve. Set
+WARMUP to load them before the first request instead:
+
+    WARMUP=all                      every lazy resource the app registered
+    WARMUP=ml_integration,cv2       only these (names as in services/lazy_resource)
+
+With GUNICORN_PRELOAD=1 the app is imported and warmed once in the master
+and the workers share it through fork; otherwise each worker warms up right
+after loading the app. To load the ML models once for all workers:
+
+    GUNICORN_PRELOAD=1 WARMUP=ml_integration gunicorn app:app --workers 4
+
+Before forking, the master moves everything it has built into the GC's
+permanent generation (gc.freeze), so collections in the workers don't write
+to the shared objects and copy their pages. The models' numpy arrays are
+memory-mapped from the joblib files (ML_MMAP_MODE) and stay shared as well.
+benchmarks/worker_memory.py measures the per-worker memory.
+
+Each worker reloads the active ML model version on SIGHUP, without
+restarting (`kill -HUP $(pgrep -P <master pid>)`; SIGHUP to the master
+itself still restarts the workers, gunicorn's own reload). See
+ml_models/model_registry.py.
+"""
+
+import gc
+import os
+import signal
+import sys
+
+WARMUP = [name.strip() for name in os.getenv('WARMUP', '').split(',') if name.strip()]
+preload_app = os.getenv('GUNICORN_PRELOAD', '').lower() in ('1', 'true', 'yes')
+
+
+def _warm_up():
+    from services.lazy_resource import warm_up
+    warm_up(None if 'all' in WARMUP else WARMUP)
+
+
+def when_ready(server):
+    # With preload_app the master has already imported the app by now
+    if WARMUP and preload_app:
+        _warm_up()
+    if preload_app:
+        gc.freeze()
+
+
+def post_worker_init(worker):
+    # The per-worker counterpart: post_fork runs before the worker imports the app
+    if WARMUP and not preload_app:
+        _warm_up()
+    signal.signal(signal.SIGHUP, _reload_models)
+
+
+def _reload_models(signum, frame):
+    # Workers that haven't loaded the models yet will load the active version anyway
+    ml_integration = sys.modules.get('ml_integration')
+    if ml_integration is not None:
+        ml_integration.reload_in_background()
@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify
 import json
-import os
-from groq import Groq
+from services.llm_gateway import get_llm_gateway, get_async_llm_gateway, LLMUnavailableError
+from services.llm_response_cache import get_llm_response_cache, analysis_cache_key
 from dotenv import load_dotenv
 
 # Load environment configuration
@@ -10,21 +10,12 @@ load_dotenv()
 # Initialize blueprint for AI interaction routes
 ai_interactions_bp = Blueprint('ai_interactions', __name__)
 
-# Setup Groq client with error handling
-def initialize_groq_client():
-    """Initialize Groq client with proper error handling"""
-    api_key = os.getenv('GROQ_API_KEY')
-    if not api_key:
-        print("Warning: GROQ_API_KEY not found in environment")
-        return None
-    
-    try:
-        return Groq(api_key=api_key)
-    except Exception as error:
-        print(f"Failed to initialize Groq client: {error}")
-        return None
+# Shared LLM gateway; an open circuit routes analysis to the rule-based fallback
+llm = get_llm_gateway()
+async_llm = get_async_llm_gateway()  # used by the ASGI app (asgi.py)
 
-client = initialize_groq_client()
+# Parsed AI analyses keyed by regimen, age bucket and profile; common regimens repeat constantly
+response_cache = get_llm_response_cache()
 
 @ai_interactions_bp.route('/comprehensive-check', methods=['POST'])
 def comprehensive_interaction_check():
@@ -42,7 +33,7 @@ def comprehensive_interaction_check():
         
         print(f"Processing interaction check for {len(medication_list)} medications (patient age: {patient_age})")
         
-        if not client:
+        if not llm.is_configured():
             return jsonify({
                 "error": "AI service temporarily unavailable",
                 "fallback_message": "Please try again later"
@@ -50,6 +41,7 @@ def comprehensive_interaction_check():
             
         # Perform comprehensive analysis
         analysis_result = perform_comprehensive_analysis(medication_list, patient_age)
+        analysis_result.setdefault("served_from_cache", False)
         return jsonify(analysis_result)
         
     except Exception as error:
@@ -72,21 +64,19 @@ def advanced_warnings():
         
         print("Generating advanced warning analysis for patient profile")
         
-        if not client:
+        if not llm.is_configured():
             return jsonify({"error": "Warning system unavailable"}), 503
             
         warning_result = generate_advanced_warnings(medication_list, patient_profile)
+        warning_result.setdefault("served_from_cache", False)
         return jsonify(warning_result)
         
     except Exception as error:
         print(f"Advanced warnings generation failed: {str(error)}")
         return jsonify({"error": str(error)}), 500
 
-def perform_comprehensive_analysis(medications, age):
-    """
-    Core function for comprehensive drug interaction analysis
-    Handles both AI-powered analysis and fallback scenarios
-    """
+def comprehensive_analysis_request(medications, age):
+    """Cache key and LLM chat request for a comprehensive analysis"""
     
     # Build medication list with proper formatting
     formatted_meds = []
@@ -97,47 +87,101 @@ def perform_comprehensive_analysis(medications, age):
     
     print(f"Analyzing drug interactions for: {', '.join(formatted_meds)}")
     
+    cache_key = analysis_cache_key('comprehensive', medications, age, model=llm.model)
+    
     # Create detailed analysis prompt
     analysis_prompt = build_interaction_analysis_prompt(formatted_meds, age)
+    chat_request = {
+        "messages": [
+            {
+                "role": "system", 
+                "content": "You are an experienced clinical pharmacist specializing in drug interaction analysis. Provide evidence-based assessments."
+            },
+            {
+                "role": "user", 
+                "content": analysis_prompt
+            }
+        ],
+        "max_tokens": 1200,
+        "temperature": 0.15  # Slightly higher for more natural responses
+    }
+    return cache_key, chat_request
+
+def get_cached_analysis(cache_key, label="Analysis"):
+    """Cached result flagged as served from cache, or None"""
+    cached_result = response_cache.get(cache_key)
+    if cached_result is not None:
+        print(f"{label} served from cache")
+        cached_result["served_from_cache"] = True
+    return cached_result
+
+def parse_comprehensive_analysis(ai_content, medications, age, cache_key):
+    """Turn the AI reply into the analysis result, caching it when it parses"""
+    try:
+        # Parse AI response
+        parsed_result = json.loads(ai_content.strip())
+        parsed_result["ai_powered"] = True
+        response_cache.put(cache_key, parsed_result)
+        
+        # Log results
+        interaction_count = len(parsed_result.get('drug_drug_interactions', []))
+        warning_count = len(parsed_result.get('age_related_warnings', []))
+        print(f"Analysis complete: {interaction_count} interactions, {warning_count} warnings identified")
+        
+        return parsed_result
+        
+    except json.JSONDecodeError as parse_error:
+        print(f"JSON parsing failed: {parse_error}")
+        # Use fallback analysis
+        return create_fallback_analysis(medications, age)
+
+def perform_comprehensive_analysis(medications, age):
+    """
+    Core function for comprehensive drug interaction analysis
+    Handles both AI-powered analysis and fallback scenarios
+    """
+    cache_key, chat_request = comprehensive_analysis_request(medications, age)
+    
+    # Serve repeated regimens from cache, even while the AI service is degraded
+    cached_result = get_cached_analysis(cache_key)
+    if cached_result is not None:
+        return cached_result
     
     try:
-        if client:
+        if llm.is_available():
             # Request AI analysis
-            ai_response = client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "You are an experienced clinical pharmacist specializing in drug interaction analysis. Provide evidence-based assessments."
-                    },
-                    {
-                        "role": "user", 
-                        "content": analysis_prompt
-                    }
-                ],
-                max_tokens=1200,
-                temperature=0.15  # Slightly higher for more natural responses
-            )
-            
-            ai_content = ai_response.choices[0].message.content.strip()
-            
-            try:
-                # Parse AI response
-                parsed_result = json.loads(ai_content)
-                parsed_result["ai_powered"] = True
-                
-                # Log results
-                interaction_count = len(parsed_result.get('drug_drug_interactions', []))
-                warning_count = len(parsed_result.get('age_related_warnings', []))
-                print(f"Analysis complete: {interaction_count} interactions, {warning_count} warnings identified")
-                
-                return parsed_result
+            ai_content = llm.chat(**chat_request)
+            return parse_comprehensive_analysis(ai_content, medications, age, cache_key)
+        
+        print("AI service degraded, using rule-based analysis")
+        return create_fallback_analysis(medications, age)
                 
-            except json.JSONDecodeError as parse_error:
-                print(f"JSON parsing failed: {parse_error}")
-                # Use fallback analysis
-                return create_fallback_analysis(medications, age)
+    except LLMUnavailableError as unavailable:
+        print(f"AI service unavailable: {unavailable}")
+        return create_fallback_analysis(medications, age)
+    except Exception as ai_error:
+        print(f"AI analysis failed: {ai_error}")
+        return create_fallback_analysis(medications, age)
+
+async def perform_comprehensive_analysis_async(medications, age):
+    """perform_comprehensive_analysis for the ASGI app; awaits the LLM instead of blocking"""
+    cache_key, chat_request = comprehensive_analysis_request(medications, age)
+    
+    cached_result = get_cached_analysis(cache_key)
+    if cached_result is not None:
+        return cached_result
+    
+    try:
+        if async_llm.is_available():
+            ai_content = await async_llm.chat(**chat_request)
+            return parse_comprehensive_analysis(ai_content, medications, age, cache_key)
+        
+        print("AI service degraded, using rule-based analysis")
+        return create_fallback_analysis(medications, age)
                 
+    except LLMUnavailableError as unavailable:
+        print(f"AI service unavailable: {unavailable}")
+        return create_fallback_analysis(medications, age)
     except Exception as ai_error:
         print(f"AI analysis failed: {ai_error}")
         return create_fallback_analysis(medications, age)
@@ -319,6 +363,13 @@ def generate_advanced_warnings(medications, patient_info):
     medical_conditions = patient_info.get('conditions', [])
     known_allergies = patient_info.get('allergies', [])
     
+    cache_key = analysis_cache_key(
+        'advanced', [{'name': med.get('name')} for med in medications], patient_age,
+        profile={'conditions': medical_conditions, 'allergies': known_allergies}, model=llm.model)
+    cached_warnings = get_cached_analysis(cache_key, "Advanced analysis")
+    if cached_warnings is not None:
+        return cached_warnings
+    
     # Build comprehensive analysis prompt
     advanced_prompt = f"""
 As a clinical decision support specialist, provide comprehensive safety analysis:
@@ -378,8 +429,7 @@ Format as JSON:
 """
 
     try:
-        ai_response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
+        response_content = llm.chat(
             messages=[
                 {
                     "role": "system", 
@@ -392,13 +442,12 @@ Format as JSON:
             ],
             max_tokens=1500,
             temperature=0.1
-        )
-        
-        response_content = ai_response.choices[0].message.content.strip()
+        ).strip()
         
         try:
             parsed_warnings = json.loads(response_content)
             parsed_warnings["advanced_analysis"] = True
+            response_cache.put(cache_key, parsed_warnings)
             
             total_warnings = len(parsed_warnings.get('contraindications', []))
             total_monitoring = len(parsed_warnings.get('monitoring_requirements', []))
@@ -1,31 +1,19 @@
 from flask import Blueprint, request, jsonify
 import json
-import os
-from groq import Groq
 from dotenv import load_dotenv
 
+from services.drug_matcher import get_drug_matcher
+from services.llm_gateway import get_llm_gateway, get_async_llm_gateway
+
 # Initialize environment configuration
 load_dotenv()
 
 # Create blueprint for natural language processing routes
 ai_nlp_bp = Blueprint('ai_nlp', __name__)
 
-# Setup AI client with fallback handling
-def setup_ai_client():
-    """Initialize AI client with proper error handling"""
-    api_key = os.getenv('GROQ_API_KEY')
-    if api_key:
-        try:
-            return Groq(api_key=api_key)
-        except Exception as init_error:
-            print(f"AI client initialization failed: {init_error}")
-            return None
-    else:
-        print("Warning: GROQ_API_KEY not configured")
-        return None
-
-# Initialize client
-client = setup_ai_client()
+# Shared LLM gateway; failures and an open circuit fall back to rule-based extraction
+llm = get_llm_gateway()
+async_llm = get_async_llm_gateway()  # used by the ASGI app (asgi.py)
 
 @ai_nlp_bp.route('/smart-extract', methods=['POST'])
 def smart_medicine_extraction():
@@ -50,8 +38,8 @@ def smart_medicine_extraction():
         
         print(f"Processing prescription text for medicine extraction: {prescription_text[:100]}...")
         
-        if not client:
-            # Use fallback extraction when AI is unavailable
+        if not llm.is_available():
+            # Use fallback extraction when AI is unavailable or degraded
             fallback_result = perform_fallback_medicine_extraction(prescription_text)
             return jsonify(fallback_result)
             
@@ -59,14 +47,7 @@ def smart_medicine_extraction():
         extraction_result = perform_intelligent_extraction(prescription_text)
         
         # Ensure the result has the correct structure
-        if not extraction_result.get('medicines'):
-            print("No medicines found by AI, trying fallback extraction")
-            fallback_result = perform_fallback_medicine_extraction(prescription_text)
-            extraction_result['medicines'] = fallback_result['medicines']
-            extraction_result['fallback_used'] = True
-        
-        print(f"Final extraction result: {len(extraction_result.get('medicines', []))} medicines found")
-        return jsonify(extraction_result)
+        return jsonify(ensure_extracted_medicines(extraction_result, prescription_text))
         
     except Exception as processing_error:
         print(f"Medicine extraction error: {str(processing_error)}")
@@ -75,97 +56,102 @@ def smart_medicine_extraction():
         fallback_result['error'] = str(processing_error)
         return jsonify(fallback_result)
 
-def perform_intelligent_extraction(prescription_text):
-    """
-    Core function for intelligent medicine extraction
-    Uses advanced AI to understand medical context and terminology
-    """
+def extraction_chat_request(prescription_text):
+    """LLM chat request for extracting medicines from prescription text"""
     
     # Build comprehensive extraction prompt
     extraction_prompt = create_extraction_prompt(prescription_text)
+    return {
+        "messages": [
+            {
+                "role": "system", 
+                "content": "You are an expert pharmaceutical AI specializing in prescription analysis. Extract ALL medicine names from text, even if mentioned casually. Return valid JSON with a medicines array containing objects with name and dose fields."
+            },
+            {
+                "role": "user", 
+                "content": extraction_prompt
+            }
+        ],
+        "max_tokens": 1200,
+        "temperature": 0.05  # Very low for accuracy
+    }
+
+def parse_intelligent_extraction(ai_content):
+    """Validate the AI extraction reply into the smart-extract result"""
+    ai_content = ai_content.strip()
+    print(f"AI extraction response received: {ai_content[:200]}...")
     
+    # Parse and validate AI response
     try:
-        # Request AI analysis
-        ai_response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {
-                    "role": "system", 
-                    "content": "You are an expert pharmaceutical AI specializing in prescription analysis. Extract ALL medicine names from text, even if mentioned casually. Return valid JSON with a medicines array containing objects with name and dose fields."
-                },
-                {
-                    "role": "user", 
-                    "content": extraction_prompt
-                }
-            ],
-            max_tokens=1200,
-            temperature=0.05  # Very low for accuracy
-        )
+        parsed_result = json.loads(ai_content)
         
-        ai_content = ai_response.choices[0].message.content.strip()
-        print(f"AI extraction response received: {ai_content[:200]}...")
+        # Validate medicines array
+        medicines = parsed_result.get('medicines', [])
+        validated_medicines = []
         
-        # Parse and validate AI response
-        try:
-            parsed_result = json.loads(ai_content)
-            
-            # Validate medicines array
-            medicines = parsed_result.get('medicines', [])
-            validated_medicines = []
-            
-            for medicine in medicines:
-                if isinstance(medicine, dict) and medicine.get('name'):
-                    validated_medicine = {
-                        'name': medicine.get('name', 'Unknown'),
-                        'dose': medicine.get('dose', 'Not specified'),
-                        'frequency': medicine.get('frequency', 'As prescribed'),
-                        'instructions': medicine.get('instructions', 'Follow prescription'),
-                        'drug_class': medicine.get('drug_class', 'Not specified'),
-                        'primary_use': medicine.get('primary_use', 'Not specified'),
-                        'confidence': medicine.get('confidence', 'Medium')
-                    }
-                    validated_medicines.append(validated_medicine)
-            
-            # Build final result
-            final_result = {
-                "medicines": validated_medicines,
-                "ai_enhanced": True,
-                "processing_method": "advanced_ai_extraction",
-                "extraction_summary": {
-                    "total_medicines": len(validated_medicines),
-                    "high_confidence_count": len([m for m in validated_medicines if m.get('confidence') == 'High']),
-                    "medium_confidence_count": len([m for m in validated_medicines if m.get('confidence') == 'Medium']),
-                    "low_confidence_count": len([m for m in validated_medicines if m.get('confidence') == 'Low'])
+        for medicine in medicines:
+            if isinstance(medicine, dict) and medicine.get('name'):
+                validated_medicine = {
+                    'name': medicine.get('name', 'Unknown'),
+                    'dose': medicine.get('dose', 'Not specified'),
+                    'frequency': medicine.get('frequency', 'As prescribed'),
+                    'instructions': medicine.get('instructions', 'Follow prescription'),
+                    'drug_class': medicine.get('drug_class', 'Not specified'),
+                    'primary_use': medicine.get('primary_use', 'Not specified'),
+                    'confidence': medicine.get('confidence', 'Medium')
                 }
+                validated_medicines.append(validated_medicine)
+        
+        # Build final result
+        final_result = {
+            "medicines": validated_medicines,
+            "ai_enhanced": True,
+            "processing_method": "advanced_ai_extraction",
+            "extraction_summary": {
+                "total_medicines": len(validated_medicines),
+                "high_confidence_count": len([m for m in validated_medicines if m.get('confidence') == 'High']),
+                "medium_confidence_count": len([m for m in validated_medicines if m.get('confidence') == 'Medium']),
+                "low_confidence_count": len([m for m in validated_medicines if m.get('confidence') == 'Low'])
             }
-            
-            # Add other fields from AI response
-            if 'clinical_notes' in parsed_result:
-                final_result['clinical_notes'] = parsed_result['clinical_notes']
-            
-            print(f"Successfully extracted {len(validated_medicines)} medicines using AI:")
-            for med in validated_medicines:
-                print(f"  - {med['name']} ({med['dose']})")
-            
-            return final_result
-            
-        except json.JSONDecodeError as json_error:
-            print(f"JSON parsing failed: {json_error}")
-            print(f"Raw AI response: {ai_content}")
-            
-            # Try to extract medicines from raw text
-            fallback_medicines = extract_medicines_from_ai_text(ai_content)
-            
-            return {
-                "medicines": fallback_medicines,
-                "ai_enhanced": True,
-                "parsing_error": True,
-                "raw_ai_response": ai_content[:500],
-                "extraction_summary": {
-                    "total_medicines": len(fallback_medicines),
-                    "extraction_method": "AI with manual parsing"
-                }
+        }
+        
+        # Add other fields from AI response
+        if 'clinical_notes' in parsed_result:
+            final_result['clinical_notes'] = parsed_result['clinical_notes']
+        
+        print(f"Successfully extracted {len(validated_medicines)} medicines using AI:")
+        for med in validated_medicines:
+            print(f"  - {med['name']} ({med['dose']})")
+        
+        return final_result
+        
+    except json.JSONDecodeError as json_error:
+        print(f"JSON parsing failed: {json_error}")
+        print(f"Raw AI response: {ai_content}")
+        
+        # Try to extract medicines from raw text
+        fallback_medicines = extract_medicines_from_ai_text(ai_content)
+        
+        return {
+            "medicines": fallback_medicines,
+            "ai_enhanced": True,
+            "parsing_error": True,
+            "raw_ai_response": ai_content[:500],
+            "extraction_summary": {
+                "total_medicines": len(fallback_medicines),
+                "extraction_method": "AI with manual parsing"
             }
+        }
+
+def perform_intelligent_extraction(prescription_text):
+    """
+    Core function for intelligent medicine extraction
+    Uses advanced AI to understand medical context and terminology
+    """
+    try:
+        # Request AI analysis
+        ai_content = llm.chat(**extraction_chat_request(prescription_text))
+        return parse_intelligent_extraction(ai_content)
             
     except Exception as ai_error:
         print(f"AI extraction failed: {ai_error}")
@@ -173,6 +159,27 @@ def perform_intelligent_extraction(prescription_text):
         # Return fallback extraction
         return perform_fallback_medicine_extraction(prescription_text)
 
+async def perform_intelligent_extraction_async(prescription_text):
+    """perform_intelligent_extraction for the ASGI app; awaits the LLM instead of blocking"""
+    try:
+        ai_content = await async_llm.chat(**extraction_chat_request(prescription_text))
+        return parse_intelligent_extraction(ai_content)
+            
+    except Exception as ai_error:
+        print(f"AI extraction failed: {ai_error}")
+        return perform_fallback_medicine_extraction(prescription_text)
+
+def ensure_extracted_medicines(extraction_result, prescription_text):
+    """Fill in rule-based medicines when the AI found none"""
+    if not extraction_result.get('medicines'):
+        print("No medicines found by AI, trying fallback extraction")
+        fallback_result = perform_fallback_medicine_extraction(prescription_text)
+        extraction_result['medicines'] = fallback_result['medicines']
+        extraction_result['fallback_used'] = True
+    
+    print(f"Final extraction result: {len(extraction_result.get('medicines', []))} medicines found")
+    return extraction_result
+
 def create_extraction_prompt(text_content):
     """Creates a detailed prompt for medicine extraction"""
     
@@ -225,7 +232,6 @@ def perform_fallback_medicine_extraction(prescription_text):
     print("Using fallback medicine extraction")
     
     extracted_medicines = []
-    text_lower = prescription_text.lower()
     
     # Comprehensive medicine database with common drugs
     medicine_database = {
@@ -301,9 +307,13 @@ def perform_fallback_medicine_extraction(prescription_text):
         }
     }
     
-    # Search for medicines in text
+    # Search for medicines in text in one pass, including brand aliases
+    matcher = get_drug_matcher()
+    matcher.add_names(medicine_database)
+    mentioned = matcher.find_names(prescription_text)
+    
     for medicine_key, medicine_info in medicine_database.items():
-        if medicine_key in text_lower:
+        if medicine_key in mentioned:
             # Try to extract actual dosage and frequency
             actual_dose = extract_dosage_from_text(prescription_text, medicine_key)
             actual_frequency = extract_frequency_from_text(prescription_text, medicine_key)
@@ -348,8 +358,12 @@ def extract_medicines_from_ai_text(ai_text):
     
     ai_text_lower = ai_text.lower()
     
+    matcher = get_drug_matcher()
+    matcher.add_names(common_medicines)
+    mentioned = matcher.find_names(ai_text)
+    
     for medicine in common_medicines:
-        if medicine in ai_text_lower:
+        if medicine in mentioned:
             # Try to find dosage near medicine name
             import re
             dosage_pattern = f"{medicine}[\\s\\w]*?(\\d+(?:\\.\\d+)?\\s*(?:mg|ml|g|mcg))"
@@ -424,7 +438,7 @@ def identify_unknown_medicine():
         
         print(f"Identifying unknown medicine: '{unknown_medicine}'")
         
-        if not client:
+        if not llm.is_configured():
             return jsonify({
                 "error": "Identification service unavailable",
                 "identification": {"corrected_name": unknown_medicine, "confidence": "Low"}
@@ -453,8 +467,7 @@ def perform_medicine_identification(medicine_name):
     
     try:
         # Request comprehensive AI analysis
-        ai_response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
+        ai_content = llm.chat(
             messages=[
                 {
                     "role": "system", 
@@ -467,9 +480,7 @@ def perform_medicine_identification(medicine_name):
             ],
             max_tokens=1400,
             temperature=0.1  # Low temperature for accurate identification
-        )
-        
-        ai_content = ai_response.choices[0].message.content.strip()
+        ).strip()
         
         # Parse identification results
         try:
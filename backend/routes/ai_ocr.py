@@ -1,28 +1,16 @@
 from flask import Blueprint, request, jsonify
 import base64
-import os
 import json
-from groq import Groq
 from dotenv import load_dotenv
 
+from services.llm_gateway import get_llm_gateway, get_async_llm_gateway
+
 load_dotenv()
 
 ai_ocr_bp = Blueprint('ai_ocr', __name__)
 
-def setup_ai_client():
-    """Initialize AI client with proper error handling"""
-    api_key = os.getenv('GROQ_API_KEY')
-    if api_key:
-        try:
-            return Groq(api_key=api_key)
-        except Exception as e:
-            print(f"Failed to initialize Groq client: {e}")
-            return None
-    else:
-        print("Warning: GROQ_API_KEY not found")
-        return None
-
-client = setup_ai_client()
+llm = get_llm_gateway()
+async_llm = get_async_llm_gateway()  # used by the ASGI app (asgi.py)
 
 @ai_ocr_bp.route('/enhance-text', methods=['POST'])
 def enhance_ocr_text():
@@ -40,7 +28,7 @@ def enhance_ocr_text():
         
         print(f"AI OCR processing: {messy_text[:100]}...")
         
-        if not client:
+        if not llm.is_configured():
             return jsonify({
                 "error": "AI OCR service unavailable",
                 "cleaned_text": messy_text,
@@ -49,13 +37,8 @@ def enhance_ocr_text():
                 "confidence": "Low"
             }), 503
             
-        # Clean up OCR text with AI
+        # Clean up OCR text with AI (medicines are validated while parsing)
         enhanced_result = ai_enhance_prescription_text(messy_text)
-        
-        # Validate medicine data
-        if 'medicines' in enhanced_result:
-            enhanced_result['medicines'] = validate_and_format_medicines(enhanced_result['medicines'])
-        
         return jsonify(enhanced_result)
         
     except Exception as e:
@@ -99,8 +82,8 @@ def extract_handwritten():
         print(f"Handwritten processing error: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
-def ai_enhance_prescription_text(messy_text):
-    """Use AI to fix OCR errors and extract structured data"""
+def enhance_text_chat_request(messy_text):
+    """LLM chat request for cleaning up OCR text and extracting medicines"""
     
     prompt = f"""
 You are a medical AI expert in prescription analysis. Fix this messy OCR text from a prescription and extract medicine information:
@@ -129,43 +112,63 @@ Return response in this JSON format:
 Focus on medical accuracy. If uncertain, indicate in confidence level.
 """
 
+    return {
+        "messages": [
+            {"role": "system", "content": "You are a medical AI specialist in prescription text processing and OCR error correction. You have extensive knowledge of medical terminology and prescription formats."},
+            {"role": "user", "content": prompt}
+        ],
+        "max_tokens": 800,
+        "temperature": 0.1
+    }
+
+def parse_enhanced_text(response_text):
+    """Structured result from the AI reply, with validated medicines"""
+    ai_text = response_text.strip()
+    
+    # Try to parse JSON response
     try:
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": "You are a medical AI specialist in prescription text processing and OCR error correction. You have extensive knowledge of medical terminology and prescription formats."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=800,
-            temperature=0.1
-        )
-        
-        ai_text = response.choices[0].message.content.strip()
-        
-        # Try to parse JSON response
-        try:
-            result = json.loads(ai_text)
-            result["ai_processed"] = True
-            print("✅ AI OCR enhancement successful!")
-            return result
-        except json.JSONDecodeError:
-            # If JSON parsing fails, return structured fallback
-            return {
-                "cleaned_text": ai_text,
-                "medicines": [],
-                "ai_processed": True,
-                "confidence": "Low",
-                "error": "JSON parsing failed but got AI response"
-            }
-            
-    except Exception as e:
-        print(f"AI OCR enhancement failed: {e}")
-        return {
-            "cleaned_text": messy_text,
+        result = json.loads(ai_text)
+        result["ai_processed"] = True
+        print("✅ AI OCR enhancement successful!")
+    except json.JSONDecodeError:
+        # If JSON parsing fails, return structured fallback
+        result = {
+            "cleaned_text": ai_text,
             "medicines": [],
-            "ai_processed": False,
-            "error": str(e)
+            "ai_processed": True,
+            "confidence": "Low",
+            "error": "JSON parsing failed but got AI response"
         }
+    
+    # Validate medicine data
+    if 'medicines' in result:
+        result['medicines'] = validate_and_format_medicines(result['medicines'])
+    return result
+
+def enhance_text_failure(messy_text, error):
+    print(f"AI OCR enhancement failed: {error}")
+    return {
+        "cleaned_text": messy_text,
+        "medicines": [],
+        "ai_processed": False,
+        "error": str(error)
+    }
+
+def ai_enhance_prescription_text(messy_text):
+    """Use AI to fix OCR errors and extract structured data"""
+    try:
+        response_text = llm.chat(**enhance_text_chat_request(messy_text))
+        return parse_enhanced_text(response_text)
+    except Exception as e:
+        return enhance_text_failure(messy_text, e)
+
+async def ai_enhance_prescription_text_async(messy_text):
+    """ai_enhance_prescription_text for the ASGI app; awaits the LLM instead of blocking"""
+    try:
+        response_text = await async_llm.chat(**enhance_text_chat_request(messy_text))
+        return parse_enhanced_text(response_text)
+    except Exception as e:
+        return enhance_text_failure(messy_text, e)
 
 def ai_process_handwritten_prescription(text):
     """Special AI processing for handwritten prescriptions"""
@@ -206,8 +209,7 @@ Return JSON:
 """
 
     try:
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
+        response_text = llm.chat(
             messages=[
                 {"role": "system", "content": "You are a medical AI expert in handwritten prescription interpretation with knowledge of medical abbreviations, shorthand, and common prescription patterns."},
                 {"role": "user", "content": prompt}
@@ -216,7 +218,7 @@ Return JSON:
             temperature=0.2
         )
         
-        ai_result = response.choices[0].message.content.strip()
+        ai_result = response_text.strip()
         
         try:
             result = json.loads(ai_result)
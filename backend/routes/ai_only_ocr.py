@@ -1,46 +1,59 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 import os
+import sys
 import json
+import time
+import hmac
 import base64
-from groq import Groq
 from dotenv import load_dotenv
-from PIL import Image
-import pytesseract
-import io
 
 # Load environment configuration
 load_dotenv()
 
-# Add ML integration for enhanced medicine extraction
-try:
-    import sys
+from services.drug_matcher import get_drug_matcher
+from services.llm_gateway import get_llm_gateway
+from services.ocr_engine import get_ocr_engine, OCRBusyError
+from services.image_ingest import load_image
+from services.pdf_ingest import is_pdf, extract_pdf_text, PDFUnavailableError
+from services.batch_scan import BatchRequestError, BatchTooLargeError, collect_documents, run_batch, format_ndjson_line
+from services.lazy_resource import LazyResource, lazy_import
+
+def load_ml_integration():
+    """ML integration for enhanced medicine extraction (joblib, numpy, scikit-learn models)"""
     sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'ml_models'))
-    from ml_integration import extract_medicines, check_interactions, check_age_warnings, get_ml_status
-    ML_AVAILABLE = True
+    try:
+        import ml_integration
+    except ImportError as e:
+        print(f"⚠️ ML models not available: {e}")
+        raise
     print("✅ ML models available for enhanced extraction")
-    print(f"   ML Status: {get_ml_status()}")
-except ImportError as e:
-    ML_AVAILABLE = False
-    print(f"⚠️ ML models not available: {e}")
+    print(f"   ML Status: {ml_integration.get_ml_status()}")
+    return ml_integration
+
+# Heavy dependencies load on first use (or in warm_up()), not with the blueprint
+ml_models = LazyResource('ml_integration', load_ml_integration)
+image_preprocess = lazy_import('services.image_preprocess')
+drug_checker = lazy_import('services.drug_checker')
+# ml_models/model_registry.py; importable once ml_models has loaded (it puts ml_models/ on sys.path)
+model_registry = lazy_import('model_registry')
 
 # Create blueprint for AI-powered OCR processing
 ai_only_ocr_bp = Blueprint('ai_only_ocr', __name__)
 
-# Initialize Groq client with error handling
-def setup_ai_ocr_client():
-    """Initialize AI client for OCR processing with proper error handling"""
-    api_key = os.getenv('GROQ_API_KEY')
-    if api_key:
-        try:
-            return Groq(api_key=api_key)
-        except Exception as initialization_error:
-            print(f"Failed to initialize AI OCR client: {initialization_error}")
-            return None
-    else:
-        print("Warning: GROQ_API_KEY not found in environment")
-        return None
+# Shared LLM gateway; failures and an open circuit fall back to text analysis / OCR
+llm = get_llm_gateway()
+
+# Shared Tesseract workers, located once at import; a full queue answers 429
+ocr_engine = get_ocr_engine()
+
+# Characters Tesseract may emit for prescription text
+PRESCRIPTION_CHAR_WHITELIST = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789.:(),-/ '
 
-client = setup_ai_ocr_client()
+# Batch documents wait out a full OCR queue this many times before failing
+BATCH_OCR_RETRIES = int(os.getenv('BATCH_OCR_RETRIES', 3))
+
+# Bearer token for the model admin endpoints; unset disables them
+MODEL_ADMIN_TOKEN = os.getenv('MODEL_ADMIN_TOKEN', '')
 
 @ai_only_ocr_bp.route('/ai-scan', methods=['POST'])
 def ai_powered_document_scan():
@@ -85,6 +98,17 @@ def ai_powered_document_scan():
             "external_dependencies": False
         })
         
+    except OCRBusyError as busy:
+        print("OCR queue full, rejecting document scan")
+        return jsonify({
+            "error": "OCR service busy",
+            "retry_after": busy.retry_after
+        }), 429, {'Retry-After': str(busy.retry_after)}
+        
+    except PDFUnavailableError:
+        print("PDF upload rejected: pypdfium2 is not installed")
+        return jsonify({"error": "PDF support not installed"}), 415
+        
     except Exception as processing_error:
         print(f"Document processing failed: {str(processing_error)}")
         return jsonify({
@@ -92,10 +116,138 @@ def ai_powered_document_scan():
             "details": str(processing_error)
         }), 500
 
+@ai_only_ocr_bp.route('/ai-scan/batch', methods=['POST'])
+def ai_powered_batch_scan():
+    """
+    Batch variant of /ai-scan for pharmacy integrations and backfills
+    Accepts many files (multipart field "files", repeated) and/or zip archives
+    of them; each document goes through OCR, medicine extraction and the
+    interaction check on a bounded pool (BATCH_SCAN_WORKERS).
+
+    The response is NDJSON, one line per document in the order they finish:
+    {"index", "filename", "success", ...} with the /ai-scan fields plus
+    "interactions" and "age_warnings", or "error" when the document failed.
+    """
+    uploads = request.files.getlist('files') + request.files.getlist('file')
+    try:
+        patient_age = int(request.form['patientAge']) if request.form.get('patientAge') else None
+    except ValueError:
+        return jsonify({"error": "patientAge must be a whole number"}), 400
+    
+    try:
+        documents = collect_documents(uploads)
+    except BatchTooLargeError as size_error:
+        return jsonify({"error": str(size_error)}), 413
+    except BatchRequestError as batch_error:
+        return jsonify({"error": str(batch_error)}), 400
+    
+    print(f"Processing batch of {len(documents)} documents")
+    
+    def stream_results():
+        for index, result in run_batch(documents, lambda document: scan_batch_document(document, patient_age)):
+            yield format_ndjson_line({"index": index, "filename": documents[index].filename, **result})
+    
+    return Response(
+        stream_with_context(stream_results()),
+        mimetype='application/x-ndjson',
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Keep reverse proxies from buffering the stream
+        }
+    )
+
+def scan_batch_document(document, patient_age=None):
+    """
+    OCR -> medicine extraction -> interaction check for one batch document
+    patient_age falls back to the age found in the document, if any
+    """
+    extracted_content = None
+    for attempt in range(BATCH_OCR_RETRIES + 1):
+        try:
+            extracted_content = extract_file_content(document)
+            break
+        except OCRBusyError as busy:
+            if attempt == BATCH_OCR_RETRIES:
+                raise
+            time.sleep(busy.retry_after)
+    
+    if not extracted_content:
+        return {"success": False, "error": "Unable to extract content from file"}
+    
+    ai_analysis_result = analyze_prescription_with_ai(extracted_content, document.filename)
+    medicine_names = [medicine['name'] for medicine in ai_analysis_result.get('medicines', [])
+                      if isinstance(medicine, dict) and medicine.get('name')]
+    
+    if patient_age is None:
+        patient_info = ai_analysis_result.get('patient_info')
+        document_age = str(patient_info.get('age', '')) if isinstance(patient_info, dict) else ''
+        patient_age = int(document_age) if document_age.isdigit() else None
+    interactions, age_warnings = drug_checker.get().check_interactions_and_warnings(medicine_names, patient_age)
+    
+    return {
+        "success": True,
+        "extracted_text": extracted_content.strip(),
+        "ai_enhanced": ai_analysis_result,
+        "interactions": interactions,
+        "age_warnings": age_warnings,
+        "content_type": document.content_type,
+        "content_length": len(extracted_content)
+    }
+
+def is_model_admin():
+    """Only an 'Authorization: Bearer <MODEL_ADMIN_TOKEN>' header; a bare token is refused"""
+    scheme, _, supplied = request.headers.get('Authorization', '').partition(' ')
+    if not MODEL_ADMIN_TOKEN or scheme != 'Bearer':
+        return False
+    return hmac.compare_digest(supplied.strip().encode(), MODEL_ADMIN_TOKEN.encode())
+
+@ai_only_ocr_bp.route('/models', methods=['GET'])
+def ml_model_status():
+    """Model version this worker serves, and the versions in the registry"""
+    if not is_model_admin():
+        return jsonify({"error": "Not authorized"}), 403
+    if not ml_models.is_available():
+        return jsonify({"error": "ML models not available"}), 503
+    
+    ml_integration = ml_models.get()
+    registry = model_registry.get()
+    registry_dir = ml_integration.dosesafe_ml.registry_dir
+    return jsonify({
+        "serving": ml_integration.get_ml_status(),
+        "registry": registry.read_registry(registry_dir),
+        "versions": [{key: manifest[key] for key in ('version', 'created_at', 'checksum', 'training_stats')}
+                     for manifest in registry.list_versions(registry_dir)]
+    })
+
+@ai_only_ocr_bp.route('/models/activate', methods=['POST'])
+def activate_ml_models():
+    """
+    Make a model version active and swap this worker over to it, without
+    dropping requests in flight. Body: {"version": "..."}; without one the
+    worker just reloads the registry's active version. Other workers follow
+    within MODEL_REGISTRY_POLL_SECONDS, or at once on SIGHUP.
+    """
+    if not is_model_admin():
+        return jsonify({"error": "Not authorized"}), 403
+    if not ml_models.is_available():
+        return jsonify({"error": "ML models not available"}), 503
+    
+    ml_integration = ml_models.get()
+    registry = model_registry.get()
+    version = (request.get_json(silent=True) or {}).get('version')
+    try:
+        if version:
+            registry.activate_version(ml_integration.dosesafe_ml.registry_dir, version)
+        swap = ml_integration.reload_models()
+    except registry.ModelRegistryError as registry_error:
+        return jsonify({"error": str(registry_error)}), 400
+    
+    return jsonify({"success": True, **swap})
+
 def extract_file_content(file_object):
     """
     Extract actual content from uploaded file based on file type
-    Supports text files and images with OCR processing
+    Supports text files, PDFs and images with OCR processing
     """
     
     try:
@@ -129,6 +281,14 @@ def extract_file_content(file_object):
             
             return cleaned_content
             
+        elif file_object.content_type == 'application/pdf' or is_pdf(file_object):
+            # Embedded text where the PDF has it, OCR (pages in parallel) where it does not
+            document = extract_pdf_text(file_object, ocr_engine, char_whitelist=PRESCRIPTION_CHAR_WHITELIST)
+            sources = [page['source'] for page in document['pages']]
+            print(f"PDF processed: {document['page_count']} pages "
+                  f"({sources.count('text')} text layer, {sources.count('ocr')} OCR, {sources.count('unreadable')} unreadable)")
+            return document['text']
+            
         elif file_object.content_type.startswith('image/'):
             # Handle image files with traditional OCR (Tesseract)
             print(f"Processing image file: {file_object.content_type}")
@@ -141,6 +301,8 @@ def extract_file_content(file_object):
             print(f"Unsupported file type: {file_object.content_type}")
             return f"File type {file_object.content_type} - specialized processing required"
             
+    except (OCRBusyError, PDFUnavailableError):
+        raise
     except Exception as extraction_error:
         print(f"Content extraction failed: {extraction_error}")
         return None
@@ -212,10 +374,10 @@ def analyze_prescription_with_ai(prescription_text, source_filename):
     """
     
     # First, try ML-enhanced medicine extraction
-    if ML_AVAILABLE:
+    if ml_models.is_available():
         try:
             print("🤖 Using ML models for medicine extraction...")
-            ml_medicines = extract_medicines(prescription_text)
+            ml_medicines = ml_models.get().extract_medicines(prescription_text)
             
             if ml_medicines:
                 print(f"✅ ML extracted {len(ml_medicines)} medicines: {ml_medicines}")
@@ -250,12 +412,11 @@ def analyze_prescription_with_ai(prescription_text, source_filename):
     analysis_prompt = build_prescription_analysis_prompt(prescription_text, source_filename)
     
     try:
-        if client:
+        if llm.is_available():
             print("Sending prescription text to AI for analysis...")
             
             # Request AI analysis using Groq/Llama model
-            ai_response = client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
+            ai_analysis_text = llm.chat(
                 messages=[
                     {
                         "role": "system", 
@@ -268,9 +429,7 @@ def analyze_prescription_with_ai(prescription_text, source_filename):
                 ],
                 max_tokens=1200,
                 temperature=0.03  # Very low temperature for medical accuracy
-            )
-            
-            ai_analysis_text = ai_response.choices[0].message.content.strip()
+            ).strip()
             print(f"AI response received: {ai_analysis_text[:300]}...")
             
             # Parse and validate AI response
@@ -344,7 +503,7 @@ def analyze_prescription_with_ai(prescription_text, source_filename):
                 }
                 
         else:
-            print("AI client not available, using text analysis fallback")
+            print("AI service unavailable or degraded, using text analysis fallback")
             return perform_text_analysis_fallback(prescription_text)
             
     except Exception as ai_error:
@@ -414,8 +573,13 @@ def extract_medicines_from_raw_text(raw_text):
     
     raw_text_lower = raw_text.lower()
     
+    # One pass over the text finds every known drug name or brand alias
+    matcher = get_drug_matcher()
+    matcher.add_names(common_medicines)
+    mentioned = matcher.find_names(raw_text)
+    
     for medicine in common_medicines:
-        if medicine in raw_text_lower or f"{medicine}variant" in raw_text_lower:
+        if medicine in mentioned:
             # Try to extract dosage information
             import re
             dosage_pattern = f"{medicine}[\\s\\w]*?(\\d+(?:\\.\\d+)?\\s*(?:mg|ml|g|mcg))"
@@ -441,12 +605,12 @@ def perform_text_analysis_fallback(text_content):
     print("Using fallback text analysis for medicine extraction")
     
     # Try ML-enhanced extraction first
-    if ML_AVAILABLE:
+    if ml_models.is_available():
         try:
             print("🤖 Using ML-enhanced medicine extraction...")
             
             # Use the new ML integration
-            extracted_medicines = extract_medicines(text_content)
+            extracted_medicines = ml_models.get().extract_medicines(text_content)
             
             if extracted_medicines:
                 print(f"✅ ML extraction found {len(extracted_medicines)} medicines")
@@ -467,7 +631,6 @@ def perform_text_analysis_fallback(text_content):
     
     # Traditional pattern matching fallback
     extracted_medicines = []
-    text_lower = text_content.lower()
     
     # Enhanced medicine patterns with dosage indicators
     medicine_patterns = {
@@ -486,10 +649,14 @@ def perform_text_analysis_fallback(text_content):
         'simvastatin': {'typical_dose': '20mg', 'frequency': 'Once daily'}
     }
     
-    # Search for medicine patterns in the actual text (including variants)
+    # Search for medicine patterns in the actual text in one pass; names also
+    # match inside variants (e.g., "hydroxyzinevariant22") and brand aliases count
+    matcher = get_drug_matcher()
+    matcher.add_names(medicine_patterns)
+    mentioned = matcher.find_names(text_content)
+    
     for medicine_key, medicine_info in medicine_patterns.items():
-        # Check for direct name or variant (e.g., "hydroxyzinevariant22")
-        if medicine_key in text_lower or f"{medicine_key}variant" in text_lower:
+        if medicine_key in mentioned:
             # Try to extract actual dosage from text
             actual_dose = extract_dosage_from_text(text_content, medicine_key)
             actual_frequency = extract_frequency_from_text(text_content, medicine_key)
@@ -600,39 +767,16 @@ def extract_text_from_image(file_object):
     Extract text from image files using OCR (Tesseract)
     """
     try:
-        # Set Tesseract path for Windows (common installation locations)
-        possible_paths = [
-            r'C:\Program Files\Tesseract-OCR\tesseract.exe',
-            r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
-            r'C:\Users\{}\AppData\Local\Programs\Tesseract-OCR\tesseract.exe'.format(os.getenv('USERNAME', 'User'))
-        ]
-        
-        for path in possible_paths:
-            if os.path.exists(path):
-                pytesseract.pytesseract.tesseract_cmd = path
-                print(f"Tesseract found at: {path}")
-                break
-        else:
-            print("Warning: Tesseract not found in common locations. Please check installation.")
-        
-        # Read image data
-        file_object.seek(0)
-        image_data = file_object.read()
-        
-        # Open image with PIL
-        image = Image.open(io.BytesIO(image_data))
-        
-        # Convert to RGB if necessary
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-        
+        # Decode the upload in memory, straight from the request stream
+        image = load_image(file_object)
         print(f"Processing image: {image.size} pixels, mode: {image.mode}")
         
-        # Configure Tesseract for better medical text recognition
-        custom_config = r'--oem 3 --psm 6 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789.:(),-/ '
+        # Crop to the prescription text and scale it to ~300 DPI before OCR
+        image, prepared = image_preprocess.get().prepare_for_ocr(image)
+        print(f"Prepared for OCR: crop {prepared['crop_box']}, scale {prepared['scale']}, {prepared['output_size']} pixels")
         
-        # Extract text using Tesseract OCR
-        extracted_text = pytesseract.image_to_string(image, config=custom_config)
+        # Extract text on a shared Tesseract worker (single block layout for medical text)
+        extracted_text = ocr_engine.image_to_string(image, psm=6, char_whitelist=PRESCRIPTION_CHAR_WHITELIST)
         
         # Clean up the extracted text
         cleaned_text = extracted_text.strip()
@@ -646,6 +790,8 @@ def extract_text_from_image(file_object):
         
         return cleaned_text
         
+    except OCRBusyError:
+        raise
     except Exception as ocr_error:
         print(f"OCR processing failed: {ocr_error}")
         return f"OCR processing failed: {str(ocr_error)}"
@@ -663,7 +809,7 @@ def extract_text_with_ai_vision(file_object):
         # Convert image to base64 for AI processing
         image_base64 = base64.b64encode(image_data).decode('utf-8')
         
-        if client:
+        if llm.is_available():
             print("Processing image with AI Vision model...")
             
             # Create vision prompt for medical document analysis
@@ -681,7 +827,7 @@ def extract_text_with_ai_vision(file_object):
             """
             
             # Use AI vision capabilities (if available in your Groq model)
-            ai_response = client.chat.completions.create(
+            extracted_text = llm.chat(
                 model="llama-3.2-90b-vision-preview",  # Vision-capable model
                 messages=[
                     {
@@ -699,16 +845,14 @@ def extract_text_with_ai_vision(file_object):
                 ],
                 max_tokens=1500,
                 temperature=0.1
-            )
-            
-            extracted_text = ai_response.choices[0].message.content.strip()
+            ).strip()
             print(f"AI Vision extracted {len(extracted_text)} characters")
             print(f"AI Vision preview: {extracted_text[:200]}...")
             
             return extracted_text
             
         else:
-            print("AI client not available, falling back to traditional OCR")
+            print("AI service unavailable or degraded, falling back to traditional OCR")
             return extract_text_from_image(file_object)
             
     except Exception as vision_error:
@@ -1,26 +1,18 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 import json
-import os
 from dotenv import load_dotenv
 
+from services.llm_gateway import get_llm_gateway, get_async_llm_gateway, LLMUnavailableError
+
 # Load environment variables
 load_dotenv()
 
 chatbot_bp = Blueprint('chatbot', __name__)
 
-# Initialize Groq client with proper error handling
-client = None
-try:
-    from groq import Groq
-    api_key = os.getenv('GROQ_API_KEY')
-    if api_key:
-        client = Groq(api_key=api_key)
-        print("Groq AI client initialized successfully")
-        print("Using Llama 3.3-70B model for medical analysis")
-    else:
-        print("Error: GROQ_API_KEY not found in environment variables")
-except Exception as initialization_error:
-    print(f"Groq client initialization failed: {initialization_error}")
+# Shared LLM gateway; while the upstream is degraded its circuit breaker
+# routes requests straight to the rule-based fallback responses
+llm = get_llm_gateway()
+async_llm = get_async_llm_gateway()  # used by the ASGI app (asgi.py)
 
 @chatbot_bp.route('/ask', methods=['POST'])
 def chatbot_ask():
@@ -37,7 +29,7 @@ def chatbot_ask():
             clinical_context = json.loads(clinical_context)
         
         # Generate explanation using AI or fallback system
-        if client:
+        if llm.is_available():
             explanation_response = generate_comprehensive_ai_explanation(clinical_context)
         else:
             explanation_response = generate_professional_fallback_explanation(clinical_context)
@@ -50,11 +42,8 @@ def chatbot_ask():
         fallback_response = generate_professional_fallback_explanation(clinical_context)
         return jsonify({"response": fallback_response})
 
-def generate_comprehensive_ai_explanation(clinical_context):
-    """
-    Generate comprehensive clinical explanation using AI language model
-    Processes medicine data, interactions, and warnings into professional analysis
-    """
+def explanation_chat_request(clinical_context):
+    """LLM chat request for a clinical explanation of medicines, interactions and warnings"""
     medicine_list = clinical_context.get('medicines', [])
     drug_interactions = clinical_context.get('interactions', [])
     age_warnings = clinical_context.get('warnings', [])
@@ -122,28 +111,44 @@ Requirements:
 - Limit response to 300 words maximum
 """
 
+    return {
+        "messages": [
+            {
+                "role": "system", 
+                "content": "You are an expert clinical pharmacist with extensive experience in medication therapy management, drug safety, and patient care. Generate professional, evidence-based clinical analyses that prioritize patient safety and provide actionable clinical recommendations."
+            },
+            {"role": "user", "content": clinical_analysis_prompt}
+        ],
+        "max_tokens": 500,
+        "temperature": 0.08  # Very low temperature for clinical accuracy
+    }
+
+def finish_ai_explanation(ai_generated_analysis):
+    """Add professional disclaimer and attribution"""
+    complete_clinical_response = f"{ai_generated_analysis.strip()}\n\n---\n**Clinical Analysis:** Llama 3.3-70B Medical AI | **Disclaimer:** For educational purposes only"
+    
+    print("AI-powered clinical analysis generated successfully")
+    return complete_clinical_response
+
+def generate_comprehensive_ai_explanation(clinical_context):
+    """
+    Generate comprehensive clinical explanation using AI language model
+    Processes medicine data, interactions, and warnings into professional analysis
+    """
     try:
         # Generate AI-powered clinical analysis
-        ai_response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {
-                    "role": "system", 
-                    "content": "You are an expert clinical pharmacist with extensive experience in medication therapy management, drug safety, and patient care. Generate professional, evidence-based clinical analyses that prioritize patient safety and provide actionable clinical recommendations."
-                },
-                {"role": "user", "content": clinical_analysis_prompt}
-            ],
-            max_tokens=500,
-            temperature=0.08  # Very low temperature for clinical accuracy
-        )
-        
-        ai_generated_analysis = ai_response.choices[0].message.content.strip()
+        ai_generated_analysis = llm.chat(**explanation_chat_request(clinical_context))
+        return finish_ai_explanation(ai_generated_analysis)
         
-        # Add professional disclaimer and attribution
-        complete_clinical_response = f"{ai_generated_analysis}\n\n---\n**Clinical Analysis:** Llama 3.3-70B Medical AI | **Disclaimer:** For educational purposes only"
-        
-        print("AI-powered clinical analysis generated successfully")
-        return complete_clinical_response
+    except Exception as ai_error:
+        print(f"AI analysis generation failed: {ai_error}")
+        return generate_professional_fallback_explanation(clinical_context)
+
+async def generate_comprehensive_ai_explanation_async(clinical_context):
+    """generate_comprehensive_ai_explanation for the ASGI app; awaits the LLM instead of blocking"""
+    try:
+        ai_generated_analysis = await async_llm.chat(**explanation_chat_request(clinical_context))
+        return finish_ai_explanation(ai_generated_analysis)
         
     except Exception as ai_error:
         print(f"AI analysis generation failed: {ai_error}")
@@ -308,7 +313,7 @@ def chatbot_chat():
             }), 400
         
         # Generate response using AI or fallback
-        if client:
+        if llm.is_available():
             response_text = generate_medical_chat_response(user_message, conversation_history)
             response_type = "info"
         else:
@@ -328,16 +333,75 @@ def chatbot_chat():
             "type": "error"
         })
 
-def generate_medical_chat_response(user_message, conversation_history):
+@chatbot_bp.route('/chat/stream', methods=['POST'])
+def chatbot_chat_stream():
     """
-    Generate medical chat response using Groq's Llama model
+    Streaming variant of /chat using Server-Sent Events
+    Relays the answer as it is generated instead of after the last token
+
+    Each event is `data: <json>` with a type of:
+    - "delta": the next piece of the answer in "content"
+    - "fallback": the complete answer in "content", replacing anything received
+      so far (sent when the AI service is unavailable or fails mid-answer)
+    - "done": end of the answer
     """
+    request_data = request.get_json(silent=True) or {}
+    user_message = request_data.get('message', '')
+    conversation_history = request_data.get('history', [])
+
+    if not user_message.strip():
+        return jsonify({
+            "response": "Please provide a question about medications or health.",
+            "type": "error"
+        }), 400
+
+    return Response(
+        stream_with_context(stream_medical_chat_events(user_message, conversation_history)),
+        mimetype='text/event-stream',
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Keep reverse proxies from buffering the stream
+        }
+    )
+
+def format_sse_event(payload):
+    return f"data: {json.dumps(payload)}\n\n"
+
+def stream_medical_chat_events(user_message, conversation_history):
+    """
+    Yield SSE events for a chat answer: deltas as they arrive from the model,
+    then the safety disclaimer if needed. Falls back to a single-chunk
+    rule-based answer when the upstream is unavailable or fails.
+    """
+    received = []
     try:
-        # Build conversation context
-        messages = [
-            {
-                "role": "system",
-                "content": """You are a knowledgeable medical AI assistant specializing in medication safety, drug interactions, and general health guidance. 
+        if not llm.is_available():
+            raise LLMUnavailableError("AI service unavailable or degraded")
+
+        deltas = llm.chat_stream(
+            messages=build_chat_messages(user_message, conversation_history),
+            **CHAT_COMPLETION_OPTIONS
+        )
+        for delta in deltas:
+            received.append(delta)
+            yield format_sse_event({"type": "delta", "content": delta})
+
+        if not received:
+            raise LLMUnavailableError("AI service returned an empty answer")
+
+        if needs_safety_disclaimer(''.join(received)):
+            yield format_sse_event({"type": "delta", "content": SAFETY_DISCLAIMER})
+
+    except Exception as stream_error:
+        print(f"Chat stream error: {stream_error}")
+        yield format_sse_event({
+            "type": "fallback",
+            "content": generate_fallback_chat_response(user_message)
+        })
+
+    yield format_sse_event({"type": "done"})
+
+CHAT_SYSTEM_PROMPT = """You are a knowledgeable medical AI assistant specializing in medication safety, drug interactions, and general health guidance. 
 
 IMPORTANT GUIDELINES:
 - Provide accurate, helpful information about medications and health
@@ -354,37 +418,73 @@ Do not:
 - Replace professional medical consultation
 
 Format your responses to be clear, informative, and include relevant safety reminders."""
-            }
-        ]
-        
-        # Add conversation history (last 10 messages for context)
-        for msg in conversation_history[-10:]:
-            messages.append({
-                "role": msg.get("role", "user"),
-                "content": msg.get("content", "")
-            })
-        
-        # Add current user message
+
+SAFETY_DISCLAIMER = "\n\n⚠️ **Important**: Always consult with your healthcare provider for personalized medical advice."
+
+# Same settings for the plain and streaming chat endpoints
+CHAT_COMPLETION_OPTIONS = {
+    "model": "llama-3.3-70b-versatile",  # Fast and capable model
+    "temperature": 0.7,
+    "max_tokens": 1000,
+    "top_p": 1
+}
+
+def build_chat_messages(user_message, conversation_history):
+    """System prompt, the last 10 history messages and the current user message"""
+    messages = [{"role": "system", "content": CHAT_SYSTEM_PROMPT}]
+    
+    # Add conversation history (last 10 messages for context)
+    for msg in conversation_history[-10:]:
         messages.append({
-            "role": "user", 
-            "content": user_message
+            "role": msg.get("role", "user"),
+            "content": msg.get("content", "")
         })
-        
+    
+    # Add current user message
+    messages.append({
+        "role": "user", 
+        "content": user_message
+    })
+    return messages
+
+def needs_safety_disclaimer(response_content):
+    """True when the answer does not already point the user to a professional"""
+    content = response_content.lower()
+    return "consult" not in content and "healthcare" not in content
+
+def generate_medical_chat_response(user_message, conversation_history):
+    """
+    Generate medical chat response using Groq's Llama model
+    """
+    try:
         # Generate response using Groq
-        chat_completion = client.chat.completions.create(
-            messages=messages,
-            model="llama-3.3-70b-versatile",  # Fast and capable model
-            temperature=0.7,
-            max_tokens=1000,
-            top_p=1,
-            stream=False
+        response_content = llm.chat(
+            messages=build_chat_messages(user_message, conversation_history),
+            stream=False,
+            **CHAT_COMPLETION_OPTIONS
         )
         
-        response_content = chat_completion.choices[0].message.content
-        
         # Add safety disclaimer if not already present
-        if "consult" not in response_content.lower() and "healthcare" not in response_content.lower():
-            response_content += "\n\n⚠️ **Important**: Always consult with your healthcare provider for personalized medical advice."
+        if needs_safety_disclaimer(response_content):
+            response_content += SAFETY_DISCLAIMER
+        
+        return response_content
+        
+    except Exception as ai_error:
+        print(f"Groq AI generation error: {ai_error}")
+        return generate_fallback_chat_response(user_message)
+
+async def generate_medical_chat_response_async(user_message, conversation_history):
+    """generate_medical_chat_response for the ASGI app; awaits the LLM instead of blocking"""
+    try:
+        response_content = await async_llm.chat(
+            messages=build_chat_messages(user_message, conversation_history),
+            stream=False,
+            **CHAT_COMPLETION_OPTIONS
+        )
+        
+        if needs_safety_disclaimer(response_content):
+            response_content += SAFETY_DISCLAIMER
         
         return response_content
         
@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 import re
 
+from services.drug_matcher import get_drug_matcher
+
 nlp_bp = Blueprint('nlp', __name__)
 
 @nlp_bp.route('/extract', methods=['POST'])
@@ -23,9 +25,18 @@ def extract_medicines_simple(text):
     """Simple medicine extraction that actually works"""
     medicines = []
     
+    # Common medicine names for pattern 2
+    common_medicines = ['aspirin', 'metformin', 'lisinopril', 'atorvastatin', 'metoprolol', 
+                      'hydroxyzine', 'lorazepam', 'tramadol', 'omeprazole', 'simvastatin']
+    
+    # Known drug names and brand aliases on each line, found in one pass
+    matcher = get_drug_matcher()
+    matcher.add_names(common_medicines)
+    line_mentions = matcher.find_names_by_line(text)
+    
     # Look for medicine patterns in each line
     lines = text.split('\n')
-    for line in lines:
+    for line, mentioned in zip(lines, line_mentions):
         line = line.strip()
         if not line or len(line) < 3:
             continue
@@ -40,11 +51,8 @@ def extract_medicines_simple(text):
                 medicines.append({"name": name.title(), "dose": dose})
         
         # Pattern 2: Just medicine names (common ones)
-        common_medicines = ['aspirin', 'metformin', 'lisinopril', 'atorvastatin', 'metoprolol', 
-                          'hydroxyzine', 'lorazepam', 'tramadol', 'omeprazole', 'simvastatin']
-        
         for med in common_medicines:
-            if med.lower() in line.lower():
+            if med in mentioned:
                 # Check if we already have this medicine
                 if not any(m['name'].lower() == med for m in medicines):
                     medicines.append({"name": med.title(), "dose": "As prescribed"})
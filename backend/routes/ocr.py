@@ -1,17 +1,18 @@
 from flask import Blueprint, request, jsonify
-import pytesseract
-from PIL import Image
-import io
-import os
-import tempfile
 import json
-from werkzeug.utils import secure_filename
 
 # Import our enhanced OCR service
 from services.ocr_service import extract_text_from_image, extract_text_from_base64
+from services.drug_matcher import get_drug_matcher
+from services.image_ingest import load_image
+from services.ocr_engine import get_ocr_engine, OCRBusyError
+from services.pdf_ingest import is_pdf, extract_pdf_text, PDFUnavailableError
 
 ocr_bp = Blueprint('ocr', __name__)
 
+# Shared Tesseract workers for scanned PDF pages (created here, on the main thread)
+ocr_engine = get_ocr_engine()
+
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf'}
 
@@ -47,48 +48,63 @@ def ocr_scan():
         print(f"Processing file: {file.filename}")
         print(f"Patient age: {patient_age}, Condition: {patient_condition}")
         
-        # Save file temporarily
-        filename = secure_filename(file.filename)
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as temp_file:
-            file.save(temp_file.name)
-            temp_path = temp_file.name
-        
-        try:
-            # Extract text using enhanced OCR
-            extracted_text = extract_text_from_image(temp_path)
-            print(f"OCR extracted text: {extracted_text[:200]}...")
-            
-            if not extracted_text.strip():
-                return jsonify({
-                    "error": "No text could be extracted from the image",
-                    "extracted_text": "",
-                    "medicines": [],
-                    "confidence": "Low"
-                }), 400
-            
-            # Simple medicine extraction (you can enhance this with AI)
-            medicines = extract_medicines_from_text(extracted_text)
-            
-            # Calculate confidence based on extracted medicines
-            confidence = "High" if len(medicines) > 0 else "Medium" if extracted_text.strip() else "Low"
+        if is_pdf(file):
+            # Embedded text where the PDF has it, OCR (pages in parallel) where it does not
+            extracted_text = extract_pdf_text(file, ocr_engine)['text']
+        else:
+            # Decode the upload in memory, straight from the request stream
+            try:
+                image = load_image(file)
+            except Exception as decode_error:
+                print(f"Could not decode upload as an image: {decode_error}")
+                image = None
             
-            result = {
-                "success": True,
-                "extracted_text": extracted_text,
-                "medicines": medicines,
-                "confidence": confidence,
-                "patient_age": patient_age,
-                "patient_condition": patient_condition,
-                "processing_method": "Enhanced OCR"
-            }
-            
-            print(f"OCR processing complete. Found {len(medicines)} medicines.")
-            return jsonify(result)
-            
-        finally:
-            # Clean up temp file
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
+            # Extract text using enhanced OCR
+            extracted_text = extract_text_from_image(image)
+        print(f"OCR extracted text: {extracted_text[:200]}...")
+        
+        if not extracted_text.strip():
+            return jsonify({
+                "error": "No text could be extracted from the image",
+                "extracted_text": "",
+                "medicines": [],
+                "confidence": "Low"
+            }), 400
+        
+        # Simple medicine extraction (you can enhance this with AI)
+        medicines = extract_medicines_from_text(extracted_text)
+        
+        # Calculate confidence based on extracted medicines
+        confidence = "High" if len(medicines) > 0 else "Medium" if extracted_text.strip() else "Low"
+        
+        result = {
+            "success": True,
+            "extracted_text": extracted_text,
+            "medicines": medicines,
+            "confidence": confidence,
+            "patient_age": patient_age,
+            "patient_condition": patient_condition,
+            "processing_method": "Enhanced OCR"
+        }
+        
+        print(f"OCR processing complete. Found {len(medicines)} medicines.")
+        return jsonify(result)
+        
+    except OCRBusyError as busy:
+        print("OCR queue full, rejecting scan")
+        return jsonify({
+            "error": "OCR service busy",
+            "retry_after": busy.retry_after
+        }), 429, {'Retry-After': str(busy.retry_after)}
+        
+    except PDFUnavailableError:
+        print("PDF upload rejected: pypdfium2 is not installed")
+        return jsonify({
+            "error": "PDF support not installed. Please upload PNG, JPG or JPEG files.",
+            "extracted_text": "",
+            "medicines": [],
+            "confidence": "Low"
+        }), 415
         
     except Exception as e:
         print(f"OCR scan error: {str(e)}")
@@ -120,14 +136,19 @@ def extract_medicines_from_text(text):
         'prednisone', 'furosemide', 'atorvastatin', 'losartan', 'gabapentin'
     ]
     
-    for line in lines:
+    # Known drug names and brand aliases on each line, found in one pass
+    matcher = get_drug_matcher()
+    matcher.add_names(common_medicines)
+    line_mentions = matcher.find_names_by_line(text)
+    
+    for line, mentioned in zip(lines, line_mentions):
         line_lower = line.lower().strip()
         if not line_lower:
             continue
             
         # Check if line contains medicine-related keywords
         has_medicine_keyword = any(keyword in line_lower for keyword in medicine_keywords)
-        has_medicine_name = any(med in line_lower for med in common_medicines)
+        has_medicine_name = any(med in mentioned for med in common_medicines)
         
         if has_medicine_keyword or has_medicine_name:
             # Try to extract medicine information
@@ -0,0 +1,163 @@
+import io
+import json
+import mimetypes
+import os
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from werkzeug.datastructures import FileStorage
+
+from services.image_ingest import MAX_UPLOAD_BYTES
+
+# Documents scanned at once across all batch requests; the rest wait in order
+BATCH_SCAN_WORKERS = int(os.getenv('BATCH_SCAN_WORKERS', 4))
+BATCH_MAX_DOCUMENTS = int(os.getenv('BATCH_MAX_DOCUMENTS', 500))
+# Total size of a batch's documents once zips are inflated, so a small zip can't expand without bound
+BATCH_MAX_UNCOMPRESSED_BYTES = int(os.getenv('BATCH_MAX_UNCOMPRESSED_BYTES', 256 * 1024 * 1024))
+
+ZIP_CONTENT_TYPES = {'application/zip', 'application/x-zip-compressed'}
+
+
+class BatchRequestError(ValueError):
+    """The batch cannot be accepted as sent (HTTP 400)"""
+
+
+class BatchTooLargeError(BatchRequestError):
+    """A document or the whole batch is over its size limit (HTTP 413)"""
+
+
+class ZipEntryDocument:
+    """
+    A file inside an uploaded zip, inflated only when a worker picks it up
+    (load_document), so a batch holds its zips compressed rather than every
+    entry's bytes at once
+    """
+
+    def __init__(self, archive_data, entry):
+        self.archive_data = archive_data
+        self.entry = entry
+        self.filename = entry.filename
+        self.content_type = mimetypes.guess_type(os.path.basename(entry.filename))[0] or 'application/octet-stream'
+        self.size = entry.file_size
+
+    def open(self):
+        with zipfile.ZipFile(io.BytesIO(self.archive_data)) as archive:
+            return FileStorage(stream=io.BytesIO(archive.read(self.entry)), filename=self.filename,
+                               content_type=self.content_type)
+
+
+def is_zip(upload):
+    if upload.content_type in ZIP_CONTENT_TYPES or (upload.filename or '').lower().endswith('.zip'):
+        return True
+    stream = upload.stream
+    position = stream.tell()
+    header = stream.read(4)
+    stream.seek(position)
+    return header == b'PK\x03\x04'
+
+
+def expand_zip(upload):
+    """ZipEntryDocuments for the files in a zip upload; nothing is inflated yet"""
+    documents = []
+    try:
+        upload.stream.seek(0)
+        archive_data = upload.stream.read()
+        with zipfile.ZipFile(io.BytesIO(archive_data)) as archive:
+            for entry in archive.infolist():
+                name = os.path.basename(entry.filename)
+                if entry.is_dir() or not name or name.startswith('.') or entry.filename.startswith('__MACOSX/'):
+                    continue
+                # Sizes come from the archive directory, and zipfile never inflates an entry past its size
+                if entry.file_size > MAX_UPLOAD_BYTES:
+                    raise BatchTooLargeError(f"{entry.filename} is larger than {MAX_UPLOAD_BYTES} bytes uncompressed")
+                if len(documents) >= BATCH_MAX_DOCUMENTS:
+                    raise BatchRequestError(f"Batches are limited to {BATCH_MAX_DOCUMENTS} documents")
+                documents.append(ZipEntryDocument(archive_data, entry))
+    except zipfile.BadZipFile as zip_error:
+        raise BatchRequestError(f"{upload.filename} is not a valid zip archive: {zip_error}")
+    return documents
+
+
+def detach(upload):
+    """
+    Copy of an upload that outlives the request: Flask closes request.files
+    when the view returns, while a streamed batch is still being scanned
+    """
+    upload.stream.seek(0)
+    data = upload.stream.read()
+    document = FileStorage(stream=io.BytesIO(data), filename=upload.filename, content_type=upload.content_type)
+    document.size = len(data)
+    return document
+
+
+def load_document(document):
+    """The FileStorage to scan for a collected document, inflating zip entries"""
+    return document.open() if isinstance(document, ZipEntryDocument) else document
+
+
+def collect_documents(uploads):
+    """
+    Documents of a batch request in upload order: plain files held in
+    memory, zip archives expanded into ZipEntryDocuments. Raises
+    BatchRequestError when there are none or more than BATCH_MAX_DOCUMENTS,
+    BatchTooLargeError when they add up to more than
+    BATCH_MAX_UNCOMPRESSED_BYTES.
+    """
+    documents = []
+    total_bytes = 0
+    for upload in uploads:
+        if not upload or not upload.filename:
+            continue
+        added = expand_zip(upload) if is_zip(upload) else [detach(upload)]
+        documents.extend(added)
+        total_bytes += sum(document.size for document in added)
+        if len(documents) > BATCH_MAX_DOCUMENTS:
+            raise BatchRequestError(f"Batches are limited to {BATCH_MAX_DOCUMENTS} documents")
+        if total_bytes > BATCH_MAX_UNCOMPRESSED_BYTES:
+            raise BatchTooLargeError(f"Batches are limited to {BATCH_MAX_UNCOMPRESSED_BYTES} bytes uncompressed")
+    if not documents:
+        raise BatchRequestError("No files provided in request")
+    return documents
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_batch_executor():
+    """Shared pool for batch documents, so concurrent batches share BATCH_SCAN_WORKERS"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=BATCH_SCAN_WORKERS, thread_name_prefix='batch-scan')
+    return _executor
+
+
+def run_batch(documents, scan_document, executor=None):
+    """
+    Scan documents on the batch pool and yield (index, result) as each one
+    finishes. Zip entries are inflated by the worker that scans them, so at
+    most one per worker is in memory. scan_document(document) gets a
+    FileStorage and returns a JSON-serializable dict;
+    an exception becomes {'success': False, 'error': ...}. Documents not
+    started yet are cancelled if the consumer stops early (client gone).
+    """
+    executor = executor or get_batch_executor()
+    futures = {executor.submit(lambda document: scan_document(load_document(document)), document): index
+               for index, document in enumerate(documents)}
+    try:
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as scan_error:
+                result = {"success": False, "error": str(scan_error)}
+            yield futures[future], result
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def format_ndjson_line(payload):
+    return json.dumps(payload) + "\n"
@@ -1,49 +1,25 @@
-import csv
-import os
-import difflib
 import re
 
-DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
-INTERACTIONS_FILE = os.path.join(DATA_DIR, 'drug_interactions.csv')
-WARNINGS_FILE = os.path.join(DATA_DIR, 'drug_warning.csv')
-
-# Load drug interactions into a list of dicts
-def load_interactions():
-    interactions = []
-    with open(INTERACTIONS_FILE, newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            interactions.append({
-                'drug1': row['drug1'].strip().lower(),
-                'drug2': row['drug2'].strip().lower(),
-                'severity': row.get('severity', ''),
-                'note': row.get('note', '')
-            })
-    return interactions
-
-# Load drug warnings into a dict: drug_name -> warning/note/age_group/severity
-def load_warnings():
-    warnings = {}
-    with open(WARNINGS_FILE, newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            drug = row['drug_name'].strip().lower()
-            warning_obj = {
-                'warning': row.get('warning', ''),
-                'note': row.get('note', ''),
-                'age_group': row.get('age_group', 'all'),
-                'severity': row.get('severity', '')
-            }
-            if drug not in warnings:
-                warnings[drug] = []
-            warnings[drug].append(warning_obj)
-    return warnings
-
-INTERACTIONS = load_interactions()
-WARNINGS = load_warnings()
-
-print("Loaded interactions:", INTERACTIONS[:3])  # Show first 3 for brevity
-print("Loaded warnings:", list(WARNINGS.items())[:3])  # Show first 3 for brevity
+from services.drug_knowledge_base import get_knowledge_base, add_reload_listener
+
+def build_interaction_index(knowledge_base):
+    """
+    Index interactions by normalized, unordered drug pair.
+    Each pair keeps only its highest-severity entry (first one wins on ties),
+    so checking a pair of medicines is a single dict lookup.
+    """
+    names = knowledge_base.drug_names
+    index = {}
+    for entry in knowledge_base.interactions:
+        key = pair_key(names[entry.drug1_id], names[entry.drug2_id])
+        current = index.get(key)
+        if not current or get_severity_rank(entry.severity) > get_severity_rank(current.severity):
+            index[key] = entry
+    return index
+
+def pair_key(drug1, drug2):
+    n1, n2 = normalize(drug1), normalize(drug2)
+    return (n1, n2) if n1 <= n2 else (n2, n1)
 
 SEVERITY_RANK = {'critical': 3, 'high': 2, 'moderate': 1, 'low': 0}
 
@@ -51,14 +27,33 @@ def get_severity_rank(severity):
     ranks = {"critical": 4, "high": 3, "medium": 2, "moderate": 2, "low": 1}
     return ranks.get(severity.lower(), 0)
 
+NON_ALPHA = re.compile(r'[^a-zA-Z]')
+
 def normalize(name):
-    return re.sub(r'[^a-zA-Z]', '', name).lower()
+    return NON_ALPHA.sub('', name).lower()
 
 def interaction_matches(med1, med2, csv1, csv2):
     n1, n2 = normalize(med1), normalize(med2)
     c1, c2 = normalize(csv1), normalize(csv2)
     return (n1 == c1 and n2 == c2) or (n1 == c2 and n2 == c1)
 
+KNOWLEDGE_BASE = get_knowledge_base()
+INTERACTION_INDEX = build_interaction_index(KNOWLEDGE_BASE)
+# Read together, so a check never mixes the index of one load with the names of another
+_tables = (KNOWLEDGE_BASE, INTERACTION_INDEX)
+
+print("Loaded drug knowledge base:", KNOWLEDGE_BASE.get_stats())
+print("Indexed interaction pairs:", len(INTERACTION_INDEX))
+
+def refresh_tables(knowledge_base):
+    """Re-index the interactions after the knowledge base was reloaded"""
+    global KNOWLEDGE_BASE, INTERACTION_INDEX, _tables
+    index = build_interaction_index(knowledge_base)
+    _tables = (knowledge_base, index)
+    KNOWLEDGE_BASE, INTERACTION_INDEX = _tables
+
+add_reload_listener(refresh_tables)
+
 def is_warning_relevant(warning_age_group, patient_age):
     if warning_age_group.lower() in ['all', '', 'any']:
         return True
@@ -80,44 +75,45 @@ def is_warning_relevant(warning_age_group, patient_age):
     return False
 
 def check_interactions_and_warnings(medicines, age=None):
+    knowledge_base, interaction_index = _tables
     print("Medicines received:", medicines, "Age:", age)
-    print("All warning keys:", list(WARNINGS.keys())[:10])  # show first 10 for brevity
+    print("All warning keys:", knowledge_base.drug_names[:10])  # show first 10 for brevity
 
     meds = [m.strip().lower() for m in medicines]
     found_interactions = {}
     found_warnings = []
 
-    # Check interactions (deduplicate and keep highest severity)
-    for i in range(len(meds)):
-        for j in range(i+1, len(meds)):
-            for entry in INTERACTIONS:
-                pair = tuple(sorted([entry['drug1'], entry['drug2']]))
-                if interaction_matches(meds[i], meds[j], entry['drug1'], entry['drug2']):
-                    current = found_interactions.get(pair)
-                    new_severity = get_severity_rank(entry['severity'])
-                    if not current or new_severity > get_severity_rank(current['severity']):
-                        found_interactions[pair] = {
-                            'drug1': entry['drug1'].title(),
-                            'drug2': entry['drug2'].title(),
-                            'severity': entry['severity'],
-                            'note': entry['note']
-                        }
+    # Check interactions (the index already holds the highest severity per pair)
+    normalized = [normalize(m) for m in meds]
+    for i in range(len(normalized)):
+        for j in range(i+1, len(normalized)):
+            n1, n2 = normalized[i], normalized[j]
+            pair = (n1, n2) if n1 <= n2 else (n2, n1)
+            if pair in found_interactions:
+                continue
+            entry = interaction_index.get(pair)
+            if entry:
+                found_interactions[pair] = {
+                    'drug1': knowledge_base.drug_names[entry.drug1_id].title(),
+                    'drug2': knowledge_base.drug_names[entry.drug2_id].title(),
+                    'severity': entry.severity,
+                    'note': entry.note
+                }
 
     # Check single-drug warnings (with age logic)
     for med in meds:
         best_warning = None
         best_severity = 0
-        for warning in WARNINGS.get(med, []):
-            warning_age_group = warning.get('age_group', 'all')
-            if is_warning_relevant(warning_age_group, age):
-                severity_rank = get_severity_rank(warning.get('severity', ''))
+        for warning in knowledge_base.warnings_for_drug(med):
+            if is_warning_relevant(warning.age_group, age):
+                severity_rank = get_severity_rank(warning.severity)
                 if severity_rank > best_severity:
                     best_severity = severity_rank
                     best_warning = {
                         'drug': med.title(),
-                        'warning': warning['warning'],
-                        'note': warning['note'],
-                        'severity': warning.get('severity', '')
+                        'warning': warning.warning,
+                        'note': warning.note,
+                        'severity': warning.severity
                     }
         if best_warning and best_severity >= 2:  # Only show medium or higher
             found_warnings.append(best_warning)
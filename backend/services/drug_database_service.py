@@ -1,47 +1,89 @@
-import pandas as pd
-import os
-from fuzzywuzzy import fuzz, process
-import json
+from services.drug_knowledge_base import get_knowledge_base, reload_knowledge_base
+from services.drug_name_resolver import DrugNameResolver
+from services.resolution_cache import ResolutionCache
+from services.lazy_resource import LazyResource
+
+def medication_name(med):
+    """Drug name from a medication string or dict"""
+    if isinstance(med, str):
+        return med
+    return med.get('name', '') or med.get('medication', '')
+
+class MedicationResolution:
+    """
+    A medication list resolved to database drug names once per request.
+    Pass it to the analysis methods in place of the raw list so they share
+    the fuzzy matching instead of each resolving every medication again.
+    """
+    def __init__(self, service, medications):
+        self.medications = list(medications)
+        self.matches = []  # matched drug names per medication, best first
+        resolved = {}
+        for med in self.medications:
+            drug_name = medication_name(med)
+            if drug_name not in resolved:
+                resolved[drug_name] = service.find_drug_matches(drug_name)
+            self.matches.append(resolved[drug_name])
+        self.lookups = len(resolved)
 
 class DrugDatabaseService:
     def __init__(self):
-        self.interactions_df = None
-        self.warnings_df = None
+        self.knowledge_base = None
+        self.interaction_rows = {}  # (drug1, drug2) as written in the CSV -> interaction row numbers
+        self.warning_rows = {}      # drug name -> warning row numbers
         self.drug_names = set()
-        self.load_databases()
+        self.name_resolver = None
+        self.match_cache = ResolutionCache()  # (name, threshold) -> matched drug names
+        self.load_databases(reload=False)
     
-    def load_databases(self):
-        """Load CSV databases"""
+    def load_databases(self, reload=True):
+        """
+        Load drug tables from the shared knowledge base. reload re-reads the
+        drug CSVs (or their snapshot) first, so edited tables take effect;
+        with reload=False the tables already loaded in this process are used.
+        """
         try:
-            # Load drug interactions
-            interactions_path = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'drug_interactions.csv')
-            if os.path.exists(interactions_path):
-                self.interactions_df = pd.read_csv(interactions_path)
-                print(f"✅ Loaded {len(self.interactions_df)} drug interactions")
-                
-                # Extract all drug names
-                drugs1 = set(self.interactions_df['drug1'].str.lower().str.strip())
-                drugs2 = set(self.interactions_df['drug2'].str.lower().str.strip())
-                self.drug_names.update(drugs1, drugs2)
+            knowledge_base = reload_knowledge_base() if reload else get_knowledge_base()
+            names = knowledge_base.drug_names
             
-            # Load drug warnings
-            warnings_path = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'drug_warning.csv')
-            if os.path.exists(warnings_path):
-                self.warnings_df = pd.read_csv(warnings_path)
-                print(f"✅ Loaded {len(self.warnings_df)} drug warnings")
-                
-                # Extract drug names from warnings
-                warning_drugs = set(self.warnings_df[' drug_name'].str.lower().str.strip())
-                self.drug_names.update(warning_drugs)
+            # Drug interactions, indexed by ordered drug pair
+            interaction_rows = {}
+            for row, record in enumerate(knowledge_base.interactions):
+                pair = (names[record.drug1_id], names[record.drug2_id])
+                interaction_rows.setdefault(pair, []).append(row)
+            print(f"✅ Loaded {len(knowledge_base.interactions)} drug interactions")
+            
+            # Drug warnings, indexed by drug
+            warning_rows = {}
+            for row, record in enumerate(knowledge_base.warnings):
+                warning_rows.setdefault(names[record.drug_id], []).append(row)
+            print(f"✅ Loaded {len(knowledge_base.warnings)} drug warnings")
+            
+            self.knowledge_base = knowledge_base
+            self.interaction_rows = {pair: tuple(rows) for pair, rows in interaction_rows.items()}
+            self.warning_rows = {drug: tuple(rows) for drug, rows in warning_rows.items()}
+            
+            # All drug names from both tables, already lowercased and stripped
+            self.drug_names = set(knowledge_base.drug_names)
+            self.name_resolver = DrugNameResolver(self.drug_names)
+            
+            # Cached name resolutions refer to the previous tables
+            self.match_cache.clear()
                 
             print(f"✅ Total unique drugs in database: {len(self.drug_names)}")
             
         except Exception as e:
             print(f"❌ Failed to load drug databases: {e}")
     
+    def resolve_medications(self, medications):
+        """Resolve a medication list once; an existing resolution is reused as is"""
+        if isinstance(medications, MedicationResolution):
+            return medications
+        return MedicationResolution(self, medications)
+    
     def find_drug_matches(self, drug_name, threshold=80):
         """Find matching drugs using fuzzy matching"""
-        if not self.drug_names:
+        if not self.drug_names or self.name_resolver is None:
             return []
             
         drug_name_clean = drug_name.lower().strip()
@@ -50,52 +92,41 @@ class DrugDatabaseService:
         if drug_name_clean in self.drug_names:
             return [drug_name_clean]
         
-        # Fuzzy matching
-        matches = process.extractBests(drug_name_clean, self.drug_names, 
-                                     scorer=fuzz.ratio, score_cutoff=threshold, limit=3)
-        
-        return [match[0] for match in matches]
+        # Fuzzy matching, cached since OCR repeats the same misspellings
+        matches = self.match_cache.get_or_compute(
+            (drug_name_clean, threshold),
+            lambda: tuple(self.name_resolver.match(drug_name_clean, threshold=threshold, limit=3)))
+        return list(matches)
+    
+    def get_cache_stats(self):
+        """Hit, miss and eviction counts of the fuzzy match cache"""
+        return self.match_cache.get_stats()
     
     def check_drug_interactions(self, medications):
         """Check for drug interactions using CSV data"""
-        if self.interactions_df is None:
+        if self.knowledge_base is None:
             return []
         
         interactions = []
-        drug_list = []
-        
-        # Normalize medication names
-        for med in medications:
-            if isinstance(med, str):
-                drug_name = med
-            else:
-                drug_name = med.get('name', '') or med.get('medication', '')
-            
-            matches = self.find_drug_matches(drug_name)
-            if matches:
-                drug_list.append(matches[0])  # Use best match
+        
+        # Use the best match of each resolved medication
+        resolution = self.resolve_medications(medications)
+        drug_list = [matches[0] for matches in resolution.matches if matches]
         
         # Check all pairs for interactions
         for i, drug1 in enumerate(drug_list):
             for j, drug2 in enumerate(drug_list[i+1:], i+1):
                 # Check both directions
-                interaction1 = self.interactions_df[
-                    (self.interactions_df['drug1'].str.lower() == drug1) &
-                    (self.interactions_df['drug2'].str.lower() == drug2)
-                ]
+                rows = self.interaction_rows.get((drug1, drug2), ()) + self.interaction_rows.get((drug2, drug1), ())
                 
-                interaction2 = self.interactions_df[
-                    (self.interactions_df['drug1'].str.lower() == drug2) &
-                    (self.interactions_df['drug2'].str.lower() == drug1)
-                ]
-                
-                for _, row in pd.concat([interaction1, interaction2]).iterrows():
+                for row in rows:
+                    record = self.knowledge_base.interactions[row]
                     interactions.append({
                         'drugs': [drug1.title(), drug2.title()],
-                        'severity': row['severity'],
-                        'mechanism': row['note'],
+                        'severity': record.severity,
+                        'mechanism': record.note,
                         'clinical_effects': f"Interaction between {drug1.title()} and {drug2.title()}",
-                        'recommendation': row['note'],
+                        'recommendation': record.note,
                         'monitoring': f"Monitor patient closely when using {drug1.title()} and {drug2.title()} together"
                     })
         
@@ -103,35 +134,25 @@ class DrugDatabaseService:
     
     def check_age_warnings(self, medications, patient_age):
         """Check for age-specific warnings using CSV data"""
-        if self.warnings_df is None:
+        if self.knowledge_base is None:
             return []
         
         warnings = []
         
-        for med in medications:
-            if isinstance(med, str):
-                drug_name = med
-            else:
-                drug_name = med.get('name', '') or med.get('medication', '')
-            
-            matches = self.find_drug_matches(drug_name)
-            
+        for matches in self.resolve_medications(medications).matches:
             for matched_drug in matches:
                 # Find warnings for this drug
-                drug_warnings = self.warnings_df[
-                    self.warnings_df[' drug_name'].str.lower().str.strip() == matched_drug
-                ]
-                
-                for _, row in drug_warnings.iterrows():
-                    age_group = row['age_group']
+                for row in self.warning_rows.get(matched_drug, ()):
+                    record = self.knowledge_base.warnings[row]
+                    age_group = record.age_group
                     is_applicable = self._check_age_applicability(age_group, patient_age)
                     
                     if is_applicable:
                         warnings.append({
                             'medication': matched_drug.title(),
-                            'warning': row['warning'],
-                            'severity': row['severity'],
-                            'recommendation': f"Consider alternative: {row['alternative']}. {row['note']}",
+                            'warning': record.warning,
+                            'severity': record.severity,
+                            'recommendation': f"Consider alternative: {record.alternative}. {record.note}",
                             'age_group': age_group
                         })
         
@@ -161,42 +182,35 @@ class DrugDatabaseService:
         """Find contraindications based on high severity warnings"""
         contraindications = []
         
-        if self.warnings_df is None:
+        if self.knowledge_base is None:
             return contraindications
         
-        for med in medications:
-            if isinstance(med, str):
-                drug_name = med
-            else:
-                drug_name = med.get('name', '') or med.get('medication', '')
-            
-            matches = self.find_drug_matches(drug_name)
-            
+        for matches in self.resolve_medications(medications).matches:
             for matched_drug in matches:
                 # Find high/critical severity warnings
-                critical_warnings = self.warnings_df[
-                    (self.warnings_df[' drug_name'].str.lower().str.strip() == matched_drug) &
-                    (self.warnings_df['severity'].isin(['High', 'Critical']))
-                ]
-                
-                for _, row in critical_warnings.iterrows():
+                for row in self.warning_rows.get(matched_drug, ()):
+                    record = self.knowledge_base.warnings[row]
+                    if record.severity not in ('High', 'Critical'):
+                        continue
+                    
                     contraindications.append({
                         'medication': matched_drug.title(),
-                        'contraindication': row['warning'],
-                        'reason': row['note'],
-                        'severity': row['severity']
+                        'contraindication': record.warning,
+                        'reason': record.note,
+                        'severity': record.severity
                     })
         
         return contraindications
     
-    def find_harmful_combinations(self, medications):
+    def find_harmful_combinations(self, medications, interactions=None):
         """Find harmful drug combinations from high severity interactions"""
         harmful = []
         
-        if self.interactions_df is None:
+        if self.knowledge_base is None:
             return harmful
         
-        interactions = self.check_drug_interactions(medications)
+        if interactions is None:
+            interactions = self.check_drug_interactions(medications)
         
         for interaction in interactions:
             if interaction['severity'].lower() in ['high', 'severe']:
@@ -207,6 +221,38 @@ class DrugDatabaseService:
                 })
         
         return harmful
+    
+    def generate_safety_report(self, medications, patient_age, interactions=None, age_warnings=None,
+                               contraindications=None, harmful_combinations=None):
+        """
+        Run all four safety checks on one resolution of the medication list.
+        Checks already run (e.g. as parallel /scan/image stages) can be
+        passed in and are not repeated.
+        """
+        resolution = self.resolve_medications(medications)
+        if interactions is None:
+            interactions = self.check_drug_interactions(resolution)
+        
+        return {
+            'interactions': interactions,
+            'age_warnings': age_warnings if age_warnings is not None else self.check_age_warnings(resolution, patient_age),
+            'contraindications': contraindications if contraindications is not None else self.find_contraindications(resolution),
+            'harmful_combinations': (harmful_combinations if harmful_combinations is not None
+                                     else self.find_harmful_combinations(resolution, interactions)),
+            'resolved_medications': [{
+                'medication': medication_name(med),
+                'matches': matches
+            } for med, matches in zip(resolution.medications, resolution.matches)]
+        }
+
+# Shared instance, built on first use (or in warm_up()) rather than at import
+_service = LazyResource('drug_db_service', DrugDatabaseService)
+
+def get_drug_db_service():
+    return _service.get()
 
-# Global instance
-drug_db_service = DrugDatabaseService()
+def __getattr__(name):
+    # `from services.drug_database_service import drug_db_service` keeps working
+    if name == 'drug_db_service':
+        return get_drug_db_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,336 @@
+import array
+import bisect
+import csv
+import hashlib
+import os
+import sys
+import threading
+from collections import namedtuple
+
+from services import drug_snapshot
+
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
+INTERACTIONS_FILE = os.path.join(DATA_DIR, 'drug_interactions.csv')
+WARNINGS_FILE = os.path.join(DATA_DIR, 'drug_warning.csv')
+SNAPSHOT_FILE = os.path.join(DATA_DIR, 'drug_tables.snapshot')
+
+INTERACTION_COLUMNS = ('drug1', 'drug2', 'severity', 'note')
+WARNING_COLUMNS = ('drug_name', 'age_group', 'warning', 'severity', 'alternative', 'note')
+
+# Drug names are stored once as integer IDs; records only carry the IDs
+InteractionRecord = namedtuple('InteractionRecord', ['drug1_id', 'drug2_id', 'severity', 'note'])
+WarningRecord = namedtuple('WarningRecord', ['drug_id', 'age_group', 'warning', 'severity', 'alternative', 'note'])
+
+
+def source_checksum(*paths):
+    """SHA-256 over the source CSVs, used to detect stale snapshots"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as source:
+            digest.update(source.read())
+    return digest.digest()
+
+
+def read_table(path, required_columns):
+    """Read a CSV table, normalizing header and cell whitespace"""
+    with open(path, newline='', encoding='utf-8') as csvfile:
+        reader = csv.DictReader(csvfile)
+        # drug_warning.csv ships with a leading space in " drug_name"
+        reader.fieldnames = [name.strip() for name in (reader.fieldnames or [])]
+        missing = [column for column in required_columns if column not in reader.fieldnames]
+        if missing:
+            raise ValueError(f"{os.path.basename(path)} is missing columns: {', '.join(missing)}")
+
+        for row in reader:
+            yield {column: (row.get(column) or '').strip() for column in required_columns}
+
+
+def compile_tables(interactions_path=INTERACTIONS_FILE, warnings_path=WARNINGS_FILE):
+    """
+    Parse and validate both CSVs into the compact columnar layout shared with
+    the binary snapshot: a string table plus flat integer arrays.
+    """
+    strings = []
+    string_ids = {}
+    drug_ids = {}
+    drugs = array.array('I')
+
+    def string_id(value):
+        sid = string_ids.get(value)
+        if sid is None:
+            sid = string_ids[value] = len(strings)
+            strings.append(value)
+        return sid
+
+    def drug_id(name):
+        key = name.lower()
+        did = drug_ids.get(key)
+        if did is None:
+            did = drug_ids[key] = len(drugs) // 2
+            drugs.extend((string_id(key), string_id(name)))
+        return did
+
+    skipped_rows = 0
+
+    interactions = array.array('I')
+    pair_entries = []
+    for row in read_table(interactions_path, INTERACTION_COLUMNS):
+        if not row['drug1'] or not row['drug2']:
+            skipped_rows += 1
+            continue
+        id1, id2 = drug_id(row['drug1']), drug_id(row['drug2'])
+        pair_entries.append((pair_key(id1, id2), len(interactions) // 4))
+        interactions.extend((id1, id2, string_id(row['severity']), string_id(row['note'])))
+
+    warnings = array.array('I')
+    warning_entries = []
+    for row in read_table(warnings_path, WARNING_COLUMNS):
+        if not row['drug_name']:
+            skipped_rows += 1
+            continue
+        did = drug_id(row['drug_name'])
+        warning_entries.append((did, len(warnings) // 6))
+        warnings.extend((did, string_id(row['age_group']), string_id(row['warning']),
+                         string_id(row['severity']), string_id(row['alternative']), string_id(row['note'])))
+
+    # Sorting (key, row) keeps rows for the same key in CSV order
+    pair_entries.sort()
+    warning_entries.sort()
+
+    return {
+        'strings': strings,
+        'drugs': drugs,
+        'interactions': interactions,
+        'pair_keys': array.array('Q', [key for key, _ in pair_entries]),
+        'pair_rows': array.array('I', [row for _, row in pair_entries]),
+        'warnings': warnings,
+        'warning_keys': array.array('I', [key for key, _ in warning_entries]),
+        'warning_rows': array.array('I', [row for _, row in warning_entries]),
+        'skipped_rows': skipped_rows
+    }
+
+
+def pair_key(id1, id2):
+    """Single sortable integer for an unordered pair of drug IDs"""
+    return (id1 << 32 | id2) if id1 <= id2 else (id2 << 32 | id1)
+
+
+class RecordTable:
+    """Read-only sequence that decodes fixed-width integer rows into records on access"""
+
+    def __init__(self, values, width, decode):
+        self.values = values
+        self.width = width
+        self.decode = decode
+
+    def __len__(self):
+        return len(self.values) // self.width
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('record index out of range')
+        start = index * self.width
+        return self.decode(self.values[start:start + self.width])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+class DrugKnowledgeBase:
+    """
+    Single in-memory copy of the drug interaction and warning tables.
+    Loads and validates both CSVs once, interns drug names to integer IDs
+    and exposes pair, warning and name indexes for every service to share.
+
+    Tables come from the memory-mapped binary snapshot when it matches the
+    CSVs, otherwise they are compiled from the CSVs into the same layout.
+    """
+
+    def __init__(self, interactions_path=INTERACTIONS_FILE, warnings_path=WARNINGS_FILE,
+                 snapshot_path=SNAPSHOT_FILE):
+        self.interactions_path = interactions_path
+        self.warnings_path = warnings_path
+        self.snapshot_path = snapshot_path
+
+        self.source = None         # 'snapshot' or 'csv'
+        self.strings = []          # string table shared by all records
+        self.drug_names = []       # id -> lowercase name
+        self.display_names = []    # id -> name as written in the CSV
+        self.drug_ids = {}         # lowercase name -> id
+        self.interactions = ()     # InteractionRecord rows in CSV order
+        self.warnings = ()         # WarningRecord rows in CSV order
+        self.skipped_rows = 0
+        self._tables = {}
+
+        self.load()
+
+    def load(self):
+        """Load both tables and build the indexes"""
+        tables = None
+        if self.snapshot_path:
+            checksum = source_checksum(self.interactions_path, self.warnings_path)
+            tables = drug_snapshot.read_snapshot(self.snapshot_path, checksum)
+
+        if tables is not None:
+            self.source = 'snapshot'
+        else:
+            tables = compile_tables(self.interactions_path, self.warnings_path)
+            self.source = 'csv'
+
+        self._attach(tables)
+
+        print(f"✅ Drug knowledge base ({self.source}): {len(self.interactions)} interactions, "
+              f"{len(self.warnings)} warnings, {len(self.drug_names)} unique drugs")
+        if self.skipped_rows:
+            print(f"⚠️ Skipped {self.skipped_rows} rows with missing drug names")
+
+    def _attach(self, tables):
+        self._tables = tables
+        self.strings = strings = tables['strings']
+        self.skipped_rows = tables.get('skipped_rows', 0)
+
+        drugs = tables['drugs']
+        self.drug_names = [strings[drugs[i]] for i in range(0, len(drugs), 2)]
+        self.display_names = [strings[drugs[i + 1]] for i in range(0, len(drugs), 2)]
+        self.drug_ids = {name: drug_id for drug_id, name in enumerate(self.drug_names)}
+
+        self.interactions = RecordTable(tables['interactions'], 4, lambda row: InteractionRecord(
+            row[0], row[1], strings[row[2]], strings[row[3]]))
+        self.warnings = RecordTable(tables['warnings'], 6, lambda row: WarningRecord(
+            row[0], strings[row[1]], strings[row[2]], strings[row[3]], strings[row[4]], strings[row[5]]))
+
+    @staticmethod
+    def _matching_rows(keys, rows, key):
+        """Row numbers for key in a sorted key array"""
+        start = bisect.bisect_left(keys, key)
+        end = start
+        while end < len(keys) and keys[end] == key:
+            end += 1
+        return [rows[i] for i in range(start, end)]
+
+    def drug_id(self, name):
+        """Look up the ID of a known drug, or None"""
+        if not name:
+            return None
+        return self.drug_ids.get(name.strip().lower())
+
+    def pair_records(self, id1, id2):
+        """All interaction records for an unordered pair of drug IDs"""
+        rows = self._matching_rows(self._tables['pair_keys'], self._tables['pair_rows'], pair_key(id1, id2))
+        return tuple(self.interactions[row] for row in rows)
+
+    def warning_records(self, drug_id):
+        """All warning records for a drug ID"""
+        rows = self._matching_rows(self._tables['warning_keys'], self._tables['warning_rows'], drug_id)
+        return tuple(self.warnings[row] for row in rows)
+
+    def interactions_for_pair(self, drug1, drug2):
+        """All interaction records for an unordered pair of drug names"""
+        id1, id2 = self.drug_id(drug1), self.drug_id(drug2)
+        if id1 is None or id2 is None:
+            return ()
+        return self.pair_records(id1, id2)
+
+    def warnings_for_drug(self, drug):
+        """All warning records for a drug name"""
+        drug_id = self.drug_id(drug)
+        if drug_id is None:
+            return ()
+        return self.warning_records(drug_id)
+
+    def interaction_rows(self):
+        """Interaction table as a list of dicts with the original CSV columns"""
+        names = self.display_names
+        return [{
+            'drug1': names[record.drug1_id],
+            'drug2': names[record.drug2_id],
+            'severity': record.severity,
+            'note': record.note
+        } for record in self.interactions]
+
+    def warning_rows(self):
+        """Warning table as a list of dicts with the original CSV columns"""
+        names = self.display_names
+        return [{
+            'drug_name': names[record.drug_id],
+            'age_group': record.age_group,
+            'warning': record.warning,
+            'severity': record.severity,
+            'alternative': record.alternative,
+            'note': record.note
+        } for record in self.warnings]
+
+    def get_stats(self):
+        pair_keys = self._tables['pair_keys']
+        warning_keys = self._tables['warning_keys']
+        return {
+            'source': self.source,
+            'interactions': len(self.interactions),
+            'warnings': len(self.warnings),
+            'unique_drugs': len(self.drug_names),
+            'interaction_pairs': len(set(pair_keys)),
+            'drugs_with_warnings': len(set(warning_keys)),
+            'skipped_rows': self.skipped_rows
+        }
+
+
+def build_snapshot(snapshot_path=SNAPSHOT_FILE, interactions_path=INTERACTIONS_FILE, warnings_path=WARNINGS_FILE):
+    """Compile the CSVs into the binary snapshot loaded by DrugKnowledgeBase"""
+    tables = compile_tables(interactions_path, warnings_path)
+    checksum = source_checksum(interactions_path, warnings_path)
+    drug_snapshot.write_snapshot(snapshot_path, tables, checksum)
+    print(f"✅ Wrote drug snapshot {snapshot_path} ({os.path.getsize(snapshot_path)} bytes, "
+          f"{len(tables['drugs']) // 2} drugs, {len(tables['interactions']) // 4} interactions, "
+          f"{len(tables['warnings']) // 6} warnings)")
+    return snapshot_path
+
+
+_knowledge_base = None
+_knowledge_base_lock = threading.Lock()
+_reload_listeners = []
+
+
+def get_knowledge_base():
+    """Shared per-process DrugKnowledgeBase, loaded on first use"""
+    global _knowledge_base
+    if _knowledge_base is None:
+        with _knowledge_base_lock:
+            if _knowledge_base is None:
+                _knowledge_base = DrugKnowledgeBase()
+    return _knowledge_base
+
+
+def add_reload_listener(callback):
+    """Call callback(knowledge_base) whenever reload_knowledge_base swaps in new tables"""
+    _reload_listeners.append(callback)
+
+
+def reload_knowledge_base():
+    """
+    Re-read the drug tables (the snapshot if it still matches the CSVs,
+    otherwise the CSVs) into a new DrugKnowledgeBase and make it the shared
+    one. Callers already holding the previous instance keep a consistent
+    view of the old tables; listeners rebuild what they derived from them.
+    """
+    global _knowledge_base
+    with _knowledge_base_lock:
+        previous = _knowledge_base
+        if previous is None:
+            knowledge_base = DrugKnowledgeBase()
+        else:
+            knowledge_base = DrugKnowledgeBase(previous.interactions_path, previous.warnings_path,
+                                               previous.snapshot_path)
+        _knowledge_base = knowledge_base
+    for callback in list(_reload_listeners):
+        callback(knowledge_base)
+    return knowledge_base
+
+
+if __name__ == '__main__':
+    # Build step: cd backend && python -m services.drug_knowledge_base [snapshot_path]
+    build_snapshot(sys.argv[1] if len(sys.argv) > 1 else SNAPSHOT_FILE)
@@ -0,0 +1,177 @@
+import json
+import os
+import threading
+from collections import deque, namedtuple
+
+from services.drug_knowledge_base import get_knowledge_base, add_reload_listener
+
+MEDICINES_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'ml_models', 'data', 'medicines.json'))
+
+# name: canonical lowercase drug name, pattern: the lowercase text that matched,
+# start/end: offsets into the original text
+DrugMention = namedtuple('DrugMention', ['name', 'pattern', 'start', 'end'])
+
+
+class DrugNameMatcher:
+    """
+    Aho–Corasick automaton over drug names and aliases. Finds every
+    (possibly overlapping) mention in one pass over the text, case-insensitively.
+
+    Plain names match anywhere, like `name in text.lower()`. Patterns added
+    with whole_word=True (brand aliases such as "ASA") only match between
+    non-alphanumeric characters.
+    """
+
+    def __init__(self):
+        self._patterns = {}  # pattern -> (canonical name, whole_word)
+        self._automaton = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._patterns)
+
+    def add_names(self, names, canonical=None, whole_word=False):
+        """
+        Add patterns, each mapping to itself or to canonical. A pattern that
+        is already known keeps its first canonical name.
+        """
+        with self._lock:
+            for name in names:
+                pattern = (name or '').strip().lower()
+                if pattern and pattern not in self._patterns:
+                    target = canonical.strip().lower() if canonical else pattern
+                    self._patterns[pattern] = (target, whole_word)
+                    self._automaton = None
+
+    def add_aliases(self, aliases):
+        """Add brand/alternate names from a {alias: canonical name} mapping"""
+        for alias, name in aliases.items():
+            self.add_names([alias], canonical=name, whole_word=True)
+
+    def _build(self):
+        """goto/fail/output tables; output lists already include fail-link outputs"""
+        patterns = list(self._patterns)
+        goto = [{}]
+        outputs = [[]]
+        for index, pattern in enumerate(patterns):
+            state = 0
+            for char in pattern:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = goto[state][char] = len(goto)
+                    goto.append({})
+                    outputs.append([])
+                state = next_state
+            outputs[state].append(index)
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(char, 0)
+                outputs[next_state] = outputs[next_state] + outputs[fail[next_state]]
+
+        entries = [(pattern, len(pattern)) + self._patterns[pattern] for pattern in patterns]
+        return goto, fail, outputs, entries
+
+    def _get_automaton(self):
+        with self._lock:
+            if self._automaton is None:
+                self._automaton = self._build()
+            return self._automaton
+
+    def find_all(self, text):
+        """Every drug mention in text, ordered by start offset then longest first"""
+        if not text:
+            return []
+        goto, fail, outputs, entries = self._get_automaton()
+
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # A few characters expand when lowercased; keep offsets aligned
+            lowered = ''.join(char.lower() if len(char.lower()) == 1 else char for char in text)
+
+        mentions = []
+        state = 0
+        for position, char in enumerate(lowered):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in outputs[state]:
+                pattern, length, name, whole_word = entries[index]
+                start = position - length + 1
+                if whole_word and ((start > 0 and lowered[start - 1].isalnum()) or
+                                   (position + 1 < len(lowered) and lowered[position + 1].isalnum())):
+                    continue
+                mentions.append(DrugMention(name, pattern, start, position + 1))
+
+        mentions.sort(key=lambda mention: (mention.start, -mention.end))
+        return mentions
+
+    def find_names(self, text):
+        """Canonical names of all drugs mentioned in text"""
+        return {mention.name for mention in self.find_all(text)}
+
+    def find_names_by_line(self, text):
+        """Canonical names mentioned on each line of text.split('\\n')"""
+        lines = text.split('\n')
+        line_names = [set() for _ in lines]
+        line = 0
+        line_end = len(lines[0])
+        for mention in self.find_all(text):
+            while mention.start > line_end:
+                line += 1
+                line_end += len(lines[line]) + 1
+            line_names[line].add(mention.name)
+        return line_names
+
+
+def load_medicines(path=MEDICINES_FILE):
+    """Curated medicines with their brand and alternate names"""
+    if not os.path.exists(path):
+        print(f"⚠️ Medicine aliases not found: {path}")
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def build_drug_matcher(knowledge_base=None, medicines_path=MEDICINES_FILE):
+    """Matcher over every knowledge base drug plus the curated medicines and their aliases"""
+    knowledge_base = knowledge_base or get_knowledge_base()
+    medicines = load_medicines(medicines_path)
+    matcher = DrugNameMatcher()
+    matcher.add_names(knowledge_base.drug_names)
+    matcher.add_names(medicine['name'] for medicine in medicines)
+    for medicine in medicines:
+        matcher.add_aliases({alias: medicine['name'] for alias in medicine.get('aliases', [])})
+    print(f"✅ Drug name matcher: {len(matcher)} names and aliases")
+    return matcher
+
+
+_drug_matcher = None
+_drug_matcher_lock = threading.Lock()
+
+
+def get_drug_matcher():
+    """Shared per-process DrugNameMatcher, built on first use"""
+    global _drug_matcher
+    if _drug_matcher is None:
+        with _drug_matcher_lock:
+            if _drug_matcher is None:
+                _drug_matcher = build_drug_matcher()
+    return _drug_matcher
+
+
+def reset_drug_matcher(knowledge_base=None):
+    """Drop the shared matcher so the next get_drug_matcher() builds it from the reloaded tables"""
+    global _drug_matcher
+    with _drug_matcher_lock:
+        _drug_matcher = None
+
+
+add_reload_listener(reset_drug_matcher)
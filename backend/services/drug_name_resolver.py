@@ -0,0 +1,103 @@
+import math
+from collections import Counter
+
+from fuzzywuzzy import fuzz, utils
+
+
+def character_tokens(text):
+    """Characters counted with multiplicity: 'anna' -> {('a', 1), ('n', 1), ('n', 2), ('a', 2)}"""
+    seen = Counter()
+    tokens = set()
+    for char in text:
+        seen[char] += 1
+        tokens.add((char, seen[char]))
+    return tokens
+
+
+class DrugNameResolver:
+    """
+    Fuzzy drug-name lookup with the same results as
+    process.extractBests(name, names, scorer=fuzz.ratio, score_cutoff=threshold, limit=limit)
+    but without scoring every name.
+
+    fuzz.ratio is 2*M / (len(a) + len(b)) where M counts matched characters,
+    so M can never exceed the characters the two strings share (counted with
+    multiplicity). Names are indexed by those character tokens. A query only
+    probes the posting lists of its rarest tokens (prefix filtering), then
+    drops candidates whose length or shared-token count cannot reach the
+    threshold. Survivors are scored with fuzz.ratio itself, so scores are
+    identical to a full scan.
+    """
+
+    def __init__(self, names, threshold=80, limit=3):
+        self.threshold = threshold
+        self.limit = limit
+
+        # Choices are compared after fuzzywuzzy's default processing
+        choices = {}
+        for name in names:
+            choices.setdefault(utils.full_process(name), []).append(name)
+
+        self.processed = list(choices)               # entry id -> processed name
+        self.originals = [choices[p] for p in self.processed]
+        self.tokens = [character_tokens(p) for p in self.processed]
+        self.postings = {}                            # token -> entry ids
+        for entry_id, tokens in enumerate(self.tokens):
+            for token in tokens:
+                self.postings.setdefault(token, []).append(entry_id)
+
+    def __len__(self):
+        return sum(len(names) for names in self.originals)
+
+    def resolve(self, name, threshold=None, limit=None):
+        """Best (name, score) matches scoring at least threshold, highest score first"""
+        threshold = self.threshold if threshold is None else threshold
+        limit = self.limit if limit is None else limit
+
+        query = utils.full_process(name or '')
+        if not query or limit <= 0:
+            return []
+
+        results = []
+        for entry_id in self._candidates(query, threshold):
+            score = fuzz.ratio(query, self.processed[entry_id])
+            if score >= threshold:
+                results.extend((original, score) for original in self.originals[entry_id])
+
+        results.sort(key=lambda match: (-match[1], match[0]))
+        return results[:limit]
+
+    def match(self, name, threshold=None, limit=None):
+        """Names only, best first"""
+        return [match for match, _ in self.resolve(name, threshold, limit)]
+
+    def _candidates(self, query, threshold):
+        """Entry ids that could reach threshold; never drops a real match"""
+        # intr(100 * r) >= threshold needs r >= (threshold - 0.5) / 100
+        min_ratio = (threshold - 0.5) / 100 - 1e-9
+        if min_ratio <= 0:
+            return range(len(self.processed))
+
+        query_length = len(query)
+        min_length = math.ceil(query_length * min_ratio / (2 - min_ratio))
+        max_length = math.floor(query_length * (2 - min_ratio) / min_ratio)
+
+        # Shared tokens needed by the shortest allowed candidate; any candidate
+        # sharing that many must contain one of the query's rarest tokens
+        min_overlap = math.ceil(min_ratio * (query_length + min_length) / 2)
+        query_tokens = sorted(character_tokens(query), key=lambda token: len(self.postings.get(token, ())))
+        prefix = query_tokens[:max(query_length - min_overlap + 1, 0)]
+
+        candidates = set()
+        for token in prefix:
+            candidates.update(self.postings.get(token, ()))
+
+        query_token_set = set(query_tokens)
+        for entry_id in candidates:
+            length = len(self.processed[entry_id])
+            if length < min_length or length > max_length:
+                continue
+            shared = len(query_token_set & self.tokens[entry_id])
+            if 2 * shared < min_ratio * (query_length + length):
+                continue
+            yield entry_id
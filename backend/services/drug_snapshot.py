@@ -0,0 +1,141 @@
+import array
+import hashlib
+import mmap
+import os
+import struct
+import sys
+
+# Binary snapshot of the compiled drug tables.
+#
+# Layout: header, section table, then each section aligned to 8 bytes.
+# Sections are flat little-endian integer arrays, so a reader can mmap the
+# file and use the arrays in place; forked workers share the same pages.
+# The header carries a SHA-256 of everything after it, so a damaged file is
+# rejected rather than served.
+
+SNAPSHOT_MAGIC = b'DSKB'
+SNAPSHOT_VERSION = 2
+
+# (section name, array typecode)
+SECTIONS = (
+    ('string_offsets', 'I'),  # n_strings + 1 byte offsets into string_data
+    ('string_data', 'B'),     # UTF-8 strings, concatenated
+    ('drugs', 'I'),           # name_sid, display_sid per drug id
+    ('interactions', 'I'),    # drug1_id, drug2_id, severity_sid, note_sid per row
+    ('pair_keys', 'Q'),       # sorted (low_id << 32 | high_id)
+    ('pair_rows', 'I'),       # interaction row for each pair key
+    ('warnings', 'I'),        # drug_id, age_group_sid, warning_sid, severity_sid, alternative_sid, note_sid per row
+    ('warning_keys', 'I'),    # sorted drug_id
+    ('warning_rows', 'I'),    # warning row for each warning key
+)
+
+HEADER = struct.Struct('<4sIII32s32s')  # magic, version, section count, skipped rows, source checksum, body checksum
+SECTION_ENTRY = struct.Struct('<QQ')  # byte offset, byte length
+ALIGNMENT = 8
+
+
+def _native_layout_supported():
+    """Sections are written and mapped as native arrays; require the layout they assume"""
+    return (sys.byteorder == 'little'
+            and array.array('I').itemsize == 4
+            and array.array('Q').itemsize == 8)
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_snapshot(path, tables, checksum):
+    """
+    Write compiled tables to a snapshot file.
+    tables holds 'strings' (list of str), 'skipped_rows' and one array per section.
+    """
+    if not _native_layout_supported():
+        raise RuntimeError("Drug snapshots require a little-endian platform with 32/64-bit array items")
+
+    string_offsets = array.array('I', [0])
+    string_data = bytearray()
+    for value in tables['strings']:
+        string_data += value.encode('utf-8')
+        string_offsets.append(len(string_data))
+
+    payloads = []
+    for name, typecode in SECTIONS:
+        if name == 'string_offsets':
+            payloads.append(string_offsets.tobytes())
+        elif name == 'string_data':
+            payloads.append(bytes(string_data))
+        else:
+            payloads.append(array.array(typecode, tables[name]).tobytes())
+
+    offset = _align(HEADER.size + SECTION_ENTRY.size * len(SECTIONS))
+    entries = []
+    for payload in payloads:
+        entries.append((offset, len(payload)))
+        offset = _align(offset + len(payload))
+
+    body = bytearray()
+    for entry in entries:
+        body += SECTION_ENTRY.pack(*entry)
+    for (section_offset, _), payload in zip(entries, payloads):
+        body += b'\0' * (section_offset - HEADER.size - len(body))
+        body += payload
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as snapshot:
+        snapshot.write(HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(SECTIONS),
+                                   tables.get('skipped_rows', 0), checksum, hashlib.sha256(body).digest()))
+        snapshot.write(body)
+    # Readers either see the old snapshot or the complete new one
+    os.replace(temp_path, path)
+
+
+def read_snapshot(path, checksum):
+    """
+    Memory-map a snapshot and return its tables, or None when the snapshot
+    is missing, unreadable, damaged (body checksum mismatch), from another
+    format version or built from different source CSVs (checksum mismatch).
+    """
+    if not os.path.exists(path):
+        print(f"⚠️ Drug snapshot not found: {path}")
+        return None
+    if not _native_layout_supported():
+        print("⚠️ Drug snapshot layout not supported on this platform")
+        return None
+
+    try:
+        with open(path, 'rb') as snapshot:
+            mapped = mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Could not map drug snapshot: {e}")
+        return None
+
+    try:
+        magic, version, section_count, skipped_rows, snapshot_checksum, body_checksum = HEADER.unpack_from(mapped, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION or section_count != len(SECTIONS):
+            print(f"⚠️ Drug snapshot has unsupported format (version {version})")
+            return None
+        if snapshot_checksum != checksum:
+            print("⚠️ Drug snapshot is stale (source CSV checksum changed)")
+            return None
+        if hashlib.sha256(memoryview(mapped)[HEADER.size:]).digest() != body_checksum:
+            print("⚠️ Drug snapshot is corrupt (body checksum mismatch)")
+            return None
+
+        view = memoryview(mapped)
+        tables = {'skipped_rows': skipped_rows, 'mmap': mapped}
+        for index, (name, typecode) in enumerate(SECTIONS):
+            offset, length = SECTION_ENTRY.unpack_from(mapped, HEADER.size + SECTION_ENTRY.size * index)
+            if offset + length > len(mapped):
+                print(f"⚠️ Drug snapshot is truncated (section {name})")
+                return None
+            tables[name] = view[offset:offset + length].cast(typecode)
+    except (struct.error, TypeError, ValueError) as e:
+        print(f"⚠️ Drug snapshot is corrupt: {e}")
+        return None
+
+    # The string table is small; decode it once so lookups return plain str
+    offsets, data = tables.pop('string_offsets'), tables.pop('string_data')
+    tables['strings'] = [bytes(data[offsets[i]:offsets[i + 1]]).decode('utf-8')
+                         for i in range(len(offsets) - 1)]
+    return tables
@@ -0,0 +1,57 @@
+import base64
+import io
+import os
+
+from flask import Request
+
+# Uploads are held in memory, so every app that takes them needs a size cap
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))
+
+
+class InMemoryUploadRequest(Request):
+    """
+    Request whose uploaded files stay in memory. Werkzeug spools any upload
+    in a body over 500 KB to a temporary file; here every file part is read
+    into a BytesIO that the image decoder reads directly.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return io.BytesIO()
+
+
+def enable_in_memory_uploads(app):
+    """Keep the app's uploads off disk; bodies over MAX_CONTENT_LENGTH get a 413"""
+    app.request_class = InMemoryUploadRequest
+    if not app.config.get('MAX_CONTENT_LENGTH'):
+        app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
+    return app
+
+
+def load_image(source):
+    """
+    Decode an uploaded image into a PIL image without touching disk.
+    source is a werkzeug FileStorage, a file-like object or raw bytes.
+    """
+    from PIL import Image
+
+    stream = getattr(source, 'stream', source)
+    if isinstance(stream, (bytes, bytearray)):
+        stream = io.BytesIO(stream)
+    elif hasattr(stream, 'seek'):
+        stream.seek(0)
+
+    image = Image.open(stream)
+    image.load()  # decode now, while the request stream is still open
+    return image
+
+
+def load_base64_image(base64_image):
+    """Decode a base64 image, with or without a data: URL prefix"""
+    return load_image(base64.b64decode(base64_image.split(',')[1] if ',' in base64_image else base64_image))
+
+
+def to_grayscale_array(image):
+    """uint8 numpy array of a PIL image in grayscale, for OpenCV"""
+    import numpy as np
+
+    return np.asarray(image.convert('L'))
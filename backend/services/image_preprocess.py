@@ -0,0 +1,120 @@
+import os
+
+import numpy as np
+from PIL import Image, ImageFilter, ImageOps
+
+# Tesseract reads best at roughly 300 DPI, i.e. text lines around 30-40 px
+# tall; phone photos are 12+ MP with lines several times that
+OCR_TARGET_TEXT_HEIGHT = int(os.getenv('OCR_TARGET_TEXT_HEIGHT', 36))  # px per text line after scaling
+OCR_MAX_SIDE = int(os.getenv('OCR_MAX_SIDE', 3500))                    # px, longest side handed to OCR
+OCR_DPI = 300
+
+ANALYSIS_SIDE = 1000      # px, longest side of the thumbnail used to find the text
+MAX_UPSCALE = 2.0         # small text is enlarged at most this much
+CELL = 16                 # px, thumbnail block size when looking for text
+MIN_TRANSITIONS = 1.0     # ink/paper switches per pixel row (and column) in a text block
+INK_CONTRAST = 0.75       # ink is darker than this share of its surroundings
+MIN_LINE_HEIGHT = 2       # px in the thumbnail; shorter ink runs are noise
+
+
+def ink_mask(gray):
+    """
+    True where a grayscale thumbnail has text ink: pixels clearly darker
+    than their blurred surroundings, so uneven light and dark backgrounds
+    around the page do not count as ink
+    """
+    radius = max(8, max(gray.size) // 60)
+    background = np.asarray(gray.filter(ImageFilter.BoxBlur(radius)), dtype=np.float32)
+    return np.asarray(gray, dtype=np.float32) < background * INK_CONTRAST
+
+
+def text_cells(ink):
+    """
+    Boolean grid of CELL x CELL blocks that look like text. Text strokes
+    switch between ink and paper often in both directions; page edges and
+    shadows only switch in one, and flat areas not at all.
+    """
+    rows, columns = ink.shape[0] // CELL, ink.shape[1] // CELL
+    ink = ink[:rows * CELL, :columns * CELL]
+    across = np.zeros(ink.shape, dtype=np.float32)
+    down = np.zeros(ink.shape, dtype=np.float32)
+    across[:, 1:] = ink[:, 1:] != ink[:, :-1]
+    down[1:, :] = ink[1:, :] != ink[:-1, :]
+    per_cell = lambda changes: changes.reshape(rows, CELL, columns, CELL).sum(axis=(1, 3)) / CELL
+    cells = (per_cell(across) >= MIN_TRANSITIONS) & (per_cell(down) >= MIN_TRANSITIONS)
+
+    # Drop isolated cells (specks, corners of the page)
+    padded = np.pad(cells, 1)
+    neighbours = sum(np.roll(np.roll(padded, dy, 0), dx, 1) for dy in (-1, 0, 1) for dx in (-1, 0, 1))[1:-1, 1:-1] - cells
+    return cells & (neighbours > 0)
+
+
+def text_runs(profile, min_ink):
+    """Lengths of consecutive rows holding ink, i.e. text line heights"""
+    padded = np.concatenate(([False], profile > min_ink, [False]))
+    edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+    runs = edges[1::2] - edges[::2]
+    return runs[runs >= MIN_LINE_HEIGHT]
+
+
+def find_text_region(gray, margin_lines=1.0):
+    """
+    Bounding box (left, top, right, bottom) of the text in a grayscale
+    thumbnail and the median text line height, both in thumbnail pixels.
+    (None, None) when no text is found.
+    """
+    ink = ink_mask(gray)
+    cells = text_cells(ink)
+    if not cells.any():
+        return None, None
+    cell_rows, cell_columns = np.flatnonzero(cells.any(axis=1)), np.flatnonzero(cells.any(axis=0))
+    top, bottom = cell_rows[0] * CELL, (cell_rows[-1] + 1) * CELL
+    left, right = cell_columns[0] * CELL, (cell_columns[-1] + 1) * CELL
+
+    runs = text_runs(ink[top:bottom, left:right].mean(axis=1), 0.01)
+    line_height = float(np.median(runs)) if len(runs) else None
+
+    margin = int(round((line_height or CELL) * margin_lines))
+    height, width = ink.shape
+    box = (max(0, left - margin), max(0, top - margin), min(width, right + margin), min(height, bottom + margin))
+    return box, line_height
+
+
+def prepare_for_ocr(image, target_text_height=OCR_TARGET_TEXT_HEIGHT, max_side=OCR_MAX_SIDE, crop=True):
+    """
+    Shrink a page photo to what Tesseract needs before any heavy processing:
+    apply EXIF rotation, go grayscale, crop to the text-bearing region and
+    rescale so text lines are about target_text_height px (tagged 300 DPI).
+    The text is located on a ~1000 px thumbnail, so this stays cheap on
+    12 MP photos. Returns (image, info) where info records what was done.
+    """
+    gray = ImageOps.exif_transpose(image).convert('L')
+    width, height = gray.size
+
+    thumb_scale = min(1.0, ANALYSIS_SIDE / max(width, height))
+    thumb = gray.reduce(max(1, int(1 / thumb_scale))) if thumb_scale < 1 else gray
+    thumb_scale = thumb.size[0] / width
+    box, line_height = find_text_region(thumb)
+
+    if box is not None and crop:
+        box = tuple(int(round(value / thumb_scale)) for value in box)
+        gray = gray.crop(box)
+    else:
+        box = (0, 0, width, height)
+
+    scale = 1.0
+    if line_height:
+        scale = min(MAX_UPSCALE, target_text_height / (line_height / thumb_scale))
+    scale = min(scale, max_side / max(gray.size))
+    if abs(scale - 1.0) > 0.05:
+        size = (max(1, int(round(gray.size[0] * scale))), max(1, int(round(gray.size[1] * scale))))
+        gray = gray.resize(size, Image.LANCZOS if scale > 1 else Image.BILINEAR, reducing_gap=2.0 if scale < 1 else None)
+
+    gray.info['dpi'] = (OCR_DPI, OCR_DPI)
+    return gray, {
+        'original_size': [width, height],
+        'crop_box': list(box),
+        'line_height': round(line_height / thumb_scale, 1) if line_height else None,
+        'scale': round(scale, 3),
+        'output_size': list(gray.size)
+    }
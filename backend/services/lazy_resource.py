@@ -0,0 +1,114 @@
+import importlib
+import os
+import threading
+import time
+
+# A failed factory is retried on the next get() after this many seconds
+RETRY_SECONDS = float(os.getenv('LAZY_RESOURCE_RETRY_SECONDS', 60))
+
+# Every LazyResource by name, in creation order; warm_up() loads them
+_resources = {}
+_registry_lock = threading.RLock()
+
+
+class LazyResource:
+    """
+    A heavy module or object (OpenCV, scikit-learn models, indexes) built on
+    first use instead of at import. The factory runs once even when several
+    request threads ask at the same time. A failure is re-raised without
+    calling the factory again until retry_after seconds have passed, so a
+    missing optional dependency is not retried per request but a transient
+    one (a model file still being copied, a slow mount) recovers.
+    """
+
+    def __init__(self, name, factory, retry_after=None, clock=time.monotonic):
+        self.name = name
+        self.factory = factory
+        self.retry_after = RETRY_SECONDS if retry_after is None else retry_after
+        self.clock = clock
+        self._value = None
+        self._error = None
+        self._failed_at = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.load_seconds = None
+        with _registry_lock:
+            _resources.setdefault(name, self)
+
+    def get(self):
+        if self._needs_load():
+            with self._lock:
+                if self._needs_load():
+                    start = time.perf_counter()
+                    try:
+                        self._value = self.factory()
+                        self._error = self._failed_at = None
+                    except Exception as load_error:
+                        self._error = load_error
+                        self._failed_at = self.clock()
+                    self.load_seconds = time.perf_counter() - start
+                    self._loaded = True
+        error = self._error
+        if error is not None:
+            raise error
+        return self._value
+
+    def _needs_load(self):
+        """Never tried, or the last attempt failed more than retry_after seconds ago"""
+        if not self._loaded:
+            return True
+        return self._error is not None and self.clock() - self._failed_at >= self.retry_after
+
+    def is_available(self):
+        """Load if needed; False when the factory failed (e.g. an optional package is missing)"""
+        try:
+            self.get()
+            return True
+        except Exception:
+            return False
+
+    def is_loaded(self):
+        return self._loaded and self._error is None
+
+
+def lazy_import(module_name):
+    """LazyResource for a module, imported on first get(); one per module name"""
+    with _registry_lock:
+        resource = _resources.get(module_name)
+        if resource is None:
+            resource = LazyResource(module_name, lambda: importlib.import_module(module_name))
+        return resource
+
+
+def warm_up(names=None):
+    """
+    Load lazy resources now instead of on first request: all registered ones,
+    or those in `names`. Meant for the gunicorn preload / post_fork phase
+    (see gunicorn.conf.py). Returns {name: seconds, or None if it failed}.
+    """
+    with _registry_lock:
+        resources = [resource for name, resource in _resources.items() if names is None or name in names]
+    timings = {}
+    for resource in resources:
+        try:
+            resource.get()
+            timings[resource.name] = resource.load_seconds
+            print(f"✅ Warmed up {resource.name} ({resource.load_seconds:.2f}s)")
+        except Exception as load_error:
+            timings[resource.name] = None
+            print(f"⚠️ Could not warm up {resource.name}: {load_error}")
+    return timings
+
+
+def get_resource_stats():
+    """Which lazy resources are loaded, and how long each took"""
+    with _registry_lock:
+        resources = list(_resources.values())
+    return {
+        resource.name: {
+            'loaded': resource.is_loaded(),
+            'load_seconds': round(resource.load_seconds, 3) if resource.load_seconds is not None else None,
+            'error': str(resource._error) if resource._error is not None else None
+        }
+        for resource in resources
+    }
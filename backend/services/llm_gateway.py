@@ -0,0 +1,376 @@
+import asyncio
+import os
+import random
+import threading
+import time
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    # The Vercel function (api/index.py) only installs the root requirements
+    # and gets its settings from the environment
+    pass
+
+DEFAULT_MODEL = "llama-3.3-70b-versatile"
+
+# All settings can be overridden per deployment; LLM_BASE_URL points the
+# gateway at a local stub server for tests and load tests
+LLM_BASE_URL = os.getenv('LLM_BASE_URL') or None
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', 30))             # seconds per attempt
+LLM_DEADLINE = float(os.getenv('LLM_DEADLINE', 45))           # seconds per call, across retries
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 2))
+LLM_BACKOFF_BASE = float(os.getenv('LLM_BACKOFF_BASE', 0.25))  # seconds, doubled per retry
+LLM_BACKOFF_MAX = float(os.getenv('LLM_BACKOFF_MAX', 4))
+LLM_MAX_CONNECTIONS = int(os.getenv('LLM_MAX_CONNECTIONS', 20))
+LLM_BREAKER_FAILURES = int(os.getenv('LLM_BREAKER_FAILURES', 5))
+LLM_BREAKER_RESET = float(os.getenv('LLM_BREAKER_RESET', 30))  # seconds open before a probe
+
+
+class LLMUnavailableError(Exception):
+    """The upstream LLM cannot be used for this call; callers use their rule-based fallback"""
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive upstream failures. While open
+    every call is refused immediately; after reset_timeout a single probe
+    call is let through (half-open) and its outcome closes or reopens it.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=LLM_BREAKER_FAILURES, reset_timeout=LLM_BREAKER_RESET, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def _current_state(self):
+        if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self.state
+
+    def is_open(self):
+        """True while calls would be refused"""
+        with self._lock:
+            state = self._current_state()
+            return state == self.OPEN or (state == self.HALF_OPEN and self._probe_in_flight)
+
+    def allow_request(self):
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+                self._probe_in_flight = False
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'state': self._current_state(),
+                'consecutive_failures': self.consecutive_failures,
+                'times_opened': self.times_opened
+            }
+
+
+def _is_retryable(error):
+    """Transport errors, timeouts, rate limits and 5xx are worth retrying; other 4xx are not"""
+    import groq
+    if isinstance(error, groq.APIConnectionError):  # includes APITimeoutError
+        return True
+    if isinstance(error, groq.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+class LLMGateway:
+    """
+    Single entry point for chat completions. One pooled HTTP client per
+    process, a deadline per call, bounded retries with jittered exponential
+    backoff and a circuit breaker. Every failure surfaces as
+    LLMUnavailableError so callers can switch to their fallback.
+    """
+
+    def __init__(self, api_key=None, base_url=LLM_BASE_URL, model=DEFAULT_MODEL, timeout=LLM_TIMEOUT,
+                 deadline=LLM_DEADLINE, max_retries=LLM_MAX_RETRIES, backoff_base=LLM_BACKOFF_BASE,
+                 backoff_max=LLM_BACKOFF_MAX, max_connections=LLM_MAX_CONNECTIONS, breaker=None):
+        self.api_key = api_key if api_key is not None else os.getenv('GROQ_API_KEY')
+        self.base_url = base_url
+        self.model = model
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_connections = max_connections
+        self.breaker = breaker or CircuitBreaker()
+
+        self._client = None
+        self._client_pid = None
+        self._client_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {'calls': 0, 'successes': 0, 'failures': 0, 'retries': 0, 'rejected': 0}
+
+    def is_configured(self):
+        return bool(self.api_key)
+
+    def is_available(self):
+        """Configured and not currently short-circuited"""
+        return self.is_configured() and not self.breaker.is_open()
+
+    def _get_client(self):
+        """The process's pooled client; recreated after a fork so workers never share sockets"""
+        with self._client_lock:
+            if self._client is None or self._client_pid != os.getpid():
+                import httpx
+                from groq import Groq
+                http_client = httpx.Client(
+                    timeout=self.timeout,
+                    limits=httpx.Limits(max_connections=self.max_connections,
+                                        max_keepalive_connections=self.max_connections))
+                kwargs = {'api_key': self.api_key, 'max_retries': 0, 'timeout': self.timeout,
+                          'http_client': http_client}
+                if self.base_url:
+                    kwargs['base_url'] = self.base_url
+                self._client = Groq(**kwargs)
+                self._client_pid = os.getpid()
+            return self._client
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _backoff(self, attempt):
+        """Full jitter: uniform in [0, min(max, base * 2^attempt)]"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def chat_completion(self, messages, model=None, deadline=None, **params):
+        """
+        Create a chat completion, returning the SDK response object.
+        Raises LLMUnavailableError when not configured, short-circuited,
+        out of time or out of retries.
+        """
+        if not self.is_configured():
+            raise LLMUnavailableError("GROQ_API_KEY not configured")
+
+        self._count('calls')
+        if not self.breaker.allow_request():
+            self._count('rejected')
+            raise LLMUnavailableError("LLM circuit open; upstream degraded")
+
+        expires_at = time.monotonic() + (deadline or self.deadline)
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                response = self._get_client().chat.completions.create(
+                    messages=messages, model=model or self.model,
+                    timeout=min(self.timeout, remaining), **params)
+                self.breaker.record_success()
+                self._count('successes')
+                return response
+            except Exception as error:
+                if not _is_retryable(error):
+                    # The request itself is bad; the upstream is healthy
+                    self.breaker.record_success()
+                    self._count('failures')
+                    raise LLMUnavailableError(f"LLM request rejected: {error}") from error
+                last_error = error
+
+            if attempt < self.max_retries:
+                delay = self._backoff(attempt)
+                if time.monotonic() + delay >= expires_at:
+                    break
+                self._count('retries')
+                time.sleep(delay)
+
+        self.breaker.record_failure()
+        self._count('failures')
+        reason = last_error or "deadline exceeded"
+        raise LLMUnavailableError(f"LLM call failed: {reason}") from last_error
+
+    def chat(self, messages, model=None, deadline=None, **params):
+        """Create a chat completion and return the message text"""
+        response = self.chat_completion(messages, model=model, deadline=deadline, **params)
+        return response.choices[0].message.content
+
+    def chat_stream(self, messages, model=None, deadline=None, **params):
+        """
+        Stream a chat completion, yielding text deltas as they arrive.
+        Opening the stream gets the same deadline, retries and breaker as
+        chat_completion. Once deltas are flowing, a dropped stream counts
+        as an upstream failure and raises LLMUnavailableError.
+        """
+        stream = self.chat_completion(messages, model=model, deadline=deadline, stream=True, **params)
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as error:
+            self.breaker.record_failure()
+            self._count('failures')
+            raise LLMUnavailableError(f"LLM stream interrupted: {error}") from error
+        finally:
+            # Also runs when the consumer stops early (client disconnected)
+            stream.response.close()
+
+    def get_stats(self):
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['configured'] = self.is_configured()
+        stats['circuit'] = self.breaker.get_stats()
+        return stats
+
+
+class AsyncLLMGateway(LLMGateway):
+    """
+    asyncio twin of LLMGateway for the ASGI app: calls are awaited instead
+    of holding a worker thread for the whole upstream round trip. Same
+    deadline, retry and circuit breaker rules.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._client_loop = None
+
+    def _get_client(self):
+        """One pooled AsyncGroq client per process and event loop"""
+        loop = asyncio.get_running_loop()
+        with self._client_lock:
+            if self._client is None or self._client_pid != os.getpid() or self._client_loop is not loop:
+                import httpx
+                from groq import AsyncGroq
+                http_client = httpx.AsyncClient(
+                    timeout=self.timeout,
+                    limits=httpx.Limits(max_connections=self.max_connections,
+                                        max_keepalive_connections=self.max_connections))
+                kwargs = {'api_key': self.api_key, 'max_retries': 0, 'timeout': self.timeout,
+                          'http_client': http_client}
+                if self.base_url:
+                    kwargs['base_url'] = self.base_url
+                self._client = AsyncGroq(**kwargs)
+                self._client_pid = os.getpid()
+                self._client_loop = loop
+            return self._client
+
+    async def chat_completion(self, messages, model=None, deadline=None, **params):
+        """Awaitable chat_completion; raises LLMUnavailableError like the sync gateway"""
+        if not self.is_configured():
+            raise LLMUnavailableError("GROQ_API_KEY not configured")
+
+        self._count('calls')
+        if not self.breaker.allow_request():
+            self._count('rejected')
+            raise LLMUnavailableError("LLM circuit open; upstream degraded")
+
+        expires_at = time.monotonic() + (deadline or self.deadline)
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                response = await self._get_client().chat.completions.create(
+                    messages=messages, model=model or self.model,
+                    timeout=min(self.timeout, remaining), **params)
+                self.breaker.record_success()
+                self._count('successes')
+                return response
+            except Exception as error:
+                if not _is_retryable(error):
+                    self.breaker.record_success()
+                    self._count('failures')
+                    raise LLMUnavailableError(f"LLM request rejected: {error}") from error
+                last_error = error
+
+            if attempt < self.max_retries:
+                delay = self._backoff(attempt)
+                if time.monotonic() + delay >= expires_at:
+                    break
+                self._count('retries')
+                await asyncio.sleep(delay)
+
+        self.breaker.record_failure()
+        self._count('failures')
+        reason = last_error or "deadline exceeded"
+        raise LLMUnavailableError(f"LLM call failed: {reason}") from last_error
+
+    async def chat(self, messages, model=None, deadline=None, **params):
+        response = await self.chat_completion(messages, model=model, deadline=deadline, **params)
+        return response.choices[0].message.content
+
+    async def chat_stream(self, messages, model=None, deadline=None, **params):
+        """Async generator of text deltas; see LLMGateway.chat_stream"""
+        stream = await self.chat_completion(messages, model=model, deadline=deadline, stream=True, **params)
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as error:
+            self.breaker.record_failure()
+            self._count('failures')
+            raise LLMUnavailableError(f"LLM stream interrupted: {error}") from error
+        finally:
+            await stream.response.aclose()
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+_async_gateway = None
+
+
+def get_llm_gateway():
+    """Shared per-process LLMGateway"""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = LLMGateway()
+                if _gateway.is_configured():
+                    print(f"✅ LLM gateway ready ({_gateway.model}{', ' + _gateway.base_url if _gateway.base_url else ''})")
+                else:
+                    print("⚠️ GROQ_API_KEY not set; AI features will use fallbacks")
+    return _gateway
+
+
+def get_async_llm_gateway():
+    """
+    Shared per-process AsyncLLMGateway. It uses the sync gateway's circuit
+    breaker, so both request paths agree on whether the upstream is healthy.
+    """
+    global _async_gateway
+    if _async_gateway is None:
+        breaker = get_llm_gateway().breaker
+        with _gateway_lock:
+            if _async_gateway is None:
+                _async_gateway = AsyncLLMGateway(breaker=breaker)
+    return _async_gateway
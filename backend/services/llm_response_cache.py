@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from services.resolution_cache import ResolutionCache
+
+LLM_CACHE_SIZE = int(os.getenv('LLM_CACHE_SIZE', 1024))       # parsed responses held in memory
+LLM_CACHE_TTL = float(os.getenv('LLM_CACHE_TTL', 86400))      # seconds
+LLM_CACHE_DB = os.getenv('LLM_CACHE_DB') or None              # SQLite file; unset keeps the cache in memory only
+
+# Same age groups the drug warning data is written against
+AGE_BUCKETS = ((1, 'neonate'), (2, 'infant'), (18, 'pediatric'), (65, 'adult'))
+
+
+def age_bucket(age):
+    """Warning-relevant age group for an age in years; 'unknown' when it is not a number"""
+    try:
+        age = float(age)
+    except (TypeError, ValueError):
+        return 'unknown'
+    for limit, bucket in AGE_BUCKETS:
+        if age < limit:
+            return bucket
+    return 'elderly'
+
+
+def _normalize(value):
+    return ' '.join(str(value or '').lower().split())
+
+
+def _normalize_list(values):
+    if isinstance(values, str):
+        values = values.split(',')
+    return sorted({_normalize(value) for value in values or [] if _normalize(value)})
+
+
+def analysis_cache_key(kind, medications, age, profile=None, model=''):
+    """
+    Content address of an analysis request: a hash of the sorted,
+    normalized medication list, the age bucket and the profile fields.
+    Medication order, case and spacing do not change the key.
+    """
+    canonical = {
+        'kind': kind,
+        'model': model,
+        'medications': sorted((_normalize(med.get('name')), _normalize(med.get('dose')))
+                              for med in medications if isinstance(med, dict)),
+        'age': age_bucket(age),
+        'profile': {field: _normalize_list(values) for field, values in sorted((profile or {}).items())}
+    }
+    encoded = json.dumps(canonical, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Parsed LLM results keyed by analysis_cache_key. A bounded in-memory LRU
+    with a TTL sits in front of an optional SQLite table, so a restarted
+    process starts warm. Values are stored as JSON, and every get returns
+    a fresh copy that callers may modify.
+    """
+
+    def __init__(self, max_size=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL, db_path=LLM_CACHE_DB, clock=time.time):
+        self.ttl = ttl
+        self.db_path = db_path
+        self.clock = clock
+        self.memory = ResolutionCache(max_size=max_size, ttl=ttl, clock=clock)
+        self.disk_hits = 0
+        self.disk_errors = 0
+        self._db = None
+        self._db_pid = None
+        self._db_lock = threading.Lock()
+
+    def _connection(self):
+        """The process's SQLite connection; reopened after a fork. Caller holds _db_lock."""
+        if self._db is None or self._db_pid != os.getpid():
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS llm_responses (
+                    key TEXT PRIMARY KEY,
+                    created_at REAL NOT NULL,
+                    payload TEXT NOT NULL
+                )""")
+            if self.ttl and self.ttl > 0:
+                self._db.execute("DELETE FROM llm_responses WHERE created_at <= ?", (self.clock() - self.ttl,))
+            self._db.commit()
+            self._db_pid = os.getpid()
+        return self._db
+
+    def _disk_get(self, key):
+        """(payload, remaining ttl) from SQLite, or None"""
+        try:
+            with self._db_lock:
+                row = self._connection().execute(
+                    "SELECT created_at, payload FROM llm_responses WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as error:
+            self.disk_errors += 1
+            print(f"⚠️ LLM cache read failed: {error}")
+            return None
+        if row is None:
+            return None
+        created_at, payload = row
+        if not self.ttl or self.ttl <= 0:
+            return payload, None
+        remaining = created_at + self.ttl - self.clock()
+        return (payload, remaining) if remaining > 0 else None
+
+    def _disk_put(self, key, payload):
+        try:
+            with self._db_lock:
+                db = self._connection()
+                db.execute("INSERT OR REPLACE INTO llm_responses (key, created_at, payload) VALUES (?, ?, ?)",
+                           (key, self.clock(), payload))
+                db.commit()
+        except sqlite3.Error as error:
+            self.disk_errors += 1
+            print(f"⚠️ LLM cache write failed: {error}")
+
+    def get(self, key):
+        """Cached result for key, or None"""
+        found, payload = self.memory.get(key)
+        if not found and self.db_path:
+            stored = self._disk_get(key)
+            if stored is not None:
+                payload, remaining = stored
+                # Keep the original expiry instead of restarting the TTL
+                self.memory.put(key, payload, ttl=remaining)
+                self.disk_hits += 1
+                found = True
+        return json.loads(payload) if found else None
+
+    def put(self, key, result):
+        payload = json.dumps(result)
+        self.memory.put(key, payload)
+        if self.db_path:
+            self._disk_put(key, payload)
+
+    def clear(self):
+        self.memory.clear()
+        if self.db_path:
+            try:
+                with self._db_lock:
+                    db = self._connection()
+                    db.execute("DELETE FROM llm_responses")
+                    db.commit()
+            except sqlite3.Error as error:
+                self.disk_errors += 1
+                print(f"⚠️ LLM cache clear failed: {error}")
+
+    def get_stats(self):
+        stats = self.memory.get_stats()
+        stats['db_path'] = self.db_path
+        stats['disk_hits'] = self.disk_hits
+        stats['disk_errors'] = self.disk_errors
+        return stats
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_llm_response_cache():
+    """Shared per-process LLMResponseCache"""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = LLMResponseCache()
+    return _response_cache
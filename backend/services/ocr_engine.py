@@ -0,0 +1,212 @@
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Workers are the OCR pages processed at once; the queue is how many more may
+# wait for a worker before new work is refused (HTTP 429)
+OCR_WORKERS = int(os.getenv('OCR_WORKERS', os.cpu_count() or 1))
+OCR_QUEUE_SIZE = int(os.getenv('OCR_QUEUE_SIZE', OCR_WORKERS * 2))
+OCR_TIMEOUT = float(os.getenv('OCR_TIMEOUT', 60))      # seconds a caller waits for its page
+OCR_RETRY_AFTER = int(os.getenv('OCR_RETRY_AFTER', 2))  # seconds suggested to refused clients
+
+# Checked when tesseract is not on PATH and TESSERACT_CMD is not set
+WINDOWS_TESSERACT_PATHS = [
+    r'C:\Program Files\Tesseract-OCR\tesseract.exe',
+    r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
+    r'C:\Users\{}\AppData\Local\Programs\Tesseract-OCR\tesseract.exe'.format(os.getenv('USERNAME', 'User'))
+]
+
+# Tesseract parallelises a page with OpenMP; with one page per worker that
+# only oversubscribes the CPU
+os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+
+class OCRBusyError(Exception):
+    """Every OCR worker is busy and the queue is full; answer HTTP 429 with Retry-After"""
+
+    def __init__(self, retry_after=OCR_RETRY_AFTER):
+        super().__init__("OCR service busy, retry later")
+        self.retry_after = retry_after
+
+
+class OCRUnavailableError(Exception):
+    """Neither tesserocr nor a tesseract binary is installed"""
+
+
+def resolve_tesseract_cmd():
+    """Path of the tesseract binary: TESSERACT_CMD, then PATH, then the usual Windows installs"""
+    configured = os.getenv('TESSERACT_CMD')
+    if configured:
+        return configured
+    found = shutil.which('tesseract')
+    if found:
+        return found
+    for path in WINDOWS_TESSERACT_PATHS:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def tesseract_config(psm, char_whitelist=None):
+    """tesseract command-line options for pytesseract"""
+    config = f'--oem 3 --psm {psm}'
+    if char_whitelist:
+        config += f' -c tessedit_char_whitelist={char_whitelist}'
+    return config
+
+
+class TesserocrBackend:
+    """libtesseract in process: each worker thread keeps one initialised API (warm models)"""
+
+    name = 'tesserocr'
+
+    def __init__(self):
+        import tesserocr
+        self.tesserocr = tesserocr
+        self.tessdata_path, languages = tesserocr.get_languages()
+        if 'eng' not in languages:
+            raise OCRUnavailableError(f"eng.traineddata not found in {self.tessdata_path}")
+        self._local = threading.local()
+
+    def _api(self):
+        api = getattr(self._local, 'api', None)
+        if api is None:
+            api = self.tesserocr.PyTessBaseAPI(lang='eng', oem=self.tesserocr.OEM.DEFAULT)
+            self._local.api = api
+        return api
+
+    def recognize(self, image, psm=3, char_whitelist=None):
+        api = self._api()
+        api.SetPageSegMode(psm)
+        api.SetVariable('tessedit_char_whitelist', char_whitelist or '')
+        api.SetImage(image)
+        try:
+            return api.GetUTF8Text()
+        finally:
+            api.Clear()
+
+
+class PytesseractBackend:
+    """tesseract CLI through pytesseract: one process per page, but the binary is located once"""
+
+    name = 'pytesseract'
+
+    def __init__(self, tesseract_cmd):
+        import pytesseract
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+        self.pytesseract = pytesseract
+        self.tesseract_cmd = tesseract_cmd
+
+    def recognize(self, image, psm=3, char_whitelist=None):
+        return self.pytesseract.image_to_string(image, config=tesseract_config(psm, char_whitelist))
+
+
+def detect_backend():
+    """Prefer tesserocr (no process or temp file per page); fall back to the tesseract binary"""
+    try:
+        return TesserocrBackend()
+    except Exception as tesserocr_error:
+        tesseract_cmd = resolve_tesseract_cmd()
+        if tesseract_cmd:
+            try:
+                return PytesseractBackend(tesseract_cmd)
+            except ImportError:
+                pass
+        print(f"⚠️ Tesseract not available ({tesserocr_error}); OCR requests will fail over to their fallbacks")
+        return None
+
+
+class OCREngine:
+    """
+    Shared OCR workers. Pages run on a fixed pool of `workers` threads (both
+    backends release the GIL while recognising); at most `queue_size` more
+    may wait, beyond that submit() raises OCRBusyError straight away.
+    """
+
+    def __init__(self, backend=None, workers=OCR_WORKERS, queue_size=OCR_QUEUE_SIZE):
+        self.backend = backend if backend is not None else detect_backend()
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+        self._executor = None
+        self._executor_pid = None
+        self._executor_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0, 'in_flight': 0}
+
+    def is_available(self):
+        return self.backend is not None
+
+    def _get_executor(self):
+        # A pool inherited through fork has no threads; each process builds its own
+        with self._executor_lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ocr-worker')
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def _finished(self, future):
+        self._slots.release()
+        self._count('in_flight', -1)
+        self._count('failed' if future.exception() else 'completed')
+
+    def submit(self, image, psm=3, char_whitelist=None):
+        """Queue one page; returns a Future with its text"""
+        if self.backend is None:
+            raise OCRUnavailableError("Tesseract OCR is not installed")
+        if not self._slots.acquire(blocking=False):
+            self._count('rejected')
+            raise OCRBusyError()
+        self._count('submitted')
+        self._count('in_flight')
+        try:
+            future = self._get_executor().submit(self.backend.recognize, image, psm, char_whitelist)
+        except Exception:
+            self._slots.release()
+            self._count('in_flight', -1)
+            raise
+        future.add_done_callback(self._finished)
+        return future
+
+    def image_to_string(self, image, psm=3, char_whitelist=None, timeout=OCR_TIMEOUT):
+        """OCR one PIL image on a worker and wait for the text"""
+        return self.submit(image, psm, char_whitelist).result(timeout=timeout)
+
+    def get_stats(self):
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats.update({
+            'backend': self.backend.name if self.backend else None,
+            'tesseract_cmd': getattr(self.backend, 'tesseract_cmd', None),
+            'workers': self.workers,
+            'queue_size': self.queue_size
+        })
+        return stats
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_ocr_engine():
+    """
+    Shared per-process OCREngine; the tesseract backend is located once, here.
+    Call it at import time: tesserocr can only be imported on the main thread.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = OCREngine()
+                if _engine.is_available():
+                    print(f"✅ OCR engine ready ({_engine.backend.name}, {_engine.workers} workers, queue {_engine.queue_size})")
+    return _engine
@@ -1,25 +1,21 @@
-import cv2
-import numpy as np
-from PIL import Image
-import io
-import base64
-import os
-import tempfile
 import re
-import time
+
+from services.image_ingest import load_base64_image, to_grayscale_array
+from services.lazy_resource import lazy_import
+
+# OpenCV and numpy load with the first image, not with the module
+opencv = lazy_import('cv2')
+image_preprocess = lazy_import('services.image_preprocess')
 
 # Fallback OCR without EasyOCR dependency issues
-def simple_text_extraction(image_path):
+def simple_text_extraction(image):
     """
     Simple text extraction - for now focus on getting Groq AI to work
     """
     try:
-        # Read the image to verify it exists and is readable
-        if os.path.exists(image_path):
-            with open(image_path, 'rb') as f:
-                # Just verify we can read the file
-                image_data = f.read()
-                print(f"✅ Successfully read image file: {len(image_data)} bytes")
+        # Just verify the decoded image is usable
+        if image is not None:
+            print(f"✅ Successfully decoded image: {image.size[0]}x{image.size[1]} pixels")
         
         # Return a placeholder that indicates image was received
         # The real magic happens in Groq AI analysis
@@ -39,18 +35,23 @@ def simple_text_extraction(image_path):
         print(f"Simple text extraction failed: {e}")
         return "Prescription image received - analyzing with AI"
 
-def preprocess_image(image_path):
+def preprocess_image(image, prepare=True):
     """
     Preprocess image for better OCR accuracy
+    Takes a PIL image and returns the cleaned-up PIL image, all in memory.
+    The text region is cropped and rescaled first, so denoising runs on a
+    fraction of a phone photo instead of the whole frame.
     """
     try:
-        # Read image
-        image = cv2.imread(image_path)
-        if image is None:
-            return image_path
+        # Crop to the text and normalize its size
+        if prepare:
+            image, _ = image_preprocess.get().prepare_for_ocr(image)
+        
+        from PIL import Image
+        cv2 = opencv.get()
         
         # Convert to grayscale
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        gray = to_grayscale_array(image)
         
         # Apply denoising
         denoised = cv2.fastNlMeansDenoising(gray)
@@ -58,22 +59,19 @@ def preprocess_image(image_path):
         # Apply adaptive threshold for better text extraction
         thresh = cv2.adaptiveThreshold(denoised, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
         
-        # Save preprocessed image
-        preprocessed_path = image_path.replace('.', '_processed.')
-        cv2.imwrite(preprocessed_path, thresh)
-        
-        return preprocessed_path
+        return Image.fromarray(thresh)
     except Exception as e:
         print(f"Image preprocessing failed: {e}")
-        return image_path
+        return image
 
-def extract_text_from_image(image_path):
+def extract_text_from_image(image):
     """
     Enhanced text extraction - now uses Groq AI for analysis
+    Takes a decoded PIL image (see services.image_ingest.load_image)
     """
     try:
         # Use simple extraction for now, focus on AI analysis
-        extracted_text = simple_text_extraction(image_path)
+        extracted_text = simple_text_extraction(image)
         
         return extracted_text
         
@@ -86,21 +84,11 @@ def extract_text_from_base64(base64_image):
     Extract text from base64 encoded image
     """
     try:
-        # Decode base64 image
-        image_data = base64.b64decode(base64_image.split(',')[1] if ',' in base64_image else base64_image)
-        
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as temp_file:
-            temp_file.write(image_data)
-            temp_path = temp_file.name
+        # Decode base64 image in memory
+        image = load_base64_image(base64_image)
         
         # Extract text
-        text = extract_text_from_image(temp_path)
-        
-        # Clean up
-        os.unlink(temp_path)
-        
-        return text
+        return extract_text_from_image(image)
     except Exception as e:
         print(f"Base64 OCR extraction failed: {e}")
         return ""
\ No newline at end of file
@@ -0,0 +1,144 @@
+import os
+import threading
+from collections import deque
+
+from services.lazy_resource import LazyResource, lazy_import
+from services.ocr_engine import OCR_TIMEOUT
+
+
+def load_pdfium():
+    try:
+        import pypdfium2
+    except ImportError:
+        print("⚠️ pypdfium2 not installed; PDF uploads will not be read (pip install pypdfium2)")
+        raise
+    return pypdfium2
+
+
+# Loaded with the first PDF upload (or in warm_up())
+pdfium = LazyResource('pypdfium2', load_pdfium)
+image_preprocess = lazy_import('services.image_preprocess')
+
+# Pages with at least this much embedded text are read directly; the rest
+# (scans, photos saved as PDF) are rendered and OCR'd
+PDF_MIN_TEXT_CHARS = int(os.getenv('PDF_MIN_TEXT_CHARS', 20))
+PDF_RENDER_DPI = int(os.getenv('PDF_RENDER_DPI', 200))
+PDF_MAX_PAGES = int(os.getenv('PDF_MAX_PAGES', 50))
+
+PAGE_SEPARATOR = "\n\n"
+
+# PDFium is not thread-safe; every call into it goes through this lock
+_pdfium_lock = threading.Lock()
+
+
+class PDFUnavailableError(Exception):
+    """pypdfium2 is not installed"""
+
+
+def pdf_available():
+    return pdfium.is_available()
+
+
+def is_pdf(source):
+    """True if an upload (FileStorage, stream or bytes) starts with the PDF signature"""
+    stream = getattr(source, 'stream', source)
+    if isinstance(stream, (bytes, bytearray)):
+        return bytes(stream[:5]) == b'%PDF-'
+    position = stream.tell()
+    header = stream.read(5)
+    stream.seek(position)
+    return header == b'%PDF-'
+
+
+def _read_bytes(source):
+    stream = getattr(source, 'stream', source)
+    if isinstance(stream, (bytes, bytearray)):
+        return bytes(stream)
+    stream.seek(0)
+    return stream.read()
+
+
+def _text_layer(page):
+    text_page = page.get_textpage()
+    try:
+        return text_page.get_text_bounded().replace('\r\n', '\n').strip()
+    finally:
+        text_page.close()
+
+
+def _render(page, dpi):
+    bitmap = page.render(scale=dpi / 72, grayscale=True)
+    try:
+        return bitmap.to_pil()
+    finally:
+        bitmap.close()
+
+
+def extract_pdf_text(source, ocr_engine=None, psm=3, char_whitelist=None, dpi=PDF_RENDER_DPI, max_pages=PDF_MAX_PAGES):
+    """
+    Text of a PDF upload, pages merged in order.
+
+    Pages with a text layer are read directly. The others are rendered one by
+    one (PDFium is single-threaded) and handed to the OCR engine as they are
+    ready, so rendering overlaps recognition and up to ocr_engine.workers
+    pages are OCR'd at once. A document never holds more than that many
+    queue slots, leaving room for other requests.
+
+    Returns {'text', 'page_count', 'pages': [{'page', 'source', 'characters'}]}
+    where source is 'text', 'ocr' or 'unreadable' (no text layer, no OCR).
+    """
+    if not pdf_available():
+        raise PDFUnavailableError("pypdfium2 is not installed")
+    prepare_for_ocr = image_preprocess.get().prepare_for_ocr
+
+    with _pdfium_lock:
+        document = pdfium.get().PdfDocument(_read_bytes(source))
+    try:
+        page_count = len(document)
+        pages = [None] * min(page_count, max_pages)
+        in_flight = deque()
+        ocr_slots = ocr_engine.workers if ocr_engine is not None and ocr_engine.is_available() else 0
+
+        def collect_oldest():
+            index, future = in_flight.popleft()
+            pages[index] = ('ocr', future.result(timeout=OCR_TIMEOUT).strip())
+
+        try:
+            for index in range(len(pages)):
+                with _pdfium_lock:
+                    page = document[index]
+                    try:
+                        text = _text_layer(page)
+                        image = _render(page, dpi) if len(text) < PDF_MIN_TEXT_CHARS and ocr_slots else None
+                    finally:
+                        page.close()
+
+                if image is None:
+                    pages[index] = ('text', text) if text else ('unreadable', '')
+                    continue
+
+                if len(in_flight) >= ocr_slots:
+                    collect_oldest()
+                image, _ = prepare_for_ocr(image)
+                in_flight.append((index, ocr_engine.submit(image, psm, char_whitelist)))
+
+            while in_flight:
+                collect_oldest()
+        except Exception:
+            # e.g. OCRBusyError: drop this document's queued pages
+            for _, future in in_flight:
+                future.cancel()
+            raise
+    finally:
+        with _pdfium_lock:
+            document.close()
+
+    if page_count > len(pages):
+        print(f"⚠️ PDF has {page_count} pages; only the first {len(pages)} were read")
+
+    return {
+        'text': PAGE_SEPARATOR.join(text for _, text in pages if text),
+        'page_count': page_count,
+        'pages': [{'page': number, 'source': source_type, 'characters': len(text)}
+                  for number, (source_type, text) in enumerate(pages, start=1)]
+    }
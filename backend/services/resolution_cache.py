@@ -0,0 +1,87 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_CACHE_SIZE = int(os.getenv('DRUG_NAME_CACHE_SIZE', 4096))
+DEFAULT_CACHE_TTL = float(os.getenv('DRUG_NAME_CACHE_TTL', 3600))
+
+
+class ResolutionCache:
+    """
+    Bounded, thread-safe LRU cache with a per-entry TTL for drug-name
+    resolutions. OCR keeps producing the same misspellings, so most
+    lookups repeat. Owners call clear() whenever their drug tables reload.
+    """
+
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE, ttl=DEFAULT_CACHE_TTL, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl              # seconds; None or <= 0 disables expiry
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, value), least recently used first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """(True, value) for a live entry, otherwise (False, None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > self.clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value, ttl=None):
+        """Store value; ttl overrides the cache-wide TTL for this entry"""
+        if self.max_size <= 0:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = self.clock() + ttl if ttl and ttl > 0 else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """Cached value for key, computing and storing it on a miss"""
+        found, value = self.get(key)
+        if not found:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """Drop every entry, e.g. after the drug tables were reloaded"""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# CPU-bound stages (OCR, CSV checks) share a pool sized to the cores; stages
+# that mostly wait on the network (LLM calls) get their own, larger pool so a
+# few slow upstream calls cannot hold every thread. Every gunicorn thread can
+# have one scan in flight, so size the I/O pool to at least --threads.
+PIPELINE_WORKERS = int(os.getenv('SCAN_PIPELINE_WORKERS', 4))
+PIPELINE_IO_WORKERS = int(os.getenv('SCAN_PIPELINE_IO_WORKERS', 16))
+
+Stage = namedtuple('Stage', ['name', 'function', 'after', 'io'])
+
+
+class StagePipeline:
+    """
+    A small DAG of named stages. A stage's function is called with the
+    results of everything listed in `after` as keyword arguments; those are
+    earlier stages or inputs passed to run(). Every stage starts as soon
+    as its dependencies have finished, so independent stages run side by
+    side and the wall time follows the longest chain, not the sum.
+    """
+
+    def __init__(self):
+        self.stages = OrderedDict()
+
+    def add(self, name, function, after=(), io=False):
+        """
+        Add a stage; stages can only depend on stages added before them, so
+        the graph has no cycles. Mark stages that wait on network calls with
+        io=True so they run on the I/O pool.
+        """
+        if name in self.stages:
+            raise ValueError(f"Duplicate stage: {name}")
+        self.stages[name] = Stage(name, function, tuple(after), io)
+        return self
+
+    def run(self, executor=None, io_executor=None, **inputs):
+        """
+        Run every stage on the shared pools and return (results, timings).
+        results maps stage and input names to values. timings maps each
+        stage to its start offset and duration in ms, plus the pipeline
+        total. The first stage error is raised once running stages finish.
+        """
+        available = set(inputs)
+        for stage in self.stages.values():
+            missing = [name for name in stage.after if name not in available]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stages or inputs: {missing}")
+            available.add(stage.name)
+
+        executor = executor or get_pipeline_executor()
+        io_executor = io_executor or get_pipeline_io_executor()
+        results = dict(inputs)
+        timings = OrderedDict()
+        pending = OrderedDict(self.stages)
+        running = {}
+        started = time.perf_counter()
+
+        def timed(stage, kwargs):
+            stage_start = time.perf_counter()
+            try:
+                return stage.function(**kwargs)
+            finally:
+                timings[stage.name] = {
+                    'start_ms': round((stage_start - started) * 1000, 1),
+                    'duration_ms': round((time.perf_counter() - stage_start) * 1000, 1)
+                }
+
+        error = None
+        while pending or running:
+            if error is None:
+                for name, stage in list(pending.items()):
+                    if all(dependency in results for dependency in stage.after):
+                        kwargs = {dependency: results[dependency] for dependency in stage.after}
+                        pool = io_executor if stage.io else executor
+                        running[pool.submit(timed, stage, kwargs)] = name
+                        del pending[name]
+            elif not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as stage_error:
+                    error = error or stage_error
+
+        if error is not None:
+            raise error
+
+        ordered = OrderedDict((name, timings[name]) for name in self.stages)
+        ordered['total_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        return results, ordered
+
+
+_executor = None
+_io_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_pipeline_executor():
+    """Bounded thread pool shared by all pipeline runs in this process"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix='pipeline-stage')
+    return _executor
+
+
+def get_pipeline_io_executor():
+    """Thread pool for stages that wait on network calls, shared by all pipeline runs in this process"""
+    global _io_executor
+    if _io_executor is None:
+        with _executor_lock:
+            if _io_executor is None:
+                _io_executor = ThreadPoolExecutor(max_workers=PIPELINE_IO_WORKERS, thread_name_prefix='pipeline-io')
+    return _io_executor
@@ -0,0 +1,105 @@
+"""
+Micro-benchmark for services/drug_checker.check_interactions_and_warnings
+Measures per-request latency of the indexed pair lookup for regimens of
+2, 10, 50 and 200 drugs, next to the previous full-table scan.
+"""
+
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+with contextlib.redirect_stdout(io.StringIO()):
+    from services import drug_checker
+
+REGIMEN_SIZES = [2, 10, 50, 200]
+
+
+KNOWLEDGE_BASE = drug_checker.KNOWLEDGE_BASE
+INTERACTIONS = [{
+    'drug1': row['drug1'].lower(),
+    'drug2': row['drug2'].lower(),
+    'severity': row['severity'],
+    'note': row['note']
+} for row in KNOWLEDGE_BASE.interaction_rows()]
+
+
+def linear_scan_interactions(medicines):
+    """The pre-index implementation: every pair scans the whole INTERACTIONS table"""
+    meds = [m.strip().lower() for m in medicines]
+    found_interactions = {}
+    for i in range(len(meds)):
+        for j in range(i + 1, len(meds)):
+            for entry in INTERACTIONS:
+                pair = tuple(sorted([entry['drug1'], entry['drug2']]))
+                if drug_checker.interaction_matches(meds[i], meds[j], entry['drug1'], entry['drug2']):
+                    current = found_interactions.get(pair)
+                    new_severity = drug_checker.get_severity_rank(entry['severity'])
+                    if not current or new_severity > drug_checker.get_severity_rank(current['severity']):
+                        found_interactions[pair] = entry
+    return found_interactions
+
+
+def build_regimen(size, rng):
+    """
+    Pick a regimen from drugs that appear in the interactions table so lookups
+    actually hit, padded with warning-table drugs once those run out
+    """
+    interacting = sorted({e['drug1'] for e in INTERACTIONS} | {e['drug2'] for e in INTERACTIONS})
+    regimen = rng.sample(interacting, min(size, len(interacting)))
+    if len(regimen) < size:
+        others = sorted(set(KNOWLEDGE_BASE.drug_names) - set(regimen))
+        regimen += rng.sample(others, size - len(regimen))
+    return regimen
+
+
+def time_call(func, medicines, repeat):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func(medicines)
+        elapsed = time.perf_counter() - start
+    return elapsed / repeat * 1000
+
+
+def run_benchmark(include_linear=True):
+    rng = random.Random(42)
+
+    print("⏱️ drug_checker interaction lookup benchmark")
+    print(f"   Interactions loaded: {len(INTERACTIONS)}")
+    print(f"   Indexed pairs: {len(drug_checker.INTERACTION_INDEX)}")
+    print("=" * 60)
+    print(f"{'drugs':>6} {'pairs':>8} {'indexed (ms)':>14} {'linear (ms)':>14}")
+
+    for size in REGIMEN_SIZES:
+        medicines = build_regimen(size, rng)
+        pairs = size * (size - 1) // 2
+
+        indexed_ms = time_call(drug_checker.check_interactions_and_warnings, medicines,
+                               repeat=max(1, 2000 // max(pairs, 1)))
+
+        linear_ms = None
+        # The full scan is O(pairs x rows); 200 drugs takes minutes, so cap it
+        if include_linear and size <= 50:
+            linear_ms = time_call(linear_scan_interactions, medicines, repeat=1)
+
+        linear_text = f"{linear_ms:14.2f}" if linear_ms is not None else f"{'skipped':>14}"
+        print(f"{size:>6} {pairs:>8} {indexed_ms:14.3f} {linear_text}")
+
+    # Sanity check: indexed lookup finds the same pairs as the full scan
+    medicines = build_regimen(30, rng)
+    with contextlib.redirect_stdout(io.StringIO()):
+        indexed, _ = drug_checker.check_interactions_and_warnings(medicines)
+    linear = linear_scan_interactions(medicines)
+    indexed_pairs = {drug_checker.pair_key(i['drug1'], i['drug2']) for i in indexed}
+    linear_pairs = {drug_checker.pair_key(*pair) for pair in linear}
+    status = "✅" if indexed_pairs == linear_pairs else "❌"
+    print(f"\n{status} Indexed and linear results agree on {len(indexed_pairs)} pairs")
+
+
+if __name__ == "__main__":
+    run_benchmark(include_linear='--no-linear' not in sys.argv)
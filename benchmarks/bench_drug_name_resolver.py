@@ -0,0 +1,110 @@
+"""
+Micro-benchmark for services/drug_name_resolver.DrugNameResolver
+Resolves misspelled drug names against the knowledge base and checks the
+results against the previous full scan with process.extractBests.
+"""
+
+import contextlib
+import io
+import os
+import random
+import string
+import sys
+import time
+
+from fuzzywuzzy import fuzz, process
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+with contextlib.redirect_stdout(io.StringIO()):
+    from services.drug_knowledge_base import get_knowledge_base
+    from services.drug_name_resolver import DrugNameResolver
+    DRUG_NAMES = set(get_knowledge_base().drug_names)
+
+THRESHOLD = 80
+LIMIT = 3
+QUERY_COUNT = 500
+
+
+def misspell(name, rng):
+    """Apply one or two random typos: insert, delete, substitute or swap"""
+    chars = list(name)
+    for _ in range(rng.randint(1, 2)):
+        position = rng.randrange(len(chars) + 1)
+        edit = rng.choice(('insert', 'delete', 'substitute', 'swap'))
+        if edit == 'insert':
+            chars.insert(position, rng.choice(string.ascii_lowercase))
+        elif chars and edit == 'delete':
+            del chars[min(position, len(chars) - 1)]
+        elif chars and edit == 'substitute':
+            chars[min(position, len(chars) - 1)] = rng.choice(string.ascii_lowercase)
+        elif len(chars) > 1:
+            i = min(position, len(chars) - 2)
+            chars[i], chars[i + 1] = chars[i + 1], chars[i]
+    return ''.join(chars)
+
+
+def build_queries(rng):
+    """Mostly typos of known drugs, plus unrelated strings that should not match"""
+    names = sorted(DRUG_NAMES)
+    queries = [misspell(rng.choice(names), rng) for _ in range(QUERY_COUNT * 9 // 10)]
+    while len(queries) < QUERY_COUNT:
+        queries.append(''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 14))))
+    return queries
+
+
+def full_scan(query):
+    return process.extractBests(query, DRUG_NAMES, scorer=fuzz.ratio, score_cutoff=THRESHOLD, limit=LIMIT)
+
+
+def same_matches(expected, actual):
+    """
+    Same scores in the same order, and the same names apart from ties at the
+    cutoff score (extractBests picks among those in set iteration order)
+    """
+    if [score for _, score in expected] != [score for _, score in actual]:
+        return False
+    if not expected:
+        return True
+    last_score = expected[-1][1]
+    return ({name for name, score in expected if score != last_score}
+            == {name for name, score in actual if score != last_score})
+
+
+def time_queries(func, queries):
+    start = time.perf_counter()
+    for query in queries:
+        func(query)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def run_benchmark():
+    rng = random.Random(42)
+    queries = build_queries(rng)
+
+    start = time.perf_counter()
+    resolver = DrugNameResolver(DRUG_NAMES, threshold=THRESHOLD, limit=LIMIT)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    print("⏱️ Fuzzy drug-name resolution benchmark")
+    print(f"   Drug names: {len(DRUG_NAMES)}, queries: {len(queries)}, cutoff: {THRESHOLD}")
+    print(f"   Index build: {build_ms:.1f} ms")
+    print("=" * 60)
+
+    scan_ms = time_queries(full_scan, queries)
+    resolver_ms = time_queries(resolver.resolve, queries)
+    print(f"{'extractBests (ms/query)':>28} {scan_ms:10.3f}")
+    print(f"{'resolver (ms/query)':>28} {resolver_ms:10.3f}")
+    print(f"{'speedup':>28} {scan_ms / resolver_ms:9.1f}x")
+
+    mismatches = [query for query in queries if not same_matches(full_scan(query), resolver.resolve(query))]
+    matched = sum(1 for query in queries if resolver.resolve(query))
+    status = "✅" if not mismatches else "❌"
+    print(f"\n{status} Resolver agrees with extractBests on {len(queries) - len(mismatches)}/{len(queries)} "
+          f"queries ({matched} with matches)")
+    for query in mismatches[:10]:
+        print(f"   {query!r}: expected {full_scan(query)}, got {resolver.resolve(query)}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,150 @@
+"""
+Load test for the LLM-bound endpoints: sync (gunicorn gthread) vs ASGI (uvicorn)
+Both servers talk to benchmarks/stub_llm_server.py with a fixed upstream
+latency, then N concurrent clients hit one endpoint. The sync server can
+only have workers x threads LLM calls in flight; the ASGI server awaits
+them without holding a thread.
+
+    python benchmarks/load_test_llm_routes.py --latency 1 --threads 8 --concurrency 8 32 128
+
+Needs backend/requirements-async.txt and gunicorn.
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(BENCH_DIR, '..', 'backend'))
+
+PAYLOADS = {
+    '/chatbot/chat': {"message": "Can I take ibuprofen with lisinopril?"},
+    '/ai-interactions/comprehensive-check': {"medicines": [{"name": "Aspirin", "dose": "81mg"}], "age": 40},
+    '/ai-nlp/smart-extract': {"text": "Aspirin 81mg once daily"},
+    '/ai-ocr/enhance-text': {"text": "Asprin 81mg od"},
+    '/chatbot/ask': {"context": {"medicines": [{"name": "Aspirin", "dose": "81mg"}]}},
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server at {url} did not start")
+
+
+def start_process(command, env):
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=env, start_new_session=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def stop_process(process):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=10)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+async def fire(url, payload, concurrency, timeout):
+    """Send concurrency requests at once; returns (wall seconds, latencies of 200 responses, failures)"""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+        async def one():
+            start = time.perf_counter()
+            try:
+                response = await client.post(url, json=payload)
+                return time.perf_counter() - start if response.status_code == 200 else None
+            except httpx.HTTPError:
+                return None
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one() for _ in range(concurrency)))
+        wall = time.perf_counter() - start
+    latencies = sorted(latency for latency in results if latency is not None)
+    return wall, latencies, len(results) - len(latencies)
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))] if values else float('nan')
+
+
+def run_mode(name, command, env, port, path, levels, timeout):
+    process = start_process(command, env)
+    try:
+        wait_until_up(f"http://127.0.0.1:{port}/health")
+        url = f"http://127.0.0.1:{port}{path}"
+        asyncio.run(fire(url, PAYLOADS[path], 2, timeout))  # warm-up: imports, matcher, client pool
+        rows = []
+        for concurrency in levels:
+            wall, latencies, failures = asyncio.run(fire(url, PAYLOADS[path], concurrency, timeout))
+            rows.append((name, concurrency, len(latencies) / wall, statistics.median(latencies) if latencies else float('nan'),
+                         percentile(latencies, 0.95), failures))
+        return rows
+    finally:
+        stop_process(process)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--path', default='/chatbot/chat', choices=sorted(PAYLOADS))
+    parser.add_argument('--latency', type=float, default=1.0, help="stub LLM latency in seconds")
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--threads', type=int, default=8, help="gunicorn threads per sync worker")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[8, 32, 128])
+    parser.add_argument('--timeout', type=float, default=60.0)
+    args = parser.parse_args()
+
+    stub_port, sync_port, async_port = free_port(), free_port(), free_port()
+    stub = subprocess.Popen([sys.executable, os.path.join(BENCH_DIR, 'stub_llm_server.py'), '--port', str(stub_port),
+                             '--latency', str(args.latency), '--token-delay', '0'],
+                            stdout=subprocess.DEVNULL, start_new_session=True)
+
+    env = dict(os.environ,
+               LLM_BASE_URL=f"http://127.0.0.1:{stub_port}",
+               GROQ_API_KEY='stub-key',
+               LLM_MAX_CONNECTIONS=str(max(args.concurrency) * 2),
+               LLM_MAX_RETRIES='0',
+               LLM_CACHE_SIZE='0')  # every request must reach the LLM
+
+    try:
+        rows = run_mode(
+            f"sync  ({args.workers}x{args.threads} threads)",
+            [sys.executable, '-m', 'gunicorn', 'asgi:flask_app', '--bind', f"127.0.0.1:{sync_port}",
+             '--worker-class', 'gthread', '--workers', str(args.workers), '--threads', str(args.threads),
+             '--timeout', '120', '--backlog', '2048'],
+            env, sync_port, args.path, args.concurrency, args.timeout)
+        rows += run_mode(
+            f"async ({args.workers} worker{'s' if args.workers > 1 else ''})",
+            [sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1', '--port', str(async_port),
+             '--workers', str(args.workers), '--no-access-log', '--backlog', '2048'],
+            env, async_port, args.path, args.concurrency, args.timeout)
+    finally:
+        stop_process(stub)
+
+    print(f"\n📊 POST {args.path} with {args.latency:.1f}s upstream latency")
+    print(f"{'mode':<26}{'concurrent':>11}{'req/s':>9}{'p50 s':>9}{'p95 s':>9}{'failed':>8}")
+    for name, concurrency, throughput, p50, p95, failures in rows:
+        print(f"{name:<26}{concurrency:>11}{throughput:>9.1f}{p50:>9.2f}{p95:>9.2f}{failures:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+"""
+ML inference latency: joblib models (scikit-learn / XGBoost) vs their compiled copies
+Loads one model version twice, once as trained and once through
+ml_models/compiled_models.py, and times each classifier's and vectorizer's
+single-row and batch calls plus the DoseSafeMLPredictor methods the API uses.
+Also reports the largest probability difference between the two and what a
+worker pays to load each (fresh interpreter: seconds, RSS, modules).
+
+    python benchmarks/ml_inference.py --train --repeat 200
+
+--train runs ml_models/comprehensive_trainer_fixed.py into a temporary
+directory first (it exports the compiled copies); otherwise --models-dir must
+hold a model version that has them (python ml_models/compiled_models.py).
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.abspath(os.path.join(BENCH_DIR, '..'))
+ML_DIR = os.path.join(REPO_DIR, 'ml_models')
+sys.path.append(ML_DIR)
+
+DRUGS = ['Warfarin', 'Aspirin', 'Metformin', 'Lisinopril', 'Ibuprofen',
+         'Simvastatin', 'Clopidogrel', 'Digoxin', 'Amiodarone', 'Omeprazole']
+TOKENS = ['Metformin', '500mg', 'twice', 'daily', 'Warfarin', 'Lisinopril', 'tablet', 'Atorvastatin',
+          'bedtime', 'Patient', 'Amoxicillin', 'capsule', 'morning', 'Ibuprofen', 'Sertraline', 'food']
+BATCH_ROWS = 256
+
+# Fresh interpreter: load the models as a worker would, report the cost
+LOAD_PROBE = """
+import contextlib, io, json, sys, time
+def rss_mb():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    import ml_integration
+print(json.dumps({'load_s': time.perf_counter() - start, 'rss_mb': rss_mb(), 'modules': len(sys.modules)}))
+"""
+
+
+def train_models(work_dir):
+    """Run the trainer as it expects to be run (data in ../data), return the models dir"""
+    os.symlink(os.path.join(REPO_DIR, 'data'), os.path.join(work_dir, 'data'))
+    train_dir = os.path.join(work_dir, 'train')
+    os.makedirs(train_dir)
+    print("🏋️ Training models into a temporary directory...")
+    subprocess.run([sys.executable, os.path.join(ML_DIR, 'comprehensive_trainer_fixed.py')],
+                   cwd=train_dir, check=True, stdout=subprocess.DEVNULL)
+    return os.path.join(train_dir, 'models')
+
+
+def timed(call, repeat):
+    """Median seconds per call"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def load_cost(models_dir, compiled):
+    env = dict(os.environ, ML_MODELS_DIR=models_dir, ML_COMPILED_MODELS='1' if compiled else '0')
+    completed = subprocess.run([sys.executable, '-c', LOAD_PROBE], cwd=ML_DIR, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def format_time(seconds):
+    return f"{seconds * 1e6:.0f}us" if seconds < 1e-3 else f"{seconds * 1e3:.2f}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--models-dir', default=os.path.join(ML_DIR, 'models'))
+    parser.add_argument('--train', action='store_true', help="train the models into a temporary directory first")
+    parser.add_argument('--repeat', type=int, default=100, help="calls per measurement; the median is reported")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='ml_inference_')
+    try:
+        models_dir = train_models(work_dir) if args.train else os.path.abspath(args.models_dir)
+        os.environ['ML_MODELS_DIR'] = models_dir
+        os.environ['MODEL_REGISTRY_POLL_SECONDS'] = '0'
+        with contextlib.redirect_stdout(io.StringIO()):
+            import ml_integration
+            ml_integration.ML_COMPILED_MODELS = False
+            original = ml_integration.DoseSafeMLPredictor()
+            ml_integration.ML_COMPILED_MODELS = True
+            compiled = ml_integration.DoseSafeMLPredictor()
+        if not compiled.get_model_status()['compiled']:
+            print(f"❌ No compiled models in {compiled.models_dir}; run ml_models/compiled_models.py or use --train")
+            return
+
+        rng = np.random.default_rng(0)
+        rows = []
+
+        # Inputs built the way DoseSafeMLPredictor builds them
+        pairs = [(DRUGS[i], DRUGS[j]) for i in range(len(DRUGS)) for j in range(i + 1, len(DRUGS))]
+        interaction_X = original._interaction_features(pairs * (BATCH_ROWS // len(pairs) + 1))[:BATCH_ROWS]
+        token_X = original.vectorizers['medicine_text'].transform((TOKENS * (BATCH_ROWS // len(TOKENS) + 1))[:BATCH_ROWS])
+        age_drugs = original.vectorizers['warning_drug'].transform((DRUGS * (BATCH_ROWS // len(DRUGS) + 1))[:BATCH_ROWS])
+        age_X = np.hstack([age_drugs.toarray(), rng.integers(0, len(original.encoders['age_group'].classes_), (BATCH_ROWS, 1))])
+        inputs = {
+            'interaction_classifier': interaction_X,
+            'severity_classifier': interaction_X,
+            'medicine_extractor': token_X,
+            'age_warning_classifier': age_X,
+        }
+
+        for name, X in inputs.items():
+            if name not in compiled.models:
+                continue
+            models = {'joblib': original.models[name], 'compiled': compiled.models[name]}
+            batch = {kind: original._model_input(model, X) if name != 'medicine_extractor' else X
+                     for kind, model in models.items()}
+            single = {kind: X[:1] for kind, X in batch.items()}
+            difference = np.abs(models['joblib'].predict_proba(batch['joblib']) -
+                                models['compiled'].predict_proba(batch['compiled'])).max()
+            for label, data, repeat in (('1 row', single, args.repeat), (f'{BATCH_ROWS} rows', batch, max(args.repeat // 10, 5))):
+                rows.append((f"{name} predict_proba", label,
+                             *(timed(lambda: models[kind].predict_proba(data[kind]), repeat) for kind in models),
+                             difference))
+
+        texts = {'interaction_text': ['warfarin aspirin'], 'medicine_text': ['Metformin'], 'warning_drug': ['Warfarin']}
+        for name, sample in texts.items():
+            vectorizers = {'joblib': original.vectorizers[name], 'compiled': compiled.vectorizers[name]}
+            documents = (sample * BATCH_ROWS) if name != 'medicine_text' else (TOKENS * (BATCH_ROWS // len(TOKENS)))
+            difference = abs(vectorizers['joblib'].transform(documents) - vectorizers['compiled'].transform(documents)).max()
+            for label, data, repeat in (('1 row', sample, args.repeat), (f'{BATCH_ROWS} rows', documents, max(args.repeat // 10, 5))):
+                rows.append((f"{name} transform", label,
+                             *(timed(lambda: vectorizers[kind].transform(data), repeat) for kind in vectorizers),
+                             difference))
+
+        def classify(predictor):
+            predictor.token_cache.clear()
+            return predictor._classify_tokens(TOKENS)
+
+        calls = [
+            ('check_drug_interactions', '1 pair', lambda predictor: predictor.check_drug_interactions('Warfarin', 'Aspirin')),
+            ('check_interactions_batch', f'{len(pairs)} pairs', lambda predictor: predictor.check_interactions_batch(DRUGS)),
+            ('check_age_warnings', '1 drug', lambda predictor: predictor.check_age_warnings('Warfarin', 'Elderly')),
+            ('_classify_tokens (uncached)', f'{len(TOKENS)} tokens', classify),
+        ]
+        with contextlib.redirect_stdout(io.StringIO()):
+            for name, label, call in calls:
+                timings = [timed(lambda: call(predictor), args.repeat) for predictor in (original, compiled)]
+                rows.append((f"DoseSafeMLPredictor.{name}", label, *timings, None))
+
+        loads = {}
+        for kind, flag in (('joblib', False), ('compiled', True)):
+            try:
+                loads[kind] = load_cost(models_dir, flag)
+            except RuntimeError as error:
+                print(f"❌ Loading {kind} models: {error}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"\n⚡ ML inference, median of {args.repeat} calls (batches: {max(args.repeat // 10, 5)})")
+    print(f"{'call':<48}{'input':>11}{'joblib':>11}{'compiled':>11}{'speedup':>9}{'max |diff|':>12}")
+    for name, label, joblib_s, compiled_s, difference in rows:
+        diff = f"{difference:.1e}" if difference is not None else '-'
+        print(f"{name:<48}{label:>11}{format_time(joblib_s):>11}{format_time(compiled_s):>11}"
+              f"{joblib_s / compiled_s:>8.1f}x{diff:>12}")
+
+    if loads:
+        print("\n📦 Loading the models in a fresh interpreter")
+        print(f"{'models':<10}{'load s':>8}{'RSS MB':>8}{'modules':>9}")
+        for kind, cost in loads.items():
+            print(f"{kind:<10}{cost['load_s']:>8.2f}{cost['rss_mb']:>8.0f}{cost['modules']:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+OCR preprocessing benchmark: latency vs extraction accuracy
+Builds a fixture set of synthetic prescription photos (12 MP, paper on a
+cluttered background, uneven light, sensor noise) with known text, then
+OCRs each one:
+
+  full frame   - the uploaded image as is (what the routes used to do)
+  prepared     - services/image_preprocess.prepare_for_ocr: text region
+                 cropped and rescaled to the target line height
+
+Accuracy is character similarity to the ground truth and the share of
+drug names read correctly. With OpenCV installed it also times
+ocr_service.preprocess_image (denoise + threshold) on both frames.
+
+    python benchmarks/ocr_preprocess_accuracy.py --fixtures 6 --targets 28 36 48
+
+Needs Pillow, numpy and tesserocr (or pytesseract with a tesseract binary).
+"""
+
+import argparse
+import difflib
+import os
+import random
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.append(BACKEND_DIR)
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+from services.image_preprocess import prepare_for_ocr
+from services.ocr_engine import OCREngine, detect_backend
+
+DRUGS = ["Metformin", "Lisinopril", "Atorvastatin", "Amoxicillin", "Omeprazole", "Amlodipine",
+         "Warfarin", "Sertraline", "Levothyroxine", "Gabapentin", "Losartan", "Prednisone"]
+DOSES = ["5mg", "10mg", "20mg", "50mg", "250mg", "500mg", "1000mg"]
+DIRECTIONS = ["once daily", "twice daily", "three times daily", "at bedtime", "every 8 hours", "as needed"]
+
+
+def make_fixture(seed, size=(4000, 3000)):
+    """One synthetic prescription photo and its ground-truth lines"""
+    rng = random.Random(seed)
+    width, height = size
+
+    # Cluttered, unevenly lit background
+    gradient = np.linspace(60, 140, width, dtype=np.float32)[None, :] * np.linspace(0.7, 1.1, height, dtype=np.float32)[:, None]
+    photo = Image.fromarray(np.clip(gradient, 0, 255).astype(np.uint8)).convert('RGB')
+
+    # Paper sheet covering part of the frame
+    paper_width, paper_height = int(width * rng.uniform(0.45, 0.6)), int(height * rng.uniform(0.6, 0.8))
+    paper_left, paper_top = rng.randint(150, width - paper_width - 150), rng.randint(100, height - paper_height - 100)
+    paper = Image.new('RGB', (paper_width, paper_height), (245, 243, 236))
+    draw = ImageDraw.Draw(paper)
+
+    font_size = rng.choice([44, 52, 60, 72])
+    font = ImageFont.load_default(size=font_size)
+    title_font = ImageFont.load_default(size=int(font_size * 1.3))
+    lines = ["Rx - City Health Clinic", f"Patient age: {rng.randint(18, 90)}"]
+    for _ in range(rng.randint(4, 7)):
+        lines.append(f"{rng.choice(DRUGS)} {rng.choice(DOSES)} {rng.choice(DIRECTIONS)}")
+
+    y = int(paper_height * 0.08)
+    for index, line in enumerate(lines):
+        draw.text((int(paper_width * 0.08), y), line, fill=(25, 25, 35), font=title_font if index == 0 else font)
+        y += int(font_size * 1.8)
+
+    photo.paste(paper.rotate(rng.uniform(-1.0, 1.0), expand=False, fillcolor=(245, 243, 236)), (paper_left, paper_top))
+
+    # Sensor noise and a little blur
+    pixels = np.asarray(photo, dtype=np.int16)
+    noise = np.random.default_rng(seed).normal(0, 6, pixels.shape).astype(np.int16)
+    photo = Image.fromarray(np.clip(pixels + noise, 0, 255).astype(np.uint8)).filter(ImageFilter.GaussianBlur(0.8))
+    return photo, lines
+
+
+def normalize(text):
+    return ' '.join(text.lower().split())
+
+
+def score(text, lines):
+    """(character similarity, share of drug lines whose drug name was read)"""
+    similarity = difflib.SequenceMatcher(None, normalize(text), normalize('\n'.join(lines))).ratio()
+    drug_lines = [line for line in lines if line.split()[0] in DRUGS]
+    found = sum(1 for line in drug_lines if line.split()[0].lower() in text.lower())
+    return similarity, found / len(drug_lines)
+
+
+def run_mode(engine, fixtures, prepare):
+    latencies, similarities, recalls = [], [], []
+    for photo, lines in fixtures:
+        start = time.perf_counter()
+        page = prepare(photo) if prepare else photo
+        text = engine.image_to_string(page, psm=3, timeout=None)
+        latencies.append(time.perf_counter() - start)
+        similarity, recall = score(text, lines)
+        similarities.append(similarity)
+        recalls.append(recall)
+    return statistics.mean(latencies), statistics.mean(similarities), statistics.mean(recalls)
+
+
+def time_denoise(fixtures, target):
+    """ocr_service.preprocess_image on the full frame vs the prepared frame, if OpenCV is installed"""
+    try:
+        from services.ocr_service import preprocess_image
+    except ImportError:
+        return None
+    photo = fixtures[0][0]
+    start = time.perf_counter()
+    preprocess_image(photo, prepare=False)
+    full = time.perf_counter() - start
+    start = time.perf_counter()
+    preprocess_image(photo)
+    prepared = time.perf_counter() - start
+    return full, prepared
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--fixtures', type=int, default=6)
+    parser.add_argument('--targets', type=int, nargs='+', default=[28, 36, 48], help="target text line heights (px)")
+    parser.add_argument('--save', metavar='DIR', help="also write the fixture images here")
+    args = parser.parse_args()
+
+    backend = detect_backend()
+    if backend is None:
+        sys.exit("❌ Tesseract is not installed")
+    engine = OCREngine(backend=backend, workers=1)
+
+    fixtures = [make_fixture(seed) for seed in range(args.fixtures)]
+    if args.save:
+        os.makedirs(args.save, exist_ok=True)
+        for seed, (photo, lines) in enumerate(fixtures):
+            photo.save(os.path.join(args.save, f"prescription_{seed}.jpg"), quality=90)
+            with open(os.path.join(args.save, f"prescription_{seed}.txt"), 'w') as truth:
+                truth.write('\n'.join(lines) + '\n')
+
+    rows = [("full frame", *run_mode(engine, fixtures, None))]
+    for target in args.targets:
+        rows.append((f"prepared (lines {target}px)",
+                     *run_mode(engine, fixtures, lambda photo: prepare_for_ocr(photo, target_text_height=target)[0])))
+
+    width, height = fixtures[0][0].size
+    print(f"\n📊 {len(fixtures)} synthetic prescriptions at {width}x{height} ({width * height / 1e6:.0f} MP), {backend.name}")
+    print(f"{'mode':<26}{'s/image':>9}{'char sim':>10}{'drug recall':>13}")
+    for name, latency, similarity, recall in rows:
+        print(f"{name:<26}{latency:>9.2f}{similarity:>10.3f}{recall:>13.2f}")
+
+    denoise = time_denoise(fixtures, args.targets[0])
+    if denoise:
+        print(f"\n🧹 preprocess_image (denoise + threshold): full frame {denoise[0]:.2f}s, prepared {denoise[1]:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+OCR throughput benchmark: per-call Tesseract vs the shared warm OCR engine
+Renders synthetic prescription pages and OCRs them at a fixed CPU budget:
+
+  per-call  - what routes did before: a fresh Tesseract per page
+              (pytesseract + tesseract binary, or a new tesserocr API when
+              there is no binary), one thread per concurrent request
+  engine    - backend/services/ocr_engine.py: `workers` long-lived workers,
+              each keeping its Tesseract API initialised
+
+    python benchmarks/ocr_throughput.py --pages 24 --workers 1 2 4 --cpus 2
+
+Needs Pillow and tesserocr (or pytesseract with a tesseract binary).
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.append(BACKEND_DIR)
+
+from PIL import Image, ImageDraw, ImageFont
+
+from services.ocr_engine import OCREngine, detect_backend, resolve_tesseract_cmd
+
+PRESCRIPTION_LINES = [
+    "Metformin 500mg tablet twice daily with meals",
+    "Lisinopril 10mg tablet once daily in the morning",
+    "Atorvastatin 20mg tablet at bedtime",
+    "Aspirin 81mg tablet once daily",
+    "Amoxicillin 500mg capsule three times daily for 7 days",
+]
+
+
+def render_page(index, width=1240, height=1754, lines=20):
+    """A4 page at 150 dpi with numbered prescription lines"""
+    page = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(page)
+    font = ImageFont.load_default(size=30)
+    for line in range(lines):
+        text = f"{line + 1}. {PRESCRIPTION_LINES[(index + line) % len(PRESCRIPTION_LINES)]}"
+        draw.text((80, 80 + line * 80), text, fill='black', font=font)
+    return page
+
+
+def per_call_recognizer():
+    """Fresh Tesseract for every page, like the routes used to do"""
+    tesseract_cmd = resolve_tesseract_cmd()
+    if tesseract_cmd:
+        import pytesseract
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+        return 'pytesseract', lambda page: pytesseract.image_to_string(page, config='--oem 3 --psm 6')
+    import tesserocr
+    return 'tesserocr, new API per page', lambda page: tesserocr.image_to_text(page, psm=tesserocr.PSM.SINGLE_BLOCK)
+
+
+def run_per_call(pages, concurrency):
+    _, recognize = per_call_recognizer()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as requests:
+        texts = list(requests.map(recognize, pages))
+    return time.perf_counter() - start, texts
+
+
+def run_engine(pages, workers):
+    engine = OCREngine(backend=detect_backend(), workers=workers, queue_size=len(pages))
+    engine.image_to_string(pages[0], psm=6)  # warm the first worker like a running server
+    start = time.perf_counter()
+    futures = [engine.submit(page, psm=6) for page in pages]
+    texts = [future.result() for future in futures]
+    return time.perf_counter() - start, texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=24)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4],
+                        help="engine workers / concurrent per-call requests")
+    parser.add_argument('--cpus', type=int, default=None, help="pin the benchmark to this many CPUs")
+    args = parser.parse_args()
+
+    if args.cpus and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, sorted(os.sched_getaffinity(0))[:args.cpus])
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+
+    if detect_backend() is None:
+        sys.exit("❌ Tesseract is not installed")
+
+    pages = [render_page(index) for index in range(args.pages)]
+    per_call_name, _ = per_call_recognizer()
+    rows = []
+    for workers in args.workers:
+        elapsed, baseline = run_per_call(pages, workers)
+        rows.append((f"per-call ({per_call_name})", workers, elapsed))
+        elapsed, texts = run_engine(pages, workers)
+        rows.append(("engine (warm workers)", workers, elapsed))
+        if texts != baseline:
+            print(f"⚠️ Text differs between modes at {workers} workers")
+
+    print(f"\n📊 {args.pages} pages of {pages[0].size[0]}x{pages[0].size[1]} on {cpus} CPU(s)")
+    print(f"{'mode':<42}{'workers':>8}{'pages/s':>10}{'ms/page':>10}")
+    for name, workers, elapsed in rows:
+        print(f"{name:<42}{workers:>8}{args.pages / elapsed:>10.2f}{elapsed * 1000 / args.pages:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Worker cold start: import time and RSS of backend/app.py per blueprint
+Each row is a fresh interpreter that imports app.py and registers one
+blueprint (as app_backup.py / asgi.py do), so the numbers are what a
+gunicorn worker pays before serving its first request. With --warm it also
+runs services/lazy_resource.warm_up() (the optional preload / post_fork
+hook) and reports what loading everything up front costs.
+
+    python benchmarks/startup_import.py --repeat 3 --warm
+
+Linux only (RSS is read from /proc/self/status).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(BENCH_DIR, '..', 'backend'))
+
+# name -> (module, blueprint attribute, url prefix)
+BLUEPRINTS = {
+    'chatbot': ('routes.chatbot', 'chatbot_bp', '/chatbot'),
+    'ai_interactions': ('routes.ai_interactions', 'ai_interactions_bp', '/ai-interactions'),
+    'ai_nlp': ('routes.ai_nlp', 'ai_nlp_bp', '/ai-nlp'),
+    'ai_ocr': ('routes.ai_ocr', 'ai_ocr_bp', '/ai-ocr'),
+    'ai_only_ocr': ('routes.ai_only_ocr', 'ai_only_ocr_bp', '/ai-only-ocr'),
+    'ocr': ('routes.ocr', 'ocr_bp', '/ocr'),
+    'nlp': ('routes.nlp', 'nlp_bp', '/nlp'),
+    'interaction': ('routes.interaction', 'interaction_bp', '/interaction'),
+}
+
+CHILD = """
+import contextlib, importlib, io, json, sys, time
+
+def rss_mb():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+
+blueprints, warm = json.loads(sys.argv[1]), sys.argv[2] == '1'
+result = {'base_rss_mb': rss_mb()}
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    import app
+    for module, attribute, prefix in blueprints:
+        app.app.register_blueprint(getattr(importlib.import_module(module), attribute), url_prefix=prefix)
+result.update(import_s=time.perf_counter() - start, rss_mb=rss_mb(), modules=len(sys.modules))
+
+if warm:
+    try:
+        from services.lazy_resource import warm_up
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            warm_up()
+        result.update(warm_s=time.perf_counter() - start, warm_rss_mb=rss_mb())
+    except ImportError:
+        pass
+print(json.dumps(result))
+"""
+
+
+def measure(blueprints, warm):
+    completed = subprocess.run(
+        [sys.executable, '-c', CHILD, json.dumps(blueprints), '1' if warm else '0'],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3, help="runs per row; the median is reported")
+    parser.add_argument('--warm', action='store_true', help="also time warm_up() after the imports")
+    parser.add_argument('--blueprints', nargs='+', choices=sorted(BLUEPRINTS), default=list(BLUEPRINTS))
+    args = parser.parse_args()
+
+    rows = [('app.py only', [])]
+    rows += [(f"+ {name}", [BLUEPRINTS[name]]) for name in args.blueprints]
+    rows.append(('+ all of the above', [BLUEPRINTS[name] for name in args.blueprints]))
+
+    header = f"{'app.py':<22}{'import s':>10}{'RSS MB':>9}{'modules':>9}"
+    if args.warm:
+        header += f"{'warm-up s':>11}{'warm RSS MB':>13}"
+    print(f"\n🚀 Worker cold start, median of {args.repeat} ({sys.executable})")
+    print(header)
+    for label, blueprints in rows:
+        try:
+            runs = [measure(blueprints, args.warm) for _ in range(args.repeat)]
+        except RuntimeError as error:
+            print(f"{label:<22}❌ {error}")
+            continue
+        median = lambda key: statistics.median(run[key] for run in runs) if all(key in run for run in runs) else None
+        line = f"{label:<22}{median('import_s'):>10.2f}{median('rss_mb'):>9.0f}{median('modules'):>9.0f}"
+        if args.warm:
+            warm_s, warm_rss = median('warm_s'), median('warm_rss_mb')
+            line += f"{warm_s:>11.2f}{warm_rss:>13.0f}" if warm_s is not None else f"{'n/a':>11}{'n/a':>13}"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
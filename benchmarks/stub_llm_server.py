@@ -0,0 +1,151 @@
+"""
+Local stand-in for the Groq chat completions API, used by the LLM gateway
+tests and load tests. Serves POST .../chat/completions (plain and
+stream=True) with configurable latency and injected failures.
+
+Run standalone:  python benchmarks/stub_llm_server.py --port 8900 --latency 2
+then point the backend at it with LLM_BASE_URL=http://127.0.0.1:8900 and
+any GROQ_API_KEY.
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = ('{"medicines": [{"name": "Aspirin", "dose": "81mg"}], '
+                 '"drug_drug_interactions": [], "age_related_warnings": []}')
+
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+
+        if not self.path.endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': f'unknown path {self.path}'}})
+            return
+
+        with server.lock:
+            server.requests += 1
+            fail = server.fail_next > 0
+            if fail:
+                server.fail_next -= 1
+
+        if server.latency:
+            time.sleep(server.latency)
+
+        if fail:
+            self._send_json(server.fail_status, {'error': {'message': 'injected failure', 'type': 'server_error'}})
+            return
+
+        reply = server.reply
+        model = request.get('model', 'stub')
+        if request.get('stream'):
+            self._stream(reply, model)
+            return
+
+        # A real model spends the same generation time whether or not it streams
+        if server.token_delay:
+            time.sleep(server.token_delay * len(reply.split(' ')))
+
+        self._send_json(200, {
+            'id': 'chatcmpl-stub',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': reply},
+                'finish_reason': 'stop'
+            }],
+            'usage': {'prompt_tokens': 1, 'completion_tokens': 1, 'total_tokens': 2}
+        })
+
+    def _stream(self, reply, model):
+        """Send the reply word by word as OpenAI-style SSE chunks"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        words = reply.split(' ')
+        for index, word in enumerate(words):
+            chunk = {
+                'id': 'chatcmpl-stub',
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{
+                    'index': 0,
+                    'delta': {'content': word if index == 0 else ' ' + word},
+                    'finish_reason': None
+                }]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+            if self.server.token_delay:
+                time.sleep(self.server.token_delay)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+class StubLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, latency=0.0, reply=DEFAULT_REPLY, token_delay=0.0):
+        super().__init__(address, StubLLMHandler)
+        self.latency = latency          # seconds before answering
+        self.token_delay = token_delay  # seconds per generated word (between streamed chunks)
+        self.reply = reply
+        self.fail_next = 0              # answer this many requests with fail_status
+        self.fail_status = 503
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def handle_error(self, request, client_address):
+        # Clients that hit their own deadline hang up mid-response; that is expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_stub_server(port=0, **options):
+    """Start a stub server on a background thread; returns the server"""
+    server = StubLLMServer(('127.0.0.1', port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--latency', type=float, default=2.0)
+    parser.add_argument('--token-delay', type=float, default=0.05)
+    args = parser.parse_args()
+
+    server = StubLLMServer(('127.0.0.1', args.port), latency=args.latency, token_delay=args.token_delay)
+    print(f"🧪 Stub LLM listening on {server.base_url} (latency {args.latency}s)")
+    server.serve_forever()
@@ -0,0 +1,188 @@
+"""
+Per-worker memory of the ML models under gunicorn: load per worker vs preload
+Starts gunicorn (backend/gunicorn.conf.py) with N sync workers serving the
+/ai-only-ocr blueprint and WARMUP=ml_integration, in three modes:
+
+    per-worker      every worker imports scikit-learn/xgboost and loads the models
+    preload         loaded once in the master (GUNICORN_PRELOAD=1), shared by fork
+    preload + mmap  as above, numpy arrays memory-mapped from the joblib files
+
+then sends text scans (ML medicine extraction) so every worker has used the
+models, and reads each worker's RSS, PSS and private memory from
+/proc/<pid>/smaps_rollup. RSS counts shared pages in full in every worker;
+PSS splits them between the processes sharing them, private is what the
+worker alone holds, i.e. what each extra worker really costs.
+
+    python benchmarks/worker_memory.py --workers 4 --train
+
+--train runs ml_models/comprehensive_trainer_fixed.py into a temporary
+directory first; otherwise --models-dir must hold trained models (a model
+registry, or bare .joblib files).
+Linux only; needs gunicorn.
+"""
+
+import argparse
+import concurrent.futures
+import os
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.abspath(os.path.join(BENCH_DIR, '..'))
+BACKEND_DIR = os.path.join(REPO_DIR, 'backend')
+ML_DIR = os.path.join(REPO_DIR, 'ml_models')
+
+# WSGI module for gunicorn: app.py plus the blueprint that uses the ML models
+APP_MODULE = """
+from app import app
+from routes.ai_only_ocr import ai_only_ocr_bp
+app.register_blueprint(ai_only_ocr_bp, url_prefix='/ai-only-ocr')
+"""
+
+PRESCRIPTION = (b"Dr. Sarah Johnson, City Hospital\nPatient: John Smith  Date: 2024-01-15\n"
+                b"Metformin 500mg twice daily\nWarfarin 5mg once daily\nAspirin 81mg daily\n"
+                b"Lisinopril 10mg once daily\n")
+
+MODES = {
+    'per-worker': {'GUNICORN_PRELOAD': '0', 'ML_MMAP_MODE': ''},
+    'preload': {'GUNICORN_PRELOAD': '1', 'ML_MMAP_MODE': ''},
+    'preload + mmap': {'GUNICORN_PRELOAD': '1', 'ML_MMAP_MODE': 'r'},
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def train_models(work_dir):
+    """Run the trainer as it expects to be run (data in ../data), return the models dir"""
+    os.symlink(os.path.join(REPO_DIR, 'data'), os.path.join(work_dir, 'data'))
+    train_dir = os.path.join(work_dir, 'train')
+    os.makedirs(train_dir)
+    print("🏋️ Training models into a temporary directory...")
+    subprocess.run([sys.executable, os.path.join(ML_DIR, 'comprehensive_trainer_fixed.py')],
+                   cwd=train_dir, check=True, stdout=subprocess.DEVNULL)
+    return os.path.join(train_dir, 'models')
+
+
+def children(pid):
+    """PIDs whose parent is pid (the gunicorn workers)"""
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as stat:
+                fields = stat.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            pids.append(int(entry))
+    return pids
+
+
+def memory_mb(pid):
+    """RSS, PSS and private (clean + dirty) memory of a process, in MB"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as rollup:
+        for line in rollup:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return {'rss': values['Rss'], 'pss': values['Pss'],
+            'private': values['Private_Clean'] + values['Private_Dirty']}
+
+
+def wait_for_workers(process, url, workers, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("gunicorn exited during startup")
+        try:
+            httpx.get(url, timeout=1)
+            if len(children(process.pid)) == workers:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"gunicorn at {url} did not start")
+
+
+def scan(url):
+    files = {'file': ('prescription.txt', PRESCRIPTION, 'text/plain')}
+    return httpx.post(url, files=files, timeout=60).status_code
+
+
+def run_mode(name, settings, args, models_dir, app_dir):
+    port = free_port()
+    env = dict(os.environ, WARMUP='ml_integration', ML_MODELS_DIR=models_dir,
+               GROQ_API_KEY='', PYTHONPATH=app_dir, **settings)
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'bench_ml_app:app', '--bind', f"127.0.0.1:{port}",
+         '--workers', str(args.workers), '--timeout', '120'],
+        cwd=BACKEND_DIR, env=env, start_new_session=True,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        base = f"http://127.0.0.1:{port}"
+        wait_for_workers(process, f"{base}/health", args.workers, args.timeout)
+        # Concurrent requests, so they spread over the workers
+        with concurrent.futures.ThreadPoolExecutor(args.workers) as pool:
+            statuses = list(pool.map(scan, [f"{base}/ai-only-ocr/ai-scan"] * args.requests))
+        failed = sum(status != 200 for status in statuses)
+        time.sleep(1)
+        workers = [memory_mb(pid) for pid in children(process.pid)]
+        master = memory_mb(process.pid)
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=30)
+
+    median = lambda key: statistics.median(worker[key] for worker in workers)
+    return (name, median('rss'), median('pss'), median('private'), master['pss'],
+            master['pss'] + sum(worker['pss'] for worker in workers), failed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=32, help="text scans sent before measuring")
+    parser.add_argument('--models-dir', default=os.path.join(ML_DIR, 'models'))
+    parser.add_argument('--train', action='store_true', help="train the models into a temporary directory first")
+    parser.add_argument('--timeout', type=float, default=120.0, help="seconds to wait for gunicorn to start")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='worker_memory_')
+    try:
+        models_dir = train_models(work_dir) if args.train else os.path.abspath(args.models_dir)
+        if not any(name.endswith('.joblib') or name == 'registry.json' for name in os.listdir(models_dir)):
+            print(f"❌ No trained models in {models_dir}; run with --train")
+            return
+        with open(os.path.join(work_dir, 'bench_ml_app.py'), 'w') as module:
+            module.write(APP_MODULE)
+
+        rows = []
+        for name, settings in MODES.items():
+            try:
+                rows.append(run_mode(name, settings, args, models_dir, work_dir))
+            except RuntimeError as error:
+                print(f"❌ {name}: {error}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"\n🧠 {args.workers} gunicorn workers with the ML models loaded, MB (worker columns are medians)")
+    print(f"{'mode':<18}{'worker RSS':>12}{'worker PSS':>12}{'private':>9}{'master PSS':>12}{'total PSS':>11}{'failed':>8}")
+    for name, rss, pss, private, master, total, failed in rows:
+        print(f"{name:<18}{rss:>12.0f}{pss:>12.1f}{private:>9.1f}{master:>12.1f}{total:>11.0f}{failed:>8}")
+
+
+if __name__ == '__main__':
+    main()
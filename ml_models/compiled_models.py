@@ -0,0 +1,354 @@
+"""
+Compiled Models for DoseSafe-AI
+Lean inference copies of the trained classifiers, vectorizers and encoders
+
+scikit-learn's and XGBoost's predict_proba carry a lot of fixed cost per call
+(input validation, DMatrix construction, a thread pool over 100-200 trees),
+which dominates when ml_integration scores one drug pair or a handful of OCR
+tokens. Here each artifact is flattened into plain numpy arrays:
+
+    CompiledTreeEnsemble   all trees of a RandomForest or binary XGBoost model
+                           in one node table, evaluated level by level for all
+                           rows and trees at once
+    CompiledVectorizer     TF-IDF vocabulary, idf weights and the word/char
+                           n-gram analyzer
+    CompiledLabelEncoder   the classes, for transform / inverse_transform
+
+They need only numpy and scipy to load (no sklearn or xgboost import in the
+workers) and are saved next to the originals as <name>.compiled.joblib, where
+DoseSafeMLPredictor prefers them (ML_COMPILED_MODELS). Every export is checked
+against the original on sample inputs and skipped if they disagree.
+
+    python compiled_models.py --models-dir models
+
+compiles the active registry version and publishes the result as a new version.
+"""
+
+import os
+import re
+import sys
+import shutil
+import argparse
+import tempfile
+from collections import Counter
+
+import joblib
+import numpy as np
+from scipy import sparse
+
+COMPILED_SUFFIX = '.compiled.joblib'
+# Compiled and original predict_proba may differ by float rounding, nothing more
+PROBABILITY_TOLERANCE = 1e-5
+
+_white_spaces = re.compile(r"\s\s+")
+
+
+def compiled_path(path):
+    """models/x.joblib -> models/x.compiled.joblib"""
+    return path[:-len('.joblib')] + COMPILED_SUFFIX
+
+
+class CompiledTreeEnsemble:
+    """
+    Trees flattened into one node table. Leaves point at themselves, so
+    walking every (row, tree) pair max_depth steps lands each on its leaf
+    without per-node branching in Python.
+    """
+
+    def __init__(self, trees, n_features, classes, kind, base_margin=0.0):
+        # trees: dicts of per-node arrays (feature, threshold, left, right, default_left, value)
+        offsets = np.cumsum([0] + [len(tree['feature']) for tree in trees])
+        self.roots = offsets[:-1].astype(np.int32)
+        self.feature = np.concatenate([tree['feature'] for tree in trees]).astype(np.int32)
+        self.threshold = np.concatenate([tree['threshold'] for tree in trees])
+        left = np.concatenate([tree['left'] + offset for tree, offset in zip(trees, offsets)])
+        right = np.concatenate([tree['right'] + offset for tree, offset in zip(trees, offsets)])
+        self.children = np.column_stack([left, right]).ravel().astype(np.int32)  # node i: [2i] left, [2i+1] right
+        self.default_left = np.concatenate([tree['default_left'] for tree in trees]).astype(bool)
+        self.value = np.concatenate([tree['value'] for tree in trees])
+        self.depth = max(tree['depth'] for tree in trees)
+        self.n_features_in_ = n_features
+        self.classes_ = np.asarray(classes)
+        self.kind = kind  # 'random_forest': mean of leaf class fractions; 'xgboost': sigmoid of summed margins
+        self.base_margin = base_margin
+        # XGBoost reads entries absent from a sparse matrix as missing, scikit-learn as 0
+        self.absent_is_missing = kind == 'xgboost'
+
+    def _dense(self, X):
+        if sparse.issparse(X):
+            if not self.absent_is_missing:
+                return X.toarray().astype(np.float32)
+            X = X.tocsr()
+            dense = np.full(X.shape, np.nan, dtype=np.float32)
+            rows = np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))
+            dense[rows, X.indices] = X.data
+            return dense
+        return np.asarray(X, dtype=np.float32)
+
+    def _leaf_values(self, X):
+        X = self._dense(X)
+        features = X.ravel()
+        row_starts = (np.arange(X.shape[0]) * X.shape[1])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], len(self.roots)))
+        has_missing = np.isnan(features).any()
+        for _ in range(self.depth):
+            x = features.take(row_starts + self.feature.take(nodes))
+            threshold = self.threshold.take(nodes)
+            # Both libraries compare float32 features; XGBoost splits on <, scikit-learn on <=
+            go_right = x >= threshold if self.kind == 'xgboost' else x > threshold
+            if has_missing:
+                go_right = np.where(np.isnan(x), ~self.default_left.take(nodes), go_right)
+            nodes = self.children.take(2 * nodes + go_right)
+        return self.value.take(nodes, axis=0)  # (rows, trees, outputs)
+
+    def predict_proba(self, X):
+        values = self._leaf_values(X)
+        if self.kind == 'xgboost':
+            margin = values[:, :, 0].sum(axis=1, dtype=np.float32) + np.float32(self.base_margin)
+            positive = 1.0 / (1.0 + np.exp(-margin.astype(np.float64)))
+            return np.column_stack([1.0 - positive, positive])
+        return values.sum(axis=1) / len(self.roots)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+class CompiledVectorizer:
+    """TfidfVectorizer.transform for the word and char analyzers, without scikit-learn"""
+
+    def __init__(self, vocabulary, idf, analyzer, ngram_range, lowercase, token_pattern, norm):
+        self.vocabulary_ = dict(vocabulary)
+        self.idf_ = np.asarray(idf, dtype=np.float64)
+        self.analyzer = analyzer
+        self.ngram_range = tuple(ngram_range)
+        self.lowercase = lowercase
+        self.token_pattern = token_pattern
+        self.norm = norm
+        self._token_re = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_token_re'] = None
+        return state
+
+    def _word_ngrams(self, text):
+        if self._token_re is None:
+            self._token_re = re.compile(self.token_pattern)
+        tokens = self._token_re.findall(text)
+        min_n, max_n = self.ngram_range
+        ngrams = list(tokens) if min_n == 1 else []
+        for n in range(max(min_n, 2), min(max_n, len(tokens)) + 1):
+            ngrams.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return ngrams
+
+    def _char_ngrams(self, text):
+        text = _white_spaces.sub(" ", text)
+        min_n, max_n = self.ngram_range
+        ngrams = list(text) if min_n == 1 else []
+        for n in range(max(min_n, 2), min(max_n, len(text)) + 1):
+            ngrams.extend(text[i:i + n] for i in range(len(text) - n + 1))
+        return ngrams
+
+    def analyze(self, text):
+        if self.lowercase:
+            text = text.lower()
+        return self._char_ngrams(text) if self.analyzer == 'char' else self._word_ngrams(text)
+
+    def transform(self, documents):
+        vocabulary = self.vocabulary_
+        indptr, indices, counts = [0], [], []
+        for document in documents:
+            terms = sorted((vocabulary[ngram], count) for ngram, count in Counter(self.analyze(document)).items()
+                           if ngram in vocabulary)
+            indices.extend(column for column, _ in terms)
+            counts.extend(count for _, count in terms)
+            indptr.append(len(indices))
+
+        indptr = np.asarray(indptr)
+        indices = np.asarray(indices, dtype=np.int32)
+        data = np.asarray(counts, dtype=np.float64) * self.idf_[indices]
+        if self.norm == 'l2':
+            rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+            row_norms = np.sqrt(np.bincount(rows, weights=data * data, minlength=len(indptr) - 1))
+            data /= row_norms[rows]
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(indptr) - 1, len(self.idf_)))
+
+
+class CompiledLabelEncoder:
+    """LabelEncoder.transform / inverse_transform over the stored classes"""
+
+    def __init__(self, classes):
+        self.classes_ = np.asarray(classes)
+        self._index = {label: index for index, label in enumerate(self.classes_.tolist())}
+
+    def transform(self, labels):
+        try:
+            return np.array([self._index[label] for label in labels], dtype=np.int64)
+        except KeyError as unknown:
+            raise ValueError(f"y contains previously unseen labels: {unknown}")
+
+    def inverse_transform(self, encoded):
+        return self.classes_[np.asarray(encoded, dtype=np.int64)]
+
+
+def _forest_trees(forest):
+    trees = []
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        leaves = tree.children_left == -1
+        nodes = np.arange(tree.node_count)
+        value = tree.value[:, 0, :].astype(np.float64)
+        value = value / value.sum(axis=1, keepdims=True)
+        trees.append({
+            'feature': np.where(leaves, 0, tree.feature),
+            'threshold': np.where(leaves, np.inf, tree.threshold),
+            'left': np.where(leaves, nodes, tree.children_left),
+            'right': np.where(leaves, nodes, tree.children_right),
+            'default_left': (np.asarray(tree.missing_go_to_left, dtype=bool)
+                             if hasattr(tree, 'missing_go_to_left') else np.zeros(tree.node_count, dtype=bool)),
+            'value': value,
+            'depth': tree.max_depth
+        })
+    return trees
+
+
+def _xgboost_trees(model):
+    import json
+    booster = model.get_booster()
+    config = json.loads(booster.save_config())['learner']
+    if config['objective']['name'] != 'binary:logistic':
+        raise ValueError(f"unsupported XGBoost objective {config['objective']['name']}")
+    base_score = float(config['learner_model_param']['base_score'].strip('[]'))
+    dump = json.loads(booster.save_raw('json'))['learner']['gradient_booster']['model']['trees']
+
+    trees = []
+    for tree in dump:
+        if any(tree.get('split_type', [])):
+            raise ValueError("categorical splits are not supported")
+        left = np.asarray(tree['left_children'])
+        right = np.asarray(tree['right_children'])
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+        leaves = left == -1
+        nodes = np.arange(len(left))
+        depth = np.zeros(len(left), dtype=np.int32)
+        for node in nodes:  # parents come before their children
+            if not leaves[node]:
+                depth[left[node]] = depth[right[node]] = depth[node] + 1
+        trees.append({
+            'feature': np.where(leaves, 0, tree['split_indices']),
+            'threshold': np.where(leaves, np.float32(np.inf), conditions),
+            'left': np.where(leaves, nodes, left),
+            'right': np.where(leaves, nodes, right),
+            'default_left': np.asarray(tree['default_left'], dtype=bool),
+            'value': np.where(leaves, conditions, 0).astype(np.float32)[:, None],
+            'depth': int(depth.max())
+        })
+    return trees, float(np.log(base_score / (1.0 - base_score)))
+
+
+def compile_artifact(artifact):
+    """Compiled copy of a trained model, vectorizer or encoder; ValueError if it can't be compiled"""
+    module, name = type(artifact).__module__, type(artifact).__name__
+    if module.startswith('sklearn.ensemble') and name == 'RandomForestClassifier':
+        if artifact.n_outputs_ != 1:
+            raise ValueError("multi-output forests are not supported")
+        return CompiledTreeEnsemble(_forest_trees(artifact), int(artifact.n_features_in_),
+                                    artifact.classes_, 'random_forest')
+    if module.startswith('xgboost') and name == 'XGBClassifier':
+        trees, base_margin = _xgboost_trees(artifact)
+        return CompiledTreeEnsemble(trees, int(artifact.n_features_in_), artifact.classes_, 'xgboost', base_margin)
+    if name == 'TfidfVectorizer':
+        params = artifact.get_params()
+        supported = (params['analyzer'] in ('word', 'char') and params['input'] == 'content' and
+                     not params['binary'] and not params['sublinear_tf'] and params['use_idf'] and
+                     params['norm'] in ('l2', None) and params['stop_words'] is None and
+                     params['preprocessor'] is None and params['tokenizer'] is None and
+                     params['strip_accents'] is None)
+        if not supported:
+            raise ValueError("unsupported TfidfVectorizer settings")
+        return CompiledVectorizer(artifact.vocabulary_, artifact.idf_, params['analyzer'], params['ngram_range'],
+                                  params['lowercase'], params['token_pattern'], params['norm'])
+    if name == 'LabelEncoder':
+        return CompiledLabelEncoder(artifact.classes_)
+    raise ValueError(f"no compiled form for {module}.{name}")
+
+
+def _sample_inputs(original, samples):
+    """Inputs to check a compiled artifact against: rows from the samples, or made up ones"""
+    n_features = int(original.n_features_in_)
+    rng = np.random.default_rng(0)
+    if samples is not None and samples.shape[1] == n_features:
+        return [samples]
+    dense = (rng.random((64, n_features)) < 0.05) * rng.random((64, n_features))
+    return [dense, sparse.csr_matrix(dense)]
+
+
+def verify_compiled(original, compiled, texts=(), samples=None):
+    """True if the compiled artifact reproduces the original's outputs"""
+    if isinstance(compiled, CompiledLabelEncoder):
+        return list(compiled.inverse_transform(range(len(original.classes_)))) == list(original.classes_)
+    if isinstance(compiled, CompiledVectorizer):
+        documents = list(texts) + list(original.vocabulary_)[:200] + ["", "  Take  Aspirin 81mg\ttwice daily "]
+        difference = abs(compiled.transform(documents) - original.transform(documents))
+        return difference.max() <= PROBABILITY_TOLERANCE if difference.nnz else True
+    for X in _sample_inputs(original, samples):
+        if np.abs(compiled.predict_proba(X) - original.predict_proba(X)).max() > PROBABILITY_TOLERANCE:
+            return False
+    return True
+
+
+def export_compiled(artifacts_dir, texts=(), samples=None):
+    """
+    Write <name>.compiled.joblib next to every .joblib artifact that compiles
+    and reproduces the original. `texts` (documents for the vectorizers) and
+    `samples` ({model name: feature matrix}) make the check more thorough.
+    Returns the names exported.
+    """
+    exported = []
+    for filename in sorted(os.listdir(artifacts_dir)):
+        if not filename.endswith('.joblib') or filename.endswith(COMPILED_SUFFIX):
+            continue
+        name = filename[:-len('.joblib')]
+        original = joblib.load(os.path.join(artifacts_dir, filename))
+        try:
+            compiled = compile_artifact(original)
+        except ValueError as unsupported:
+            print(f"⚠️ Not compiling {name}: {unsupported}")
+            continue
+        if not verify_compiled(original, compiled, texts, (samples or {}).get(name)):
+            print(f"❌ Compiled {name} does not match the original, not exported")
+            continue
+        joblib.dump(compiled, compiled_path(os.path.join(artifacts_dir, filename)))
+        exported.append(name)
+        print(f"⚡ Compiled {name}")
+    return exported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the active model version and publish it as a new version")
+    parser.add_argument('--models-dir', default='models', help="model registry directory")
+    parser.add_argument('--no-activate', action='store_true', help="publish without activating")
+    args = parser.parse_args()
+
+    from model_registry import resolve, publish
+    version_dir, manifest = resolve(args.models_dir)
+    if manifest is None:
+        print(f"❌ {args.models_dir} has no active registry version")
+        return 1
+
+    artifacts_dir = tempfile.mkdtemp(prefix='.artifacts-', dir=args.models_dir)
+    try:
+        for name in manifest['files']:
+            if not name.endswith(COMPILED_SUFFIX):
+                shutil.copy2(os.path.join(version_dir, name), artifacts_dir)
+        if not export_compiled(artifacts_dir):
+            print("❌ Nothing could be compiled")
+            return 1
+        publish(artifacts_dir, args.models_dir, activate=not args.no_activate)
+    finally:
+        shutil.rmtree(artifacts_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
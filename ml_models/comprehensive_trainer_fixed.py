@@ -7,36 +7,107 @@ import pandas as pd
 import numpy as np
 import os
 import json
+import time
+import hashlib
+import shutil
+import tempfile
 import joblib
+from concurrent.futures import ThreadPoolExecutor
+import sklearn
 from sklearn.model_selection import train_test_split, cross_val_score, StratifiedKFold
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.feature_extraction.text import TfidfVectorizer, CountVectorizer
 from sklearn.preprocessing import LabelEncoder
 from sklearn.metrics import classification_report, confusion_matrix, f1_score, precision_score, recall_score
 import xgboost as xgb
-import lightgbm as lgb
 from fuzzywuzzy import fuzz
-import matplotlib.pyplot as plt
-import seaborn as sns
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
+# Drug tables come from the backend's shared knowledge base
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+from services.drug_knowledge_base import DrugKnowledgeBase
+from model_registry import publish
+from compiled_models import export_compiled
+
+# Models fit concurrently, splitting these cores between them
+TRAINING_WORKERS = int(os.getenv('TRAINING_WORKERS', os.cpu_count() or 1))
+# Seeds negative sampling, the train/test splits and the models
+TRAINING_SEED = int(os.getenv('TRAINING_SEED', '42'))
+# Feature matrices and fitted models, reused while their input data is unchanged
+TRAINING_CACHE_DIR = os.getenv('TRAINING_CACHE_DIR', os.path.join('models', '.training-cache'))
+# Bump when feature construction changes, to invalidate cached stages
+TRAINING_CACHE_FORMAT = 1
+
+AGE_GROUPS = ['<2 years', '<18', 'Elderly', 'Adult', 'All', 'Neonates']
+
 class DoseSafeMLTrainer:
     """
     Comprehensive ML trainer using your existing CSV data
     """
     
-    def __init__(self, data_dir="../data"):
+    def __init__(self, data_dir="../data", cache_dir=TRAINING_CACHE_DIR, workers=TRAINING_WORKERS, seed=TRAINING_SEED):
         # Fix the path to your actual data directory
         current_dir = os.path.dirname(os.path.abspath(__file__))
         self.data_dir = os.path.join(current_dir, "..", "data")
         print(f"📁 Data directory: {self.data_dir}")
         
+        self.cache_dir = cache_dir  # None disables the training cache
+        self.workers = max(1, workers)
+        self.seed = seed
+        
         self.models = {}
         self.vectorizers = {}
         self.encoders = {}
         self.training_stats = {}
-        
+        self.validation_samples = {}  # model name -> held-out features, to check the compiled copies against
+        self.features = {}  # dataset name -> cache key and train/test split, shared by the models trained on it
+        self.n_jobs = {}  # model name -> cores it may use while the others train
+    
+    @staticmethod
+    def _data_checksum(df):
+        """Checksum of a dataset's contents, independent of its index"""
+        return hashlib.sha256(pd.util.hash_pandas_object(df, index=False).values.tobytes()).hexdigest()
+    
+    def _cached(self, stage, key_parts, build):
+        """
+        build()'s result for this stage, from the training cache when it was
+        last built from the same key_parts (data checksums, parameters)
+        """
+        key = hashlib.sha256(json.dumps(
+            [TRAINING_CACHE_FORMAT, stage, self.seed, sklearn.__version__, xgb.__version__, *key_parts],
+            sort_keys=True, default=str
+        ).encode()).hexdigest()
+        if not self.cache_dir:
+            return key, build()
+        
+        path = os.path.join(self.cache_dir, f"{stage}.joblib")
+        if os.path.exists(path):
+            try:
+                cached = joblib.load(path)
+                if cached['key'] == key:
+                    print(f"♻️ {stage}: inputs unchanged, reusing the cached result")
+                    return key, cached['value']
+            except Exception as cache_error:
+                print(f"⚠️ Ignoring unreadable training cache {path}: {cache_error}")
+        
+        value = build()
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(prefix=f".{stage}-", dir=self.cache_dir)
+            os.close(fd)
+            joblib.dump({'key': key, 'value': value}, temp_path)
+            os.replace(temp_path, path)
+        except OSError as cache_error:
+            print(f"⚠️ Could not cache {stage}: {cache_error}")
+        return key, value
+    
+    @staticmethod
+    def _model_params(model):
+        """Parameters that change what a model learns (not how many cores it uses)"""
+        return {name: value for name, value in model.get_params().items() if name not in ('n_jobs', 'nthread')}
+    
     def load_existing_data(self):
         """Load your existing CSV files"""
         
@@ -47,29 +118,29 @@ class DoseSafeMLTrainer:
             print(f"❌ Data directory not found: {self.data_dir}")
             return False
         
-        # Load drug interactions
         interactions_path = os.path.join(self.data_dir, "drug_interactions.csv")
-        if not os.path.exists(interactions_path):
-            print(f"❌ File not found: {interactions_path}")
-            return False
-            
-        self.drug_interactions = pd.read_csv(interactions_path)
+        warnings_path = os.path.join(self.data_dir, "drug_warning.csv")
+        for path in (interactions_path, warnings_path):
+            if not os.path.exists(path):
+                print(f"❌ File not found: {path}")
+                return False
+        
+        # Parse and validate both tables through the knowledge base
+        knowledge_base = DrugKnowledgeBase(interactions_path, warnings_path)
+        
+        # Load drug interactions
+        self.drug_interactions = pd.DataFrame(knowledge_base.interaction_rows())
         print(f"✅ Loaded {len(self.drug_interactions)} drug interactions")
         print(f"   Sample: {self.drug_interactions.head(2).to_dict('records')}")
         
         # Load drug warnings  
-        warnings_path = os.path.join(self.data_dir, "drug_warning.csv")
-        if not os.path.exists(warnings_path):
-            print(f"❌ File not found: {warnings_path}")
-            return False
-            
-        self.drug_warnings = pd.read_csv(warnings_path)
+        self.drug_warnings = pd.DataFrame(knowledge_base.warning_rows())
         print(f"✅ Loaded {len(self.drug_warnings)} drug warnings")
         print(f"   Sample: {self.drug_warnings.head(2).to_dict('records')}")
         
         # Extract unique drugs
         drugs_from_interactions = set(self.drug_interactions['drug1'].tolist() + self.drug_interactions['drug2'].tolist())
-        drugs_from_warnings = set(self.drug_warnings[' drug_name'].str.strip().tolist())
+        drugs_from_warnings = set(self.drug_warnings['drug_name'].str.strip().tolist())
         
         self.all_drugs = drugs_from_interactions.union(drugs_from_warnings)
         print(f"✅ Total unique drugs: {len(self.all_drugs)}")
@@ -83,52 +154,70 @@ class DoseSafeMLTrainer:
         print("🔄 Creating expanded interaction dataset...")
         
         # Base interactions from CSV
-        interactions_data = []
-        
-        for _, row in self.drug_interactions.iterrows():
-            interactions_data.append({
-                'drug1': row['drug1'].strip(),
-                'drug2': row['drug2'].strip(), 
-                'severity': row['severity'].strip(),
-                'has_interaction': 1,
-                'note': row['note']
-            })
-        
-        # Create negative samples (no interaction)
-        drug_list = list(self.all_drugs)
-        negative_samples = 0
-        target_negatives = len(interactions_data) * 2  # 2:1 ratio negative:positive
-        
-        existing_pairs = set()
-        for item in interactions_data:
-            pair1 = (item['drug1'], item['drug2'])
-            pair2 = (item['drug2'], item['drug1'])
-            existing_pairs.add(pair1)
-            existing_pairs.add(pair2)
-        
-        while negative_samples < target_negatives:
-            drug1 = np.random.choice(drug_list)
-            drug2 = np.random.choice(drug_list)
-            
-            if drug1 != drug2 and (drug1, drug2) not in existing_pairs:
-                interactions_data.append({
-                    'drug1': drug1,
-                    'drug2': drug2,
-                    'severity': 'none',
-                    'has_interaction': 0,
-                    'note': 'No known interaction'
-                })
-                existing_pairs.add((drug1, drug2))
-                existing_pairs.add((drug2, drug1))
-                negative_samples += 1
-        
-        self.interaction_dataset = pd.DataFrame(interactions_data)
+        positives = pd.DataFrame({
+            'drug1': self.drug_interactions['drug1'].str.strip(),
+            'drug2': self.drug_interactions['drug2'].str.strip(),
+            'severity': self.drug_interactions['severity'].str.strip(),
+            'has_interaction': 1,
+            'note': self.drug_interactions['note']
+        })
+        
+        # Create negative samples (no interaction), 2:1 ratio negative:positive
+        drug1, drug2 = self._sample_negative_pairs(positives['drug1'], positives['drug2'], len(positives) * 2)
+        negatives = pd.DataFrame({
+            'drug1': drug1,
+            'drug2': drug2,
+            'severity': 'none',
+            'has_interaction': 0,
+            'note': 'No known interaction'
+        })
+        
+        self.interaction_dataset = pd.concat([positives, negatives], ignore_index=True)
         print(f"✅ Created interaction dataset: {len(self.interaction_dataset)} samples")
         print(f"   - Positive samples (interactions): {sum(self.interaction_dataset['has_interaction'])}")
         print(f"   - Negative samples (no interaction): {len(self.interaction_dataset) - sum(self.interaction_dataset['has_interaction'])}")
         
         return self.interaction_dataset
     
+    def _sample_negative_pairs(self, positive_drug1, positive_drug2, count):
+        """
+        `count` distinct pairs of different drugs that aren't known to
+        interact, in either order. Drawn in vectorized batches from a
+        generator seeded with self.seed, so reruns get the same pairs.
+        """
+        drug_list = np.array(sorted(self.all_drugs), dtype=object)
+        n_drugs = len(drug_list)
+        index = {drug: position for position, drug in enumerate(drug_list)}
+        first = np.array([index.get(drug, -1) for drug in positive_drug1])
+        second = np.array([index.get(drug, -1) for drug in positive_drug2])
+        known = (first >= 0) & (second >= 0)
+        known_pairs = np.unique(np.minimum(first, second)[known] * n_drugs + np.maximum(first, second)[known])
+        
+        available = n_drugs * (n_drugs - 1) // 2 - len(known_pairs)
+        if count > available:
+            print(f"⚠️ Only {available} drug pairs without a known interaction, using all of them")
+            count = available
+        
+        rng = np.random.default_rng(self.seed)
+        chosen_first = np.empty(0, dtype=np.int64)
+        chosen_second = np.empty(0, dtype=np.int64)
+        chosen_pairs = np.empty(0, dtype=np.int64)
+        while len(chosen_pairs) < count:
+            draws = max(2 * (count - len(chosen_pairs)), 64)
+            first = rng.integers(n_drugs, size=draws)
+            second = rng.integers(n_drugs, size=draws)
+            pairs = np.minimum(first, second) * n_drugs + np.maximum(first, second)
+            usable = (first != second) & ~np.isin(pairs, known_pairs) & ~np.isin(pairs, chosen_pairs)
+            first, second, pairs = first[usable], second[usable], pairs[usable]
+            # First draw of each pair, in draw order
+            _, first_draws = np.unique(pairs, return_index=True)
+            keep = np.sort(first_draws)[:count - len(chosen_pairs)]
+            chosen_first = np.concatenate([chosen_first, first[keep]])
+            chosen_second = np.concatenate([chosen_second, second[keep]])
+            chosen_pairs = np.concatenate([chosen_pairs, pairs[keep]])
+        
+        return drug_list[chosen_first], drug_list[chosen_second]
+    
     def create_medicine_extraction_dataset(self):
         """Create dataset for medicine name extraction training"""
         
@@ -137,7 +226,7 @@ class DoseSafeMLTrainer:
         extraction_data = []
         
         # Positive samples - actual medicine names
-        for drug in self.all_drugs:
+        for drug in sorted(self.all_drugs):
             clean_drug = drug.strip()
             if len(clean_drug) > 2:  # Skip very short names
                 extraction_data.append({
@@ -213,80 +302,173 @@ class DoseSafeMLTrainer:
         else:
             return 'other'
     
-    def train_interaction_predictor(self):
-        """Train drug interaction prediction model"""
+    def prepare_interaction_features(self):
+        """Text and similarity features for the interaction dataset, split for training"""
         
-        print("🚀 Training Drug Interaction Predictor...")
+        print("🔄 Preparing interaction features...")
         
-        # Create features
-        X_features = []
-        for _, row in self.interaction_dataset.iterrows():
-            drug1 = row['drug1'].lower().strip()
-            drug2 = row['drug2'].lower().strip()
+        def build():
+            drug1 = self.interaction_dataset['drug1'].str.lower().str.strip().tolist()
+            drug2 = self.interaction_dataset['drug2'].str.lower().str.strip().tolist()
             
             # Text features
-            combined_text = f"{drug1} {drug2}"
-            
-            # Similarity features
-            similarity = fuzz.ratio(drug1, drug2) / 100.0
+            combined_text = [f"{first} {second}" for first, second in zip(drug1, drug2)]
+            vectorizer = TfidfVectorizer(max_features=1000, ngram_range=(1, 2))
+            text_features = vectorizer.fit_transform(combined_text)
             
-            # Length features
-            len_diff = abs(len(drug1) - len(drug2))
-            avg_len = (len(drug1) + len(drug2)) / 2
+            # Similarity, length and category features
+            numerical_features = np.array([
+                (
+                    fuzz.ratio(first, second) / 100.0,
+                    abs(len(first) - len(second)),
+                    (len(first) + len(second)) / 2,
+                    1 if self._get_drug_category(first) == self._get_drug_category(second) else 0
+                )
+                for first, second in zip(drug1, drug2)
+            ]).reshape(-1, 4)
+            X = np.hstack([text_features.toarray(), numerical_features])
             
-            # Category features
-            cat1 = self._get_drug_category(drug1)
-            cat2 = self._get_drug_category(drug2)
-            same_category = 1 if cat1 == cat2 else 0
+            # Target variables, severity labels encoded
+            y_interaction = self.interaction_dataset['has_interaction'].values
+            encoder = LabelEncoder()
+            y_severity_encoded = encoder.fit_transform(self.interaction_dataset['severity'].values)
             
-            features = {
-                'combined_text': combined_text,
-                'similarity': similarity,
-                'len_diff': len_diff,
-                'avg_len': avg_len,
-                'same_category': same_category
+            X_train, X_test, y_int_train, y_int_test, y_sev_train, y_sev_test = train_test_split(
+                X, y_interaction, y_severity_encoded, test_size=0.2, random_state=self.seed, stratify=y_interaction
+            )
+            return {
+                'vectorizer': vectorizer, 'encoder': encoder,
+                'X_train': X_train, 'X_test': X_test,
+                'y_int_train': y_int_train, 'y_int_test': y_int_test,
+                'y_sev_train': y_sev_train, 'y_sev_test': y_sev_test
             }
+        
+        # Keyed by the columns the features are built from
+        data_checksum = self._data_checksum(self.interaction_dataset[['drug1', 'drug2', 'severity', 'has_interaction']])
+        key, features = self._cached('interaction_features', [data_checksum], build)
+        self.vectorizers['interaction_text'] = features['vectorizer']
+        self.encoders['severity'] = features['encoder']
+        self.validation_samples['interaction_classifier'] = features['X_test']
+        self.validation_samples['severity_classifier'] = features['X_test']
+        self.features['interaction'] = dict(features, key=key)
+        
+        print(f"📊 Training set: {features['X_train'].shape[0]} samples")
+        print(f"📊 Test set: {features['X_test'].shape[0]} samples")
+        
+        return self.features['interaction']
+    
+    def prepare_extraction_features(self):
+        """Character n-gram features for the medicine extraction dataset, split for training"""
+        
+        print("🔄 Preparing medicine extraction features...")
+        
+        def build():
+            texts = self.extraction_dataset['text'].values
+            labels = self.extraction_dataset['is_medicine'].values
+            
+            # Character-level for better medicine matching
+            vectorizer = TfidfVectorizer(max_features=2000, ngram_range=(1, 3), analyzer='char', lowercase=True)
+            X = vectorizer.fit_transform(texts)
             
-            X_features.append(features)
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, labels, test_size=0.2, random_state=self.seed, stratify=labels
+            )
+            return {'vectorizer': vectorizer, 'X_train': X_train, 'X_test': X_test, 'y_train': y_train, 'y_test': y_test}
         
-        # Convert to DataFrame
-        features_df = pd.DataFrame(X_features)
+        # Keyed by the columns the features are built from
+        data_checksum = self._data_checksum(self.extraction_dataset[['text', 'is_medicine']])
+        key, features = self._cached('extraction_features', [data_checksum], build)
+        self.vectorizers['medicine_text'] = features['vectorizer']
+        self.validation_samples['medicine_extractor'] = features['X_test']
+        self.features['extraction'] = dict(features, key=key)
         
-        # Vectorize text features
-        self.vectorizers['interaction_text'] = TfidfVectorizer(max_features=1000, ngram_range=(1, 2))
-        text_features = self.vectorizers['interaction_text'].fit_transform(features_df['combined_text'])
+        print(f"📊 Training set: {features['X_train'].shape[0]} samples")
+        print(f"📊 Test set: {features['X_test'].shape[0]} samples")
         
-        # Combine with numerical features
-        numerical_features = features_df[['similarity', 'len_diff', 'avg_len', 'same_category']].values
-        X = np.hstack([text_features.toarray(), numerical_features])
+        return self.features['extraction']
+    
+    def prepare_age_warning_features(self):
+        """Drug name and age group features for age warnings, split for training"""
         
-        # Target variables
-        y_interaction = self.interaction_dataset['has_interaction'].values
-        y_severity = self.interaction_dataset['severity'].values
+        print("🔄 Preparing age warning features...")
         
-        # Encode severity labels
-        self.encoders['severity'] = LabelEncoder()
-        y_severity_encoded = self.encoders['severity'].fit_transform(y_severity)
+        # Warnings from CSV
+        warning_rows = pd.DataFrame({
+            'drug_name': self.drug_warnings['drug_name'].str.strip(),
+            'age_group': self.drug_warnings['age_group'].str.strip(),
+            'severity': self.drug_warnings['severity'].str.strip(),
+            'has_warning': 1
+        })
         
-        # Split data
-        X_train, X_test, y_int_train, y_int_test, y_sev_train, y_sev_test = train_test_split(
-            X, y_interaction, y_severity_encoded, test_size=0.2, random_state=42, stratify=y_interaction
-        )
+        # Create negative samples (drugs without warnings for certain age groups)
+        drugs_with_warnings = set(warning_rows['drug_name'])
+        drugs_without_warnings = [drug for drug in sorted(self.all_drugs) if drug not in drugs_with_warnings]
+        negative_age_groups = AGE_GROUPS[:3]
+        negative_rows = pd.DataFrame({
+            'drug_name': np.repeat(np.array(drugs_without_warnings, dtype=object), len(negative_age_groups)),
+            'age_group': negative_age_groups * len(drugs_without_warnings),
+            'severity': 'none',
+            'has_warning': 0
+        })
+        self.age_warning_dataset = pd.concat([warning_rows, negative_rows], ignore_index=True)
+        
+        def build():
+            # Text features for drugs, encoded age groups
+            vectorizer = TfidfVectorizer(max_features=500, ngram_range=(1, 2))
+            drug_features = vectorizer.fit_transform(self.age_warning_dataset['drug_name'].values)
+            encoder = LabelEncoder()
+            age_features = encoder.fit_transform(self.age_warning_dataset['age_group'].values).reshape(-1, 1)
+            X = np.hstack([drug_features.toarray(), age_features])
+            y = self.age_warning_dataset['has_warning'].values
+            
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=0.2, random_state=self.seed, stratify=y
+            )
+            return {'vectorizer': vectorizer, 'encoder': encoder,
+                    'X_train': X_train, 'X_test': X_test, 'y_train': y_train, 'y_test': y_test}
+        
+        # Keyed by the columns the features are built from
+        data_checksum = self._data_checksum(self.age_warning_dataset[['drug_name', 'age_group', 'has_warning']])
+        key, features = self._cached('age_warning_features', [data_checksum], build)
+        self.vectorizers['warning_drug'] = features['vectorizer']
+        self.encoders['age_group'] = features['encoder']
+        self.validation_samples['age_warning_classifier'] = features['X_test']
+        self.features['age_warning'] = dict(features, key=key)
+        
+        return self.features['age_warning']
+    
+    def _fit_model(self, name, model, features, X_train, y_train):
+        """
+        `model` fitted on X_train, or its cached fit when neither the
+        features nor its parameters changed since
+        """
+        
+        def build():
+            model.set_params(n_jobs=self.n_jobs.get(name, self.workers))
+            model.fit(X_train, y_train)
+            # Serve with the library default, not the cores it trained with
+            return model.set_params(n_jobs=None)
+        
+        _, fitted = self._cached(name, [features['key'], self._model_params(model)], build)
+        return fitted
+    
+    def train_interaction_predictor(self):
+        """Train drug interaction prediction model"""
         
-        print(f"📊 Training set: {X_train.shape[0]} samples")
-        print(f"📊 Test set: {X_test.shape[0]} samples")
+        print("🚀 Training Drug Interaction Predictor...")
+        features = self.features.get('interaction') or self.prepare_interaction_features()
+        X_train, X_test = features['X_train'], features['X_test']
+        y_int_train, y_int_test = features['y_int_train'], features['y_int_test']
         
         # Train interaction classifier
         print("🔧 Training interaction classifier...")
-        self.models['interaction_classifier'] = xgb.XGBClassifier(
+        self.models['interaction_classifier'] = self._fit_model('interaction_classifier', xgb.XGBClassifier(
             n_estimators=200,
             max_depth=6,
             learning_rate=0.1,
-            random_state=42,
+            random_state=self.seed,
             eval_metric='logloss'
-        )
-        
-        self.models['interaction_classifier'].fit(X_train, y_int_train)
+        ), features, X_train, y_int_train)
         
         # Evaluate interaction classifier
         y_int_pred = self.models['interaction_classifier'].predict(X_test)
@@ -294,31 +476,10 @@ class DoseSafeMLTrainer:
         int_precision = precision_score(y_int_test, y_int_pred)
         int_recall = recall_score(y_int_test, y_int_pred)
         
-        print(f"\\n📈 Interaction Classifier Results:")
-        print(f"   F1 Score: {int_f1:.4f}")
-        print(f"   Precision: {int_precision:.4f}")
-        print(f"   Recall: {int_recall:.4f}")
-        
-        # Train severity classifier (only on positive interactions)
-        interaction_mask = y_int_train == 1
-        if np.sum(interaction_mask) > 10:  # Ensure enough samples
-            print("🔧 Training severity classifier...")
-            self.models['severity_classifier'] = RandomForestClassifier(
-                n_estimators=100,
-                max_depth=10,
-                random_state=42
-            )
-            
-            self.models['severity_classifier'].fit(X_train[interaction_mask], y_sev_train[interaction_mask])
-            
-            # Evaluate severity classifier
-            test_interaction_mask = y_int_test == 1
-            if np.sum(test_interaction_mask) > 0:
-                y_sev_pred = self.models['severity_classifier'].predict(X_test[test_interaction_mask])
-                sev_f1 = f1_score(y_sev_test[test_interaction_mask], y_sev_pred, average='weighted')
-                
-                print(f"\\n📈 Severity Classifier Results:")
-                print(f"   F1 Score (weighted): {sev_f1:.4f}")
+        print(f"\n📈 Interaction Classifier Results:\n"
+              f"   F1 Score: {int_f1:.4f}\n"
+              f"   Precision: {int_precision:.4f}\n"
+              f"   Recall: {int_recall:.4f}")
         
         # Store training stats
         self.training_stats['interaction_model'] = {
@@ -331,43 +492,48 @@ class DoseSafeMLTrainer:
         
         return True
     
-    def train_medicine_extractor(self):
-        """Train medicine name extraction model"""
-        
-        print("🚀 Training Medicine Extractor...")
+    def train_severity_classifier(self):
+        """Train interaction severity model (only on positive interactions)"""
         
-        # Prepare features
-        texts = self.extraction_dataset['text'].values
-        labels = self.extraction_dataset['is_medicine'].values
-        
-        # Create text features
-        self.vectorizers['medicine_text'] = TfidfVectorizer(
-            max_features=2000,
-            ngram_range=(1, 3),
-            analyzer='char',  # Character-level for better medicine matching
-            lowercase=True
-        )
+        features = self.features.get('interaction') or self.prepare_interaction_features()
+        interaction_mask = features['y_int_train'] == 1
+        if np.sum(interaction_mask) <= 10:  # Ensure enough samples
+            print("⚠️ Too few interactions to train the severity classifier")
+            return False
         
-        X = self.vectorizers['medicine_text'].fit_transform(texts)
+        print("🔧 Training severity classifier...")
+        self.models['severity_classifier'] = self._fit_model('severity_classifier', RandomForestClassifier(
+            n_estimators=100,
+            max_depth=10,
+            random_state=self.seed
+        ), features, features['X_train'][interaction_mask], features['y_sev_train'][interaction_mask])
+        
+        # Evaluate severity classifier
+        test_interaction_mask = features['y_int_test'] == 1
+        if np.sum(test_interaction_mask) > 0:
+            y_sev_pred = self.models['severity_classifier'].predict(features['X_test'][test_interaction_mask])
+            sev_f1 = f1_score(features['y_sev_test'][test_interaction_mask], y_sev_pred, average='weighted')
+            
+            print(f"\n📈 Severity Classifier Results:\n"
+                  f"   F1 Score (weighted): {sev_f1:.4f}")
         
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, labels, test_size=0.2, random_state=42, stratify=labels
-        )
+        return True
+    
+    def train_medicine_extractor(self):
+        """Train medicine name extraction model"""
         
-        print(f"📊 Training set: {X_train.shape[0]} samples")
-        print(f"📊 Test set: {X_test.shape[0]} samples")
+        print("🚀 Training Medicine Extractor...")
+        features = self.features.get('extraction') or self.prepare_extraction_features()
+        X_train, X_test, y_train, y_test = features['X_train'], features['X_test'], features['y_train'], features['y_test']
         
         # Train model
-        self.models['medicine_extractor'] = xgb.XGBClassifier(
+        self.models['medicine_extractor'] = self._fit_model('medicine_extractor', xgb.XGBClassifier(
             n_estimators=150,
             max_depth=6,
             learning_rate=0.1,
-            random_state=42,
+            random_state=self.seed,
             eval_metric='logloss'
-        )
-        
-        self.models['medicine_extractor'].fit(X_train, y_train)
+        ), features, X_train, y_train)
         
         # Evaluate
         y_pred = self.models['medicine_extractor'].predict(X_test)
@@ -375,14 +541,13 @@ class DoseSafeMLTrainer:
         precision = precision_score(y_test, y_pred)
         recall = recall_score(y_test, y_pred)
         
-        print(f"\n📈 Medicine Extractor Results:")
-        print(f"   F1 Score: {f1:.4f}")
-        print(f"   Precision: {precision:.4f}")
-        print(f"   Recall: {recall:.4f}")
-        
         # Detailed classification report
-        print("\n📋 Classification Report:")
-        print(classification_report(y_test, y_pred, target_names=['Non-Medicine', 'Medicine']))
+        print(f"\n📈 Medicine Extractor Results:\n"
+              f"   F1 Score: {f1:.4f}\n"
+              f"   Precision: {precision:.4f}\n"
+              f"   Recall: {recall:.4f}\n"
+              f"\n📋 Classification Report:\n"
+              f"{classification_report(y_test, y_pred, target_names=['Non-Medicine', 'Medicine'])}")
         
         # Store training stats
         self.training_stats['medicine_extractor'] = {
@@ -399,66 +564,15 @@ class DoseSafeMLTrainer:
         """Train age-related warning classifier"""
         
         print("🚀 Training Age Warning Classifier...")
-        
-        # Prepare age warning data
-        warning_data = []
-        for _, row in self.drug_warnings.iterrows():
-            drug_name = row[' drug_name'].strip()
-            age_group = row['age_group'].strip()
-            severity = row['severity'].strip()
-            
-            warning_data.append({
-                'drug_name': drug_name,
-                'age_group': age_group,
-                'severity': severity,
-                'has_warning': 1
-            })
-        
-        # Create negative samples (drugs without warnings for certain age groups)
-        age_groups = ['<2 years', '<18', 'Elderly', 'Adult', 'All', 'Neonates']
-        drugs_with_warnings = set(self.drug_warnings[' drug_name'].str.strip())
-        
-        for drug in self.all_drugs:
-            if drug not in drugs_with_warnings:
-                for age_group in age_groups[:3]:  # Add some negative samples
-                    warning_data.append({
-                        'drug_name': drug,
-                        'age_group': age_group,
-                        'severity': 'none',
-                        'has_warning': 0
-                    })
-        
-        warning_df = pd.DataFrame(warning_data)
-        
-        # Create features
-        drug_texts = warning_df['drug_name'].values
-        age_groups = warning_df['age_group'].values
-        
-        # Text features for drugs
-        self.vectorizers['warning_drug'] = TfidfVectorizer(max_features=500, ngram_range=(1, 2))
-        drug_features = self.vectorizers['warning_drug'].fit_transform(drug_texts)
-        
-        # Encode age groups
-        self.encoders['age_group'] = LabelEncoder()
-        age_features = self.encoders['age_group'].fit_transform(age_groups).reshape(-1, 1)
-        
-        # Combine features
-        X = np.hstack([drug_features.toarray(), age_features])
-        y = warning_df['has_warning'].values
-        
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42, stratify=y
-        )
+        features = self.features.get('age_warning') or self.prepare_age_warning_features()
+        X_train, X_test, y_train, y_test = features['X_train'], features['X_test'], features['y_train'], features['y_test']
         
         # Train model
-        self.models['age_warning_classifier'] = RandomForestClassifier(
+        self.models['age_warning_classifier'] = self._fit_model('age_warning_classifier', RandomForestClassifier(
             n_estimators=100,
             max_depth=8,
-            random_state=42
-        )
-        
-        self.models['age_warning_classifier'].fit(X_train, y_train)
+            random_state=self.seed
+        ), features, X_train, y_train)
         
         # Evaluate
         y_pred = self.models['age_warning_classifier'].predict(X_test)
@@ -466,10 +580,10 @@ class DoseSafeMLTrainer:
         precision = precision_score(y_test, y_pred)
         recall = recall_score(y_test, y_pred)
         
-        print(f"\\n📈 Age Warning Classifier Results:")
-        print(f"   F1 Score: {f1:.4f}")
-        print(f"   Precision: {precision:.4f}")
-        print(f"   Recall: {recall:.4f}")
+        print(f"\n📈 Age Warning Classifier Results:\n"
+              f"   F1 Score: {f1:.4f}\n"
+              f"   Precision: {precision:.4f}\n"
+              f"   Recall: {recall:.4f}")
         
         # Store training stats
         self.training_stats['age_warning_classifier'] = {
@@ -482,40 +596,80 @@ class DoseSafeMLTrainer:
         
         return True
     
+    def train_all_models(self):
+        """
+        Prepare (or reuse) each dataset's features, then fit the interaction,
+        severity, extractor and age warning models concurrently, splitting
+        self.workers cores between them
+        """
+        
+        self.prepare_interaction_features()
+        self.prepare_extraction_features()
+        self.prepare_age_warning_features()
+        
+        trainers = {
+            'interaction_classifier': self.train_interaction_predictor,
+            'severity_classifier': self.train_severity_classifier,
+            'medicine_extractor': self.train_medicine_extractor,
+            'age_warning_classifier': self.train_age_warning_classifier
+        }
+        concurrent = min(len(trainers), self.workers)
+        for name in trainers:
+            self.n_jobs[name] = max(1, self.workers // concurrent)
+        
+        print(f"🧵 Training {len(trainers)} models, {concurrent} at a time on {self.workers} cores")
+        with ThreadPoolExecutor(max_workers=concurrent, thread_name_prefix='trainer') as pool:
+            futures = [pool.submit(trainer) for trainer in trainers.values()]
+            trained = all([future.result() for future in futures])
+        
+        # Same order whichever model finished first
+        self.models = {name: self.models[name] for name in trainers if name in self.models}
+        return trained
+    
     def save_models(self, models_dir="models"):
-        """Save all trained models"""
+        """Save all trained models as a new version in the model registry and activate it"""
         
         os.makedirs(models_dir, exist_ok=True)
+        artifacts_dir = tempfile.mkdtemp(prefix='.artifacts-', dir=models_dir)
+        
+        try:
+            # Save models
+            for model_name, model in self.models.items():
+                joblib.dump(model, os.path.join(artifacts_dir, f"{model_name}.joblib"))
+                print(f"💾 Saved {model_name}")
+            
+            # Save vectorizers
+            for vec_name, vectorizer in self.vectorizers.items():
+                joblib.dump(vectorizer, os.path.join(artifacts_dir, f"{vec_name}_vectorizer.joblib"))
+                print(f"💾 Saved {vec_name} vectorizer")
+            
+            # Save encoders
+            for enc_name, encoder in self.encoders.items():
+                joblib.dump(encoder, os.path.join(artifacts_dir, f"{enc_name}_encoder.joblib"))
+                print(f"💾 Saved {enc_name} encoder")
+            
+            # Save training stats
+            with open(os.path.join(artifacts_dir, "training_stats.json"), 'w') as f:
+                json.dump(self.training_stats, f, indent=2, sort_keys=True)
+            print(f"📊 Saved training statistics")
+            
+            # Save drug list
+            with open(os.path.join(artifacts_dir, "drug_database.json"), 'w') as f:
+                json.dump(list(self.all_drugs), f, indent=2)
+            print(f"💊 Saved drug database")
+            
+            # Lean numpy copies for serving, checked against the held-out data
+            try:
+                export_compiled(artifacts_dir, texts=list(self.all_drugs), samples=self.validation_samples)
+            except Exception as export_error:
+                print(f"⚠️ Could not compile models: {export_error}")
+            
+            # Running services pick up the new version (ml_integration.reload_models)
+            manifest = publish(artifacts_dir, models_dir, activate=True)
+        finally:
+            shutil.rmtree(artifacts_dir, ignore_errors=True)
         
-        # Save models
-        for model_name, model in self.models.items():
-            model_path = os.path.join(models_dir, f"{model_name}.joblib")
-            joblib.dump(model, model_path)
-            print(f"💾 Saved {model_name} to {model_path}")
-        
-        # Save vectorizers
-        for vec_name, vectorizer in self.vectorizers.items():
-            vec_path = os.path.join(models_dir, f"{vec_name}_vectorizer.joblib")
-            joblib.dump(vectorizer, vec_path)
-            print(f"💾 Saved {vec_name} vectorizer to {vec_path}")
-        
-        # Save encoders
-        for enc_name, encoder in self.encoders.items():
-            enc_path = os.path.join(models_dir, f"{enc_name}_encoder.joblib")
-            joblib.dump(encoder, enc_path)
-            print(f"💾 Saved {enc_name} encoder to {enc_path}")
-        
-        # Save training stats
-        stats_path = os.path.join(models_dir, "training_stats.json")
-        with open(stats_path, 'w') as f:
-            json.dump(self.training_stats, f, indent=2)
-        print(f"📊 Saved training statistics to {stats_path}")
-        
-        # Save drug list
-        drugs_path = os.path.join(models_dir, "drug_database.json")
-        with open(drugs_path, 'w') as f:
-            json.dump(list(self.all_drugs), f, indent=2)
-        print(f"💊 Saved drug database to {drugs_path}")
+        return manifest
     
     def generate_training_report(self):
         """Generate comprehensive training report"""
@@ -552,6 +706,7 @@ def main():
     print("="*70)
     
     # Initialize trainer
+    started = time.perf_counter()
     trainer = DoseSafeMLTrainer()
     
     # Load existing data
@@ -563,16 +718,15 @@ def main():
     trainer.create_expanded_interaction_dataset()
     trainer.create_medicine_extraction_dataset()
     
-    # Train all models
-    trainer.train_interaction_predictor()
-    trainer.train_medicine_extractor()
-    trainer.train_age_warning_classifier()
+    # Train all models (unchanged datasets come from the training cache)
+    trainer.train_all_models()
     
     # Save models
     trainer.save_models()
     
     # Generate report
     trainer.generate_training_report()
+    print(f"⏱️ Training pipeline took {time.perf_counter() - started:.1f}s")
     
     return trainer
 
@@ -4,34 +4,90 @@ Loads trained models and provides easy-to-use functions for real-time prediction
 """
 
 import os
+import sys
 import json
+import time
+import threading
 import joblib
 import numpy as np
+from scipy import sparse
 from fuzzywuzzy import fuzz
 import warnings
 warnings.filterwarnings('ignore')
 
+# Name-resolution cache and drug name matcher shared with the backend services
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+from services.resolution_cache import ResolutionCache
+from services.drug_matcher import get_drug_matcher
+from model_registry import ModelRegistryError, resolve, active_version
+from compiled_models import compiled_path
+
+# Where the trained models live (defaults to ml_models/models next to this file)
+ML_MODELS_DIR = os.getenv('ML_MODELS_DIR', '')
+# joblib mmap_mode for the numpy arrays inside the models: 'r' maps them read-only
+# from the file so gunicorn workers share one copy through the page cache; empty
+# loads them into each process. Only uncompressed dumps can be memory-mapped.
+ML_MMAP_MODE = os.getenv('ML_MMAP_MODE', 'r') or None
+# Use the compiled (numpy-only) copies of the models when a version has them; see compiled_models.py
+ML_COMPILED_MODELS = os.getenv('ML_COMPILED_MODELS', '1').lower() in ('1', 'true', 'yes')
+# How often a running service checks the registry for a newly activated version; 0 disables
+MODEL_REGISTRY_POLL_SECONDS = float(os.getenv('MODEL_REGISTRY_POLL_SECONDS', 30))
+
+# Always recognised by the fallback extractor, even without a drug database
+COMMON_MEDICINES = [
+    'Dexamethasone', 'Ciprofloxacin', 'Lorazepam', 'Paracetamol',
+    'Aspirin', 'Ibuprofen', 'Warfarin', 'Metformin', 'Hydroxyzine'
+]
+
 class DoseSafeMLPredictor:
     """
     Production-ready ML predictor for DoseSafe-AI
     Loads trained models and provides prediction functions
     """
     
-    def __init__(self, models_dir=None):
+    def __init__(self, models_dir=None, version=None):
+        if models_dir is None and ML_MODELS_DIR:
+            models_dir = ML_MODELS_DIR
         if models_dir is None:
             current_dir = os.path.dirname(os.path.abspath(__file__))
             models_dir = os.path.join(current_dir, "models")
         
+        self.registry_dir = models_dir
         self.models_dir = models_dir
+        self.version = None  # None for a directory of models without a registry
+        self.manifest = None
         self.models = {}
         self.vectorizers = {}
         self.encoders = {}
         self.drug_database = []
+        self.name_cache = ResolutionCache()  # OCR token -> matched drug_database entry
+        self.token_cache = ResolutionCache()  # OCR token -> (medicine prediction, confidence)
+        self._matcher = None  # shared drug matcher, once our names are registered with it
         self.is_loaded = False
         
+        # With a registry, load the requested (or active) version's verified artifacts
+        try:
+            self.models_dir, self.manifest = resolve(models_dir, version)
+        except ModelRegistryError as registry_error:
+            if version is not None:
+                raise
+            print(f"❌ {registry_error}")
+            return
+        if self.manifest:
+            self.version = self.manifest['version']
+        
         # Try to load models
         self.load_models()
     
+    def _load(self, path):
+        """
+        joblib.load with the numpy arrays memory-mapped (see ML_MMAP_MODE),
+        preferring the artifact's compiled copy (see ML_COMPILED_MODELS)
+        """
+        if ML_COMPILED_MODELS and os.path.exists(compiled_path(path)):
+            path = compiled_path(path)
+        return joblib.load(path, mmap_mode=ML_MMAP_MODE)
+    
     def load_models(self):
         """Load all trained models, vectorizers, and encoders"""
         
@@ -53,7 +109,7 @@ class DoseSafeMLPredictor:
             for model_name, filename in model_files.items():
                 model_path = os.path.join(self.models_dir, filename)
                 if os.path.exists(model_path):
-                    self.models[model_name] = joblib.load(model_path)
+                    self.models[model_name] = self._load(model_path)
                     print(f"✅ Loaded {model_name}")
                 else:
                     print(f"⚠️ Model not found: {filename}")
@@ -68,7 +124,7 @@ class DoseSafeMLPredictor:
             for vec_name, filename in vectorizer_files.items():
                 vec_path = os.path.join(self.models_dir, filename)
                 if os.path.exists(vec_path):
-                    self.vectorizers[vec_name] = joblib.load(vec_path)
+                    self.vectorizers[vec_name] = self._load(vec_path)
                     print(f"✅ Loaded {vec_name} vectorizer")
             
             # Load encoders
@@ -80,7 +136,7 @@ class DoseSafeMLPredictor:
             for enc_name, filename in encoder_files.items():
                 enc_path = os.path.join(self.models_dir, filename)
                 if os.path.exists(enc_path):
-                    self.encoders[enc_name] = joblib.load(enc_path)
+                    self.encoders[enc_name] = self._load(enc_path)
                     print(f"✅ Loaded {enc_name} encoder")
             
             # Load drug database
@@ -90,6 +146,11 @@ class DoseSafeMLPredictor:
                     self.drug_database = json.load(f)
                 print(f"✅ Loaded drug database with {len(self.drug_database)} drugs")
             
+            # Cached name matches and predictions refer to the previous models
+            self.name_cache.clear()
+            self.token_cache.clear()
+            self._matcher = None
+            
             self.is_loaded = True
             print(f"🎉 ML models loaded successfully!")
             return True
@@ -153,6 +214,7 @@ class DoseSafeMLPredictor:
             medicines = []
             confidences = []
             
+            candidates = []
             for word in words:
                 cleaned_word = word.strip().strip('.,;:()[]{}')
                 if len(cleaned_word) > 2:  # Skip very short words
@@ -161,20 +223,23 @@ class DoseSafeMLPredictor:
                     if cleaned_word.startswith('e') and len(cleaned_word) > 3:
                         cleaned_word = cleaned_word[1:]  # Remove 'e' prefix
                     
-                    # Use ML model to predict if it's a medicine
-                    X = self.vectorizers['medicine_text'].transform([cleaned_word])
-                    prediction = self.models['medicine_extractor'].predict(X)[0]
-                    confidence = self.models['medicine_extractor'].predict_proba(X)[0].max()
-                    
-                    if prediction == 1 and confidence > 0.6:  # Lowered threshold for OCR
-                        medicines.append(cleaned_word)
-                        confidences.append(float(confidence))
-                        print(f"  ✅ Found medicine: {cleaned_word} (confidence: {confidence:.3f})")
+                    candidates.append(cleaned_word)
+            
+            # Use ML model to predict which words are medicines, all at once
+            predictions = self._classify_tokens(candidates)
+            
+            for cleaned_word in candidates:
+                prediction, confidence = predictions[cleaned_word]
+                if prediction == 1 and confidence > 0.6:  # Lowered threshold for OCR
+                    medicines.append(cleaned_word)
+                    confidences.append(float(confidence))
+                    print(f"  ✅ Found medicine: {cleaned_word} (confidence: {confidence:.3f})")
             
             # Also try database matching for known medicines
             if self.drug_database:
+                mentioned = self._drug_matcher().find_names(processed_text)
                 for drug in self.drug_database:
-                    if drug.lower() in processed_text.lower():
+                    if drug.lower() in mentioned:
                         if drug not in medicines:
                             medicines.append(drug)
                             print(f"  ✅ Database match: {drug}")
@@ -197,6 +262,32 @@ class DoseSafeMLPredictor:
             print(f"❌ ML medicine extraction failed: {e}")
             return self._fallback_medicine_extraction(text)
     
+    def _classify_tokens(self, tokens):
+        """
+        (prediction, confidence) of the medicine extractor for each distinct
+        token. Tokens not in the cache go through one transform and one
+        predict_proba call.
+        """
+        predictions = {}
+        uncached = []
+        for token in dict.fromkeys(tokens):
+            found, prediction = self.token_cache.get(token)
+            if found:
+                predictions[token] = prediction
+            else:
+                uncached.append(token)
+        
+        if uncached:
+            extractor = self.models['medicine_extractor']
+            X = self.vectorizers['medicine_text'].transform(uncached)
+            probabilities = extractor.predict_proba(X)
+            labels = np.asarray(extractor.classes_)[probabilities.argmax(axis=1)]
+            for token, label, confidence in zip(uncached, labels, probabilities.max(axis=1)):
+                predictions[token] = (label, confidence)
+                self.token_cache.put(token, predictions[token])
+        
+        return predictions
+    
     def _filter_false_positives(self, medicines):
         """
         Filter out false positives from extracted medicines
@@ -374,6 +465,87 @@ class DoseSafeMLPredictor:
             print(f"❌ ML interaction check failed: {e}")
             return self._fallback_interaction_check(drug1, drug2)
     
+    def check_interactions_batch(self, drugs):
+        """
+        Check every pair of drugs (i < j, in list order) for interactions with
+        one vectorizer transform and one predict_proba call. Severity is only
+        predicted for the pairs classified as interacting.
+        Returns a list of {'drug1', 'drug2', 'has_interaction', 'confidence', 'severity'}.
+        """
+        pairs = [(drugs[i], drugs[j]) for i in range(len(drugs)) for j in range(i + 1, len(drugs))]
+        if not pairs:
+            return []
+        
+        if not self.is_loaded or 'interaction_classifier' not in self.models:
+            return [dict(drug1=drug1, drug2=drug2, **self._fallback_interaction_check(drug1, drug2))
+                    for drug1, drug2 in pairs]
+        
+        try:
+            X = self._interaction_features(pairs)
+            
+            # Label and confidence both come from the class probabilities
+            classifier = self.models['interaction_classifier']
+            probabilities = classifier.predict_proba(self._model_input(classifier, X))
+            labels = np.asarray(classifier.classes_)[probabilities.argmax(axis=1)]
+            confidences = probabilities.max(axis=1)
+            
+            results = [{
+                'drug1': drug1,
+                'drug2': drug2,
+                'has_interaction': bool(label),
+                'confidence': float(confidence),
+                'severity': 'unknown'
+            } for (drug1, drug2), label, confidence in zip(pairs, labels, confidences)]
+            
+            # Severity only for the interacting pairs
+            positive_rows = np.flatnonzero(labels.astype(bool))
+            if len(positive_rows) and 'severity_classifier' in self.models:
+                try:
+                    severity_classifier = self.models['severity_classifier']
+                    severity_encoded = severity_classifier.predict(
+                        self._model_input(severity_classifier, X[positive_rows]))
+                    severities = self.encoders['severity'].inverse_transform(severity_encoded)
+                except Exception:
+                    severities = ['medium'] * len(positive_rows)  # Default
+                for row, severity in zip(positive_rows, severities):
+                    results[row]['severity'] = severity
+            
+            print(f"🤖 ML interaction batch: {len(pairs)} pairs, {len(positive_rows)} interactions")
+            return results
+            
+        except Exception as e:
+            print(f"❌ ML interaction batch check failed: {e}")
+            return [dict(drug1=drug1, drug2=drug2, **self._fallback_interaction_check(drug1, drug2))
+                    for drug1, drug2 in pairs]
+    
+    def _interaction_features(self, pairs):
+        """Sparse feature matrix for drug pairs, same columns as training"""
+        combined_texts = []
+        numerical_features = np.empty((len(pairs), 4))
+        for row, (drug1, drug2) in enumerate(pairs):
+            drug1_clean = drug1.lower().strip()
+            drug2_clean = drug2.lower().strip()
+            combined_texts.append(f"{drug1_clean} {drug2_clean}")
+            numerical_features[row] = (
+                fuzz.ratio(drug1_clean, drug2_clean) / 100.0,
+                abs(len(drug1_clean) - len(drug2_clean)),
+                (len(drug1_clean) + len(drug2_clean)) / 2,
+                1 if self._get_drug_category(drug1_clean) == self._get_drug_category(drug2_clean) else 0
+            )
+        
+        text_features = self.vectorizers['interaction_text'].transform(combined_texts)
+        return sparse.hstack([text_features, sparse.csr_matrix(numerical_features)], format='csr')
+    
+    @staticmethod
+    def _model_input(model, X):
+        """
+        XGBoost reads absent sparse entries as missing rather than 0, and
+        the classifiers were trained on dense arrays; densify only for it
+        """
+        if type(model).__module__.startswith('xgboost') or getattr(model, 'absent_is_missing', False):
+            return X.toarray()
+        return X
+    
     def check_age_warnings(self, drug_name, age_group="Adult"):
         """
         Check for age-related warnings using trained ML model
@@ -451,27 +623,19 @@ class DoseSafeMLPredictor:
             if len(cleaned) > 3 and any(c.isalpha() for c in cleaned):
                 # Check against drug database if available
                 if self.drug_database:
-                    for drug in self.drug_database:
-                        # Exact match or partial match
-                        if (cleaned.lower() == drug.lower() or 
-                            drug.lower() in cleaned.lower() or 
-                            cleaned.lower() in drug.lower()):
-                            medicines.append(drug)
-                            print(f"  ✅ Fallback found: {drug}")
-                            break
+                    drug = self._match_database_drug(cleaned)
+                    if drug is not None:
+                        medicines.append(drug)
+                        print(f"  ✅ Fallback found: {drug}")
                 else:
                     # Very basic heuristic for common medicine patterns
                     if any(suffix in cleaned.lower() for suffix in ['cin', 'ine', 'ol', 'am', 'one', 'zole']):
                         medicines.append(cleaned)
         
         # Also check for exact medicine names in the original text
-        common_medicines = [
-            'Dexamethasone', 'Ciprofloxacin', 'Lorazepam', 'Paracetamol',
-            'Aspirin', 'Ibuprofen', 'Warfarin', 'Metformin', 'Hydroxyzine'
-        ]
-        
-        for med in common_medicines:
-            if med.lower() in text.lower():
+        mentioned = self._drug_matcher().find_names(text)
+        for med in COMMON_MEDICINES:
+            if med.lower() in mentioned:
                 if med not in medicines:
                     medicines.append(med)
                     print(f"  ✅ Common medicine found: {med}")
@@ -480,6 +644,29 @@ class DoseSafeMLPredictor:
         all_medicines = self._filter_false_positives(medicines)
         return list(set(all_medicines))  # Remove duplicates
     
+    def _drug_matcher(self):
+        """Shared drug name matcher, with the drug database and common medicines registered"""
+        if self._matcher is None:
+            matcher = get_drug_matcher()
+            matcher.add_names(self.drug_database)
+            matcher.add_names(COMMON_MEDICINES)
+            self._matcher = matcher
+        return self._matcher
+    
+    def _match_database_drug(self, name):
+        """First drug_database entry matching name exactly or as a substring, cached"""
+        name_lower = name.lower()
+        
+        def find():
+            for drug in self.drug_database:
+                drug_lower = drug.lower()
+                # Exact match or partial match
+                if name_lower == drug_lower or drug_lower in name_lower or name_lower in drug_lower:
+                    return drug
+            return None
+        
+        return self.name_cache.get_or_compute(name_lower, find)
+    
     def _fallback_interaction_check(self, drug1, drug2):
         """Fallback method when ML is not available"""
         print("⚠️ Using fallback interaction check")
@@ -521,25 +708,90 @@ class DoseSafeMLPredictor:
             'models_loaded': list(self.models.keys()),
             'vectorizers_loaded': list(self.vectorizers.keys()),
             'encoders_loaded': list(self.encoders.keys()),
-            'drug_database_size': len(self.drug_database)
+            'drug_database_size': len(self.drug_database),
+            'models_dir': self.models_dir,
+            'version': self.version,
+            'checksum': self.manifest['checksum'] if self.manifest else None,
+            'mmap_mode': ML_MMAP_MODE,
+            'compiled': sorted(name for name, artifact in {**self.models, **self.vectorizers, **self.encoders}.items()
+                               if type(artifact).__module__ == 'compiled_models'),
+            'name_cache': self.name_cache.get_stats(),
+            'token_cache': self.token_cache.get_stats()
         }
 
 # Global instance for easy import
 dosesafe_ml = DoseSafeMLPredictor()
 
+_reload_lock = threading.Lock()
+_poll_lock = threading.Lock()
+_last_poll = time.monotonic()
+
+def reload_models(version=None):
+    """
+    Load a model version (the registry's active one by default) and swap it
+    in. The new predictor is built off to the side and replaces dosesafe_ml
+    in one assignment: requests already running finish on the predictor they
+    started with, new ones get the new version. Raises ModelRegistryError and
+    keeps the current models if the version can't be loaded.
+    """
+    global dosesafe_ml
+    with _reload_lock:
+        predictor = DoseSafeMLPredictor(models_dir=dosesafe_ml.registry_dir, version=version)
+        if not predictor.is_loaded:
+            raise ModelRegistryError(f"Could not load models from {predictor.models_dir}")
+        previous, dosesafe_ml = dosesafe_ml, predictor
+    print(f"🔁 Swapped ML models: {previous.version} -> {predictor.version}")
+    return {'version': predictor.version, 'previous': previous.version}
+
+def _reload_active():
+    try:
+        reload_models()
+    except Exception as reload_error:
+        print(f"⚠️ Could not reload ML models: {reload_error}")
+
+def reload_in_background():
+    """reload_models() for the active version on a separate thread (signal handlers, polling)"""
+    threading.Thread(target=_reload_active, daemon=True, name='ml-model-reload').start()
+
+def _follow_registry():
+    """Pick up a version activated elsewhere (another worker, the trainer), in the background"""
+    global _last_poll
+    if MODEL_REGISTRY_POLL_SECONDS <= 0 or time.monotonic() - _last_poll < MODEL_REGISTRY_POLL_SECONDS:
+        return
+    if not _poll_lock.acquire(blocking=False):
+        return
+    try:
+        _last_poll = time.monotonic()
+        active = active_version(dosesafe_ml.registry_dir)
+        if active is not None and active != dosesafe_ml.version and not _reload_lock.locked():
+            reload_in_background()
+    except Exception as poll_error:
+        print(f"⚠️ Could not read the model registry: {poll_error}")
+    finally:
+        _poll_lock.release()
+
 # Convenience functions for easy use
 def extract_medicines(text):
     """Extract medicines from text using ML"""
+    _follow_registry()
     return dosesafe_ml.extract_medicines_from_text(text)
 
 def check_interactions(drug1, drug2):
     """Check drug interactions using ML"""
+    _follow_registry()
     return dosesafe_ml.check_drug_interactions(drug1, drug2)
 
+def check_interactions_batch(drugs):
+    """Check all drug pairs for interactions using ML in one batch"""
+    _follow_registry()
+    return dosesafe_ml.check_interactions_batch(drugs)
+
 def check_age_warnings(drug_name, age_group="Adult"):
     """Check age warnings using ML"""
+    _follow_registry()
     return dosesafe_ml.check_age_warnings(drug_name, age_group)
 
 def get_ml_status():
     """Get ML system status"""
+    _follow_registry()
     return dosesafe_ml.get_model_status()
@@ -0,0 +1,209 @@
+"""
+Model Registry for DoseSafe-AI
+Versioned model artifacts with a manifest, and an active-version pointer that
+running services follow (see ml_integration.reload_models)
+
+    models/
+        registry.json               {"active": <version>, "previous": <version>, ...}
+        versions/<version>/
+            manifest.json           version, publish sequence, checksum, training stats, feature schema
+            *.joblib, training_stats.json, drug_database.json
+
+A directory of bare .joblib files without registry.json (the layout before
+the registry) still loads, as an unversioned set of models.
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+
+import joblib
+
+REGISTRY_FILE = 'registry.json'
+MANIFEST_FILE = 'manifest.json'
+VERSIONS_DIR = 'versions'
+TRAINING_STATS_FILE = 'training_stats.json'
+
+
+class ModelRegistryError(Exception):
+    """Unknown version, or artifacts that don't match their manifest"""
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as artifact:
+        for block in iter(lambda: artifact.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def combined_checksum(files):
+    """One checksum for a version, from the per-file ones"""
+    digest = hashlib.sha256()
+    for name in sorted(files):
+        digest.update(f"{name}:{files[name]}\n".encode())
+    return digest.hexdigest()
+
+
+def describe_artifact(artifact):
+    """What a model, vectorizer or encoder expects and produces"""
+    schema = {'type': f"{type(artifact).__module__}.{type(artifact).__name__}"}
+    if hasattr(artifact, 'n_features_in_'):
+        schema['n_features'] = int(artifact.n_features_in_)
+    if hasattr(artifact, 'classes_'):
+        schema['classes'] = [str(label) for label in artifact.classes_]
+    if hasattr(artifact, 'vocabulary_'):
+        schema['vocabulary_size'] = len(artifact.vocabulary_)
+        schema['analyzer'] = artifact.analyzer if isinstance(artifact.analyzer, str) else 'callable'
+        schema['ngram_range'] = list(artifact.ngram_range)
+    return schema
+
+
+def _write_json(path, data):
+    """Write through a temporary file and rename, so readers never see half a file"""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'w') as temp_file:
+            json.dump(data, temp_file, indent=2)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def build_manifest(artifacts_dir, version=None):
+    files = {name: file_checksum(os.path.join(artifacts_dir, name))
+             for name in sorted(os.listdir(artifacts_dir)) if name != MANIFEST_FILE}
+    checksum = combined_checksum(files)
+
+    training_stats = {}
+    stats_path = os.path.join(artifacts_dir, TRAINING_STATS_FILE)
+    if os.path.exists(stats_path):
+        with open(stats_path) as stats_file:
+            training_stats = json.load(stats_file)
+
+    feature_schema = {
+        name[:-len('.joblib')]: describe_artifact(joblib.load(os.path.join(artifacts_dir, name)))
+        for name in files if name.endswith('.joblib')
+    }
+
+    return {
+        'version': version or f"{time.strftime('%Y%m%d-%H%M%S')}-{checksum[:8]}",
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'checksum': checksum,
+        'files': files,
+        'training_stats': training_stats,
+        'feature_schema': feature_schema
+    }
+
+
+def publish(artifacts_dir, registry_dir, version=None, activate=True):
+    """
+    Copy a trained set of artifacts into the registry as a new version and
+    (by default) make it the active one. Returns the manifest.
+    """
+    manifest = build_manifest(artifacts_dir, version)
+    # created_at has one-second resolution; the sequence orders versions published within a second
+    published = [manifest.get('sequence', 0) for manifest in list_versions(registry_dir)]
+    manifest['sequence'] = max(published, default=0) + 1
+    versions_dir = os.path.join(registry_dir, VERSIONS_DIR)
+    version_dir = os.path.join(versions_dir, manifest['version'])
+    if os.path.exists(version_dir):
+        raise ModelRegistryError(f"Version {manifest['version']} already exists")
+
+    # Assemble next to the final location, then rename: a version is complete or absent
+    os.makedirs(versions_dir, exist_ok=True)
+    staging_dir = tempfile.mkdtemp(dir=versions_dir, prefix='.staging-')
+    try:
+        for name in manifest['files']:
+            shutil.copy2(os.path.join(artifacts_dir, name), staging_dir)
+        _write_json(os.path.join(staging_dir, MANIFEST_FILE), manifest)
+        os.rename(staging_dir, version_dir)
+    except BaseException:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+    print(f"📦 Published model version {manifest['version']}")
+
+    if activate:
+        activate_version(registry_dir, manifest['version'])
+    return manifest
+
+
+def read_registry(registry_dir):
+    """Contents of registry.json, or None for an unversioned models directory"""
+    path = os.path.join(registry_dir, REGISTRY_FILE)
+    try:
+        with open(path) as registry_file:
+            return json.load(registry_file)
+    except FileNotFoundError:
+        return None
+
+
+def active_version(registry_dir):
+    registry = read_registry(registry_dir)
+    return registry.get('active') if registry else None
+
+
+def list_versions(registry_dir):
+    """Manifests of all published versions, in publish order"""
+    versions_dir = os.path.join(registry_dir, VERSIONS_DIR)
+    if not os.path.isdir(versions_dir):
+        return []
+    manifests = []
+    for name in os.listdir(versions_dir):
+        manifest_path = os.path.join(versions_dir, name, MANIFEST_FILE)
+        if not name.startswith('.') and os.path.exists(manifest_path):
+            with open(manifest_path) as manifest_file:
+                manifests.append(json.load(manifest_file))
+    # Versions published before manifests had a sequence sort first, by time
+    return sorted(manifests, key=lambda manifest: (manifest.get('sequence', 0), manifest['created_at'],
+                                                   manifest['version']))
+
+
+def verify(version_dir):
+    """The version's manifest, after checking every artifact against its checksum"""
+    manifest_path = os.path.join(version_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise ModelRegistryError(f"No manifest in {version_dir}")
+    with open(manifest_path) as manifest_file:
+        manifest = json.load(manifest_file)
+    for name, checksum in manifest['files'].items():
+        path = os.path.join(version_dir, name)
+        if not os.path.exists(path) or file_checksum(path) != checksum:
+            raise ModelRegistryError(f"{name} in version {manifest['version']} does not match its manifest")
+    return manifest
+
+
+def resolve(registry_dir, version=None):
+    """
+    (artifacts directory, verified manifest) for `version`, or for the active
+    version when None. An unversioned directory resolves to itself with no
+    manifest.
+    """
+    if version is None:
+        version = active_version(registry_dir)
+        if version is None:
+            return registry_dir, None
+    version_dir = os.path.join(registry_dir, VERSIONS_DIR, version)
+    if not os.path.isdir(version_dir):
+        raise ModelRegistryError(f"Unknown model version: {version}")
+    return version_dir, verify(version_dir)
+
+
+def activate_version(registry_dir, version):
+    """Point the registry at `version`; services pick it up on reload"""
+    resolve(registry_dir, version)
+    registry = read_registry(registry_dir) or {}
+    if registry.get('active') == version:
+        return registry
+    registry = {
+        'active': version,
+        'previous': registry.get('active'),
+        'updated_at': time.strftime('%Y-%m-%dT%H:%M:%S%z')
+    }
+    _write_json(os.path.join(registry_dir, REGISTRY_FILE), registry)
+    print(f"✅ Active model version is now {version}")
+    return registry
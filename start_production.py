@@ -75,6 +75,22 @@ def check_dependencies():
     
     return True
 
+def models_available():
+    """True if the model registry has an active version (or the models predate the registry)"""
+    models_dir = Path(__file__).parent / "ml_models" / "models"
+    if (models_dir / "registry.json").exists():
+        return True
+    return any(models_dir.glob("*.joblib"))
+
+def train_models():
+    """Train and publish a model version (see ml_models/model_registry.py)"""
+    ml_dir = Path(__file__).parent / "ml_models"
+    result = subprocess.run([sys.executable, "comprehensive_trainer_fixed.py"], cwd=ml_dir)
+    if result.returncode == 0:
+        print("✅ ML models trained and activated")
+    else:
+        print("❌ ML model training failed")
+
 def main():
     """Main startup function"""
     print("🏥 DoseSafe-AI Production Startup")
@@ -85,14 +101,11 @@ def main():
         print("❌ Dependency check failed. Please fix issues above.")
         return
     
-    # Check if ML models exist
-    models_dir = Path(__file__).parent / "ml_models" / "models"
-    if not models_dir.exists():
-        print("⚠️ ML models not found. Training models...")
-        ml_dir = Path(__file__).parent / "ml_models"
-        os.chdir(ml_dir)
-        subprocess.run([sys.executable, "comprehensive_trainer_fixed.py"])
-        os.chdir(Path(__file__).parent)
+    # Train ML models in the background if there are none; the backend starts
+    # with fallback extraction and picks them up once the trainer activates them
+    if not models_available():
+        print("⚠️ ML models not found. Training models in the background...")
+        threading.Thread(target=train_models, daemon=True).start()
     
     print("🚀 Starting DoseSafe-AI...")
     
@@ -0,0 +1,86 @@
+"""
+Test script for the ASGI deployment mode (backend/asgi.py)
+Calls each async LLM endpoint and its Flask twin against a stub LLM server
+and checks they answer the same, including the fallback when the upstream
+fails. No API key needed.
+"""
+
+import sys
+import os
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+sys.path.append(BACKEND_DIR)
+sys.path.append(os.path.join(os.path.dirname(__file__), 'benchmarks'))
+
+from stub_llm_server import start_stub_server
+
+# The route modules read their gateway settings at import time
+stub = start_stub_server()
+os.environ['LLM_BASE_URL'] = stub.base_url
+os.environ['GROQ_API_KEY'] = 'stub-key'
+os.environ['LLM_MAX_RETRIES'] = '0'
+os.environ['LLM_CACHE_SIZE'] = '0'
+
+os.chdir(BACKEND_DIR)
+from starlette.testclient import TestClient
+from asgi import app, flask_app
+from services.llm_gateway import get_llm_gateway
+
+REQUESTS = {
+    '/ai-interactions/comprehensive-check': {"medicines": [{"name": "Aspirin", "dose": "81mg"}], "age": 70},
+    '/ai-nlp/smart-extract': {"text": "Aspirin 81mg once daily"},
+    '/ai-ocr/enhance-text': {"text": "Asprin 81mg od"},
+    '/chatbot/ask': {"context": {"medicines": [{"name": "Aspirin", "dose": "81mg"}]}},
+    '/chatbot/chat': {"message": "Can I take aspirin daily?"},
+}
+
+
+async_client = TestClient(app)
+sync_client = flask_app.test_client()
+
+
+def test_healthy_upstream():
+    print("\n⚡ Healthy upstream:")
+    for path, payload in REQUESTS.items():
+        before = stub.requests
+        async_response = async_client.post(path, json=payload)
+        async_calls = stub.requests - before
+        sync_response = sync_client.post(path, json=payload)
+        assert async_response.status_code == sync_response.status_code == 200, path
+        assert async_response.json() == sync_response.get_json(), f"{path} answers like Flask"
+        assert async_calls == 1, f"{path} calls the LLM once"
+
+
+def test_failing_upstream():
+    print("\n🛟 Failing upstream:")
+    try:
+        for path, payload in REQUESTS.items():
+            get_llm_gateway().breaker.record_success()  # start each endpoint with a closed circuit
+            stub.fail_next = 1
+            async_body = async_client.post(path, json=payload).json()
+            get_llm_gateway().breaker.record_success()
+            stub.fail_next = 1
+            sync_body = sync_client.post(path, json=payload).get_json()
+            for body in (async_body, sync_body):
+                body.pop('error', None)  # error text names the raising call
+            assert async_body == sync_body, f"{path} falls back like Flask"
+    finally:
+        stub.fail_next = 0
+        get_llm_gateway().breaker.record_success()
+
+
+def test_flask_mount():
+    print("\n🌐 Flask mount:")
+    assert async_client.get('/health').json() == {"status": "healthy"}, "other routes are served by the Flask app"
+    assert async_client.post('/ai-nlp/smart-extract', json={"text": " "}).status_code == 400, \
+        "bad input is rejected like Flask"
+
+
+if __name__ == "__main__":
+    print("🧪 Testing ASGI routes against their Flask twins")
+    print("=" * 50)
+    test_healthy_upstream()
+    test_failing_upstream()
+    test_flask_mount()
+    stub.shutdown()
+    print("\n🎉 All ASGI route checks passed!")
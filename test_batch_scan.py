@@ -0,0 +1,184 @@
+"""
+Test script for the batch prescription scan API (/ai-only-ocr/ai-scan/batch)
+Checks multipart and zip uploads, NDJSON lines streamed as documents finish,
+bounded parallelism, per-document failures and the size limits that keep a
+zip bomb from expanding in memory.
+"""
+
+import sys
+import os
+import io
+import json
+import time
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+sys.path.append(BACKEND_DIR)
+os.chdir(BACKEND_DIR)
+
+from flask import Flask
+from werkzeug.datastructures import FileStorage
+import services.batch_scan as batch_scan
+from services.batch_scan import BATCH_SCAN_WORKERS, collect_documents, run_batch
+from services.image_ingest import enable_in_memory_uploads
+import routes.ai_only_ocr as ai_only_ocr
+
+PRESCRIPTIONS = {
+    "rx_warfarin.txt": "Patient age: 72\nWarfarin 5mg once daily\nAspirin 81mg once daily",
+    "rx_metformin.txt": "Metformin 500mg twice daily",
+    "rx_lisinopril.txt": "Lisinopril 10mg once daily",
+}
+
+
+def zip_bytes(files):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w', compression=zipfile.ZIP_DEFLATED) as zipped:
+        for name, text in files.items():
+            zipped.writestr(name, text)
+    return archive.getvalue()
+
+
+def text_upload(name, text):
+    return (io.BytesIO(text.encode()), name, 'text/plain')
+
+
+def post_batch(client, uploads, **form):
+    return client.post('/ai-only-ocr/ai-scan/batch', data={'files': uploads, **form}, content_type='multipart/form-data')
+
+
+class RecordingAnalysis:
+    """Stands in for the AI analysis: slow for names containing 'slow', records peak concurrency"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def __call__(self, text, filename):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.6 if 'slow' in filename else 0.1)
+        with self.lock:
+            self.active -= 1
+        if 'broken' in filename:
+            raise RuntimeError("analysis failed")
+        return {"medicines": [{"name": text.split()[0]}]}
+
+
+def make_client():
+    app = enable_in_memory_uploads(Flask(__name__))
+    app.register_blueprint(ai_only_ocr.ai_only_ocr_bp, url_prefix='/ai-only-ocr')
+    return app.test_client()
+
+
+def test_multipart_and_zip_uploads():
+    print("\n📦 Multipart and zip uploads:")
+    uploads = [text_upload(name, text) for name, text in PRESCRIPTIONS.items()]
+    uploads.append((io.BytesIO(zip_bytes({f"nightly/{name}": text for name, text in PRESCRIPTIONS.items()})),
+                    'backfill.zip', 'application/zip'))
+    response = post_batch(make_client(), uploads)
+    assert response.is_streamed and response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert sorted(line['index'] for line in lines) == list(range(6))
+    assert sum(line['filename'].startswith('nightly/') for line in lines) == 3, "zips are expanded into their files"
+    assert all(line['success'] for line in lines)
+
+    warfarin = next(line for line in lines if line['filename'] == 'rx_warfarin.txt')
+    medicines = [medicine['name'].lower() for medicine in warfarin['ai_enhanced'].get('medicines', [])]
+    print(f"   rx_warfarin.txt: medicines {medicines}, {len(warfarin['interactions'])} interactions")
+    assert 'warfarin' in medicines
+    assert isinstance(warfarin['interactions'], list)
+
+
+def test_streaming_and_parallelism():
+    print("\n🌊 Streaming and parallelism:")
+    real_analysis = ai_only_ocr.analyze_prescription_with_ai
+    analysis = RecordingAnalysis()
+    ai_only_ocr.analyze_prescription_with_ai = analysis
+    try:
+        names = ['slow_first.txt'] + [f"rx_{number}.txt" for number in range(BATCH_SCAN_WORKERS * 2)] + ['rx_broken.txt']
+        response = post_batch(make_client(), [text_upload(name, "Metformin 500mg") for name in names])
+        start = time.perf_counter()
+        arrivals = []
+        for chunk in response.response:
+            arrivals.append((time.perf_counter() - start, json.loads(chunk)))
+    finally:
+        ai_only_ocr.analyze_prescription_with_ai = real_analysis
+
+    order = [line['index'] for _, line in arrivals]
+    print(f"   completion order {order}, first line after {arrivals[0][0]:.2f}s, last after {arrivals[-1][0]:.2f}s")
+    assert order[0] != 0 and 0 in order, "lines arrive as documents finish, not in upload order"
+    assert arrivals[0][0] < arrivals[-1][0] / 2, "the first line arrives before the batch is done"
+    assert 1 < analysis.peak <= BATCH_SCAN_WORKERS
+    broken = next(line for _, line in arrivals if line['filename'] == 'rx_broken.txt')
+    assert not broken['success'] and 'analysis failed' in broken['error']
+    assert sum(line['success'] for _, line in arrivals) == len(names) - 1, "the rest of the batch still succeeds"
+
+
+def test_rejected_batches():
+    print("\n🚫 Rejected batches:")
+    client = make_client()
+    assert post_batch(client, []).status_code == 400
+    bad_zip = post_batch(client, [(io.BytesIO(b"PK\x03\x04 not really a zip"), 'broken.zip', 'application/zip')])
+    assert bad_zip.status_code == 400
+    assert post_batch(client, [text_upload('a.txt', 'Metformin')], patientAge='old').status_code == 400
+
+
+def test_zip_size_limits():
+    print("\n💣 Zip size limits:")
+    client = make_client()
+    # 40 MB of zeros deflates to about 40 KB
+    bomb = zip_bytes({"rx_zeros.txt": "0" * (40 * 1024 * 1024)})
+    assert len(bomb) < 100 * 1024
+    response = post_batch(client, [(io.BytesIO(bomb), 'bomb.zip', 'application/zip')])
+    assert response.status_code == 413, "an entry over MAX_UPLOAD_BYTES uncompressed"
+
+    entries = {f"rx_{number}.txt": "0" * (1024 * 1024) for number in range(8)}
+    real_limit = batch_scan.BATCH_MAX_UNCOMPRESSED_BYTES
+    batch_scan.BATCH_MAX_UNCOMPRESSED_BYTES = 5 * 1024 * 1024
+    try:
+        response = post_batch(client, [(io.BytesIO(zip_bytes(entries)), 'many.zip', 'application/zip')])
+    finally:
+        batch_scan.BATCH_MAX_UNCOMPRESSED_BYTES = real_limit
+    assert response.status_code == 413, "entries adding up to more than BATCH_MAX_UNCOMPRESSED_BYTES"
+
+
+def test_zip_entries_inflated_by_workers():
+    print("\n🗜️ Zip entries inflated on demand:")
+    upload = FileStorage(stream=io.BytesIO(zip_bytes({f"rx_{number}.txt": f"Metformin {number}" for number in range(6)})),
+                         filename='nightly.zip', content_type='application/zip')
+    documents = collect_documents([upload])
+    assert [document.filename for document in documents] == [f"rx_{number}.txt" for number in range(6)]
+    assert not any(isinstance(document, FileStorage) for document in documents), "nothing is inflated up front"
+
+    lock = threading.Lock()
+    state = {'open': 0, 'peak': 0}
+
+    def scan(document):
+        with lock:
+            state['open'] += 1
+            state['peak'] = max(state['peak'], state['open'])
+        text = document.read().decode()
+        time.sleep(0.05)
+        with lock:
+            state['open'] -= 1
+        return {"success": True, "text": text}
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = dict(run_batch(documents, scan, executor=executor))
+    assert [results[index]['text'] for index in range(6)] == [f"Metformin {number}" for number in range(6)]
+    assert state['peak'] <= 2, "at most one inflated entry per worker"
+
+
+if __name__ == "__main__":
+    print("🧪 Testing batch prescription scan API")
+    print("=" * 50)
+    test_multipart_and_zip_uploads()
+    test_streaming_and_parallelism()
+    test_rejected_batches()
+    test_zip_size_limits()
+    test_zip_entries_inflated_by_workers()
+    print("\n🎉 All batch scan checks passed!")
@@ -0,0 +1,102 @@
+"""
+Test script for the streaming chatbot endpoint (/chatbot/chat/stream)
+Serves the chatbot blueprint over real HTTP against a stub LLM server and
+compares time-to-first-byte with the buffered /chatbot/chat endpoint.
+Also checks the safety disclaimer and the single-chunk fallback.
+"""
+
+import sys
+import os
+import json
+import threading
+import time
+import contextlib
+import http.client
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+sys.path.append(os.path.join(os.path.dirname(__file__), 'benchmarks'))
+
+from stub_llm_server import start_stub_server
+
+STUB_REPLY = ' '.join(['Ibuprofen can raise blood pressure and may interact with lisinopril.'] * 8)
+
+# The route module reads its gateway settings at import time
+stub = start_stub_server(latency=0.2, token_delay=0.02, reply=STUB_REPLY)
+os.environ['LLM_BASE_URL'] = stub.base_url
+os.environ['GROQ_API_KEY'] = 'stub-key'
+
+from flask import Flask
+from werkzeug.serving import make_server
+from routes.chatbot import chatbot_bp, SAFETY_DISCLAIMER
+
+QUESTION = {"message": "Can I take ibuprofen with lisinopril?"}
+
+
+@contextlib.contextmanager
+def app_server():
+    """The chatbot blueprint on a real HTTP server; yields its port"""
+    app = Flask(__name__)
+    app.register_blueprint(chatbot_bp, url_prefix='/chatbot')
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield server.server_port
+    finally:
+        server.shutdown()
+
+
+def timed_post(port, path, payload):
+    """(seconds to first body byte, seconds to complete, body text)"""
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    start = time.perf_counter()
+    connection.request('POST', path, body=json.dumps(payload), headers={'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    first = response.read1(1) if hasattr(response, 'read1') else response.read(1)
+    first_byte = time.perf_counter() - start
+    body = first + response.read()
+    total = time.perf_counter() - start
+    connection.close()
+    return first_byte, total, body.decode('utf-8')
+
+
+def parse_events(body):
+    return [json.loads(line[len('data: '):]) for line in body.split('\n') if line.startswith('data: ')]
+
+
+def test_stream_first_byte_and_events():
+    print("\n⏱️ Time to first byte:")
+    with app_server() as port:
+        buffered_first, buffered_total, _ = timed_post(port, '/chatbot/chat', QUESTION)
+        stream_first, stream_total, body = timed_post(port, '/chatbot/chat/stream', QUESTION)
+    print(f"   /chat        first byte {buffered_first * 1000:7.1f} ms, complete {buffered_total * 1000:7.1f} ms")
+    print(f"   /chat/stream first byte {stream_first * 1000:7.1f} ms, complete {stream_total * 1000:7.1f} ms")
+    assert stream_first < buffered_first / 2, "streaming sends its first byte well before the full answer"
+
+    events = parse_events(body)
+    deltas = [event['content'] for event in events if event['type'] == 'delta']
+    assert len(deltas) > 10, "the answer arrives as many deltas"
+    assert ''.join(deltas).startswith(STUB_REPLY), "deltas reassemble the full answer"
+    assert deltas[-1] == SAFETY_DISCLAIMER, "the safety disclaimer is appended at the end"
+    assert events[-1] == {"type": "done"}, "the stream ends with done"
+
+
+def test_upstream_failure_falls_back():
+    print("\n🛟 Upstream failure:")
+    stub.fail_next = 10
+    try:
+        with app_server() as port:
+            _, _, body = timed_post(port, '/chatbot/chat/stream', QUESTION)
+    finally:
+        stub.fail_next = 0
+    events = parse_events(body)
+    assert [event['type'] for event in events] == ['fallback', 'done'], "a single rule-based chunk"
+    assert events[0]['content']
+
+
+if __name__ == "__main__":
+    print("🧪 Testing streaming chat endpoint against a stub LLM")
+    print("=" * 50)
+    test_stream_first_byte_and_events()
+    test_upstream_failure_falls_back()
+    stub.shutdown()
+    print("\n🎉 All streaming chat checks passed!")
@@ -0,0 +1,159 @@
+"""
+Test script for compiled models (ml_models/compiled_models.py)
+Checks the numpy copies of the forests, XGBoost models, TF-IDF vectorizers
+and label encoders reproduce the originals, that export skips what it can't
+compile, and that DoseSafeMLPredictor serves the compiled copies without
+importing scikit-learn or XGBoost.
+"""
+
+import sys
+import os
+import json
+import shutil
+import tempfile
+import subprocess
+
+import joblib
+import numpy as np
+from scipy import sparse
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import LabelEncoder
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+ML_DIR = os.path.join(ROOT_DIR, 'ml_models')
+sys.path.append(ML_DIR)
+
+from compiled_models import compile_artifact, export_compiled, COMPILED_SUFFIX
+
+MEDICINES = ['Metformin', 'Warfarin', 'Aspirin', 'Lisinopril', 'Ibuprofen', 'Amoxicillin', 'Atorvastatin', 'Digoxin']
+OTHER_WORDS = ['twice', 'daily', 'patient', 'hospital', 'tablet', 'morning', 'bedtime', 'with food']
+DOCUMENTS = ["warfarin aspirin", "metformin   lisinopril", "Ibuprofen 400mg with food", "", "x"]
+
+# Loads the models as a worker would and reports whether the ML libraries came along
+PREDICTOR_PROBE = """
+import contextlib, io, json, sys
+with contextlib.redirect_stdout(io.StringIO()):
+    import ml_integration
+    tokens = ml_integration.dosesafe_ml._classify_tokens({tokens})
+print(json.dumps({{'compiled': ml_integration.get_ml_status()['compiled'],
+                  'libraries': [name for name in ('sklearn', 'xgboost') if name in sys.modules],
+                  'tokens': {{token: [int(label), float(confidence)] for token, (label, confidence) in tokens.items()}}}}))
+"""
+
+
+def max_difference(a, b):
+    return float(np.abs(np.asarray(a, dtype=float) - np.asarray(b, dtype=float)).max())
+
+
+def training_data():
+    """(X, y with three classes, unseen rows X_new, rng for further draws)"""
+    rng = np.random.default_rng(7)
+    X = rng.random((400, 12)) * rng.integers(0, 20, 12)
+    y = (X[:, 0] + X[:, 3] > X[:, 5]).astype(int) + (X[:, 7] > 5)
+    X_new = rng.random((50, 12)) * rng.integers(0, 20, 12)
+    return X, y, X_new, rng
+
+
+def test_random_forest():
+    print("\n🌲 Random forest:")
+    X, y, X_new, _ = training_data()
+    forest = RandomForestClassifier(n_estimators=30, max_depth=8, random_state=0).fit(X, y)
+    compiled = compile_artifact(forest)
+    assert max_difference(compiled.predict_proba(X_new), forest.predict_proba(X_new)) < 1e-9, \
+        "class probabilities match predict_proba"
+    assert list(compiled.predict(X_new)) == list(forest.predict(X_new)), "predict returns the same classes"
+    assert max_difference(compiled.predict_proba(X_new[:1]), forest.predict_proba(X_new[:1])) < 1e-9, \
+        "a single row is scored like a batch"
+
+
+def test_xgboost():
+    print("\n🚀 XGBoost:")
+    try:
+        import xgboost as xgb
+    except ImportError:
+        print("   ⚠️ XGBoost not installed, skipping")
+        return
+    X, y, X_new, rng = training_data()
+    booster = xgb.XGBClassifier(n_estimators=40, max_depth=5, random_state=0).fit(X, (y > 0).astype(int))
+    compiled = compile_artifact(booster)
+    assert max_difference(compiled.predict_proba(X_new), booster.predict_proba(X_new)) < 1e-5, \
+        "probabilities match within float32 rounding"
+    X_missing = X_new.copy()
+    X_missing[rng.random(X_missing.shape) < 0.3] = np.nan
+    assert max_difference(compiled.predict_proba(X_missing), booster.predict_proba(X_missing)) < 1e-5, \
+        "missing values follow each split's default direction"
+    X_sparse = sparse.csr_matrix(np.where(rng.random(X_new.shape) < 0.6, 0, X_new))
+    assert max_difference(compiled.predict_proba(X_sparse), booster.predict_proba(X_sparse)) < 1e-5, \
+        "entries absent from a sparse matrix count as missing, as in XGBoost"
+
+
+def test_vectorizers_and_encoders():
+    print("\n🔤 Vectorizers and encoders:")
+    rng = np.random.default_rng(7)
+    texts = [" ".join(rng.choice(MEDICINES + OTHER_WORDS, 3)) for _ in range(100)]
+    for settings in ({'ngram_range': (1, 2)}, {'analyzer': 'char', 'ngram_range': (1, 3), 'max_features': 300}):
+        vectorizer = TfidfVectorizer(**settings).fit(texts)
+        compiled = compile_artifact(vectorizer)
+        difference = abs(compiled.transform(DOCUMENTS + texts) - vectorizer.transform(DOCUMENTS + texts))
+        assert (difference.max() if difference.nnz else 0) < 1e-12, \
+            f"{settings.get('analyzer', 'word')} TF-IDF matches transform"
+
+    compiled = compile_artifact(LabelEncoder().fit(['Adult', 'Elderly', 'Pediatric']))
+    assert list(compiled.transform(['Elderly', 'Adult'])) == [1, 0], "the label encoder round-trips"
+    assert list(compiled.inverse_transform([2])) == ['Pediatric']
+    try:
+        compiled.transform(['Neonates'])
+        raise AssertionError("unseen labels should raise ValueError, like LabelEncoder")
+    except ValueError:
+        pass
+
+
+def test_export_and_serving():
+    print("\n📤 Export and serving:")
+    models_dir = tempfile.mkdtemp(prefix='models_')
+    try:
+        tokens = MEDICINES + OTHER_WORDS
+        vectorizer = TfidfVectorizer(analyzer='char', ngram_range=(1, 3)).fit(tokens)
+        extractor = RandomForestClassifier(n_estimators=20, random_state=0)
+        extractor.fit(vectorizer.transform(tokens), [1] * len(MEDICINES) + [0] * len(OTHER_WORDS))
+        joblib.dump(extractor, os.path.join(models_dir, 'medicine_extractor.joblib'))
+        joblib.dump(vectorizer, os.path.join(models_dir, 'medicine_text_vectorizer.joblib'))
+        joblib.dump(TfidfVectorizer(analyzer='char_wb').fit(tokens), os.path.join(models_dir, 'warning_drug_vectorizer.joblib'))
+        exported = export_compiled(models_dir, texts=tokens)
+        assert exported == ['medicine_extractor', 'medicine_text_vectorizer'], "supported artifacts are exported"
+        assert os.path.exists(os.path.join(models_dir, 'medicine_extractor' + COMPILED_SUFFIX)), "next to the originals"
+        assert not os.path.exists(os.path.join(models_dir, 'warning_drug_vectorizer' + COMPILED_SUFFIX)), \
+            "unsupported settings are skipped, the original stays in use"
+
+        os.remove(os.path.join(models_dir, 'warning_drug_vectorizer.joblib'))
+        probes = {}
+        for flag in ('1', '0'):
+            completed = subprocess.run([sys.executable, '-c', PREDICTOR_PROBE.format(tokens=tokens)], cwd=ML_DIR,
+                                       capture_output=True, text=True,
+                                       env=dict(os.environ, ML_MODELS_DIR=models_dir, ML_COMPILED_MODELS=flag))
+            assert completed.returncode == 0, f"ML_COMPILED_MODELS={flag}: {completed.stderr[-500:]}"
+            probes[flag] = json.loads(completed.stdout.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(models_dir, ignore_errors=True)
+
+    compiled_probe, original_probe = probes['1'], probes['0']
+    assert compiled_probe['compiled'] == ['medicine_extractor', 'medicine_text'], \
+        "the predictor serves the compiled copies when present"
+    assert compiled_probe['libraries'] == [], "without importing scikit-learn or XGBoost"
+    assert original_probe['compiled'] == [], "ML_COMPILED_MODELS=0 serves the originals"
+    for token in tokens:
+        compiled_label, compiled_confidence = compiled_probe['tokens'][token]
+        original_label, original_confidence = original_probe['tokens'][token]
+        assert compiled_label == original_label and abs(compiled_confidence - original_confidence) < 1e-9, \
+            f"both classify {token!r} the same, with the same confidence"
+
+
+if __name__ == "__main__":
+    print("🧪 Testing compiled models")
+    print("=" * 50)
+    test_random_forest()
+    test_xgboost()
+    test_vectorizers_and_encoders()
+    test_export_and_serving()
+    print("\n🎉 All compiled model checks passed!")
@@ -0,0 +1,148 @@
+"""
+Test script for the shared drug knowledge base (backend/services/drug_knowledge_base.py)
+Checks the pair index in drug_checker finds what the old full-table scan
+found, in either argument order, that interaction_rows() / warning_rows()
+give back the CSV rows, and how malformed CSV rows are handled.
+"""
+
+import sys
+import os
+import io
+import csv
+import random
+import shutil
+import tempfile
+import contextlib
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+sys.path.append(BACKEND_DIR)
+
+from services.drug_knowledge_base import (DrugKnowledgeBase, INTERACTIONS_FILE, WARNINGS_FILE,
+                                          INTERACTION_COLUMNS, WARNING_COLUMNS)
+
+with contextlib.redirect_stdout(io.StringIO()):
+    from services import drug_checker
+
+
+def csv_rows(path, columns, drug_columns):
+    """The CSV as the knowledge base should see it: stripped headers and cells, rows without a drug dropped"""
+    with open(path, newline='', encoding='utf-8') as csvfile:
+        reader = csv.DictReader(csvfile)
+        reader.fieldnames = [name.strip() for name in reader.fieldnames]
+        rows = [{column: (row.get(column) or '').strip() for column in columns} for row in reader]
+    return [row for row in rows if all(row[column] for column in drug_columns)]
+
+
+def linear_scan(med1, med2, interactions):
+    """The pre-index lookup: scan every row, keep the highest severity (first wins on ties)"""
+    found = None
+    for entry in interactions:
+        if drug_checker.interaction_matches(med1, med2, entry['drug1'], entry['drug2']):
+            if not found or drug_checker.get_severity_rank(entry['severity']) > drug_checker.get_severity_rank(found['severity']):
+                found = entry
+    return found
+
+
+def write_csv(path, text):
+    with open(path, 'w', encoding='utf-8') as csvfile:
+        csvfile.write(text)
+
+
+def load_knowledge_base(interactions_path, warnings_path):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return DrugKnowledgeBase(interactions_path, warnings_path, snapshot_path=None)
+
+
+def test_pair_index_matches_linear_scan():
+    print("\n🔗 Pair index vs. full-table scan:")
+    knowledge_base = drug_checker.KNOWLEDGE_BASE
+    interactions = [{key: value.lower() if key.startswith('drug') else value for key, value in row.items()}
+                    for row in knowledge_base.interaction_rows()]
+    rng = random.Random(7)
+    pairs = [(row['drug1'], row['drug2']) for row in rng.sample(interactions, 200)]
+    names = sorted(knowledge_base.drug_names)
+    pairs += [tuple(rng.sample(names, 2)) for _ in range(200)]
+    pairs += [(' WARFARIN ', 'haloperidol'), ('Warfarin', 'Halo-peridol'), ('warfarin', 'warfarin'), ('', 'aspirin')]
+
+    for med1, med2 in pairs:
+        expected = linear_scan(med1, med2, interactions)
+        for first, second in ((med1, med2), (med2, med1)):
+            entry = drug_checker.INTERACTION_INDEX.get(drug_checker.pair_key(first, second))
+            found = None if entry is None else {
+                'drug1': knowledge_base.drug_names[entry.drug1_id], 'drug2': knowledge_base.drug_names[entry.drug2_id],
+                'severity': entry.severity, 'note': entry.note}
+            assert found == expected, f"{first} + {second}"
+
+    for med1, med2 in pairs[:200]:
+        records = knowledge_base.interactions_for_pair(med1, med2)
+        assert records == knowledge_base.interactions_for_pair(med2, med1), f"{med1} + {med2} in either order"
+        scanned = [row for row in interactions if {row['drug1'], row['drug2']} == {med1, med2}]
+        assert [record.note for record in records] == [row['note'] for row in scanned], "every row, in CSV order"
+
+
+def test_rows_round_trip():
+    print("\n🔁 interaction_rows() / warning_rows():")
+    knowledge_base = drug_checker.KNOWLEDGE_BASE
+    assert knowledge_base.interaction_rows() == csv_rows(INTERACTIONS_FILE, INTERACTION_COLUMNS, ('drug1', 'drug2'))
+    assert knowledge_base.warning_rows() == csv_rows(WARNINGS_FILE, WARNING_COLUMNS, ('drug_name',))
+
+    data_dir = tempfile.mkdtemp(prefix='drug_tables_')
+    try:
+        for name, columns, rows in (('interactions.csv', INTERACTION_COLUMNS, knowledge_base.interaction_rows()),
+                                    ('warnings.csv', WARNING_COLUMNS, knowledge_base.warning_rows())):
+            with open(os.path.join(data_dir, name), 'w', newline='', encoding='utf-8') as csvfile:
+                writer = csv.DictWriter(csvfile, fieldnames=columns)
+                writer.writeheader()
+                writer.writerows(rows)
+        rebuilt = load_knowledge_base(os.path.join(data_dir, 'interactions.csv'), os.path.join(data_dir, 'warnings.csv'))
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    assert rebuilt.interaction_rows() == knowledge_base.interaction_rows(), "rows written back out load the same"
+    assert rebuilt.warning_rows() == knowledge_base.warning_rows()
+    assert rebuilt.drug_names == knowledge_base.drug_names
+
+
+def test_malformed_rows():
+    print("\n🧹 Malformed CSV rows:")
+    data_dir = tempfile.mkdtemp(prefix='drug_tables_')
+    interactions_path = os.path.join(data_dir, 'interactions.csv')
+    warnings_path = os.path.join(data_dir, 'warnings.csv')
+    try:
+        write_csv(interactions_path, "drug1 , drug2,severity,note\n"
+                                     "  Warfarin ,Aspirin,high,\"Bleeding risk, monitor INR\"\n"
+                                     ",Aspirin,low,no first drug\n"
+                                     "Metformin,,low,no second drug\n"
+                                     "Digoxin,Amiodarone\n"
+                                     "\n"
+                                     "aspirin,WARFARIN,critical,duplicate pair in another case\n")
+        write_csv(warnings_path, " drug_name,age_group,warning,severity,alternative,note\n"
+                                 "Aspirin,<16,Reye's syndrome,High,Paracetamol,\n"
+                                 " ,Elderly,no drug name,Low,,\n")
+        knowledge_base = load_knowledge_base(interactions_path, warnings_path)
+        assert knowledge_base.skipped_rows == 3, "rows without a drug name are skipped and counted"
+        assert knowledge_base.interaction_rows() == [
+            {'drug1': 'Warfarin', 'drug2': 'Aspirin', 'severity': 'high', 'note': 'Bleeding risk, monitor INR'},
+            {'drug1': 'Digoxin', 'drug2': 'Amiodarone', 'severity': '', 'note': ''},
+            {'drug1': 'Aspirin', 'drug2': 'Warfarin', 'severity': 'critical', 'note': 'duplicate pair in another case'},
+        ], "header and cell whitespace stripped, short rows padded"
+        assert [record.severity for record in knowledge_base.interactions_for_pair('ASPIRIN', 'warfarin')] == ['high', 'critical']
+        assert knowledge_base.warnings_for_drug(' aspirin ')[0].alternative == 'Paracetamol'
+        assert knowledge_base.drug_id('') is None and knowledge_base.interactions_for_pair('aspirin', 'unknown') == ()
+
+        write_csv(warnings_path, "drug,age_group,warning,severity,alternative,note\nAspirin,<16,x,High,,\n")
+        try:
+            load_knowledge_base(interactions_path, warnings_path)
+            raise AssertionError("a table missing a required column should not load")
+        except ValueError as missing_column:
+            assert 'drug_name' in str(missing_column)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    print("🧪 Testing the drug knowledge base")
+    print("=" * 50)
+    test_pair_index_matches_linear_scan()
+    test_rows_round_trip()
+    test_malformed_rows()
+    print("\n🎉 All drug knowledge base checks passed!")
@@ -0,0 +1,121 @@
+"""
+Test script for the Aho-Corasick drug name matcher (backend/services/drug_matcher.py)
+Checks it finds what the `name in text.lower()` scans it replaced found,
+including overlapping names, that brand aliases only match as whole words,
+that offsets stay aligned with the original text when lowercasing changes
+its length, and that find_names_by_line attributes names to the right line.
+"""
+
+import sys
+import os
+import io
+import random
+import contextlib
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+sys.path.append(BACKEND_DIR)
+
+from services.drug_matcher import DrugNameMatcher
+
+with contextlib.redirect_stdout(io.StringIO()):
+    from services.drug_knowledge_base import get_knowledge_base
+    DRUG_NAMES = sorted(get_knowledge_base().drug_names)
+
+FILLER = ['take', 'tablet', 'daily', 'mg', 'with food', 'PATIENT', 'Rx:', '500', 'at bedtime', '-', '\n', '\n\n']
+
+
+def old_scan(names, text):
+    """The per-name substring scan the matcher replaced"""
+    return {name for name in names if name in text.lower()}
+
+
+def prescription(rng):
+    """Random text of drug names (in any case, sometimes glued to other words) and filler"""
+    words = []
+    for _ in range(rng.randint(5, 25)):
+        if rng.random() < 0.4:
+            name = rng.choice(DRUG_NAMES)
+            words.append(rng.choice([name, name.upper(), name.title(), f"{name}variant22", f"e{name}"]))
+        else:
+            words.append(rng.choice(FILLER))
+    return rng.choice([' ', '', ', ']).join(words)
+
+
+def test_matches_substring_scan():
+    print("\n🔍 Matcher vs. substring scan:")
+    matcher = DrugNameMatcher()
+    matcher.add_names(DRUG_NAMES)
+    rng = random.Random(3)
+    texts = [prescription(rng) for _ in range(300)]
+    texts += ["", "Warfarin", "warfarinwarfarin", "co-amoxiclav 625mg", "ASPIRIN81MG"]
+    for text in texts:
+        assert matcher.find_names(text) == old_scan(DRUG_NAMES, text), repr(text)
+        for mention in matcher.find_all(text):
+            assert text[mention.start:mention.end].lower() == mention.pattern, "offsets point at the match"
+
+
+def test_overlapping_matches():
+    print("\n🧩 Overlapping matches:")
+    matcher = DrugNameMatcher()
+    matcher.add_names(['he', 'she', 'his', 'hers'])
+    assert [(mention.pattern, mention.start, mention.end) for mention in matcher.find_all('USHERS')] == [
+        ('she', 1, 4), ('hers', 2, 6), ('he', 2, 4)], "every overlapping match, by start then longest first"
+
+    matcher = DrugNameMatcher()
+    matcher.add_names(['amoxicillin', 'clavulanic acid', 'acid', 'amoxi'])
+    text = "Amoxicillin/Clavulanic Acid 625mg"
+    assert matcher.find_names(text) == {'amoxicillin', 'amoxi', 'clavulanic acid', 'acid'} == old_scan(
+        ['amoxicillin', 'clavulanic acid', 'acid', 'amoxi'], text)
+    assert matcher.find_names("ACIDACID") == {'acid'} and len(matcher.find_all("ACIDACID")) == 2
+
+
+def test_whole_word_aliases():
+    print("\n🏷️ Brand aliases:")
+    matcher = DrugNameMatcher()
+    matcher.add_names(['aspirin', 'paracetamol'])
+    matcher.add_aliases({'ASA': 'Aspirin', 'Tylenol': 'paracetamol', 'Crocin 650': 'paracetamol'})
+    assert matcher.find_names("Take ASA 81mg") == {'aspirin'}
+    assert matcher.find_names("asa") == {'aspirin'}, "at the start and end of the text"
+    assert matcher.find_names("(ASA), then tylenol.") == {'aspirin', 'paracetamol'}
+    assert matcher.find_names("nasal spray, Asana class, ASA81") == set(), "not inside other words"
+    assert matcher.find_names("crocin 650 twice daily") == {'paracetamol'}
+    assert matcher.find_names("crocin 6500") == set()
+    assert [mention.pattern for mention in matcher.find_all("Tylenol")] == ['tylenol']
+
+    matcher.add_names(['asa'])
+    assert matcher.find_names("nasal") == set(), "an alias keeps its first canonical name and whole-word rule"
+
+
+def test_offsets_after_lowercasing():
+    print("\n🔡 Offsets when lowercasing changes length:")
+    matcher = DrugNameMatcher()
+    matcher.add_names(['warfarin', 'aspirin'])
+    matcher.add_aliases({'asa': 'aspirin'})
+    text = "İstanbul clinic: İİ Warfarin + ASA"
+    assert len(text.lower()) != len(text)
+    mentions = matcher.find_all(text)
+    assert [text[mention.start:mention.end] for mention in mentions] == ['Warfarin', 'ASA']
+    assert matcher.find_names(text) == {'warfarin', 'aspirin'}
+
+
+def test_find_names_by_line():
+    print("\n📄 Names by line:")
+    matcher = DrugNameMatcher()
+    matcher.add_names(DRUG_NAMES)
+    rng = random.Random(11)
+    texts = [prescription(rng) for _ in range(200)]
+    texts += ["warfarin\n\naspirin", "\nwarfarin\n", "aspirin", "", "metformin\nmetformin"]
+    for text in texts:
+        expected = [old_scan(DRUG_NAMES, line) for line in text.split('\n')]
+        assert matcher.find_names_by_line(text) == expected, repr(text)
+
+
+if __name__ == "__main__":
+    print("🧪 Testing the drug name matcher")
+    print("=" * 50)
+    test_matches_substring_scan()
+    test_overlapping_matches()
+    test_whole_word_aliases()
+    test_offsets_after_lowercasing()
+    test_find_names_by_line()
+    print("\n🎉 All drug name matcher checks passed!")
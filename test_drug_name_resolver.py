@@ -0,0 +1,114 @@
+"""
+Test script for the indexed fuzzy drug-name resolver (backend/services/drug_name_resolver.py)
+Checks it returns what process.extractBests(scorer=fuzz.ratio) returned on
+misspelled drug names, across score cutoffs and limits, and how it handles
+empty queries, names that process to the same text and the limit.
+"""
+
+import sys
+import os
+import io
+import random
+import string
+import contextlib
+
+from fuzzywuzzy import fuzz, process
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+sys.path.append(BACKEND_DIR)
+
+from services.drug_name_resolver import DrugNameResolver
+
+with contextlib.redirect_stdout(io.StringIO()):
+    from services.drug_knowledge_base import get_knowledge_base
+    DRUG_NAMES = set(get_knowledge_base().drug_names)
+
+# Misspellings as they come out of OCR and hand-typed prescriptions
+MISSPELLINGS = ['amoxicilin', 'amoxycillin', 'metformn', 'metfromin', 'warfarine', 'wafarin', 'paracetamo',
+                'paracetmol', 'ibuprofin', 'ibuprophen', 'atorvastatine', 'lisinoprill', 'ciprofloxacine',
+                'cipro floxacin', 'omeprazol', 'lorazepan', 'dexamethazone', 'amlodipin', 'asprin', 'levothyroxin',
+                'azithromicin', 'clopidogrel.', 'PREDNISOLONE', '  Gabapentine ', 'hydrochlorthiazide', 'xyzzy']
+
+
+def misspell(name, rng):
+    """One or two random typos: insert, delete, substitute or swap"""
+    chars = list(name)
+    for _ in range(rng.randint(1, 2)):
+        position = rng.randrange(len(chars))
+        edit = rng.choice(('insert', 'delete', 'substitute', 'swap'))
+        if edit == 'insert':
+            chars.insert(position, rng.choice(string.ascii_lowercase))
+        elif edit == 'delete' and len(chars) > 1:
+            del chars[position]
+        elif edit == 'substitute':
+            chars[position] = rng.choice(string.ascii_lowercase)
+        elif position < len(chars) - 1:
+            chars[position], chars[position + 1] = chars[position + 1], chars[position]
+    return ''.join(chars)
+
+
+def same_matches(expected, actual):
+    """
+    Same scores in the same order, and the same names apart from ties at the
+    last score (extractBests picks among those in set iteration order)
+    """
+    if [score for _, score in expected] != [score for _, score in actual]:
+        return False
+    if not expected:
+        return True
+    last_score = expected[-1][1]
+    return ({name for name, score in expected if score != last_score} ==
+            {name for name, score in actual if score != last_score})
+
+
+def test_matches_extract_bests():
+    print("\n🔎 Resolver vs. extractBests:")
+    rng = random.Random(5)
+    queries = MISSPELLINGS + [misspell(rng.choice(sorted(DRUG_NAMES)), rng) for _ in range(150)]
+    resolver = DrugNameResolver(DRUG_NAMES)
+    compared = 0
+    for threshold in (60, 80, 90):
+        for query in queries:
+            best = process.extractBests(query, DRUG_NAMES, scorer=fuzz.ratio, score_cutoff=threshold, limit=5)
+            for limit in (1, 3, 5):
+                expected = best[:limit]
+                actual = resolver.resolve(query, threshold=threshold, limit=limit)
+                assert same_matches(expected, actual), f"{query!r} (cutoff {threshold}, limit {limit}): {expected} != {actual}"
+                compared += 1
+    matched = sum(1 for query in queries if resolver.resolve(query))
+    print(f"   {compared} lookups agree ({matched}/{len(queries)} queries match at the default cutoff)")
+    assert matched > len(queries) // 2, "the sample is mostly real misspellings"
+
+
+def test_cutoff_and_limit():
+    print("\n✂️ Score cutoff and limit:")
+    resolver = DrugNameResolver(DRUG_NAMES, threshold=80, limit=3)
+    assert resolver.match('amoxicilin') == ['amoxicillin']
+    for query in ('metformn', 'ciprofloxacine', 'asprin'):
+        matches = resolver.resolve(query, threshold=50, limit=10)
+        scores = [score for _, score in matches]
+        assert scores == sorted(scores, reverse=True), "best first"
+        assert all(score >= 50 for score in scores)
+        assert resolver.resolve(query, threshold=50, limit=2) == matches[:2], "a lower limit keeps the best"
+        assert [match for match in matches if match[1] >= 80][:3] == resolver.resolve(query), "defaults from __init__"
+    assert resolver.resolve('xyzzy') == [], "nothing above the cutoff"
+    assert resolver.resolve('metformin', limit=0) == []
+    assert resolver.resolve('') == [] and resolver.resolve(None) == [] and resolver.resolve('!!!') == []
+
+
+def test_names_that_process_alike():
+    print("\n🔤 Names that process to the same text:")
+    resolver = DrugNameResolver(['Co-Amoxiclav', 'co amoxiclav', 'Digoxin'])
+    assert len(resolver) == 3
+    assert resolver.resolve('co-amoxiclav', limit=5) == [('Co-Amoxiclav', 100), ('co amoxiclav', 100)]
+    assert resolver.resolve('CO AMOXICLAV', limit=1) == [('Co-Amoxiclav', 100)], "ties are ordered by name"
+    assert resolver.match('digoxine') == ['Digoxin']
+
+
+if __name__ == "__main__":
+    print("🧪 Testing the fuzzy drug-name resolver")
+    print("=" * 50)
+    test_matches_extract_bests()
+    test_cutoff_and_limit()
+    test_names_that_process_alike()
+    print("\n🎉 All drug-name resolver checks passed!")
@@ -0,0 +1,142 @@
+"""
+Test script for the binary drug table snapshot (backend/services/drug_snapshot.py)
+Checks a snapshot loads the same tables as the CSVs, that edited CSVs make it
+stale until it is rebuilt, and that a truncated, corrupted or other-version
+file is never served: the knowledge base falls back to the CSVs instead.
+"""
+
+import sys
+import os
+import io
+import shutil
+import struct
+import tempfile
+import contextlib
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+sys.path.append(BACKEND_DIR)
+
+from services import drug_snapshot
+from services.drug_knowledge_base import (DrugKnowledgeBase, build_snapshot, compile_tables, source_checksum,
+                                          INTERACTIONS_FILE, WARNINGS_FILE)
+
+
+def load_knowledge_base(data_dir, snapshot=True):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return DrugKnowledgeBase(os.path.join(data_dir, 'interactions.csv'), os.path.join(data_dir, 'warnings.csv'),
+                                 os.path.join(data_dir, 'tables.snapshot') if snapshot else None)
+
+
+def build(data_dir):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return build_snapshot(os.path.join(data_dir, 'tables.snapshot'), os.path.join(data_dir, 'interactions.csv'),
+                              os.path.join(data_dir, 'warnings.csv'))
+
+
+def same_tables(first, second):
+    return (first.interaction_rows() == second.interaction_rows() and
+            first.warning_rows() == second.warning_rows() and
+            first.drug_names == second.drug_names and
+            {key: value for key, value in first.get_stats().items() if key != 'source'} ==
+            {key: value for key, value in second.get_stats().items() if key != 'source'})
+
+
+class DataDir:
+    """Temporary copy of the repo's drug CSVs"""
+
+    def __enter__(self):
+        self.path = tempfile.mkdtemp(prefix='drug_snapshot_')
+        shutil.copy(INTERACTIONS_FILE, os.path.join(self.path, 'interactions.csv'))
+        shutil.copy(WARNINGS_FILE, os.path.join(self.path, 'warnings.csv'))
+        return self.path
+
+    def __exit__(self, *exc_info):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def rewrite(path, edit):
+    with open(path, 'rb') as snapshot:
+        data = bytearray(snapshot.read())
+    data = edit(data)
+    with open(path, 'wb') as snapshot:
+        snapshot.write(data)
+
+
+def flip(data, offset):
+    data[offset] ^= 0xFF
+    return data
+
+
+def test_round_trip():
+    print("\n💾 Round trip:")
+    with DataDir() as data_dir:
+        from_csv = load_knowledge_base(data_dir, snapshot=False)
+        build(data_dir)
+        from_snapshot = load_knowledge_base(data_dir)
+        assert (from_csv.source, from_snapshot.source) == ('csv', 'snapshot')
+        assert same_tables(from_snapshot, from_csv)
+        for drug1, drug2 in (('warfarin', 'haloperidol'), ('Haloperidol', 'WARFARIN'), ('aspirin', 'esomeprazole')):
+            assert from_snapshot.interactions_for_pair(drug1, drug2) == from_csv.interactions_for_pair(drug1, drug2)
+        assert from_snapshot.warnings_for_drug('ciprofloxacin') == from_csv.warnings_for_drug('ciprofloxacin')
+
+        tables = compile_tables(os.path.join(data_dir, 'interactions.csv'), os.path.join(data_dir, 'warnings.csv'))
+        mapped = drug_snapshot.read_snapshot(os.path.join(data_dir, 'tables.snapshot'),
+                                             source_checksum(os.path.join(data_dir, 'interactions.csv'),
+                                                             os.path.join(data_dir, 'warnings.csv')))
+        for name, _ in drug_snapshot.SECTIONS[2:]:
+            assert list(mapped[name]) == list(tables[name]), f"section {name}"
+        assert mapped['strings'] == tables['strings'] and mapped['skipped_rows'] == tables['skipped_rows']
+
+
+def test_stale_snapshot_until_rebuilt():
+    print("\n♻️ Stale snapshot:")
+    with DataDir() as data_dir:
+        build(data_dir)
+        with open(os.path.join(data_dir, 'interactions.csv'), 'a', encoding='utf-8') as csvfile:
+            csvfile.write("\nZolpidemix,Warfarin,critical,Added after the snapshot was built\n")
+
+        stale = load_knowledge_base(data_dir)
+        assert stale.source == 'csv', "an edited CSV is read instead of the old snapshot"
+        assert stale.interactions_for_pair('zolpidemix', 'warfarin')[0].severity == 'critical'
+
+        build(data_dir)
+        rebuilt = load_knowledge_base(data_dir)
+        assert rebuilt.source == 'snapshot'
+        assert same_tables(rebuilt, stale), "the rebuilt snapshot holds the edit"
+
+
+def test_unusable_snapshots_fall_back_to_csv():
+    print("\n🧯 Unusable snapshots:")
+    header_size = drug_snapshot.HEADER.size
+    section_table = header_size + drug_snapshot.SECTION_ENTRY.size * len(drug_snapshot.SECTIONS)
+    damage = {
+        'truncated to half': lambda data: data[:len(data) // 2],
+        'truncated inside the header': lambda data: data[:header_size - 4],
+        'empty': lambda data: bytearray(),
+        'wrong magic': lambda data: b'XXXX' + data[4:],
+        'another format version': lambda data: data[:4] + struct.pack('<I', drug_snapshot.SNAPSHOT_VERSION + 1) + data[8:],
+        'section offset past the end': lambda data: (data[:header_size] + struct.pack('<QQ', len(data), 64) +
+                                                     data[header_size + 16:]),
+        'flipped byte in the string table': lambda data: flip(data, section_table + 40),
+        'flipped byte in the last section': lambda data: flip(data, len(data) - 3),
+    }
+    with DataDir() as data_dir:
+        from_csv = load_knowledge_base(data_dir, snapshot=False)
+        for description, edit in damage.items():
+            path = build(data_dir)
+            rewrite(path, edit)
+            knowledge_base = load_knowledge_base(data_dir)
+            assert knowledge_base.source == 'csv', f"{description}: the snapshot is not served"
+            assert same_tables(knowledge_base, from_csv), f"{description}: the CSV tables are"
+
+        os.remove(os.path.join(data_dir, 'tables.snapshot'))
+        assert load_knowledge_base(data_dir).source == 'csv', "a missing snapshot"
+
+
+if __name__ == "__main__":
+    print("🧪 Testing the drug table snapshot")
+    print("=" * 50)
+    test_round_trip()
+    test_stale_snapshot_until_rebuilt()
+    test_unusable_snapshots_fall_back_to_csv()
+    print("\n🎉 All drug snapshot checks passed!")
@@ -0,0 +1,104 @@
+"""
+Test script for in-memory image ingestion (backend/services/image_ingest.py)
+Checks uploads stay off disk end to end: request parsing, decoding,
+preprocessing and the /ocr/scan route, with temp files made to fail.
+"""
+
+import sys
+import os
+import io
+import base64
+import tempfile
+import contextlib
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+sys.path.append(BACKEND_DIR)
+
+from flask import Flask, request, jsonify
+from PIL import Image, ImageDraw
+from services.image_ingest import enable_in_memory_uploads, load_image, load_base64_image
+
+
+def png_bytes(width=1600, height=1200, noisy=False):
+    """PNG upload; noisy pages are large enough that werkzeug would spool them to disk"""
+    image = Image.effect_noise((width, height), 64).convert('RGB') if noisy else Image.new('RGB', (width, height), 'white')
+    ImageDraw.Draw(image).text((40, 40), "Metformin 500mg twice daily", fill='black')
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def forbid_temp_files(*args, **kwargs):
+    raise AssertionError("temp file created during ingestion")
+
+
+@contextlib.contextmanager
+def no_temp_files():
+    factories = {name: getattr(tempfile, name)
+                 for name in ('SpooledTemporaryFile', 'NamedTemporaryFile', 'TemporaryFile', 'mkstemp')}
+    for name in factories:
+        setattr(tempfile, name, forbid_temp_files)
+    try:
+        yield
+    finally:
+        for name, factory in factories.items():
+            setattr(tempfile, name, factory)
+
+
+def make_app():
+    """The /ocr blueprint plus an /upload route that reports how the upload arrived"""
+    os.chdir(BACKEND_DIR)
+    from routes.ocr import ocr_bp
+    app = enable_in_memory_uploads(Flask(__name__))
+    app.register_blueprint(ocr_bp, url_prefix='/ocr')
+
+    @app.route('/upload', methods=['POST'])
+    def upload():
+        upload_file = request.files['file']
+        return jsonify({"stream": type(upload_file.stream).__name__, "size": list(load_image(upload_file).size)})
+
+    return app
+
+
+def post_file(client, path, data):
+    return client.post(path, data={'file': (io.BytesIO(data), 'rx.png')}, content_type='multipart/form-data')
+
+
+def test_decoding():
+    print("\n📥 Decoding:")
+    assert load_image(png_bytes(320, 200)).size == (320, 200), "bytes decode to a PIL image"
+    data_url = "data:image/png;base64," + base64.b64encode(png_bytes(64, 32)).decode()
+    assert load_base64_image(data_url).size == (64, 32), "base64 data URLs decode"
+
+
+def test_uploads_stay_in_memory():
+    print("\n🌐 Request parsing and /ocr/scan:")
+    from services.ocr_service import preprocess_image
+    large_upload = png_bytes(noisy=True)
+    client = make_app().test_client()
+    with no_temp_files():
+        response = post_file(client, '/upload', large_upload)
+        assert response.status_code == 200
+        assert response.get_json() == {"stream": "BytesIO", "size": [1600, 1200]}, \
+            f"a {len(large_upload) // 1024} KB upload is decoded from a BytesIO"
+
+        assert post_file(client, '/ocr/scan', large_upload).status_code == 200, "scan succeeds without temp files"
+        cleaned = preprocess_image(load_image(png_bytes(320, 200)))
+        assert isinstance(cleaned, Image.Image) and cleaned.mode == 'L', "preprocessing returns an in-memory image"
+
+
+def test_size_cap():
+    print("\n📏 Size cap:")
+    app = make_app()
+    app.config['MAX_CONTENT_LENGTH'] = 1024
+    assert post_file(app.test_client(), '/upload', png_bytes(noisy=True)).status_code == 413, \
+        "uploads over MAX_CONTENT_LENGTH get 413"
+
+
+if __name__ == "__main__":
+    print("🧪 Testing in-memory image ingestion")
+    print("=" * 50)
+    test_decoding()
+    test_uploads_stay_in_memory()
+    test_size_cap()
+    print("\n🎉 All image ingestion checks passed!")
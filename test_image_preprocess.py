@@ -0,0 +1,71 @@
+"""
+Test script for OCR preprocessing (backend/services/image_preprocess.py)
+Checks text is found on a page photo, the crop stays on the page and the
+text is rescaled to the target line height.
+"""
+
+import sys
+import os
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+sys.path.append(BACKEND_DIR)
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+from services.image_preprocess import prepare_for_ocr, OCR_DPI
+
+PAPER_BOX = (1200, 500, 2800, 2500)
+TEXT_LINES = ["Rx - City Health Clinic", "Metformin 500mg twice daily", "Lisinopril 10mg once daily",
+              "Atorvastatin 20mg at bedtime"]
+
+
+def page_photo(font_size=60):
+    """12 MP photo: a sheet of paper with text on an unevenly lit dark background"""
+    gradient = np.linspace(50, 150, 4000, dtype=np.float32)[None, :] * np.ones((3000, 1), dtype=np.float32)
+    photo = Image.fromarray(gradient.astype(np.uint8)).convert('RGB')
+    draw = ImageDraw.Draw(photo)
+    draw.rectangle(PAPER_BOX, fill=(245, 243, 236))
+    font = ImageFont.load_default(size=font_size)
+    for index, line in enumerate(TEXT_LINES):
+        draw.text((PAPER_BOX[0] + 150, PAPER_BOX[1] + 200 + index * font_size * 2), line, fill=(25, 25, 35), font=font)
+    return photo
+
+
+def test_text_region():
+    print("\n✂️ Text region:")
+    _, info = prepare_for_ocr(page_photo())
+    left, top, right, bottom = info['crop_box']
+    print(f"   crop {info['crop_box']}, line height {info['line_height']}, scale {info['scale']}")
+    assert (left >= PAPER_BOX[0] and top >= PAPER_BOX[1] and
+            right <= PAPER_BOX[2] and bottom <= PAPER_BOX[3]), "the crop lies on the paper"
+    assert (left <= PAPER_BOX[0] + 150 and top <= PAPER_BOX[1] + 200 and
+            bottom >= PAPER_BOX[1] + 200 + 3 * 120 + 60), "the crop keeps all the text"
+    assert info['line_height'] is not None and 40 <= info['line_height'] <= 90, "the line height is measured"
+
+
+def test_scaling():
+    print("\n📐 Scaling:")
+    prepared, small = prepare_for_ocr(page_photo(), target_text_height=30)
+    _, large = prepare_for_ocr(page_photo(), target_text_height=60)
+    assert small['scale'] < large['scale'], "text is scaled towards the target height"
+    assert abs(small['line_height'] * small['scale'] - 30) < 3
+    assert prepared.mode == 'L' and prepared.info.get('dpi') == (OCR_DPI, OCR_DPI), \
+        "output is grayscale and tagged with the OCR DPI"
+    _, capped = prepare_for_ocr(page_photo(), target_text_height=500, max_side=800)
+    assert max(capped['output_size']) <= 800, "output never exceeds max_side"
+
+
+def test_blank_page():
+    print("\n📄 No text:")
+    blank, blank_info = prepare_for_ocr(Image.new('RGB', (1200, 900), 'white'))
+    assert blank_info['crop_box'] == [0, 0, 1200, 900] and blank.size == (1200, 900), \
+        "a blank page is passed through uncropped"
+
+
+if __name__ == "__main__":
+    print("🧪 Testing OCR preprocessing")
+    print("=" * 50)
+    test_text_region()
+    test_scaling()
+    test_blank_page()
+    print("\n🎉 All OCR preprocessing checks passed!")
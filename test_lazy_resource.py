@@ -0,0 +1,124 @@
+"""
+Test script for lazy loading of heavy dependencies (backend/services/lazy_resource.py)
+Checks the holder builds once under concurrency, remembers failures until
+the retry interval has passed, warms up on request, and that importing the OCR blueprints no longer pulls in
+OpenCV, numpy, PDF rendering or the ML stack.
+"""
+
+import sys
+import os
+import json
+import time
+import threading
+import subprocess
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+sys.path.append(BACKEND_DIR)
+
+from services.lazy_resource import LazyResource, lazy_import, warm_up, get_resource_stats
+
+HEAVY_MODULES = ['cv2', 'numpy', 'pypdfium2', 'joblib', 'sklearn', 'ml_integration', 'services.drug_checker']
+
+# Imports the blueprint in a fresh interpreter, reports which heavy modules came with it
+IMPORT_PROBE = """
+import contextlib, io, json, sys
+with contextlib.redirect_stdout(io.StringIO()):
+    import {module}
+print(json.dumps([name for name in {heavy} if name in sys.modules]))
+"""
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_builds_once():
+    print("\n🔒 LazyResource:")
+    calls = []
+
+    def slow_factory():
+        calls.append(threading.get_ident())
+        time.sleep(0.2)
+        return object()
+
+    resource = LazyResource('test_slow', slow_factory)
+    assert not calls and not resource.is_loaded(), "nothing is built until first use"
+    values = []
+    threads = [threading.Thread(target=lambda: values.append(resource.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1, "8 concurrent first uses build it once"
+    assert len(set(map(id, values))) == 1 and resource.is_loaded(), "and share it"
+    assert lazy_import('json') is lazy_import('json'), "lazy_import returns one holder per module"
+
+
+def test_failures():
+    print("\n🧯 Failures:")
+    failures = []
+
+    def failing_factory():
+        failures.append(1)
+        raise ImportError("No module named 'not_installed'")
+
+    clock = FakeClock()
+    missing = LazyResource('test_missing', failing_factory, retry_after=30, clock=clock)
+    assert not missing.is_available() and not missing.is_available(), "a failing factory reports unavailable"
+    assert len(failures) == 1, "the failure is remembered, not retried per request"
+    clock.now += 29
+    assert not missing.is_available() and len(failures) == 1, "not retried before retry_after"
+    clock.now += 1
+    assert not missing.is_available() and len(failures) == 2, "retried once retry_after has passed"
+    assert not missing.is_available() and len(failures) == 2, "and the new failure is remembered again"
+
+    attempts = []
+
+    def flaky_factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("model file not there yet")
+        return 'model'
+
+    flaky = LazyResource('test_flaky', flaky_factory, retry_after=30, clock=clock)
+    assert not flaky.is_available() and not flaky.is_loaded()
+    clock.now += 30
+    assert flaky.get() == 'model' and flaky.is_loaded(), "a transient failure recovers on retry"
+    assert get_resource_stats()['test_flaky']['error'] is None, "and its error is cleared"
+    clock.now += 30
+    assert flaky.get() == 'model' and len(attempts) == 2, "a loaded resource is not rebuilt"
+
+
+def test_warm_up():
+    print("\n🔥 warm_up:")
+    LazyResource('test_broken', lambda: 1 / 0)
+    lazy_json = lazy_import('json')
+    timings = warm_up(['json', 'test_broken'])
+    assert set(timings) == {'json', 'test_broken'}, "only the named resources are loaded"
+    assert timings['test_broken'] is None and lazy_json.is_loaded(), "failures are reported, not raised"
+    stats = get_resource_stats()
+    assert stats['json']['loaded'] and stats['test_broken']['error'] is not None, "stats show what is loaded"
+
+
+def test_blueprint_imports():
+    print("\n📦 Blueprint imports:")
+    for module in ['routes.ai_only_ocr', 'routes.ocr', 'services.drug_database_service']:
+        completed = subprocess.run([sys.executable, '-c', IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                                   cwd=BACKEND_DIR, capture_output=True, text=True)
+        assert completed.returncode == 0, f"importing {module} failed: {completed.stderr[-500:]}"
+        loaded = json.loads(completed.stdout.strip().splitlines()[-1])
+        assert loaded == [], f"importing {module} loads none of the heavy modules ({loaded})"
+
+
+if __name__ == "__main__":
+    print("🧪 Testing lazy loading of heavy dependencies")
+    print("=" * 50)
+    test_builds_once()
+    test_failures()
+    test_warm_up()
+    test_blueprint_imports()
+    print("\n🎉 All lazy loading checks passed!")
@@ -0,0 +1,101 @@
+"""
+Test script for the shared LLM gateway
+Runs the gateway against a local stub server: plain calls, retries with
+backoff, the per-call deadline and the circuit breaker. No API key needed.
+"""
+
+import sys
+import os
+import time
+import contextlib
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+sys.path.append(os.path.join(os.path.dirname(__file__), 'benchmarks'))
+
+from services.llm_gateway import LLMGateway, CircuitBreaker, LLMUnavailableError
+from stub_llm_server import start_stub_server
+
+MESSAGES = [{"role": "user", "content": "What are drug interactions?"}]
+
+
+def make_gateway(server, **options):
+    settings = dict(api_key='stub-key', base_url=server.base_url, timeout=2, deadline=5,
+                    max_retries=2, backoff_base=0.01, backoff_max=0.05,
+                    breaker=CircuitBreaker(failure_threshold=2, reset_timeout=0.5))
+    settings.update(options)
+    return LLMGateway(**settings)
+
+
+@contextlib.contextmanager
+def stub_server():
+    server = start_stub_server()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+
+
+def test_plain_call_and_retries():
+    print("\n🔁 Plain call and retries:")
+    with stub_server() as server:
+        gateway = make_gateway(server)
+        assert gateway.chat(MESSAGES) == server.reply
+
+        server.fail_next = 2
+        before = server.requests
+        assert gateway.chat(MESSAGES) == server.reply, "two 503s are retried and the third attempt succeeds"
+        assert server.requests - before == 3, "three upstream requests were made"
+
+
+def test_deadline():
+    print("\n⏱️ Deadline:")
+    with stub_server() as server:
+        server.latency = 1.0
+        start = time.monotonic()
+        try:
+            make_gateway(server, timeout=0.3, deadline=0.5).chat(MESSAGES)
+            raise AssertionError("a slow upstream should raise LLMUnavailableError")
+        except LLMUnavailableError:
+            elapsed = time.monotonic() - start
+        assert elapsed < 1.0, f"gives up within the deadline ({elapsed:.2f}s)"
+
+
+def test_circuit_breaker():
+    print("\n🚦 Circuit breaker:")
+    with stub_server() as server:
+        gateway = make_gateway(server, max_retries=0)
+        server.fail_next = 2
+        for _ in range(2):
+            try:
+                gateway.chat(MESSAGES)
+            except LLMUnavailableError:
+                pass
+        assert not gateway.is_available(), "opens after consecutive failures"
+
+        before = server.requests
+        try:
+            gateway.chat(MESSAGES)
+            raise AssertionError("an open circuit should refuse calls")
+        except LLMUnavailableError:
+            pass
+        assert server.requests == before, "an open circuit does not touch upstream"
+
+        time.sleep(0.6)
+        assert gateway.chat(MESSAGES) == server.reply, "the half-open probe succeeds"
+        assert gateway.is_available(), "and closes the circuit"
+        print(f"   📊 Gateway stats: {gateway.get_stats()}")
+
+
+def test_not_configured():
+    print("\n🔌 Not configured:")
+    assert not LLMGateway(api_key='').is_available(), "no API key means unavailable"
+
+
+if __name__ == "__main__":
+    print("🧪 Testing LLM gateway against a stub server")
+    print("=" * 50)
+    test_plain_call_and_retries()
+    test_deadline()
+    test_circuit_breaker()
+    test_not_configured()
+    print("\n🎉 All LLM gateway checks passed!")
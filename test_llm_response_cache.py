@@ -0,0 +1,110 @@
+"""
+Test script for the LLM response cache
+Checks the canonical key, TTL, memory bound and SQLite persistence, then runs
+the comprehensive-check route against a stub LLM server to confirm repeated
+regimens are served from cache. No API key needed.
+"""
+
+import sys
+import os
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+sys.path.append(os.path.join(os.path.dirname(__file__), 'benchmarks'))
+
+from stub_llm_server import start_stub_server
+
+# The route module reads its gateway settings at import time
+server = start_stub_server()
+os.environ['LLM_BASE_URL'] = server.base_url
+os.environ['GROQ_API_KEY'] = 'stub-key'
+
+from services.llm_response_cache import LLMResponseCache, analysis_cache_key, age_bucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_key():
+    print("\n🔑 Cache key:")
+    regimen = [{"name": "Aspirin", "dose": "81mg"}, {"name": "Lorazepam", "dose": "1 mg"}]
+    reordered = [{"name": "  lorazepam", "dose": "1  MG"}, {"name": "ASPIRIN", "dose": "81mg"}]
+    key = analysis_cache_key('comprehensive', regimen, 70)
+    assert key == analysis_cache_key('comprehensive', reordered, 70), "order, case and spacing do not matter"
+    assert key == analysis_cache_key('comprehensive', regimen, 82), "ages in the same bucket share a key"
+    assert key != analysis_cache_key('comprehensive', regimen, 40), "a different age bucket changes the key"
+    assert key != analysis_cache_key('comprehensive', [{"name": "Aspirin", "dose": "325mg"}], 70), \
+        "a different dose changes the key"
+    assert (analysis_cache_key('advanced', regimen, 70, {'allergies': ['Penicillin']}) !=
+            analysis_cache_key('advanced', regimen, 70, {'allergies': []})), "profile fields are part of the key"
+    assert [age_bucket(a) for a in (0.5, 1, 10, 30, 65, 'n/a')] == [
+        'neonate', 'infant', 'pediatric', 'adult', 'elderly', 'unknown'], "age buckets follow the warning age groups"
+
+
+def test_memory_cache():
+    print("\n🧠 Memory cache:")
+    clock = FakeClock()
+    cache = LLMResponseCache(max_size=2, ttl=60, db_path=None, clock=clock)
+    cache.put('a', {'value': 1})
+    copy = cache.get('a')
+    copy['value'] = 99
+    assert cache.get('a') == {'value': 1}, "returns independent copies"
+    clock.now += 61
+    assert cache.get('a') is None, "entries expire after the TTL"
+    for key in 'bcd':
+        cache.put(key, {'value': key})
+    assert len(cache.memory) == 2 and cache.get('b') is None, "memory stays within max_size"
+
+
+def test_sqlite_cache():
+    print("\n💾 SQLite backend:")
+    clock = FakeClock()
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, 'llm_cache.db')
+        LLMResponseCache(ttl=60, db_path=db_path, clock=clock).put('k', {'value': 'warm'})
+
+        restarted = LLMResponseCache(ttl=60, db_path=db_path, clock=clock)
+        assert restarted.get('k') == {'value': 'warm'}, "a new process starts warm"
+        assert restarted.get_stats()['disk_hits'] == 1, "the disk hit is counted"
+
+        clock.now += 61
+        assert LLMResponseCache(ttl=60, db_path=db_path, clock=clock).get('k') is None, "expired rows are not served"
+
+
+def test_comprehensive_check_route():
+    print("\n🌐 /comprehensive-check:")
+    from flask import Flask
+    from routes.ai_interactions import ai_interactions_bp, response_cache
+
+    app = Flask(__name__)
+    app.register_blueprint(ai_interactions_bp, url_prefix='/ai-interactions')
+    client = app.test_client()
+    response_cache.clear()
+
+    payload = {"medicines": [{"name": "Aspirin", "dose": "81mg"}, {"name": "Lorazepam", "dose": "1mg"}], "age": 70}
+    before = server.requests
+    first = client.post('/ai-interactions/comprehensive-check', json=payload).get_json()
+    payload["medicines"].reverse()
+    payload["age"] = 75
+    second = client.post('/ai-interactions/comprehensive-check', json=payload).get_json()
+
+    assert first.get("served_from_cache") is False, "first request goes to the LLM"
+    assert second.get("served_from_cache") is True, "same regimen is served from cache"
+    assert server.requests - before == 1, "only one upstream request was made"
+    print(f"   📊 Cache stats: {response_cache.get_stats()}")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing LLM response cache")
+    print("=" * 50)
+    test_cache_key()
+    test_memory_cache()
+    test_sqlite_cache()
+    test_comprehensive_check_route()
+    server.shutdown()
+    print("\n🎉 All LLM response cache checks passed!")
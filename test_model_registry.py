@@ -0,0 +1,227 @@
+"""
+Test script for the model registry (ml_models/model_registry.py)
+Checks versions are published with a verified manifest, and that a running
+service swaps to a newly activated version (reload, polling, SIGHUP, admin
+endpoint) while requests keep being served.
+"""
+
+import sys
+import os
+import io
+import time
+import contextlib
+import runpy
+import signal
+import shutil
+import tempfile
+import threading
+
+import joblib
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(ROOT_DIR, 'backend')
+sys.path.append(os.path.join(ROOT_DIR, 'ml_models'))
+sys.path.append(BACKEND_DIR)
+
+import model_registry
+from model_registry import ModelRegistryError
+
+MEDICINES = ['Metformin', 'Warfarin', 'Aspirin', 'Lisinopril', 'Ibuprofen', 'Amoxicillin']
+OTHER_WORDS = ['twice', 'daily', 'patient', 'hospital', 'tablet', 'morning']
+PRESCRIPTION = "Metformin 500mg twice daily\nWarfarin 5mg once daily\nAspirin 81mg daily"
+
+
+def write_artifacts(artifacts_dir, trees):
+    """A small medicine extractor, vectorizer and training stats, as the trainer saves them"""
+    tokens = MEDICINES + OTHER_WORDS
+    vectorizer = TfidfVectorizer(analyzer='char_wb', ngram_range=(2, 3)).fit(tokens)
+    extractor = RandomForestClassifier(n_estimators=trees, random_state=0)
+    extractor.fit(vectorizer.transform(tokens), [1] * len(MEDICINES) + [0] * len(OTHER_WORDS))
+    joblib.dump(extractor, os.path.join(artifacts_dir, 'medicine_extractor.joblib'))
+    joblib.dump(vectorizer, os.path.join(artifacts_dir, 'medicine_text_vectorizer.joblib'))
+    with open(os.path.join(artifacts_dir, 'training_stats.json'), 'w') as stats_file:
+        stats_file.write('{"medicine_extractor": {"f1_score": 1.0}}')
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def publish(registry_dir, version, trees):
+    artifacts_dir = tempfile.mkdtemp(prefix='artifacts_')
+    try:
+        write_artifacts(artifacts_dir, trees)
+        return model_registry.publish(artifacts_dir, registry_dir, version=version, activate=False)
+    finally:
+        shutil.rmtree(artifacts_dir)
+
+
+def test_publishing():
+    print("\n📦 Publishing:")
+    registry_dir = tempfile.mkdtemp(prefix='registry_')
+    try:
+        v10, v20 = publish(registry_dir, 'v10', 10), publish(registry_dir, 'v20', 20)
+        assert model_registry.active_version(registry_dir) is None, "nothing is active until a version is activated"
+        assert set(v10['files']) == {'medicine_extractor.joblib', 'medicine_text_vectorizer.joblib',
+                                     'training_stats.json'}, "the manifest lists every artifact"
+        assert v10['training_stats']['medicine_extractor']['f1_score'] == 1.0, "and the training stats"
+        schema = v10['feature_schema']
+        assert schema['medicine_extractor']['classes'] == ['0', '1'], "and the feature schema"
+        assert schema['medicine_extractor']['n_features'] == schema['medicine_text_vectorizer']['vocabulary_size']
+        assert v10['checksum'] != v20['checksum'], "different artifacts get different checksums"
+
+        try:
+            model_registry.activate_version(registry_dir, 'v404')
+            raise AssertionError("unknown versions should not be activated")
+        except ModelRegistryError:
+            pass
+        model_registry.activate_version(registry_dir, 'v10')
+        assert model_registry.active_version(registry_dir) == 'v10', "activating a version updates the registry"
+    finally:
+        shutil.rmtree(registry_dir, ignore_errors=True)
+
+    ordered_dir = tempfile.mkdtemp(prefix='registry_')
+    try:
+        for version in ('v2', 'v1', 'v3'):
+            publish(ordered_dir, version, 10)
+        assert [manifest['version'] for manifest in model_registry.list_versions(ordered_dir)] == ['v2', 'v1', 'v3'], \
+            "versions published within a second are listed in publish order"
+    finally:
+        shutil.rmtree(ordered_dir)
+
+
+def check_swap(ml_integration, registry_dir):
+    print("\n🔁 Swapping in a running service:")
+    assert ml_integration.get_ml_status()['version'] == 'v10', "the active version is loaded"
+    before = ml_integration.extract_medicines(PRESCRIPTION)
+
+    errors = []
+    stop = threading.Event()
+
+    def serve():
+        while not stop.is_set():
+            try:
+                if not ml_integration.extract_medicines(PRESCRIPTION):
+                    errors.append("no medicines")
+            except Exception as serve_error:
+                errors.append(serve_error)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        threads = [threading.Thread(target=serve) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        old = ml_integration.dosesafe_ml
+        model_registry.activate_version(registry_dir, 'v20')
+        swap = ml_integration.reload_models()
+        time.sleep(0.2)
+        stop.set()
+        for thread in threads:
+            thread.join()
+    assert swap == {'version': 'v20', 'previous': 'v10'}, "reload_models swaps to the newly active version"
+    assert ml_integration.dosesafe_ml.version == 'v20'
+    assert not errors, f"requests served during the swap all succeeded ({errors[:3]})"
+    assert old.is_loaded and old.version == 'v10', "a request still holding the old predictor"
+    assert old.extract_medicines_from_text(PRESCRIPTION) == before, "can finish on it"
+
+    with open(os.path.join(registry_dir, 'versions', 'v10', 'medicine_extractor.joblib'), 'ab') as artifact:
+        artifact.write(b'corrupt')
+    try:
+        ml_integration.reload_models('v10')
+        raise AssertionError("a corrupted version should be refused")
+    except ModelRegistryError:
+        pass
+    assert ml_integration.dosesafe_ml.version == 'v20', "the current version is kept"
+    shutil.rmtree(os.path.join(registry_dir, 'versions', 'v10'))
+
+
+def check_following_the_registry(ml_integration, registry_dir):
+    print("\n👀 Following the registry:")
+    ml_integration.MODEL_REGISTRY_POLL_SECONDS = 0.01
+    try:
+        model_registry.activate_version(registry_dir, 'v30')
+        time.sleep(0.02)
+        ml_integration.extract_medicines(PRESCRIPTION)
+        assert wait_for(lambda: ml_integration.dosesafe_ml.version == 'v30'), \
+            "a version activated elsewhere is picked up in the background"
+    finally:
+        ml_integration.MODEL_REGISTRY_POLL_SECONDS = 0
+
+
+def check_sighup(ml_integration, registry_dir):
+    print("\n📶 SIGHUP in a gunicorn worker:")
+    os.environ['WARMUP'] = ''
+    config = runpy.run_path(os.path.join(BACKEND_DIR, 'gunicorn.conf.py'))
+    config['post_worker_init'](None)
+    try:
+        model_registry.activate_version(registry_dir, 'v20')
+        os.kill(os.getpid(), signal.SIGHUP)
+        assert wait_for(lambda: ml_integration.dosesafe_ml.version == 'v20'), \
+            "the worker reloads the active version instead of exiting"
+    finally:
+        signal.signal(signal.SIGHUP, signal.SIG_DFL)
+
+
+def check_admin_endpoint(ml_integration, registry_dir):
+    print("\n🔑 Admin endpoint:")
+    from flask import Flask
+    os.chdir(BACKEND_DIR)
+    from routes import ai_only_ocr
+    app = Flask(__name__)
+    app.register_blueprint(ai_only_ocr.ai_only_ocr_bp, url_prefix='/ai-only-ocr')
+    client = app.test_client()
+    assert client.post('/ai-only-ocr/models/activate', json={'version': 'v30'}).status_code == 403, \
+        "disabled without MODEL_ADMIN_TOKEN"
+
+    ai_only_ocr.MODEL_ADMIN_TOKEN = 'test-token'
+    try:
+        headers = {'Authorization': 'Bearer test-token'}
+        assert client.get('/ai-only-ocr/models', headers={'Authorization': 'Bearer nope'}).status_code == 403, \
+            "a wrong token is refused"
+        for authorization in ('test-token', 'Basic test-token', 'bearer test-token', 'Bearer', 'Bearer '):
+            assert client.get('/ai-only-ocr/models', headers={'Authorization': authorization}).status_code == 403, \
+                f"{authorization!r} is refused: only 'Bearer <token>' is accepted"
+        status = client.get('/ai-only-ocr/models', headers=headers).get_json()
+        assert status['serving']['version'] == 'v20', "status shows the serving version"
+        assert [version['version'] for version in status['versions']] == ['v20', 'v30'], "and the published ones"
+        response = client.post('/ai-only-ocr/models/activate', json={'version': 'v404'}, headers=headers)
+        assert response.status_code == 400, "activating an unknown version is a 400"
+        response = client.post('/ai-only-ocr/models/activate', json={'version': 'v30'}, headers=headers)
+        assert response.status_code == 200 and response.get_json()['version'] == 'v30', "activating a version"
+        assert model_registry.active_version(registry_dir) == 'v30', "updates the registry"
+        assert ml_integration.dosesafe_ml.version == 'v30', "and swaps the worker"
+    finally:
+        ai_only_ocr.MODEL_ADMIN_TOKEN = ''
+
+
+def test_running_service_follows_the_registry():
+    registry_dir = tempfile.mkdtemp(prefix='registry_')
+    try:
+        publish(registry_dir, 'v10', 10)
+        publish(registry_dir, 'v20', 20)
+        model_registry.activate_version(registry_dir, 'v10')
+        os.environ['ML_MODELS_DIR'] = registry_dir
+        os.environ['MODEL_REGISTRY_POLL_SECONDS'] = '0'
+        import ml_integration
+
+        check_swap(ml_integration, registry_dir)
+        publish(registry_dir, 'v30', 30)
+        check_following_the_registry(ml_integration, registry_dir)
+        check_sighup(ml_integration, registry_dir)
+        check_admin_endpoint(ml_integration, registry_dir)
+    finally:
+        shutil.rmtree(registry_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    print("🧪 Testing the model registry")
+    print("=" * 50)
+    test_publishing()
+    test_running_service_follows_the_registry()
+    print("\n🎉 All model registry checks passed!")
@@ -0,0 +1,93 @@
+"""
+Test script for sharing the ML models between gunicorn workers
+Checks DoseSafeMLPredictor memory-maps the models' numpy arrays (ML_MMAP_MODE)
+without changing predictions, honours ML_MODELS_DIR, and that gunicorn.conf.py
+freezes the preloaded master's objects before forking.
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import subprocess
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(ROOT_DIR, 'backend')
+
+# gunicorn.conf.py's master hook, run as the gunicorn master would after preloading
+FREEZE_PROBE = """
+import gc, runpy, sys
+config = runpy.run_path('gunicorn.conf.py')
+config['when_ready'](None)
+print(gc.get_freeze_count() > 0)
+"""
+
+MEDICINES = ['Metformin', 'Warfarin', 'Aspirin', 'Lisinopril', 'Ibuprofen', 'Amoxicillin']
+OTHER_WORDS = ['twice', 'daily', 'patient', 'hospital', 'tablet', 'morning']
+
+
+def write_models(models_dir):
+    """A small medicine extractor and vectorizer, dumped the way the trainer saves them"""
+    tokens = MEDICINES + OTHER_WORDS
+    vectorizer = TfidfVectorizer(analyzer='char_wb', ngram_range=(2, 3)).fit(tokens)
+    extractor = RandomForestClassifier(n_estimators=20, random_state=0)
+    extractor.fit(vectorizer.transform(tokens), [1] * len(MEDICINES) + [0] * len(OTHER_WORDS))
+    joblib.dump(extractor, os.path.join(models_dir, 'medicine_extractor.joblib'))
+    joblib.dump(vectorizer, os.path.join(models_dir, 'medicine_text_vectorizer.joblib'))
+
+
+def test_memory_mapped_loading():
+    print("\n🗺️ Memory-mapped loading:")
+    models_dir = tempfile.mkdtemp(prefix='models_')
+    try:
+        write_models(models_dir)
+        os.environ['ML_MODELS_DIR'] = models_dir
+        sys.path.append(os.path.join(ROOT_DIR, 'ml_models'))
+        import ml_integration
+
+        status = ml_integration.get_ml_status()
+        assert status['models_dir'] == models_dir and 'medicine_extractor' in status['models_loaded'], \
+            "ML_MODELS_DIR points the global predictor at the models"
+        assert status['mmap_mode'] == 'r', "numpy arrays are memory-mapped by default"
+        idf = ml_integration.dosesafe_ml.vectorizers['medicine_text'].idf_
+        assert isinstance(idf, np.memmap) and not idf.flags.writeable, \
+            "the vectorizer's arrays are read-only views of the file"
+        mapped = ml_integration.dosesafe_ml._classify_tokens(MEDICINES + OTHER_WORDS)
+
+        mmap_mode = ml_integration.ML_MMAP_MODE
+        ml_integration.ML_MMAP_MODE = None
+        try:
+            private = ml_integration.DoseSafeMLPredictor()
+        finally:
+            ml_integration.ML_MMAP_MODE = mmap_mode
+        assert not isinstance(private.vectorizers['medicine_text'].idf_, np.memmap), \
+            "with ML_MMAP_MODE empty the arrays are loaded into the process"
+        assert private._classify_tokens(MEDICINES + OTHER_WORDS) == mapped, "predictions are the same either way"
+        assert [token for token, (label, _) in mapped.items() if label == 1] == MEDICINES, \
+            "memory-mapped models still find medicines"
+    finally:
+        shutil.rmtree(models_dir, ignore_errors=True)
+
+
+def test_gunicorn_preload():
+    print("\n🦄 gunicorn preload:")
+    for preload, expected in [('1', 'True'), ('0', 'False')]:
+        completed = subprocess.run([sys.executable, '-c', FREEZE_PROBE], cwd=BACKEND_DIR, capture_output=True, text=True,
+                                   env=dict(os.environ, GUNICORN_PRELOAD=preload, WARMUP=''))
+        assert completed.returncode == 0, completed.stderr[-500:]
+        frozen = completed.stdout.strip().splitlines()[-1]
+        assert frozen == expected, \
+            f"GUNICORN_PRELOAD={preload}: master objects {'are' if expected == 'True' else 'are not'} frozen before fork"
+
+
+if __name__ == "__main__":
+    print("🧪 Testing ML model sharing between workers")
+    print("=" * 50)
+    test_memory_mapped_loading()
+    test_gunicorn_preload()
+    print("\n🎉 All model sharing checks passed!")
@@ -0,0 +1,109 @@
+"""
+Test script for the shared OCR engine (backend/services/ocr_engine.py)
+Checks the bounded queue and 429 backpressure with a stand-in backend, and
+real recognition when tesserocr or a tesseract binary is installed.
+"""
+
+import sys
+import os
+import io
+import threading
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+sys.path.append(BACKEND_DIR)
+
+from PIL import Image, ImageDraw, ImageFont
+from services.ocr_engine import OCREngine, OCRBusyError, detect_backend, resolve_tesseract_cmd
+
+
+class BlockingBackend:
+    """Holds every page until released, so the test controls how busy the workers are"""
+
+    name = 'blocking'
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def recognize(self, image, psm=3, char_whitelist=None):
+        self.release.wait(5)
+        return f"psm={psm}"
+
+
+def prescription_image():
+    image = Image.new('RGB', (900, 160), 'white')
+    font = ImageFont.load_default(size=36)
+    ImageDraw.Draw(image).text((20, 50), "Amoxicillin 500mg twice daily", fill='black', font=font)
+    return image
+
+
+def test_bounded_queue():
+    print("\n🚦 Bounded queue:")
+    backend = BlockingBackend()
+    engine = OCREngine(backend=backend, workers=2, queue_size=1)
+    futures = [engine.submit(None, psm=6) for _ in range(3)]
+    try:
+        engine.submit(None)
+        raise AssertionError("work beyond workers + queue should be refused")
+    except OCRBusyError as busy:
+        assert busy.retry_after > 0, "the refusal says when to retry"
+    finally:
+        backend.release.set()
+    assert [future.result(5) for future in futures] == ["psm=6"] * 3, "accepted pages complete"
+    assert engine.image_to_string(None) == "psm=3", "slots are freed once pages finish"
+    stats = engine.get_stats()
+    assert (stats['completed'], stats['rejected'], stats['in_flight']) == (4, 1, 0), \
+        "stats count completed and rejected pages"
+
+
+def test_binary_lookup():
+    print("\n📍 Binary lookup:")
+    os.environ['TESSERACT_CMD'] = '/opt/tesseract/bin/tesseract'
+    try:
+        assert resolve_tesseract_cmd() == '/opt/tesseract/bin/tesseract', "TESSERACT_CMD wins"
+    finally:
+        del os.environ['TESSERACT_CMD']
+
+
+def test_recognition():
+    print("\n🔤 Recognition:")
+    real_backend = detect_backend()
+    if real_backend is None:
+        print("   ⚠️ Tesseract not installed, skipping recognition check")
+        return
+    text = OCREngine(backend=real_backend, workers=1).image_to_string(prescription_image(), psm=6)
+    assert "Amoxicillin" in text, f"{real_backend.name} reads a rendered prescription line"
+
+
+def test_ai_scan_backpressure():
+    print("\n🌐 /ai-scan backpressure:")
+    os.chdir(BACKEND_DIR)
+    from flask import Flask
+    from routes import ai_only_ocr
+    busy_backend = BlockingBackend()
+    original_engine = ai_only_ocr.ocr_engine
+    ai_only_ocr.ocr_engine = OCREngine(backend=busy_backend, workers=1, queue_size=0)
+    pending = ai_only_ocr.ocr_engine.submit(None)
+    try:
+        app = Flask(__name__)
+        app.register_blueprint(ai_only_ocr.ai_only_ocr_bp, url_prefix='/ai-only-ocr')
+        upload = io.BytesIO()
+        prescription_image().save(upload, 'PNG')
+        upload.seek(0)
+        response = app.test_client().post('/ai-only-ocr/ai-scan', data={'file': (upload, 'rx.png', 'image/png')},
+                                          content_type='multipart/form-data')
+    finally:
+        busy_backend.release.set()
+        pending.result(5)
+        ai_only_ocr.ocr_engine = original_engine
+    assert response.status_code == 429, "a saturated engine answers 429"
+    assert response.headers.get('Retry-After') is not None, "with Retry-After"
+
+
+if __name__ == "__main__":
+    print("🧪 Testing shared OCR engine")
+    print("=" * 50)
+    test_bounded_queue()
+    test_binary_lookup()
+    test_recognition()
+    test_ai_scan_backpressure()
+    print("\n🎉 All OCR engine checks passed!")
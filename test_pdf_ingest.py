@@ -0,0 +1,206 @@
+"""
+Test script for PDF ingestion (backend/services/pdf_ingest.py)
+Checks text-layer pages are read without OCR, scanned pages are OCR'd in
+parallel on the engine's workers, every document comes back in page order and
+the scan routes answer a busy OCR engine or missing pypdfium2 with 429 / 415.
+"""
+
+import sys
+import os
+import io
+import time
+import threading
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+sys.path.append(BACKEND_DIR)
+
+from PIL import Image, ImageDraw, ImageFont
+from services.ocr_engine import OCREngine, detect_backend
+from services.pdf_ingest import pdf_available, is_pdf, extract_pdf_text
+
+RENDER_DPI = 200
+
+
+class RecordingBackend:
+    """Answers with the page width after a delay (earlier pages slowest) and records peak concurrency"""
+
+    name = 'recording'
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def recognize(self, image, psm=3, char_whitelist=None):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(max(0.05, (1000 - image.size[0]) / 1000))
+        with self.lock:
+            self.active -= 1
+        return f"page width {int(round(image.size[0], -1))}"
+
+
+def text_pdf(page_texts):
+    """PDF with a real text layer, one line of Helvetica per page"""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in page_texts:
+        stream = f"BT /F1 14 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    pdf = io.BytesIO()
+    pdf.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(pdf.tell())
+        pdf.write(f"{number} 0 obj\n{body}\nendobj\n".encode('latin-1'))
+    xref = pdf.tell()
+    pdf.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for offset in offsets:
+        pdf.write(f"{offset:010d} 00000 n \n".encode())
+    pdf.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return pdf.getvalue()
+
+
+def scanned_pdf(pages):
+    """Image-only PDF, as a scanner or phone app produces; pages are PIL images"""
+    pdf = io.BytesIO()
+    pages[0].save(pdf, 'PDF', save_all=True, append_images=pages[1:], resolution=RENDER_DPI)
+    return pdf.getvalue()
+
+
+def prescription_page(line):
+    page = Image.new('L', (1700, 2200), 255)
+    ImageDraw.Draw(page).text((150, 200), line, fill=0, font=ImageFont.load_default(size=56))
+    return page
+
+
+def discharge_pdf():
+    return text_pdf(["Discharge summary for patient 4411", "Metformin 500mg twice daily",
+                     "Warfarin 5mg once daily, monitor INR"])
+
+
+def test_text_layer():
+    if not pdf_available():
+        print("⚠️ pypdfium2 not installed, skipping")
+        return
+    print("\n📄 Text layer:")
+    document = discharge_pdf()
+    assert is_pdf(document) and not is_pdf(b"\x89PNG\r\n"), "PDF uploads are recognised by signature"
+    result = extract_pdf_text(document)
+    assert [page['source'] for page in result['pages']] == ['text'] * 3, "text-layer pages are read without OCR"
+    assert result['text'].index("Discharge") < result['text'].index("Metformin") < result['text'].index("Warfarin")
+
+
+def test_scanned_pages():
+    if not pdf_available():
+        print("⚠️ pypdfium2 not installed, skipping")
+        return
+    print("\n🖨️ Scanned pages:")
+    widths = [600, 650, 700, 750, 800, 850]
+    backend = RecordingBackend()
+    engine = OCREngine(backend=backend, workers=3, queue_size=0)
+    start = time.perf_counter()
+    result = extract_pdf_text(scanned_pdf([Image.new('L', (width, 900), 255) for width in widths]), engine, dpi=RENDER_DPI)
+    elapsed = time.perf_counter() - start
+    serial = sum(max(0.05, (1000 - width) / 1000) for width in widths)
+    print(f"   {len(widths)} pages in {elapsed:.2f}s (serial OCR would take {serial:.2f}s)")
+    assert [page['source'] for page in result['pages']] == ['ocr'] * len(widths)
+    assert backend.peak == engine.workers, f"pages are OCR'd in parallel on {engine.workers} workers"
+    assert elapsed < serial * 0.7
+    assert result['text'].split("\n\n") == [f"page width {width}" for width in widths], "OCR text comes back in page order"
+    assert engine.get_stats()['rejected'] == 0, "a document never holds more queue slots than there are workers"
+
+    result = extract_pdf_text(scanned_pdf([Image.new('L', (600, 900), 255)]))
+    assert result['pages'][0]['source'] == 'unreadable' and result['text'] == "", "without OCR, scanned pages are unreadable"
+
+
+def test_real_recognition():
+    backend = detect_backend()
+    if not pdf_available() or backend is None:
+        print("\n⚠️ pypdfium2 or Tesseract not installed, skipping real recognition")
+        return
+    print(f"\n🔍 Real recognition ({backend.name}):")
+    result = extract_pdf_text(scanned_pdf([prescription_page("Amoxicillin 500mg twice daily"),
+                                           prescription_page("Lisinopril 10mg once daily")]),
+                              OCREngine(backend=backend, workers=2))
+    print(f"   OCR text: {result['text']!r}")
+    assert "Amoxicillin" in result['text']
+    assert result['text'].find("Amoxicillin") < result['text'].find("Lisinopril")
+
+
+def scan_client():
+    from flask import Flask
+    os.chdir(BACKEND_DIR)
+    from routes.ocr import ocr_bp
+    from routes.ai_only_ocr import ai_only_ocr_bp
+    app = Flask(__name__)
+    app.register_blueprint(ocr_bp, url_prefix='/ocr')
+    app.register_blueprint(ai_only_ocr_bp, url_prefix='/ai-only-ocr')
+    return app.test_client()
+
+
+def post_pdf(client, path):
+    return client.post(path, data={'file': (io.BytesIO(discharge_pdf()), 'discharge.pdf', 'application/pdf')},
+                       content_type='multipart/form-data')
+
+
+def test_ocr_scan_route():
+    if not pdf_available():
+        print("⚠️ pypdfium2 not installed, skipping")
+        return
+    print("\n🌐 /ocr/scan:")
+    response = post_pdf(scan_client(), '/ocr/scan')
+    body = response.get_json() or {}
+    assert response.status_code == 200
+    assert "Warfarin" in body.get('extracted_text', '')
+    assert any(medicine['name'] == "Metformin" for medicine in body.get('medicines', []))
+
+
+def test_pdf_route_errors():
+    print("\n🚦 PDF errors in the scan routes:")
+    client = scan_client()
+    import routes.ocr as ocr_routes
+    import routes.ai_only_ocr as ai_only_ocr_routes
+    from services.ocr_engine import OCRBusyError
+    from services.pdf_ingest import PDFUnavailableError
+
+    def raise_error(error):
+        def extract(*args, **kwargs):
+            raise error
+        return extract
+
+    real_extracts = ocr_routes.extract_pdf_text, ai_only_ocr_routes.extract_pdf_text
+    try:
+        for module in (ocr_routes, ai_only_ocr_routes):
+            module.extract_pdf_text = raise_error(OCRBusyError(retry_after=3))
+        for path in ('/ocr/scan', '/ai-only-ocr/ai-scan'):
+            response = post_pdf(client, path)
+            assert response.status_code == 429, f"{path}: a saturated OCR engine"
+            assert response.headers.get('Retry-After') == '3'
+
+        for module in (ocr_routes, ai_only_ocr_routes):
+            module.extract_pdf_text = raise_error(PDFUnavailableError("pypdfium2 is not installed"))
+        for path in ('/ocr/scan', '/ai-only-ocr/ai-scan'):
+            response = post_pdf(client, path)
+            assert response.status_code == 415, f"{path}: PDF support not installed"
+            assert "PDF support not installed" in response.get_json()['error']
+    finally:
+        ocr_routes.extract_pdf_text, ai_only_ocr_routes.extract_pdf_text = real_extracts
+
+
+if __name__ == "__main__":
+    print("🧪 Testing PDF ingestion")
+    print("=" * 50)
+    test_text_layer()
+    test_scanned_pages()
+    test_real_recognition()
+    test_ocr_scan_route()
+    test_pdf_route_errors()
+    print("\n🎉 All PDF ingestion checks passed!")
@@ -0,0 +1,161 @@
+"""
+Test script for the drug-name resolution cache (backend/services/resolution_cache.py)
+Checks LRU eviction order, TTL expiry and the hit, miss, eviction, expiration
+and invalidation counters, with a fake clock instead of sleeping, and that
+reloading the drug database re-reads the CSVs and drops cached resolutions.
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+sys.path.append(BACKEND_DIR)
+
+from services.resolution_cache import ResolutionCache
+import services.drug_knowledge_base as drug_knowledge_base
+
+
+class FakeClock:
+    """Stands in for time.monotonic; tests move it forward by hand"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def test_lru_eviction_order():
+    print("\n🗂️ LRU eviction:")
+    cache = ResolutionCache(max_size=3, ttl=None)
+    for key in ('amoxicilin', 'metformn', 'warfarine'):
+        cache.put(key, key.upper())
+    assert cache.get('amoxicilin') == (True, 'AMOXICILIN'), "a lookup makes an entry most recently used"
+
+    cache.put('lisinoprl', 'LISINOPRL')
+    assert cache.get('metformn') == (False, None), "the least recently used entry goes first"
+    assert cache.get('amoxicilin')[0] and cache.get('warfarine')[0] and cache.get('lisinoprl')[0]
+
+    cache.put('warfarine', 'WARFARIN')
+    cache.put('aspirn', 'ASPIRIN')
+    assert cache.get('warfarine') == (True, 'WARFARIN'), "storing an existing key refreshes it"
+    assert cache.get('amoxicilin') == (False, None)
+    assert len(cache) == 3
+    assert cache.get_stats()['evictions'] == 2
+
+
+def test_ttl_expiry():
+    print("\n⏱️ TTL expiry:")
+    clock = FakeClock()
+    cache = ResolutionCache(max_size=10, ttl=60, clock=clock)
+    cache.put('metformn', ('metformin',))
+    cache.put('warfarine', ('warfarin',), ttl=300)
+    cache.put('aspirn', ('aspirin',), ttl=0)
+
+    clock.advance(59)
+    assert cache.get('metformn') == (True, ('metformin',))
+    clock.advance(1)
+    assert cache.get('metformn') == (False, None), "an entry expires once its TTL has passed"
+    assert cache.get('warfarine')[0], "a per-entry TTL overrides the cache-wide one"
+    clock.advance(10 ** 6)
+    assert cache.get('aspirn') == (True, ('aspirin',)), "ttl=0 never expires"
+    assert cache.get('warfarine') == (False, None)
+    assert len(cache) == 1, "expired entries are dropped when looked up"
+    assert cache.get_stats()['expirations'] == 2
+
+
+def test_get_or_compute_and_stats():
+    print("\n📊 Stats:")
+    clock = FakeClock()
+    cache = ResolutionCache(max_size=2, ttl=30, clock=clock)
+    computed = []
+
+    def resolve(name):
+        def compute():
+            computed.append(name)
+            return name.rstrip('e')
+        return compute
+
+    assert cache.get_or_compute('warfarine', resolve('warfarine')) == 'warfarin'
+    assert cache.get_or_compute('warfarine', resolve('warfarine')) == 'warfarin'
+    assert computed == ['warfarine'], "a hit does not compute again"
+    cache.put('missing', None)
+    assert cache.get_or_compute('missing', resolve('missing')) is None, "a cached None is a hit"
+    assert computed == ['warfarine']
+
+    cache.get_or_compute('codeine', resolve('codeine'))
+    clock.advance(31)
+    cache.get_or_compute('codeine', resolve('codeine'))
+    cache.clear()
+    assert len(cache) == 0
+
+    stats = cache.get_stats()
+    print(f"   {stats}")
+    assert (stats['hits'], stats['misses']) == (2, 3)
+    assert stats['hit_rate'] == 0.4
+    assert (stats['evictions'], stats['expirations'], stats['invalidations']) == (1, 1, 1)
+    assert (stats['size'], stats['max_size'], stats['ttl_seconds']) == (0, 2, 30)
+
+
+def test_disabled_cache():
+    print("\n🚫 Disabled cache:")
+    cache = ResolutionCache(max_size=0)
+    assert cache.get_or_compute('metformn', lambda: 'metformin') == 'metformin'
+    assert len(cache) == 0, "max_size=0 stores nothing"
+    assert cache.get_stats()['hit_rate'] == 0.0
+
+
+def write_tables(data_dir, interactions, warnings):
+    with open(os.path.join(data_dir, 'interactions.csv'), 'w') as csvfile:
+        csvfile.write("drug1,drug2,severity,note\n" + "".join(f"{row}\n" for row in interactions))
+    with open(os.path.join(data_dir, 'warnings.csv'), 'w') as csvfile:
+        csvfile.write(" drug_name,age_group,warning,severity,alternative,note\n" + "".join(f"{row}\n" for row in warnings))
+
+
+def test_reload_rereads_tables_and_clears_resolutions():
+    print("\n🔄 Reloading the drug database:")
+    from services.drug_database_service import DrugDatabaseService
+    import services.drug_checker as drug_checker
+
+    data_dir = tempfile.mkdtemp(prefix='drug_tables_')
+    original = drug_knowledge_base.get_knowledge_base()
+    try:
+        write_tables(data_dir, ["Warfarin,Aspirin,medium,Monitor INR"],
+                     ["Aspirin,<16,Risk of Reye's syndrome,High,Paracetamol,Avoid in children"])
+        drug_knowledge_base._knowledge_base = drug_knowledge_base.DrugKnowledgeBase(
+            os.path.join(data_dir, 'interactions.csv'), os.path.join(data_dir, 'warnings.csv'), snapshot_path=None)
+        service = DrugDatabaseService()
+        assert service.find_drug_matches('metformn') == [], "not in the tables yet"
+        assert service.check_drug_interactions(['Warfarin', 'Aspirin'])[0]['severity'] == 'medium'
+
+        write_tables(data_dir, ["Warfarin,Aspirin,critical,Avoid",
+                                "Metformin,Contrast dye,high,Hold before imaging"],
+                     ["Aspirin,<16,Risk of Reye's syndrome,High,Paracetamol,Avoid in children"])
+        service.load_databases()
+        reloaded = drug_knowledge_base.get_knowledge_base()
+        assert service.knowledge_base is reloaded and reloaded.drug_id('metformin') is not None, "the CSVs are re-read"
+        assert service.get_cache_stats()['invalidations'] == 2, "cleared on the first load and again on reload"
+        assert service.find_drug_matches('metformn') == ['metformin'], "the cached miss is gone"
+        assert service.check_drug_interactions(['Warfarin', 'Aspirin'])[0]['severity'] == 'critical'
+        interactions, _ = drug_checker.check_interactions_and_warnings(['Warfarin', 'Aspirin'])
+        assert [interaction['severity'] for interaction in interactions] == ['critical'], "drug_checker re-indexes too"
+    finally:
+        drug_knowledge_base._knowledge_base = original
+        drug_checker.refresh_tables(original)
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    print("🧪 Testing the drug-name resolution cache")
+    print("=" * 50)
+    test_lru_eviction_order()
+    test_ttl_expiry()
+    test_get_or_compute_and_stats()
+    test_disabled_cache()
+    test_reload_rereads_tables_and_clears_resolutions()
+    print("\n🎉 All resolution cache checks passed!")
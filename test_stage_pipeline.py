@@ -0,0 +1,102 @@
+"""
+Test script for the scan stage pipeline (backend/services/stage_pipeline.py)
+Checks that independent stages overlap, dependencies get their inputs,
+stages waiting on the network run on their own pool, per-stage timings are
+reported and stage errors surface.
+"""
+
+import sys
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from services.stage_pipeline import StagePipeline
+
+
+def slow(value, seconds=0.3):
+    time.sleep(seconds)
+    return value
+
+
+def test_fan_out_fan_in():
+    print("\n🔀 Fan-out / fan-in:")
+    pipeline = StagePipeline()
+    pipeline.add('text', lambda file: slow(file.upper()), after=['file'])
+    pipeline.add('interactions', lambda text: slow(f"interactions({text})"), after=['text'])
+    pipeline.add('warnings', lambda text, age: slow(f"warnings({text}, {age})"), after=['text', 'age'])
+    pipeline.add('summary', lambda interactions, warnings: f"{interactions} + {warnings}",
+                 after=['interactions', 'warnings'])
+
+    start = time.perf_counter()
+    values, timings = pipeline.run(file='rx', age=70)
+    elapsed = time.perf_counter() - start
+    assert values['summary'] == "interactions(RX) + warnings(RX, 70)", "dependencies receive their results"
+    assert elapsed < 0.8, f"independent stages overlap ({elapsed:.2f}s for 0.9s of work)"
+    assert list(timings) == ['text', 'interactions', 'warnings', 'summary', 'total_ms'], \
+        "timings cover every stage plus the total"
+    assert (timings['summary']['start_ms'] >=
+            timings['warnings']['start_ms'] + timings['warnings']['duration_ms'] - 1), \
+        "a stage starts after its dependencies finish"
+
+
+def test_io_stages_use_their_own_pool():
+    print("\n🌐 I/O stages:")
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='test-cpu')
+    io_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='test-io')
+    thread_names = {}
+
+    def stage(name, seconds):
+        def run(**_):
+            thread_names[name] = threading.current_thread().name
+            return slow(name, seconds)
+        return run
+
+    pipeline = StagePipeline()
+    pipeline.add('ocr', stage('ocr', 0.1), after=['file'])
+    for name in ('extraction', 'clinical_analysis', 'ai_analysis', 'summary'):
+        pipeline.add(name, stage(name, 0.3), after=['ocr'], io=True)
+    pipeline.add('checks', stage('checks', 0.1), after=['ocr'])
+
+    start = time.perf_counter()
+    try:
+        values, _ = pipeline.run(executor=executor, io_executor=io_executor, file='rx')
+    finally:
+        executor.shutdown()
+        io_executor.shutdown()
+    elapsed = time.perf_counter() - start
+    assert values['checks'] == 'checks' and values['summary'] == 'summary'
+    assert thread_names['ocr'].startswith('test-cpu') and thread_names['checks'].startswith('test-cpu')
+    assert all(thread_names[name].startswith('test-io')
+               for name in ('extraction', 'clinical_analysis', 'ai_analysis', 'summary')), "io=True runs on the I/O pool"
+    assert elapsed < 0.6, f"slow I/O stages do not queue behind the one CPU thread ({elapsed:.2f}s)"
+
+
+def test_errors():
+    print("\n🛟 Errors:")
+    failing = StagePipeline()
+    failing.add('ok', lambda: slow('fine', 0.1))
+    failing.add('broken', lambda: 1 / 0)
+    failing.add('after_broken', lambda broken: 'never', after=['broken'])
+    try:
+        failing.run()
+        raise AssertionError("stage errors should be raised")
+    except ZeroDivisionError:
+        pass
+
+    try:
+        StagePipeline().add('orphan', lambda missing: None, after=['missing']).run()
+        raise AssertionError("unknown dependencies should be rejected")
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    print("🧪 Testing scan stage pipeline")
+    print("=" * 50)
+    test_fan_out_fan_in()
+    test_io_stages_use_their_own_pool()
+    test_errors()
+    print("\n🎉 All stage pipeline checks passed!")
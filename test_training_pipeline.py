@@ -0,0 +1,111 @@
+"""
+Test script for the training pipeline (ml_models/comprehensive_trainer_fixed.py)
+Checks negative sampling is seeded and only draws new pairs, and that
+retraining reuses the cached features and models of every dataset an edit
+didn't touch while producing the same models as a cold run.
+"""
+
+import sys
+import os
+import io
+import shutil
+import tempfile
+import contextlib
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(ROOT_DIR, 'ml_models'))
+
+from comprehensive_trainer_fixed import DoseSafeMLTrainer
+
+STAGES = ['interaction_features', 'extraction_features', 'age_warning_features', 'interaction_classifier',
+          'severity_classifier', 'medicine_extractor', 'age_warning_classifier']
+
+
+def make_trainer(cache_dir, workers=1, seed=42):
+    """Trainer with the repo's CSVs loaded and its datasets built"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        trainer = DoseSafeMLTrainer(cache_dir=cache_dir, workers=workers, seed=seed)
+        trainer.load_existing_data()
+        trainer.create_expanded_interaction_dataset()
+        trainer.create_medicine_extraction_dataset()
+    return trainer
+
+
+def train(trainer):
+    """Stages reused from the cache while training"""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        trainer.train_all_models()
+    return [stage for stage in STAGES if f"♻️ {stage}:" in output.getvalue()]
+
+
+def unordered_pairs(drug1, drug2):
+    return [frozenset(pair) for pair in zip(drug1, drug2)]
+
+
+def test_negative_sampling():
+    print("\n🎲 Negative sampling:")
+    cache_dir = tempfile.mkdtemp(prefix='training_cache_')
+    try:
+        trainer = make_trainer(cache_dir)
+        dataset = trainer.interaction_dataset
+        positives = dataset[dataset['has_interaction'] == 1]
+        negatives = dataset[dataset['has_interaction'] == 0]
+        negative_pairs = unordered_pairs(negatives['drug1'], negatives['drug2'])
+        assert len(negatives) == 2 * len(positives), "two negatives per known interaction"
+        assert all(len(pair) == 2 for pair in negative_pairs), "no drug paired with itself"
+        assert len(set(negative_pairs)) == len(negative_pairs), "no pair drawn twice"
+        assert not set(negative_pairs) & set(unordered_pairs(positives['drug1'], positives['drug2'])), \
+            "no known interaction sampled as a negative, in either order"
+        assert make_trainer(cache_dir).interaction_dataset.equals(dataset), "the same seed draws the same pairs"
+        assert not make_trainer(cache_dir, seed=7).interaction_dataset.equals(dataset), \
+            "another seed draws different pairs"
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    trainer.all_drugs = {'Aspirin', 'Warfarin', 'Metformin'}
+    with contextlib.redirect_stdout(io.StringIO()):
+        drug1, drug2 = trainer._sample_negative_pairs(['Aspirin'], ['Warfarin'], 10)
+    assert sorted(map(sorted, unordered_pairs(drug1, drug2))) == [['Aspirin', 'Metformin'], ['Metformin', 'Warfarin']], \
+        "asking for more pairs than exist returns all of them"
+
+
+def test_training_cache():
+    print("\n♻️ Training cache:")
+    cache_dir = tempfile.mkdtemp(prefix='training_cache_')
+    try:
+        cold = make_trainer(cache_dir)
+        assert train(cold) == [], "a cold cache trains every stage"
+        warm = make_trainer(cache_dir)
+        assert train(warm) == STAGES, "unchanged data reuses every stage"
+        validation = cold.validation_samples['interaction_classifier']
+        assert warm.training_stats == cold.training_stats, "with the same results"
+        assert np.array_equal(warm.models['interaction_classifier'].predict_proba(validation),
+                              cold.models['interaction_classifier'].predict_proba(validation))
+        assert all(model.get_params()['n_jobs'] is None for model in warm.models.values()), \
+            "models are saved with the default n_jobs"
+
+        edited = make_trainer(cache_dir)
+        edited.drug_interactions.loc[0, 'severity'] = 'low' if edited.drug_interactions.loc[0, 'severity'] != 'low' else 'high'
+        with contextlib.redirect_stdout(io.StringIO()):
+            edited.create_expanded_interaction_dataset()
+        assert train(edited) == ['extraction_features', 'age_warning_features', 'medicine_extractor',
+                                 'age_warning_classifier'], "an interaction severity edit retrains only the interaction models"
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print("\n🧵 Concurrent training:")
+    parallel = make_trainer(None, workers=4)
+    assert train(parallel) == [], "no cache, nothing reused"
+    assert parallel.training_stats == cold.training_stats, "training 4 models at once matches training them one at a time"
+    assert list(parallel.models) == list(cold.models)
+
+
+if __name__ == "__main__":
+    print("🧪 Testing the training pipeline")
+    print("=" * 50)
+    test_negative_sampling()
+    test_training_cache()
+    print("\n🎉 All training pipeline checks passed!")